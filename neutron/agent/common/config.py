@@ -37,6 +37,12 @@ ROOT_HELPER_OPTS = [
     # rootwrap daemon command, which may be necessary for Xen?
     cfg.StrOpt('root_helper_daemon',
                help=_('Root helper daemon application to use when possible.')),
+    cfg.IntOpt('root_helper_daemon_pool_size', default=0,
+               help=_('Number of root helper daemon connections commands '
+                      'are dispatched to, each one running its own daemon '
+                      'process. Commands are queued until a connection is '
+                      'available. 0 disables the pool: all the commands '
+                      'then share a single root helper daemon.')),
 ]
 
 AGENT_STATE_OPTS = [
@@ -61,6 +67,12 @@ USE_NAMESPACES_OPTS = [
 IPTABLES_OPTS = [
     cfg.BoolOpt('comment_iptables_rules', default=True,
                 help=_("Add comments to iptables rules.")),
+    cfg.BoolOpt('iptables_incremental_apply', default=False,
+                help=_("Only apply iptables tables and chains that changed "
+                       "since the last apply, using iptables-restore "
+                       "--noflush instead of a full save/restore cycle. "
+                       "Packet and byte counters of rewritten chains are "
+                       "reset.")),
 ]
 
 PROCESS_MONITOR_OPTS = [
@@ -14,6 +14,7 @@
 #    under the License.
 
 import collections
+import contextlib
 import itertools
 import operator
 
@@ -144,6 +145,7 @@ class OVSBridge(BaseOVS):
     def __init__(self, br_name):
         super(OVSBridge, self).__init__()
         self.br_name = br_name
+        self._deferred_flows = None
 
     def set_controller(self, controllers):
         self.ovsdb.set_controller(self.br_name,
@@ -203,21 +205,26 @@ class OVSBridge(BaseOVS):
     def delete_port(self, port_name):
         self.ovsdb.del_port(port_name, self.br_name).execute()
 
-    def run_ofctl(self, cmd, args, process_input=None):
+    def run_ofctl(self, cmd, args, process_input=None, check_error=False):
         full_args = ["ovs-ofctl", cmd, self.br_name] + args
         try:
             return utils.execute(full_args, run_as_root=True,
                                  process_input=process_input)
         except Exception as e:
-            LOG.error(_LE("Unable to execute %(cmd)s. Exception: "
-                          "%(exception)s"),
-                      {'cmd': full_args, 'exception': e})
+            with excutils.save_and_reraise_exception() as ctxt:
+                LOG.error(_LE("Unable to execute %(cmd)s. Exception: "
+                              "%(exception)s"),
+                          {'cmd': full_args, 'exception': e})
+                ctxt.reraise = check_error
 
     def count_flows(self):
         flow_list = self.run_ofctl("dump-flows", []).split("\n")[1:]
         return len(flow_list) - 1
 
     def remove_all_flows(self):
+        if self._deferred_flows is not None:
+            # Pending flows would have been removed too
+            self._deferred_flows = DeferredFlows()
         self.run_ofctl("del-flows", [])
 
     @_ofport_retry
@@ -240,9 +247,46 @@ class OVSBridge(BaseOVS):
                                self.br_name, 'datapath_id')
 
     def do_action_flows(self, action, kwargs_list):
+        if self._deferred_flows is not None:
+            for kw in kwargs_list:
+                self._deferred_flows.add(action, kw)
+            return
         flow_strs = [_build_flow_expr_str(kw, action) for kw in kwargs_list]
         self.run_ofctl('%s-flows' % action, ['-'], '\n'.join(flow_strs))
 
+    @contextlib.contextmanager
+    def defer_apply(self):
+        """Defer apply context."""
+        self.defer_apply_on()
+        try:
+            yield
+        finally:
+            self.defer_apply_off()
+
+    def defer_apply_on(self):
+        """Start deferring flow changes until defer_apply_off is called.
+
+        All the add, mod and delete flow operations on the bridge, including
+        the ones performed through a DeferredOVSBridge, are collected and
+        applied with a minimal number of ovs-ofctl calls.
+        """
+        if self._deferred_flows is None:
+            self._deferred_flows = DeferredFlows()
+
+    def defer_apply_off(self):
+        """Apply the deferred flow changes.
+
+        An exception is raised if a batch could not be applied, the flow
+        changes which were not applied are lost.
+        """
+        deferred_flows = self._deferred_flows
+        self._deferred_flows = None
+        if not deferred_flows:
+            return
+        for action, flow_strs in deferred_flows.get_batches():
+            self.run_ofctl('%s-flows' % action, ['-'], '\n'.join(flow_strs),
+                           check_error=True)
+
     def add_flow(self, **kwargs):
         self.do_action_flows('add', [kwargs])
 
@@ -398,6 +442,16 @@ class OVSBridge(BaseOVS):
         results = cmd.execute(check_error=True)
         return {p['name']: p['tag'] for p in results}
 
+    def get_vif_port_index(self):
+        """Return an incrementally updated index of the bridge VIF ports.
+
+        None is returned if the configured OVSDB interface does not keep a
+        replica of the database, callers must then rely on the get_vif_*
+        methods.
+        """
+        return self.ovsdb.get_vif_port_index(self.br_name,
+                                             self.portid_from_external_ids)
+
     def get_vif_port_by_id(self, port_id):
         ports = self.ovsdb.db_find(
             'Interface', ('external_ids', '=', {'iface-id': port_id}),
@@ -527,6 +581,64 @@ class DeferredOVSBridge(object):
                           self.br.br_name)
 
 
+class DeferredFlows(object):
+    '''Flow operations collected during an OVSBridge flow transaction.
+
+    Operations are grouped in batches of the same action, each batch being
+    applied with a single ovs-ofctl call. An operation is appended to the
+    last batch of its action only if it commutes with all the following
+    batches, so that the result is the same as applying the operations one
+    by one. It is the case when the operation matches an in_port no
+    following operation matches, and the following batches only add flows
+    or all specify an in_port: a non-strict mod or delete matching an
+    in_port never affects flows with another or no in_port.
+    '''
+
+    def __init__(self):
+        self.batches = []
+
+    def __len__(self):
+        return sum(len(batch.flow_strs) for batch in self.batches)
+
+    @staticmethod
+    def _commutes(in_port, batch):
+        return (in_port is not None and in_port not in batch.in_ports and
+                (batch.action == 'add' or not batch.any_port))
+
+    def add(self, action, flow_dict):
+        in_port = flow_dict.get('in_port')
+        if in_port is not None:
+            in_port = str(in_port)
+        flow_str = _build_flow_expr_str(dict(flow_dict), action)
+
+        target = None
+        for batch in reversed(self.batches):
+            if batch.action == action:
+                target = batch
+                break
+            if not self._commutes(in_port, batch):
+                break
+        if target is None:
+            target = _FlowBatch(action)
+            self.batches.append(target)
+        target.flow_strs.append(flow_str)
+        if in_port is None:
+            target.any_port = True
+        else:
+            target.in_ports.add(in_port)
+
+    def get_batches(self):
+        return [(batch.action, batch.flow_strs) for batch in self.batches]
+
+
+class _FlowBatch(object):
+    def __init__(self, action):
+        self.action = action
+        self.flow_strs = []
+        self.in_ports = set()
+        self.any_port = False
+
+
 def _build_flow_expr_str(flow_dict, cmd):
     flow_expr_arr = []
     actions = None
@@ -55,6 +55,8 @@ class DhcpAgent(manager.Manager):
     def __init__(self, host=None):
         super(DhcpAgent, self).__init__(host=host)
         self.needs_resync_reasons = collections.defaultdict(list)
+        # Networks whose port changes wait for the periodic reload
+        self.pending_reloads = set()
         self.conf = cfg.CONF
         self.cache = NetworkCache()
         self.dhcp_driver_cls = importutils.import_class(self.conf.dhcp_driver)
@@ -96,6 +98,8 @@ class DhcpAgent(manager.Manager):
         """Activate the DHCP agent."""
         self.sync_state()
         self.periodic_resync()
+        if self.conf.dhcp_reload_interval:
+            self.periodic_reload()
 
     def call_driver(self, action, network, **action_kwargs):
         """Invoke an action on a DHCP driver instance."""
@@ -140,10 +144,34 @@ class DhcpAgent(manager.Manager):
         """
         self.needs_resync_reasons[network].append(reason)
 
+    def _fetch_networks_markers(self):
+        try:
+            return self.plugin_rpc.get_active_networks_markers()
+        except oslo_messaging.RemoteError as e:
+            if e.exc_type != 'UnsupportedVersion':
+                raise
+            LOG.warning(_LW('Server does not support networks markers, '
+                            'networks are fetched all at once'))
+
+    def _fetch_networks_in_pages(self, network_ids):
+        page_size = self.conf.sync_networks_page_size
+        for index in range(0, len(network_ids), page_size):
+            page = network_ids[index:index + page_size]
+            for network in self.plugin_rpc.get_active_networks_info(page):
+                yield network
+
+    def _is_network_changed(self, network_id, marker):
+        network = self.cache.get_network_by_id(network_id)
+        return not network or network.get('revision_marker') != marker
+
     @utils.synchronized('dhcp-agent')
     def sync_state(self, networks=None):
         """Sync the local DHCP state with Neutron. If no networks are passed,
         or 'None' is one of the networks, sync all of the networks.
+
+        Only the networks whose revision marker changed since they were last
+        fetched are fetched again, along with the given networks, if the
+        server supports revision markers.
         """
         only_nets = set([] if (not networks or None in networks) else networks)
         LOG.info(_LI('Synchronizing state'))
@@ -151,8 +179,13 @@ class DhcpAgent(manager.Manager):
         known_network_ids = set(self.cache.get_network_ids())
 
         try:
-            active_networks = self.plugin_rpc.get_active_networks_info()
-            active_network_ids = set(network.id for network in active_networks)
+            markers = self._fetch_networks_markers()
+            if markers is None:
+                active_networks = self.plugin_rpc.get_active_networks_info()
+                active_network_ids = set(network.id
+                                         for network in active_networks)
+            else:
+                active_network_ids = set(markers)
             for deleted_id in known_network_ids - active_network_ids:
                 try:
                     self.disable_dhcp_helper(deleted_id)
@@ -161,10 +194,23 @@ class DhcpAgent(manager.Manager):
                     LOG.exception(_LE('Unable to sync network state on '
                                       'deleted network %s'), deleted_id)
 
-            for network in active_networks:
-                if (not only_nets or  # specifically resync all
-                        network.id not in known_network_ids or  # missing net
-                        network.id in only_nets):  # specific network to sync
+            if markers is None:
+                for network in active_networks:
+                    if (not only_nets or  # specifically resync all
+                            network.id not in known_network_ids or  # missing
+                            network.id in only_nets):  # specific network
+                        pool.spawn(self.safe_configure_dhcp_for_network,
+                                   network)
+            else:
+                network_ids = [
+                    network_id for network_id, marker in markers.items()
+                    if (network_id in only_nets or
+                        self._is_network_changed(network_id, marker))]
+                LOG.debug('Fetching %(changed)s of %(total)s networks',
+                          {'changed': len(network_ids),
+                           'total': len(markers)})
+                # Networks are configured while the next page is fetched
+                for network in self._fetch_networks_in_pages(network_ids):
                     pool.spawn(self.safe_configure_dhcp_for_network, network)
             pool.waitall()
             LOG.info(_LI('Synchronizing state complete'))
@@ -194,6 +240,35 @@ class DhcpAgent(manager.Manager):
         """Spawn a thread to periodically resync the dhcp state."""
         eventlet.spawn(self._periodic_resync_helper)
 
+    def reload_allocations(self, network):
+        """Reload the allocations of a network after a port change."""
+        if self.conf.dhcp_reload_interval:
+            self.pending_reloads.add(network.id)
+        else:
+            self.call_driver('reload_allocations', network)
+
+    @utils.synchronized('dhcp-agent')
+    def reload_pending_networks(self):
+        """Reload the allocations of the networks with pending changes."""
+        network_ids = self.pending_reloads
+        self.pending_reloads = set()
+        for network_id in network_ids:
+            network = self.cache.get_network_by_id(network_id)
+            if network:
+                self.call_driver('reload_allocations', network)
+
+    @utils.exception_logger()
+    def _periodic_reload_helper(self):
+        """Reload the changed networks at the configured interval."""
+        while True:
+            eventlet.sleep(self.conf.dhcp_reload_interval)
+            if self.pending_reloads:
+                self.reload_pending_networks()
+
+    def periodic_reload(self):
+        """Spawn a thread to periodically reload the changed networks."""
+        eventlet.spawn(self._periodic_reload_helper)
+
     def safe_get_network_info(self, network_id):
         try:
             network = self.plugin_rpc.get_network_info(network_id)
@@ -262,6 +337,9 @@ class DhcpAgent(manager.Manager):
             # DHCP current not running for network.
             return self.enable_dhcp_helper(network_id)
 
+        # The cached network no longer matches the network it was fetched as,
+        # see NetworkCache.invalidate_marker.
+        self.cache.invalidate_marker(old_network)
         network = self.safe_get_network_info(network_id)
         if not network:
             return
@@ -330,7 +408,11 @@ class DhcpAgent(manager.Manager):
                 if old_ips != new_ips:
                     driver_action = 'restart'
             self.cache.put_port(updated_port)
-            self.call_driver(driver_action, network)
+            if driver_action == 'reload_allocations':
+                self.reload_allocations(network)
+            else:
+                self.pending_reloads.discard(network.id)
+                self.call_driver(driver_action, network)
 
     def _is_port_on_this_agent(self, port):
         thishost = utils.get_dhcp_agent_device_id(
@@ -347,7 +429,7 @@ class DhcpAgent(manager.Manager):
         if port:
             network = self.cache.get_network_by_id(port.network_id)
             self.cache.remove_port(port)
-            self.call_driver('reload_allocations', network)
+            self.reload_allocations(network)
 
     def enable_isolated_metadata_proxy(self, network):
 
@@ -394,6 +476,8 @@ class DhcpPluginApi(object):
         1.0 - Initial version.
         1.1 - Added get_active_networks_info, create_dhcp_port,
               and update_dhcp_port methods.
+        1.2 - Added get_active_networks_markers, and the network_ids
+              argument of get_active_networks_info.
 
     """
 
@@ -407,13 +491,27 @@ class DhcpPluginApi(object):
                 version='1.0')
         self.client = n_rpc.get_client(target)
 
-    def get_active_networks_info(self):
-        """Make a remote process call to retrieve all network info."""
-        cctxt = self.client.prepare(version='1.1')
-        networks = cctxt.call(self.context, 'get_active_networks_info',
-                              host=self.host)
+    def get_active_networks_info(self, network_ids=None):
+        """Make a remote process call to retrieve all network info.
+
+        Only the networks of network_ids are retrieved if they are given.
+        """
+        if network_ids is None:
+            cctxt = self.client.prepare(version='1.1')
+            networks = cctxt.call(self.context, 'get_active_networks_info',
+                                  host=self.host)
+        else:
+            cctxt = self.client.prepare(version='1.2')
+            networks = cctxt.call(self.context, 'get_active_networks_info',
+                                  host=self.host, network_ids=network_ids)
         return [dhcp.NetModel(self.use_namespaces, n) for n in networks]
 
+    def get_active_networks_markers(self):
+        """Make a remote process call to retrieve networks markers."""
+        cctxt = self.client.prepare(version='1.2')
+        return cctxt.call(self.context, 'get_active_networks_markers',
+                          host=self.host)
+
     def get_network_info(self, network_id):
         """Make a remote process call to retrieve network info."""
         cctxt = self.client.prepare()
@@ -502,8 +600,18 @@ class NetworkCache(object):
         for port in network.ports:
             del self.port_lookup[port.id]
 
+    def invalidate_marker(self, network):
+        """Drop the revision marker of a network modified in place.
+
+        The marker describes the network as it was fetched, once the network
+        is updated from notifications it must be fetched again on the next
+        sync_state even if the server side marker is unchanged.
+        """
+        network.pop('revision_marker', None)
+
     def put_port(self, port):
         network = self.get_network_by_id(port.network_id)
+        self.invalidate_marker(network)
         for index in range(len(network.ports)):
             if network.ports[index].id == port.id:
                 network.ports[index] = port
@@ -515,6 +623,7 @@ class NetworkCache(object):
 
     def remove_port(self, port):
         network = self.get_network_by_port_id(port.id)
+        self.invalidate_marker(network)
 
         for index in range(len(network.ports)):
             if network.ports[index] == port:
@@ -568,6 +677,13 @@ class DhcpAgentWithStateReport(DhcpAgent):
         try:
             self.agent_state.get('configurations').update(
                 self.cache.get_state())
+            rootwrap_daemon_pool = (
+                linux_utils.RootwrapDaemonHelper.get_stats())
+            if rootwrap_daemon_pool is not None:
+                # NOTE: logged rather than reported, the pool metrics change
+                # on every report.
+                LOG.debug("Rootwrap daemon pool stats: %s",
+                          rootwrap_daemon_pool)
             ctx = context.get_admin_context_without_session()
             self.state_rpc.report_state(ctx, self.agent_state, self.use_call)
             self.use_call = False
@@ -29,7 +29,16 @@ DHCP_AGENT_OPTS = [
                        "dedicated network. Requires "
                        "enable_isolated_metadata = True")),
     cfg.IntOpt('num_sync_threads', default=4,
-               help=_('Number of threads to use during sync process.'))
+               help=_('Number of threads to use during sync process.')),
+    cfg.IntOpt('sync_networks_page_size', default=100,
+               help=_('Maximum number of networks fetched from the server '
+                      'at once during a sync. Only the networks changed '
+                      'since they were last fetched are fetched.')),
+    cfg.IntOpt('dhcp_reload_interval', default=0,
+               help=_("Interval in seconds at which the DHCP server of a "
+                      "network is reloaded for the port changes received "
+                      "during the interval, instead of once per port "
+                      "change. 0 reloads it on each port change.")),
 ]
 
 DHCP_OPTS = [
@@ -57,4 +66,9 @@ DNSMASQ_OPTS = [
         help=_('Limit number of leases to prevent a denial-of-service.')),
     cfg.BoolOpt('dhcp_broadcast_reply', default=False,
                 help=_("Use broadcast in DHCP replies")),
+    cfg.BoolOpt('dnsmasq_use_hostsdir', default=False,
+                help=_("Write one hosts file per port in the directories "
+                       "given to the --dhcp-hostsdir and --hostsdir options "
+                       "of dnsmasq, which reads the added hosts without "
+                       "being reloaded. Requires dnsmasq 2.73 or later.")),
 ]
@@ -113,6 +113,14 @@ class FirewallDriver(object):
         """Update rules in a security group."""
         raise NotImplementedError()
 
+    def update_security_group_member_ips(self, sg_id, added_ips,
+                                         removed_ips):
+        """Add and remove member IPs of a security group.
+
+        Member updates of the groups the firewall does not use are ignored.
+        """
+        raise NotImplementedError()
+
 
 class NoopFirewallDriver(FirewallDriver):
     """Noop Firewall Driver.
@@ -148,3 +156,7 @@ class NoopFirewallDriver(FirewallDriver):
 
     def update_security_group_rules(self, sg_id, rules):
         pass
+
+    def update_security_group_member_ips(self, sg_id, added_ips,
+                                         removed_ips):
+        pass
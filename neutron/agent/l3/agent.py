@@ -32,6 +32,7 @@ from neutron.agent.l3 import namespaces
 from neutron.agent.l3 import router_processing_queue as queue
 from neutron.agent.linux import external_process
 from neutron.agent.linux import ip_lib
+from neutron.agent.linux import utils as linux_utils
 from neutron.agent.metadata import driver as metadata_driver
 from neutron.agent import rpc as agent_rpc
 from neutron.callbacks import events
@@ -76,6 +77,7 @@ class L3PluginApi(object):
         1.4 - Added L3 HA update_router_state. This method was reworked in
               to update_ha_routers_states
         1.5 - Added update_ha_routers_states
+        1.6 - Added get_router_ids
 
     """
 
@@ -90,6 +92,11 @@ class L3PluginApi(object):
         return cctxt.call(context, 'sync_routers', host=self.host,
                           router_ids=router_ids)
 
+    def get_router_ids(self, context):
+        """Make a remote process call to retrieve scheduled routers ids."""
+        cctxt = self.client.prepare(version='1.6')
+        return cctxt.call(context, 'get_router_ids', host=self.host)
+
     def get_external_network_id(self, context):
         """Make a remote process call to retrieve the external network id.
 
@@ -214,6 +221,7 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
             self.conf.use_namespaces)
 
         self._queue = queue.RouterProcessingQueue()
+        self.sync_routers_chunk_size = self.conf.sync_routers_chunk_size
         super(L3NATAgent, self).__init__(conf=self.conf)
 
         self.target_ex_net_id = None
@@ -238,6 +246,11 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
             LOG.error(msg)
             raise SystemExit(1)
 
+        if self.conf.router_processing_workers < 1:
+            msg = _LE('router_processing_workers must be at least 1.')
+            LOG.error(msg)
+            raise SystemExit(1)
+
         if self.conf.ipv6_gateway:
             # ipv6_gateway configured. Check for valid v6 link-local address.
             try:
@@ -478,7 +491,7 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
 
     def _process_routers_loop(self):
         LOG.debug("Starting _process_routers_loop")
-        pool = eventlet.GreenPool(size=8)
+        pool = eventlet.GreenPool(size=self.conf.router_processing_workers)
         while True:
             pool.spawn_n(self._process_router_update)
 
@@ -508,34 +521,67 @@ class L3NATAgent(firewall_l3_agent.FWaaSL3AgentRpcCallback,
         except n_exc.AbortSyncRouters:
             self.fullsync = True
 
+    def _fetch_router_ids(self, context):
+        if not self.conf.use_namespaces:
+            return [self.conf.router_id]
+        try:
+            return self.plugin_rpc.get_router_ids(context)
+        except oslo_messaging.RemoteError as e:
+            if e.exc_type != 'UnsupportedVersion':
+                raise
+            LOG.warning(_LW('Server does not support router ids fetching, '
+                            'routers are fetched all at once'))
+
+    def _fetch_routers_in_chunks(self, context, router_ids):
+        """Fetch routers by chunks, halving the chunk size on timeouts."""
+        index = 0
+        while index < len(router_ids):
+            chunk = router_ids[index:index + self.sync_routers_chunk_size]
+            try:
+                routers = self.plugin_rpc.get_routers(context, chunk)
+            except oslo_messaging.MessagingTimeout:
+                if self.sync_routers_chunk_size == 1:
+                    raise
+                self.sync_routers_chunk_size = max(
+                    self.sync_routers_chunk_size // 2, 1)
+                LOG.warning(_LW('Timeout fetching %(count)s routers, '
+                                'fetching routers by %(size)s'),
+                            {'count': len(chunk),
+                             'size': self.sync_routers_chunk_size})
+                continue
+            index += len(chunk)
+            yield routers
+
     def fetch_and_sync_all_routers(self, context, ns_manager):
         prev_router_ids = set(self.router_info)
+        curr_router_ids = set()
         timestamp = timeutils.utcnow()
 
         try:
-            if self.conf.use_namespaces:
-                routers = self.plugin_rpc.get_routers(context)
+            router_ids = self._fetch_router_ids(context)
+            if router_ids is None:
+                chunks = [self.plugin_rpc.get_routers(context)]
             else:
-                routers = self.plugin_rpc.get_routers(context,
-                                                      [self.conf.router_id])
-
+                chunks = self._fetch_routers_in_chunks(context, router_ids)
+            # Routers of a chunk are queued as soon as it is received
+            for routers in chunks:
+                LOG.debug('Processing :%r', routers)
+                for r in routers:
+                    ns_manager.keep_router(r['id'])
+                    curr_router_ids.add(r['id'])
+                    update = queue.RouterUpdate(
+                        r['id'],
+                        queue.PRIORITY_SYNC_ROUTERS_TASK,
+                        router=r,
+                        timestamp=timestamp)
+                    self._queue.add(update)
         except oslo_messaging.MessagingException:
             LOG.exception(_LE("Failed synchronizing routers due to RPC error"))
             raise n_exc.AbortSyncRouters()
         else:
-            LOG.debug('Processing :%r', routers)
-            for r in routers:
-                ns_manager.keep_router(r['id'])
-                update = queue.RouterUpdate(r['id'],
-                                            queue.PRIORITY_SYNC_ROUTERS_TASK,
-                                            router=r,
-                                            timestamp=timestamp)
-                self._queue.add(update)
             self.fullsync = False
             LOG.debug("periodic_sync_routers_task successfully completed")
 
-            curr_router_ids = set([r['id'] for r in routers])
-
             # Delete routers that have disappeared since the last sync
             for router_id in prev_router_ids - curr_router_ids:
                 ns_manager.keep_router(router_id)
@@ -599,6 +645,13 @@ class L3NATAgentWithStateReport(L3NATAgent):
         configurations['ex_gw_ports'] = num_ex_gw_ports
         configurations['interfaces'] = num_interfaces
         configurations['floating_ips'] = num_floating_ips
+        # NOTE: the processing metrics change on every report, they are
+        # logged rather than reported so that the agent configurations
+        # stored by the server only change with the agent state.
+        LOG.debug("Router processing stats: %s", self._queue.get_stats())
+        rootwrap_daemon_pool = linux_utils.RootwrapDaemonHelper.get_stats()
+        if rootwrap_daemon_pool is not None:
+            LOG.debug("Rootwrap daemon pool stats: %s", rootwrap_daemon_pool)
         try:
             self.state_rpc.report_state(self.context, self.agent_state,
                                         self.use_call)
@@ -86,4 +86,14 @@ OPTS = [
                default='0x2',
                help=_('Iptables mangle mark used to mark ingress from '
                       'external network')),
+    cfg.IntOpt('router_processing_workers', default=8,
+               help=_('Number of routers processed concurrently, at least '
+                      'one. Updates of a router are always processed in '
+                      'order, updates requested by the server before those '
+                      'of the periodic resync.')),
+    cfg.IntOpt('sync_routers_chunk_size', default=256,
+               help=_('Maximum number of routers fetched from the server at '
+                      'once during a full sync. The size is halved, down to '
+                      'one router, each time the server does not answer '
+                      'in time.')),
 ]
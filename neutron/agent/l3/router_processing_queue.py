@@ -14,6 +14,8 @@
 #
 
 import datetime
+import time
+
 from six.moves import queue as Queue
 
 from oslo_utils import timeutils
@@ -23,6 +25,9 @@ PRIORITY_RPC = 0
 PRIORITY_SYNC_ROUTERS_TASK = 1
 DELETE_ROUTER = 1
 
+PRIORITY_NAMES = {PRIORITY_RPC: 'rpc',
+                  PRIORITY_SYNC_ROUTERS_TASK: 'sync_routers_task'}
+
 
 class RouterUpdate(object):
     """Encapsulates a router update
@@ -39,6 +44,8 @@ class RouterUpdate(object):
         self.id = router_id
         self.action = action
         self.router = router
+        self.queued_at = None
+        self.wait_time = 0.0
 
     def __lt__(self, other):
         """Implements priority among updates
@@ -139,10 +146,45 @@ class RouterProcessingQueue(object):
     """Manager of the queue of routers to process."""
     def __init__(self):
         self._queue = Queue.PriorityQueue()
+        self._stats = {}
 
     def add(self, update):
+        update.queued_at = time.time()
         self._queue.put(update)
 
+    def _update_stats(self, update, wait_time, process_time):
+        name = PRIORITY_NAMES.get(update.priority, str(update.priority))
+        stats = self._stats.setdefault(name, {'updates': 0,
+                                              'total_wait_time': 0.0,
+                                              'max_wait_time': 0.0,
+                                              'total_process_time': 0.0,
+                                              'max_process_time': 0.0,
+                                              'slowest_router': None})
+        stats['updates'] += 1
+        stats['total_wait_time'] += wait_time
+        stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+        stats['total_process_time'] += process_time
+        if process_time >= stats['max_process_time']:
+            stats['max_process_time'] = process_time
+            stats['slowest_router'] = update.id
+
+    def get_stats(self):
+        """Return the wait and processing time metrics by priority.
+
+        Times are in seconds, the wait time being the time spent by updates
+        in the queue before a worker picks them.
+        """
+        stats = {'queue_depth': self._queue.qsize()}
+        for name, priority_stats in self._stats.items():
+            priority_stats = dict(priority_stats)
+            updates = priority_stats['updates'] or 1
+            priority_stats['avg_wait_time'] = (
+                priority_stats['total_wait_time'] / updates)
+            priority_stats['avg_process_time'] = (
+                priority_stats['total_process_time'] / updates)
+            stats[name] = priority_stats
+        return stats
+
     def each_update_to_next_router(self):
         """Grabs the next router from the queue and processes
 
@@ -150,6 +192,7 @@ class RouterProcessingQueue(object):
         updates stop bubbling to the front of the queue.
         """
         next_update = self._queue.get()
+        next_update.wait_time = time.time() - next_update.queued_at
 
         with ExclusiveRouterProcessor(next_update.id) as rp:
             # Queue the update whether this worker is the master or not.
@@ -159,4 +202,7 @@ class RouterProcessingQueue(object):
             # rp.updates() will not yield and so this will essentially be a
             # noop.
             for update in rp.updates():
+                started_at = time.time()
                 yield (rp, update)
+                self._update_stats(update, update.wait_time,
+                                   time.time() - started_at)
@@ -166,6 +166,11 @@ class DhcpBase(object):
 class DhcpLocalProcess(DhcpBase):
     PORTS = []
 
+    # Content of the config files written by this agent, by file name. Driver
+    # instances only live for one action, the content is kept to not rewrite
+    # unchanged files and not reload the process needlessly.
+    _config_contents = {}
+
     def __init__(self, conf, network, process_monitor, version=None,
                  plugin=None):
         super(DhcpLocalProcess, self).__init__(conf, network, process_monitor,
@@ -184,6 +189,28 @@ class DhcpLocalProcess(DhcpBase):
 
     def _remove_config_files(self):
         shutil.rmtree(self.network_conf_dir, ignore_errors=True)
+        prefix = os.path.join(self.network_conf_dir, '')
+        for filename in list(self._config_contents):
+            if filename.startswith(prefix):
+                del self._config_contents[filename]
+
+    def _replace_config_file(self, filename, data, **kwargs):
+        """Write data to filename unless the file already has this content.
+
+        Returns True if the file was written.
+        """
+        if self._config_contents.get(filename) == data:
+            return False
+        utils.replace_file(filename, data, **kwargs)
+        self._config_contents[filename] = data
+        return True
+
+    def _remove_config_file(self, filename):
+        self._config_contents.pop(filename, None)
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
 
     def _enable_dhcp(self):
         """check if there is a subnet within the network with dhcp enabled."""
@@ -281,6 +308,10 @@ class Dnsmasq(DhcpLocalProcess):
 
     _TAG_PREFIX = 'tag%d'
 
+    # Set by the _output_* methods when dnsmasq has to be reloaded to take
+    # the written files into account
+    _reload_needed = False
+
     @classmethod
     def check_version(cls):
         pass
@@ -307,12 +338,20 @@ class Dnsmasq(DhcpLocalProcess):
             '--interface=%s' % self.interface_name,
             '--except-interface=lo',
             '--pid-file=%s' % pid_file,
-            '--dhcp-hostsfile=%s' % self.get_conf_file_name('host'),
-            '--addn-hosts=%s' % self.get_conf_file_name('addn_hosts'),
+        ]
+        if self.conf.dnsmasq_use_hostsdir:
+            cmd.extend([
+                '--dhcp-hostsdir=%s' % self.get_conf_file_name('host.d'),
+                '--hostsdir=%s' % self.get_conf_file_name('addn_hosts.d')])
+        else:
+            cmd.extend([
+                '--dhcp-hostsfile=%s' % self.get_conf_file_name('host'),
+                '--addn-hosts=%s' % self.get_conf_file_name('addn_hosts')])
+        cmd.extend([
             '--dhcp-optsfile=%s' % self.get_conf_file_name('opts'),
             '--leasefile-ro',
             '--dhcp-authoritative',
-        ]
+        ])
 
         possible_leases = 0
         for i, subnet in enumerate(self.network.subnets):
@@ -384,16 +423,17 @@ class Dnsmasq(DhcpLocalProcess):
     def _spawn_or_reload_process(self, reload_with_HUP):
         """Spawns or reloads a Dnsmasq process for the network.
 
-        When reload_with_HUP is True, dnsmasq receives a HUP signal,
-        or it's reloaded if the process is not running.
+        When reload_with_HUP is True, dnsmasq receives a HUP signal if its
+        config files changed, or it's reloaded if the process is not running.
         """
 
+        self._reload_needed = False
         self._output_config_files()
 
         pm = self._get_process_manager(
             cmd_callback=self._build_cmdline_callback)
 
-        pm.enable(reload_cfg=reload_with_HUP)
+        pm.enable(reload_cfg=reload_with_HUP and self._reload_needed)
 
         self.process_monitor.register(uuid=self.network.id,
                                       service_name=DNSMASQ_SERVICE_NAME,
@@ -406,8 +446,11 @@ class Dnsmasq(DhcpLocalProcess):
         ip_wrapper.netns.execute(cmd, run_as_root=True)
 
     def _output_config_files(self):
-        self._output_hosts_file()
-        self._output_addn_hosts_file()
+        if self.conf.dnsmasq_use_hostsdir:
+            self._output_hosts_dirs()
+        else:
+            self._output_hosts_file()
+            self._output_addn_hosts_file()
         self._output_opts_file()
 
     def reload_allocations(self):
@@ -461,39 +504,36 @@ class Dnsmasq(DhcpLocalProcess):
                     fqdn = '%s.%s' % (fqdn, self.conf.dhcp_domain)
                 yield (port, alloc, hostname, fqdn)
 
-    def _output_hosts_file(self):
-        """Writes a dnsmasq compatible dhcp hosts file.
+    def _iter_host_entries(self):
+        """Iterate over the dnsmasq entries of the hosts.
 
-        The generated file is sent to the --dhcp-hostsfile option of dnsmasq,
-        and lists the hosts on the network which should receive a dhcp lease.
-        Each line in this file is in the form::
-
-            'mac_address,FQDN,ip_address'
-
-        IMPORTANT NOTE: a dnsmasq instance does not resolve hosts defined in
-        this file if it did not give a lease to a host listed in it (e.g.:
-        multiple dnsmasq instances on the same network if this network is on
-        multiple network nodes). This file is only defining hosts which
-        should receive a dhcp lease, the hosts resolution in itself is
-        defined by the `_output_addn_hosts_file` method.
+        For each host on the network we yield a tuple containing:
+        (
+            port_id,  # The id of the port of the host.
+            host_entry,  # The --dhcp-hostsfile line of the host, or None.
+            addn_hosts_entry,  # The --addn-hosts line of the host, or None.
+        )
         """
-        buf = six.StringIO()
-        filename = self.get_conf_file_name('host')
-
-        LOG.debug('Building host file: %s', filename)
         dhcp_enabled_subnet_ids = [s.id for s in self.network.subnets
                                    if s.enable_dhcp]
         # NOTE(ihrachyshka): the loop should not log anything inside it, to
         # avoid potential performance drop when lots of hosts are dumped
-        for (port, alloc, hostname, name) in self._iter_hosts():
+        for (port, alloc, hostname, fqdn) in self._iter_hosts():
             if not alloc:
                 if getattr(port, 'extra_dhcp_opts', False):
-                    buf.write('%s,%s%s\n' %
-                              (port.mac_address, 'set:', port.id))
+                    yield (port.id,
+                           '%s,%s%s\n' % (port.mac_address, 'set:', port.id),
+                           None)
                 continue
 
+            # It is compulsory to write the `fqdn` before the `hostname` in
+            # order to obtain it in PTR responses.
+            addn_hosts_entry = '%s\t%s %s\n' % (alloc.ip_address, fqdn,
+                                                hostname)
+
             # don't write ip address which belongs to a dhcp disabled subnet.
             if alloc.subnet_id not in dhcp_enabled_subnet_ids:
+                yield (port.id, None, addn_hosts_entry)
                 continue
 
             # (dzyu) Check if it is legal ipv6 address, if so, need wrap
@@ -504,30 +544,65 @@ class Dnsmasq(DhcpLocalProcess):
                 ip_address = '[%s]' % ip_address
 
             if getattr(port, 'extra_dhcp_opts', False):
-                buf.write('%s,%s,%s,%s%s\n' %
-                          (port.mac_address, name, ip_address,
-                           'set:', port.id))
+                host_entry = '%s,%s,%s,%s%s\n' % (port.mac_address, fqdn,
+                                                  ip_address, 'set:', port.id)
             else:
-                buf.write('%s,%s,%s\n' %
-                          (port.mac_address, name, ip_address))
+                host_entry = '%s,%s,%s\n' % (port.mac_address, fqdn,
+                                             ip_address)
+            yield (port.id, host_entry, addn_hosts_entry)
+
+    def _output_hosts_file(self):
+        """Writes a dnsmasq compatible dhcp hosts file.
+
+        The generated file is sent to the --dhcp-hostsfile option of dnsmasq,
+        and lists the hosts on the network which should receive a dhcp lease.
+        Each line in this file is in the form::
 
-        utils.replace_file(filename, buf.getvalue())
+            'mac_address,FQDN,ip_address'
+
+        IMPORTANT NOTE: a dnsmasq instance does not resolve hosts defined in
+        this file if it did not give a lease to a host listed in it (e.g.:
+        multiple dnsmasq instances on the same network if this network is on
+        multiple network nodes). This file is only defining hosts which
+        should receive a dhcp lease, the hosts resolution in itself is
+        defined by the `_output_addn_hosts_file` method.
+        """
+        filename = self.get_conf_file_name('host')
+
+        LOG.debug('Building host file: %s', filename)
+        data = ''.join(host_entry for (port_id, host_entry, addn_hosts_entry)
+                       in self._iter_host_entries() if host_entry)
+        if self._replace_config_file(filename, data):
+            self._reload_needed = True
         LOG.debug('Done building host file %s with contents:\n%s', filename,
-                  buf.getvalue())
+                  data)
         return filename
 
     def _read_hosts_file_leases(self, filename):
         leases = set()
-        if os.path.exists(filename):
+        data = self._config_contents.get(filename)
+        if data is not None:
+            lines = data.splitlines()
+        elif os.path.exists(filename):
             with open(filename) as f:
-                for l in f.readlines():
-                    host = l.strip().split(',')
-                    leases.add((host[2].strip('[]'), host[0]))
+                lines = f.readlines()
+        else:
+            lines = []
+        for l in lines:
+            host = l.strip().split(',')
+            leases.add((host[2].strip('[]'), host[0]))
         return leases
 
     def _release_unused_leases(self):
-        filename = self.get_conf_file_name('host')
-        old_leases = self._read_hosts_file_leases(filename)
+        if self.conf.dnsmasq_use_hostsdir:
+            hosts_dir = self.get_conf_file_name('host.d')
+            filenames = [os.path.join(hosts_dir, port_id)
+                         for port_id in self._list_hosts_dir(hosts_dir)]
+        else:
+            filenames = [self.get_conf_file_name('host')]
+        old_leases = set()
+        for filename in filenames:
+            old_leases |= self._read_hosts_file_leases(filename)
 
         new_leases = set()
         for port in self.network.ports:
@@ -547,23 +622,65 @@ class Dnsmasq(DhcpLocalProcess):
         Each line in this file is in the same form as a standard /etc/hosts
         file.
         """
-        buf = six.StringIO()
-        for (port, alloc, hostname, fqdn) in self._iter_hosts():
-            # It is compulsory to write the `fqdn` before the `hostname` in
-            # order to obtain it in PTR responses.
-            if alloc:
-                buf.write('%s\t%s %s\n' % (alloc.ip_address, fqdn, hostname))
+        data = ''.join(addn_hosts_entry
+                       for (port_id, host_entry, addn_hosts_entry)
+                       in self._iter_host_entries() if addn_hosts_entry)
         addn_hosts = self.get_conf_file_name('addn_hosts')
-        utils.replace_file(addn_hosts, buf.getvalue())
+        if self._replace_config_file(addn_hosts, data):
+            self._reload_needed = True
         return addn_hosts
 
+    @staticmethod
+    def _list_hosts_dir(hosts_dir):
+        try:
+            return [f for f in os.listdir(hosts_dir) if not f.startswith('.')]
+        except OSError:
+            return []
+
+    def _output_hosts_dirs(self):
+        """Writes one dhcp hosts and one additional hosts file per port.
+
+        The files are written in the directories sent to the --dhcp-hostsdir
+        and --hostsdir options of dnsmasq, and have the content of the
+        `_output_hosts_file` and `_output_addn_hosts_file` lines of the port.
+        dnsmasq reads new and changed files of these directories by itself,
+        but it keeps the entries of the files it already read until it is
+        reloaded: only a changed or removed file requires a reload.
+        """
+        host_entries = collections.defaultdict(str)
+        addn_hosts_entries = collections.defaultdict(str)
+        for (port_id, host_entry,
+             addn_hosts_entry) in self._iter_host_entries():
+            if host_entry:
+                host_entries[port_id] += host_entry
+            if addn_hosts_entry:
+                addn_hosts_entries[port_id] += addn_hosts_entry
+
+        for kind, entries in (('host.d', host_entries),
+                              ('addn_hosts.d', addn_hosts_entries)):
+            hosts_dir = self.get_conf_file_name(kind)
+            utils.ensure_dir(hosts_dir)
+            old_port_ids = set(self._list_hosts_dir(hosts_dir))
+            for port_id, data in six.iteritems(entries):
+                filename = os.path.join(hosts_dir, port_id)
+                # dnsmasq reads the files being written too, the temporary
+                # file is hidden to it
+                if (self._replace_config_file(filename, data,
+                                              tmp_prefix='.tmp') and
+                        port_id in old_port_ids):
+                    self._reload_needed = True
+            for port_id in old_port_ids - set(entries):
+                self._remove_config_file(os.path.join(hosts_dir, port_id))
+                self._reload_needed = True
+
     def _output_opts_file(self):
         """Write a dnsmasq compatible options file."""
         options, subnet_index_map = self._generate_opts_per_subnet()
         options += self._generate_opts_per_port(subnet_index_map)
 
         name = self.get_conf_file_name('opts')
-        utils.replace_file(name, '\n'.join(options))
+        if self._replace_config_file(name, '\n'.join(options)):
+            self._reload_needed = True
         return name
 
     def _generate_opts_per_subnet(self):
@@ -19,6 +19,7 @@ import os
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import excutils
+from oslo_utils import importutils
 
 from neutron.agent.common import utils
 from neutron.common import exceptions
@@ -32,6 +33,24 @@ OPTS = [
                 help=_('Force ip_lib calls to use the root helper')),
 ]
 
+backend_map = {
+    'iproute2': 'neutron.agent.linux.ip_lib',
+    'netlink': 'neutron.agent.linux.netlink_lib',
+}
+
+BACKEND_OPTS = [
+    cfg.StrOpt('ip_lib_backend',
+               choices=backend_map.keys(),
+               default='iproute2',
+               help=_('The backend used by ip_lib to manage links, '
+                      'addresses, routes and neighbours: "iproute2" runs '
+                      'the ip command, "netlink" talks rtnetlink directly '
+                      'and requires the pyroute2 library and the agent to '
+                      'run with the CAP_NET_ADMIN and CAP_SYS_ADMIN '
+                      'capabilities.')),
+]
+cfg.CONF.register_opts(BACKEND_OPTS, 'AGENT')
+
 
 LOOPBACK_DEVNAME = 'lo'
 
@@ -43,6 +62,12 @@ class AddressNotReady(exceptions.NeutronException):
                 "become ready: %(reason)s")
 
 
+def get_backend():
+    """Return the module providing the configured ip_lib commands"""
+    return importutils.import_module(
+        backend_map[cfg.CONF.AGENT.ip_lib_backend])
+
+
 class SubProcessBase(object):
     def __init__(self, namespace=None,
                  log_fail_as_error=True):
@@ -90,7 +115,7 @@ class SubProcessBase(object):
 class IPWrapper(SubProcessBase):
     def __init__(self, namespace=None):
         super(IPWrapper, self).__init__(namespace=namespace)
-        self.netns = IpNetnsCommand(self)
+        self.netns = get_backend().IpNetnsCommand(self)
 
     def device(self, name):
         return IPDevice(name, namespace=self.namespace)
@@ -199,10 +224,11 @@ class IPDevice(SubProcessBase):
     def __init__(self, name, namespace=None):
         super(IPDevice, self).__init__(namespace=namespace)
         self.name = name
-        self.link = IpLinkCommand(self)
-        self.addr = IpAddrCommand(self)
-        self.route = IpRouteCommand(self)
-        self.neigh = IpNeighCommand(self)
+        backend = get_backend()
+        self.link = backend.IpLinkCommand(self)
+        self.addr = backend.IpAddrCommand(self)
+        self.route = backend.IpRouteCommand(self)
+        self.neigh = backend.IpNeighCommand(self)
 
     def __eq__(self, other):
         return (other is not None and self.name == other.name
@@ -28,6 +28,7 @@ PAIR_DROP = 'Drop traffic without an IP/MAC allow rule.'
 DHCP_CLIENT = 'Allow DHCP client traffic.'
 DHCP_SPOOF = 'Prevent DHCP Spoofing by VM.'
 UNMATCHED = 'Send unmatched traffic to the fallback chain.'
+SHARED_SG = 'Send traffic to the chain of the port security groups.'
 INVALID_DROP = ("Drop packets that appear related to an existing connection "
                 "(e.g. TCP ACK/FIN) but do not have an entry in conntrack.")
 ALLOW_ASSOC = ('Direct packets associated with a known session to the RETURN '
@@ -14,6 +14,8 @@
 #    under the License.
 
 import collections
+import hashlib
+
 import netaddr
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -36,6 +38,8 @@ SPOOF_FILTER = 'spoof-filter'
 CHAIN_NAME_PREFIX = {INGRESS_DIRECTION: 'i',
                      EGRESS_DIRECTION: 'o',
                      SPOOF_FILTER: 's'}
+# Prefix of the chains shared by the ports using the same security groups
+SHARED_CHAIN_PREFIX = 'g'
 DIRECTION_IP_PREFIX = {'ingress': 'source_ip_prefix',
                        'egress': 'dest_ip_prefix'}
 IPSET_DIRECTION = {INGRESS_DIRECTION: 'src',
@@ -71,6 +75,13 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
             lambda: collections.defaultdict(list))
         self.pre_sg_members = None
         self.enable_ipset = cfg.CONF.SECURITYGROUP.enable_ipset
+        self.shared_sg_chains = cfg.CONF.SECURITYGROUP.shared_sg_chains
+        # Names of the security group chains shared by ports
+        self._shared_chains = set()
+        # iptables rules compiled from security group rules during the
+        # current and the previous chains setup
+        self._compiled_rules = {}
+        self._pre_compiled_rules = {}
 
     @property
     def ports(self):
@@ -84,6 +95,27 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         LOG.debug("Update members of security group (%s)", sg_id)
         self.sg_members[sg_id] = collections.defaultdict(list, sg_members)
 
+    def update_security_group_member_ips(self, sg_id, added_ips,
+                                         removed_ips):
+        remote_sg_ids = set()
+        for rules in self.sg_rules.values():
+            remote_sg_ids.update(rule.get('remote_group_id')
+                                 for rule in rules)
+        if sg_id not in remote_sg_ids:
+            return
+        LOG.debug("Update member IPs of security group (%(sg)s): added "
+                  "%(added)s, removed %(removed)s",
+                  {'sg': sg_id, 'added': added_ips, 'removed': removed_ips})
+        members = self.sg_members[sg_id]
+        for ip in removed_ips:
+            ethertype = 'IPv%d' % netaddr.IPNetwork(ip).version
+            if ip in members[ethertype]:
+                members[ethertype].remove(ip)
+        for ip in added_ips:
+            ethertype = 'IPv%d' % netaddr.IPNetwork(ip).version
+            if ip not in members[ethertype]:
+                members[ethertype].append(ip)
+
     def _ps_enabled(self, port):
         return port.get(psec.PORTSECURITY, True)
 
@@ -150,6 +182,9 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
                                      self.unfiltered_ports)
 
     def _setup_chains_apply(self, ports, unfiltered_ports):
+        # Rules not used by the previous setup are dropped from the cache
+        self._pre_compiled_rules = self._compiled_rules
+        self._compiled_rules = {}
         self._add_chain_by_name_v4v6(SG_CHAIN)
         for port in ports.values():
             self._setup_chain(port, INGRESS_DIRECTION)
@@ -175,6 +210,9 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         for port in unfiltered_ports.values():
             self._remove_rule_port_sec(port, INGRESS_DIRECTION)
             self._remove_rule_port_sec(port, EGRESS_DIRECTION)
+        for chain_name in self._shared_chains:
+            self._remove_chain_by_name_v4v6(chain_name)
+        self._shared_chains = set()
         self._remove_chain_by_name_v4v6(SG_CHAIN)
 
     def _setup_chain(self, port, DIRECTION):
@@ -416,11 +454,19 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
     def _add_rules_by_security_group(self, port, direction):
         # select rules for current port and direction
         security_group_rules = self._select_sgr_by_direction(port, direction)
-        security_group_rules += self._select_sg_rules_for_port(port, direction)
+        if not self.shared_sg_chains:
+            security_group_rules += self._select_sg_rules_for_port(
+                port, direction)
         # make sure ipset members are updated for remote security groups
         if self.enable_ipset:
             remote_sg_ids = self._get_remote_sg_ids(port, direction)
             self._update_ipset_members(remote_sg_ids)
+        fallback_rule = None
+        if self.shared_sg_chains and port.get('security_groups'):
+            chain_name = self._setup_shared_chain(
+                port['security_groups'], direction)
+            fallback_rule = comment_rule('-g $%s' % chain_name,
+                                         comment=ic.SHARED_SG)
         # split groups by ip version
         # for ipv4, iptables command is used
         # for ipv6, iptables6 command is used
@@ -437,14 +483,44 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
             ipv6_iptables_rules += self._accept_inbound_icmpv6()
         # include IPv4 and IPv6 iptable rules from security group
         ipv4_iptables_rules += self._convert_sgr_to_iptables_rules(
-            ipv4_sg_rules)
+            ipv4_sg_rules, fallback_rule)
         ipv6_iptables_rules += self._convert_sgr_to_iptables_rules(
-            ipv6_sg_rules)
+            ipv6_sg_rules, fallback_rule)
         # finally add the rules to the port chain for a given direction
         self._add_rules_to_chain_v4v6(self._port_chain_name(port, direction),
                                       ipv4_iptables_rules,
                                       ipv6_iptables_rules)
 
+    def _shared_chain_name(self, sg_ids, direction):
+        digest = hashlib.sha1(','.join(sorted(sg_ids))).hexdigest()
+        return iptables_manager.get_chain_name(
+            '%s%s%s' % (SHARED_CHAIN_PREFIX, CHAIN_NAME_PREFIX[direction],
+                        digest))
+
+    def _setup_shared_chain(self, sg_ids, direction):
+        """Setup the chain of the rules of security groups for a direction.
+
+        The chain is shared by all the ports using exactly these security
+        groups: their chains go to it once the port specific rules are
+        checked, it returns for allowed packets and ends with the fallback
+        chain. The own IPs of the ports are not excluded from the remote
+        group rules.
+        """
+        chain_name = self._shared_chain_name(sg_ids, direction)
+        if chain_name in self._shared_chains:
+            return chain_name
+        self._shared_chains.add(chain_name)
+        self._add_chain_by_name_v4v6(chain_name)
+        rules = self._select_sg_rules_for_port(
+            {'security_groups': sg_ids}, direction)
+        ipv4_sg_rules, ipv6_sg_rules = self._split_sgr_by_ethertype(rules)
+        fallback_rule = comment_rule('-j $sg-fallback', comment=ic.UNMATCHED)
+        self._add_rules_to_chain_v4v6(
+            chain_name,
+            self._compile_sg_rules(ipv4_sg_rules) + [fallback_rule],
+            self._compile_sg_rules(ipv6_sg_rules) + [fallback_rule])
+        return chain_name
+
     def _add_fixed_egress_rules(self, port, ipv4_iptables_rules,
                                 ipv6_iptables_rules):
         self._spoofing_rule(port,
@@ -502,16 +578,48 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         else:
             return self._generate_plain_rule_args(sg_rule)
 
-    def _convert_sgr_to_iptables_rules(self, security_group_rules):
+    def _compile_sg_rule(self, sg_rule):
+        """Return the iptables rule of a security group rule or None.
+
+        Ports sharing security groups share their rules, the compiled rules
+        are cached for the chains setup. The rules referencing an ipset
+        depend on the existence of the set and are not cached.
+        """
+        key = None
+        if not (self.enable_ipset and sg_rule.get('remote_group_id')):
+            key = tuple(sorted(sg_rule.items()))
+            try:
+                return self._compiled_rules[key]
+            except KeyError:
+                pass
+            except TypeError:
+                # Not hashable, the rule is not cached
+                key = None
+        if key is not None and key in self._pre_compiled_rules:
+            rule = self._pre_compiled_rules[key]
+        else:
+            args = self._convert_sg_rule_to_iptables_args(sg_rule)
+            rule = ' '.join(args) if args else None
+        if key is not None:
+            self._compiled_rules[key] = rule
+        return rule
+
+    def _compile_sg_rules(self, security_group_rules):
+        iptables_rules = []
+        for sg_rule in security_group_rules:
+            rule = self._compile_sg_rule(sg_rule)
+            if rule:
+                iptables_rules.append(rule)
+        return iptables_rules
+
+    def _convert_sgr_to_iptables_rules(self, security_group_rules,
+                                       fallback_rule=None):
         iptables_rules = []
         self._drop_invalid_packets(iptables_rules)
         self._allow_established(iptables_rules)
-        for rule in security_group_rules:
-            args = self._convert_sg_rule_to_iptables_args(rule)
-            if args:
-                iptables_rules += [' '.join(args)]
-
-        iptables_rules += [comment_rule('-j $sg-fallback',
+        iptables_rules += self._compile_sg_rules(security_group_rules)
+        iptables_rules += [fallback_rule or
+                           comment_rule('-j $sg-fallback',
                                         comment=ic.UNMATCHED)]
         return iptables_rules
 
@@ -572,6 +680,8 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
     def filter_defer_apply_on(self):
         if not self._defer_apply:
             self.iptables.defer_apply_on()
+            if self.enable_ipset:
+                self.ipset.defer_apply_on()
             self._pre_defer_filtered_ports = dict(self.filtered_ports)
             self._pre_defer_unfiltered_ports = dict(self.unfiltered_ports)
             self.pre_sg_members = dict(self.sg_members)
@@ -669,6 +779,9 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
                                       self._pre_defer_unfiltered_ports)
             self._setup_chains_apply(self.filtered_ports,
                                      self.unfiltered_ports)
+            if self.enable_ipset:
+                # The sets must exist before the rules referencing them
+                self.ipset.defer_apply_off()
             self.iptables.defer_apply_off()
             self._remove_unused_security_group_info()
             self._pre_defer_filtered_ports = None
@@ -118,6 +118,29 @@ class IptablesTable(object):
         self.unwrapped_chains = set()
         self.remove_chains = set()
         self.wrap_name = binary_name[:16]
+        # Bookkeeping for incremental applies: wrapped chains touched since
+        # the last apply, wrapped chains known to exist after the last apply,
+        # and whether the table has to go through a full save/restore cycle
+        # (always the case for the first apply or for unwrapped changes).
+        self.dirty_chains = set()
+        self.applied_chains = set()
+        self.full_apply_needed = True
+
+    def _mark_dirty(self, chain, wrap):
+        if wrap:
+            self.dirty_chains.add(chain)
+        else:
+            self.full_apply_needed = True
+
+    def _mark_applied(self):
+        self.dirty_chains.clear()
+        self.applied_chains = set(self.chains)
+        self.full_apply_needed = False
+
+    def is_dirty(self):
+        return bool(self.full_apply_needed or
+                    self.dirty_chains & self.chains or
+                    self.applied_chains - self.chains)
 
     def add_chain(self, name, wrap=True):
         """Adds a named chain to the table.
@@ -132,10 +155,10 @@ class IptablesTable(object):
 
         """
         name = get_chain_name(name, wrap)
-        if wrap:
-            self.chains.add(name)
-        else:
-            self.unwrapped_chains.add(name)
+        chain_set = self._select_chain_set(wrap)
+        if name not in chain_set:
+            chain_set.add(name)
+            self._mark_dirty(name, wrap)
 
     def _select_chain_set(self, wrap):
         if wrap:
@@ -161,6 +184,7 @@ class IptablesTable(object):
             return
 
         chain_set.remove(name)
+        self._mark_dirty(name, wrap)
 
         if not wrap:
             # non-wrapped chains and rules need to be dealt with specially,
@@ -181,6 +205,10 @@ class IptablesTable(object):
         else:
             jump_snippet = '-j %s-%s' % (self.wrap_name, name)
 
+        for rule in self.rules:
+            if jump_snippet in rule.rule:
+                self._mark_dirty(rule.chain, rule.wrap)
+
         # finally, remove rules from list that have a matching jump chain
         self.rules = [r for r in self.rules
                       if jump_snippet not in r.rule]
@@ -207,6 +235,7 @@ class IptablesTable(object):
 
         self.rules.append(IptablesRule(chain, rule, wrap, top, self.wrap_name,
                                        tag, comment))
+        self._mark_dirty(chain, wrap)
 
     def _wrap_target_chain(self, s, wrap):
         if s.startswith('$'):
@@ -231,6 +260,7 @@ class IptablesTable(object):
             self.rules.remove(IptablesRule(chain, rule, wrap, top,
                                            self.wrap_name,
                                            comment=comment))
+            self._mark_dirty(chain, wrap)
             if not wrap:
                 self.remove_rules.append(IptablesRule(chain, rule, wrap, top,
                                                       self.wrap_name,
@@ -251,6 +281,7 @@ class IptablesTable(object):
         chained_rules = self._get_chain_rules(chain, wrap)
         for rule in chained_rules:
             self.rules.remove(rule)
+            self._mark_dirty(rule.chain, rule.wrap)
 
     def clear_rules_by_tag(self, tag):
         if not tag:
@@ -258,6 +289,7 @@ class IptablesTable(object):
         rules = [rule for rule in self.rules if rule.tag == tag]
         for rule in rules:
             self.rules.remove(rule)
+            self._mark_dirty(rule.chain, rule.wrap)
 
 
 class IptablesManager(object):
@@ -427,53 +459,123 @@ class IptablesManager(object):
         same component of Nova, and replace them with our current set of
         rules. This happens atomically, thanks to iptables-restore.
 
+        When the AGENT.iptables_incremental_apply option is enabled, tables
+        that have not changed since the last apply are skipped and tables in
+        which only wrapped chains changed are updated with a single
+        'iptables-restore --noflush' containing just those chains.
+
         """
         s = [('iptables', self.ipv4)]
         if self.use_ipv6:
             s += [('ip6tables', self.ipv6)]
 
+        incremental = cfg.CONF.AGENT.iptables_incremental_apply
         for cmd, tables in s:
-            args = ['%s-save' % (cmd,), '-c']
-            if self.namespace:
-                args = ['ip', 'netns', 'exec', self.namespace] + args
-            all_tables = self.execute(args, run_as_root=True)
-            all_lines = all_tables.split('\n')
-            # Traverse tables in sorted order for predictable dump output
-            for table_name in sorted(tables):
-                table = tables[table_name]
-                start, end = self._find_table(all_lines, table_name)
-                all_lines[start:end] = self._modify_rules(
-                    all_lines[start:end], table, table_name)
-
-            args = ['%s-restore' % (cmd,), '-c']
-            if self.namespace:
-                args = ['ip', 'netns', 'exec', self.namespace] + args
-            try:
-                self.execute(args, process_input='\n'.join(all_lines),
-                             run_as_root=True)
-            except RuntimeError as r_error:
-                with excutils.save_and_reraise_exception():
-                    try:
-                        line_no = int(re.search(
-                            'iptables-restore: line ([0-9]+?) failed',
-                            str(r_error)).group(1))
-                        context = IPTABLES_ERROR_LINES_OF_CONTEXT
-                        log_start = max(0, line_no - context)
-                        log_end = line_no + context
-                    except AttributeError:
-                        # line error wasn't found, print all lines instead
-                        log_start = 0
-                        log_end = len(all_lines)
-                    log_lines = ('%7d. %s' % (idx, l)
-                                 for idx, l in enumerate(
-                                     all_lines[log_start:log_end],
-                                     log_start + 1)
-                                 )
-                    LOG.error(_LE("IPTablesManager.apply failed to apply the "
-                                  "following set of iptables rules:\n%s"),
-                              '\n'.join(log_lines))
+            if not incremental:
+                full_tables = sorted(tables)
+                partial_tables = []
+            else:
+                full_tables = sorted(name for name, table in tables.items()
+                                     if table.full_apply_needed)
+                partial_tables = sorted(name for name, table in tables.items()
+                                        if not table.full_apply_needed and
+                                        table.is_dirty())
+            if full_tables:
+                self._apply_full(cmd, tables, full_tables)
+            if partial_tables:
+                self._apply_incremental(cmd, tables, partial_tables)
         LOG.debug("IPTablesManager.apply completed with success")
 
+    def _apply_full(self, cmd, tables, table_names):
+        args = ['%s-save' % (cmd,), '-c']
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        all_tables = self.execute(args, run_as_root=True)
+        all_lines = all_tables.split('\n')
+        # Traverse tables in sorted order for predictable dump output
+        for table_name in table_names:
+            table = tables[table_name]
+            start, end = self._find_table(all_lines, table_name)
+            all_lines[start:end] = self._modify_rules(
+                all_lines[start:end], table, table_name)
+
+        self._restore(cmd, all_lines, ['-c'])
+        for table_name in table_names:
+            tables[table_name]._mark_applied()
+
+    def _apply_incremental(self, cmd, tables, table_names):
+        all_lines = []
+        for table_name in table_names:
+            all_lines += self._generate_chain_updates(tables[table_name],
+                                                      table_name)
+
+        self._restore(cmd, all_lines, ['-n'])
+        for table_name in table_names:
+            tables[table_name]._mark_applied()
+
+    def _generate_chain_updates(self, table, table_name):
+        """Generate iptables-restore --noflush input for the dirty chains.
+
+        Declaring a user-defined chain with --noflush flushes it, so every
+        touched wrapped chain is declared and then completely re-populated.
+        Wrapped chains which no longer exist are flushed and deleted last,
+        once the chains jumping to them have been rewritten.
+
+        """
+        chains = sorted(table.dirty_chains & table.chains)
+        removed_chains = sorted(table.applied_chains - table.chains)
+
+        lines = ['# Generated by iptables_manager', '*%s' % table_name]
+        lines += [':%s-%s - [0:0]' % (self.wrap_name, chain)
+                  for chain in chains]
+        for chain in chains:
+            rules = table._get_chain_rules(chain, wrap=True)
+            rule_strs = [str(rule) for rule in rules if rule.top]
+            rule_strs += [str(rule) for rule in rules if not rule.top]
+            # Like _modify_rules, let the last occurrence of a duplicated
+            # rule take precedence.
+            seen_rules = set()
+            chain_lines = []
+            for rule_str in reversed(rule_strs):
+                if rule_str not in seen_rules:
+                    seen_rules.add(rule_str)
+                    chain_lines.append(rule_str)
+            lines += reversed(chain_lines)
+        for chain in removed_chains:
+            lines += ['-F %s-%s' % (self.wrap_name, chain),
+                      '-X %s-%s' % (self.wrap_name, chain)]
+        lines += ['COMMIT', '# Completed by iptables_manager']
+        return lines
+
+    def _restore(self, cmd, all_lines, options):
+        args = ['%s-restore' % (cmd,)] + options
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        try:
+            self.execute(args, process_input='\n'.join(all_lines),
+                         run_as_root=True)
+        except RuntimeError as r_error:
+            with excutils.save_and_reraise_exception():
+                try:
+                    line_no = int(re.search(
+                        'iptables-restore: line ([0-9]+?) failed',
+                        str(r_error)).group(1))
+                    context = IPTABLES_ERROR_LINES_OF_CONTEXT
+                    log_start = max(0, line_no - context)
+                    log_end = line_no + context
+                except AttributeError:
+                    # line error wasn't found, print all lines instead
+                    log_start = 0
+                    log_end = len(all_lines)
+                log_lines = ('%7d. %s' % (idx, l)
+                             for idx, l in enumerate(
+                                 all_lines[log_start:log_end],
+                                 log_start + 1)
+                             )
+                LOG.error(_LE("IPTablesManager.apply failed to apply the "
+                              "following set of iptables rules:\n%s"),
+                          '\n'.join(log_lines))
+
     def _find_table(self, lines, table_name):
         if len(lines) < 3:
             # length only <2 when fake iptables
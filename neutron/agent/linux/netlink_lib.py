@@ -0,0 +1,351 @@
+# Copyright (c) 2015 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""rtnetlink backend of ip_lib.
+
+The device commands of this module keep the API and the return values of the
+ip_lib commands, but talk rtnetlink directly through pyroute2 instead of
+running the ip command. A netlink socket is opened once per namespace and
+kept for the lifetime of the agent: pyroute2 enters the namespace with setns
+in a helper process it spawns, so the agent has to run with the
+CAP_NET_ADMIN and CAP_SYS_ADMIN capabilities.
+
+Operations the backend does not handle fall back to the ip command.
+"""
+
+import socket
+import threading
+
+import netaddr
+from oslo_log import log as logging
+from oslo_utils import importutils
+
+from neutron.agent.linux import ip_lib
+from neutron.common import exceptions
+from neutron.i18n import _LE
+
+LOG = logging.getLogger(__name__)
+
+pyroute2 = importutils.try_import('pyroute2')
+
+FAMILIES = {4: socket.AF_INET, 6: socket.AF_INET6}
+
+SCOPES = {'global': 0, 'site': 200, 'link': 253, 'host': 254}
+SCOPE_NAMES = dict((value, name) for name, value in SCOPES.items())
+
+RT_TABLE_MAIN = 254
+NUD_PERMANENT = 0x80
+
+IFA_F_DADFAILED = 0x08
+IFA_F_TENTATIVE = 0x40
+IFA_F_PERMANENT = 0x80
+
+
+class NetlinkSocket(object):
+    """A netlink socket of a namespace, shared by all its devices."""
+
+    def __init__(self, namespace=None):
+        if pyroute2 is None:
+            raise RuntimeError(_('The netlink ip_lib backend requires the '
+                                 'pyroute2 library'))
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._ipr = None
+
+    def _get_ipr(self):
+        if self._ipr is None:
+            if self.namespace:
+                self._ipr = pyroute2.NetNS(self.namespace)
+            else:
+                self._ipr = pyroute2.IPRoute()
+        return self._ipr
+
+    def call(self, method, *args, **kwargs):
+        """Run a pyroute2 request, netlink errors raise RuntimeError."""
+        with self._lock:
+            try:
+                return getattr(self._get_ipr(), method)(*args, **kwargs)
+            except pyroute2.NetlinkError as e:
+                raise RuntimeError(_('Netlink request %(method)s%(args)s '
+                                     'failed in namespace %(ns)s: %(err)s') %
+                                   {'method': method, 'args': args,
+                                    'ns': self.namespace, 'err': e})
+            except Exception:
+                # The connection to the namespace helper may be broken,
+                # reopen it on next request
+                self._close()
+                raise
+
+    def _close(self):
+        if self._ipr is not None:
+            try:
+                self._ipr.close()
+            except Exception:
+                LOG.exception(_LE('Failed to close netlink socket of '
+                                  'namespace %s'), self.namespace)
+            self._ipr = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+_sockets = {}
+_sockets_lock = threading.Lock()
+
+
+def get_socket(namespace=None):
+    with _sockets_lock:
+        sock = _sockets.get(namespace)
+        if sock is None:
+            sock = _sockets[namespace] = NetlinkSocket(namespace)
+        return sock
+
+
+def close_socket(namespace):
+    with _sockets_lock:
+        sock = _sockets.pop(namespace, None)
+    if sock is not None:
+        sock.close()
+
+
+class NetlinkDeviceCommandMixin(object):
+
+    def _call(self, method, *args, **kwargs):
+        sock = get_socket(self._parent.namespace)
+        return sock.call(method, *args, **kwargs)
+
+    def _lookup_index(self):
+        indexes = self._call('link_lookup', ifname=self.name)
+        return indexes[0] if indexes else None
+
+    def _get_index(self):
+        index = self._lookup_index()
+        if index is None:
+            # Callers expect the failure of the ip command
+            raise RuntimeError(_('Cannot find device "%s"') % self.name)
+        return index
+
+
+class IpLinkCommand(NetlinkDeviceCommandMixin, ip_lib.IpLinkCommand):
+
+    def _set(self, **kwargs):
+        self._call('link', 'set', index=self._get_index(), **kwargs)
+
+    def set_address(self, mac_address):
+        self._set(address=mac_address)
+
+    def set_mtu(self, mtu_size):
+        self._set(mtu=int(mtu_size))
+
+    def set_up(self):
+        self._set(state='up')
+
+    def set_down(self):
+        self._set(state='down')
+
+    def set_netns(self, namespace):
+        self._set(net_ns_fd=namespace)
+        self._parent.namespace = namespace
+
+    def set_name(self, name):
+        self._set(ifname=name)
+        self._parent.name = name
+
+    def set_alias(self, alias_name):
+        self._set(ifalias=alias_name)
+
+    def delete(self):
+        self._call('link', 'del', index=self._get_index())
+
+    @property
+    def attributes(self):
+        links = self._call('get_links', self._get_index())
+        if not links:
+            return {}
+        link = links[0]
+        attributes = {'link/ether': link.get_attr('IFLA_ADDRESS'),
+                      'state': link.get_attr('IFLA_OPERSTATE'),
+                      'mtu': link.get_attr('IFLA_MTU'),
+                      'qdisc': link.get_attr('IFLA_QDISC'),
+                      'qlen': link.get_attr('IFLA_TXQLEN'),
+                      'alias': link.get_attr('IFLA_IFALIAS')}
+        return dict((key, value) for key, value in attributes.items()
+                    if value is not None)
+
+
+class IpAddrCommand(NetlinkDeviceCommandMixin, ip_lib.IpAddrCommand):
+
+    def add(self, cidr, scope='global'):
+        net = netaddr.IPNetwork(cidr)
+        kwargs = {}
+        if net.version == 4:
+            kwargs['broadcast'] = str(net.broadcast)
+        self._call('addr', 'add', index=self._get_index(),
+                   address=str(net.ip), mask=net.prefixlen,
+                   family=FAMILIES[net.version], scope=SCOPES[scope],
+                   **kwargs)
+
+    def delete(self, cidr):
+        net = netaddr.IPNetwork(cidr)
+        self._call('addr', 'delete', index=self._get_index(),
+                   address=str(net.ip), mask=net.prefixlen,
+                   family=FAMILIES[net.version])
+
+    def flush(self, ip_version):
+        index = self._get_index()
+        for addr in self._call('get_addr', family=FAMILIES[ip_version],
+                               index=index):
+            self._call('addr', 'delete', index=index,
+                       address=addr.get_attr('IFA_ADDRESS'),
+                       mask=addr['prefixlen'], family=addr['family'])
+
+    def list(self, scope=None, to=None, filters=None, ip_version=None):
+        if filters and set(filters) - set(['permanent']):
+            return super(IpAddrCommand, self).list(
+                scope=scope, to=to, filters=filters, ip_version=ip_version)
+        kwargs = {'index': self._get_index()}
+        if ip_version:
+            kwargs['family'] = FAMILIES[ip_version]
+        to_net = netaddr.IPNetwork(to) if to else None
+
+        retval = []
+        for addr in self._call('get_addr', **kwargs):
+            if addr['index'] != kwargs['index']:
+                continue
+            flags = addr.get_attr('IFA_FLAGS') or addr['flags']
+            addr_scope = SCOPE_NAMES.get(addr['scope'], str(addr['scope']))
+            if scope and addr_scope != scope:
+                continue
+            if filters and not flags & IFA_F_PERMANENT:
+                continue
+            address = addr.get_attr('IFA_ADDRESS')
+            if to_net is not None and netaddr.IPAddress(address) not in to_net:
+                continue
+            retval.append(dict(cidr='%s/%s' % (address, addr['prefixlen']),
+                               scope=addr_scope,
+                               dynamic=not flags & IFA_F_PERMANENT,
+                               tentative=bool(flags & IFA_F_TENTATIVE),
+                               dadfailed=bool(flags & IFA_F_DADFAILED)))
+        return retval
+
+
+class IpRouteCommand(NetlinkDeviceCommandMixin, ip_lib.IpRouteCommand):
+
+    def _route(self, command, index, ip_version, table=None, **kwargs):
+        if table:
+            kwargs['table'] = int(table)
+        self._call('route', command, oif=index,
+                   family=FAMILIES[ip_version], **kwargs)
+
+    def _list_routes(self, ip_version, index, table=RT_TABLE_MAIN):
+        routes = []
+        for route in self._call('get_routes', family=FAMILIES[ip_version]):
+            route_table = route.get_attr('RTA_TABLE') or route['table']
+            if (route_table == table and
+                    route.get_attr('RTA_OIF') == index):
+                routes.append(route)
+        return routes
+
+    @staticmethod
+    def _get_cidr(route):
+        dst = route.get_attr('RTA_DST')
+        if dst is None:
+            return 'default'
+        return '%s/%s' % (dst, route['dst_len'])
+
+    def add_gateway(self, gateway, metric=None, table=None):
+        kwargs = {}
+        if metric:
+            kwargs['priority'] = int(metric)
+        self._route('replace', self._get_index(),
+                    ip_lib.get_ip_version(gateway), table=table,
+                    gateway=gateway, mask=0, **kwargs)
+
+    def delete_gateway(self, gateway, table=None):
+        index = self._lookup_index()
+        if index is None:
+            raise exceptions.DeviceNotFoundError(device_name=self.name)
+        self._route('delete', index,
+                    ip_lib.get_ip_version(gateway), table=table,
+                    gateway=gateway, mask=0)
+
+    def list_onlink_routes(self, ip_version):
+        return [self._get_cidr(route)
+                for route in self._list_routes(ip_version,
+                                               self._get_index())
+                if (route['scope'] == SCOPES['link'] and
+                    route.get_attr('RTA_PREFSRC') is None)]
+
+    def add_onlink_route(self, cidr):
+        net = netaddr.IPNetwork(cidr)
+        self._route('replace', self._get_index(), net.version,
+                    dst=str(net.ip), mask=net.prefixlen,
+                    rtscope=SCOPES['link'])
+
+    def delete_onlink_route(self, cidr):
+        net = netaddr.IPNetwork(cidr)
+        self._route('delete', self._get_index(), net.version,
+                    dst=str(net.ip), mask=net.prefixlen,
+                    rtscope=SCOPES['link'])
+
+    def get_gateway(self, scope=None, filters=None, ip_version=None):
+        if filters:
+            return super(IpRouteCommand, self).get_gateway(
+                scope=scope, filters=filters, ip_version=ip_version)
+        index = self._get_index()
+        for version in [ip_version] if ip_version else [4]:
+            for route in self._list_routes(version, index):
+                if scope and SCOPE_NAMES.get(route['scope']) != scope:
+                    continue
+                if route.get_attr('RTA_DST') is None:
+                    retval = dict(gateway=route.get_attr('RTA_GATEWAY'))
+                    metric = route.get_attr('RTA_PRIORITY')
+                    if metric is not None:
+                        retval.update(metric=metric)
+                    return retval
+
+    def add_route(self, cidr, ip, table=None):
+        net = netaddr.IPNetwork(cidr)
+        self._route('replace', self._get_index(), net.version,
+                    table=table, dst=str(net.ip), mask=net.prefixlen,
+                    gateway=ip)
+
+    def delete_route(self, cidr, ip, table=None):
+        net = netaddr.IPNetwork(cidr)
+        self._route('delete', self._get_index(), net.version,
+                    table=table, dst=str(net.ip), mask=net.prefixlen,
+                    gateway=ip)
+
+
+class IpNeighCommand(NetlinkDeviceCommandMixin, ip_lib.IpNeighCommand):
+
+    def add(self, ip_address, mac_address):
+        self._call('neigh', 'replace', ifindex=self._get_index(),
+                   dst=ip_address, lladdr=mac_address,
+                   family=FAMILIES[ip_lib.get_ip_version(ip_address)],
+                   state=NUD_PERMANENT)
+
+    def delete(self, ip_address, mac_address):
+        self._call('neigh', 'delete', ifindex=self._get_index(),
+                   dst=ip_address, lladdr=mac_address,
+                   family=FAMILIES[ip_lib.get_ip_version(ip_address)])
+
+
+class IpNetnsCommand(ip_lib.IpNetnsCommand):
+
+    def delete(self, name):
+        # The namespace helper process would keep the namespace alive
+        close_socket(name)
+        super(IpNetnsCommand, self).delete(name)
@@ -21,12 +21,16 @@ import pwd
 import shlex
 import socket
 import struct
+import sys
 import tempfile
 import threading
+import time
 
 import eventlet
+from eventlet import event
 from eventlet.green import subprocess
 from eventlet import greenthread
+from eventlet import queue
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_log import loggers
@@ -45,6 +49,88 @@ LOG = logging.getLogger(__name__)
 config.register_root_helper(cfg.CONF)
 
 
+class RootwrapDaemonPool(object):
+    """Pool of root helper daemon connections shared by greenthreads.
+
+    Commands are queued and dispatched to worker greenthreads, each one
+    owning a root helper daemon client. A worker keeps its connection to the
+    daemon open, so commands do not pay any connection setup, and callers
+    can queue commands while all the workers are busy: they are sent as soon
+    as a worker is done with its previous command.
+
+    The daemon protocol answers one command at a time per connection, so the
+    number of commands running concurrently is the size of the pool.
+    """
+
+    def __init__(self, daemon_cmd, size):
+        self.daemon_cmd = daemon_cmd
+        self.size = size
+        self._queue = queue.LightQueue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._pending = 0
+        self._stats = {'commands': 0,
+                       'max_queue_depth': 0,
+                       'total_wait_time': 0.0,
+                       'total_run_time': 0.0,
+                       'max_latency': 0.0}
+
+    def _ensure_workers(self):
+        with self._lock:
+            while len(self._workers) < self.size:
+                self._workers.append(eventlet.spawn_n(
+                    self._worker, client.Client(self.daemon_cmd)))
+
+    def _worker(self, daemon_client):
+        while True:
+            cmd, process_input, done, queued_at = self._queue.get()
+            started_at = time.time()
+            try:
+                result = daemon_client.execute(cmd, process_input)
+            except Exception:
+                done.send_exception(*sys.exc_info())
+            else:
+                done.send(result)
+            self._command_done(queued_at, started_at, time.time())
+
+    def _command_done(self, queued_at, started_at, finished_at):
+        with self._lock:
+            self._pending -= 1
+            stats = self._stats
+            stats['commands'] += 1
+            stats['total_wait_time'] += started_at - queued_at
+            stats['total_run_time'] += finished_at - started_at
+            stats['max_latency'] = max(stats['max_latency'],
+                                       finished_at - queued_at)
+
+    def execute(self, cmd, process_input=None):
+        self._ensure_workers()
+        done = event.Event()
+        with self._lock:
+            self._pending += 1
+            queue_depth = max(self._pending - self.size, 0)
+            self._stats['max_queue_depth'] = max(
+                self._stats['max_queue_depth'], queue_depth)
+        self._queue.put((cmd, process_input, done, time.time()))
+        return done.wait()
+
+    def get_stats(self):
+        """Return the latency and queue depth metrics of the pool.
+
+        Latencies are in seconds, the wait time being the time spent by
+        commands in the queue before being sent to a daemon.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = self._pending
+            stats['queue_depth'] = max(self._pending - self.size, 0)
+        commands = stats['commands'] or 1
+        stats['avg_wait_time'] = stats['total_wait_time'] / commands
+        stats['avg_latency'] = (
+            (stats['total_wait_time'] + stats['total_run_time']) / commands)
+        return stats
+
+
 class RootwrapDaemonHelper(object):
     __client = None
     __lock = threading.Lock()
@@ -57,10 +143,21 @@ class RootwrapDaemonHelper(object):
     def get_client(cls):
         with cls.__lock:
             if cls.__client is None:
-                cls.__client = client.Client(
-                    shlex.split(cfg.CONF.AGENT.root_helper_daemon))
+                daemon_cmd = shlex.split(cfg.CONF.AGENT.root_helper_daemon)
+                pool_size = cfg.CONF.AGENT.root_helper_daemon_pool_size
+                if pool_size > 0:
+                    cls.__client = RootwrapDaemonPool(daemon_cmd, pool_size)
+                else:
+                    cls.__client = client.Client(daemon_cmd)
             return cls.__client
 
+    @classmethod
+    def get_stats(cls):
+        """Return the metrics of the daemon pool, None if it is not used."""
+        daemon_client = cls.__client
+        if isinstance(daemon_client, RootwrapDaemonPool):
+            return daemon_client.get_stats()
+
 
 def addl_env_args(addl_env):
     """Build arugments for adding additional environment vars with env"""
@@ -154,17 +251,20 @@ def get_interface_mac(interface):
                     for char in info[MAC_START:MAC_END]])[:-1]
 
 
-def replace_file(file_name, data):
+def replace_file(file_name, data, tmp_prefix=None):
     """Replaces the contents of file_name with data in a safe manner.
 
     First write to a temp file and then rename. Since POSIX renames are
     atomic, the file is unlikely to be corrupted by competing writes.
 
     We create the tempfile on the same device to ensure that it can be renamed.
+    The name of the tempfile starts with tmp_prefix if it is given.
     """
 
     base_dir = os.path.dirname(os.path.abspath(file_name))
-    tmp_file = tempfile.NamedTemporaryFile('w+', dir=base_dir, delete=False)
+    kwargs = {'prefix': tmp_prefix} if tmp_prefix else {}
+    tmp_file = tempfile.NamedTemporaryFile('w+', dir=base_dir, delete=False,
+                                           **kwargs)
     tmp_file.write(data)
     tmp_file.close()
     os.chmod(tmp_file.name, 0o644)
@@ -80,6 +80,19 @@ class API(object):
             interface_map[iface_name or cfg.CONF.OVS.ovsdb_interface])
         return iface(context)
 
+    def get_vif_port_index(self, bridge, portid_from_external_ids=None):
+        """Return an incrementally updated index of the VIF ports of a bridge
+
+        :param bridge: The name of the bridge
+        :type bridge:  string
+        :param portid_from_external_ids: Return the vif id of an interface
+                                         from its external_ids
+        :type portid_from_external_ids:  callable
+        :returns:      :class:`VifPortIndex` or None if the interface cannot
+                       track OVSDB changes
+        """
+        return None
+
     @abc.abstractmethod
     def transaction(self, check_error=False, log_errors=True, **kwargs):
         """Create a transaction
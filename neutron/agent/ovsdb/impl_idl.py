@@ -24,6 +24,7 @@ from neutron.agent.ovsdb import api
 from neutron.agent.ovsdb.native import commands as cmd
 from neutron.agent.ovsdb.native import connection
 from neutron.agent.ovsdb.native import idlutils
+from neutron.agent.ovsdb.native import port_index
 from neutron.i18n import _LE
 
 
@@ -136,6 +137,11 @@ class OvsdbIdl(api.API):
     def _ovs(self):
         return self._tables['Open_vSwitch'].rows.values()[0]
 
+    def get_vif_port_index(self, bridge, portid_from_external_ids=None):
+        index = port_index.VifPortIndex(bridge, portid_from_external_ids)
+        OvsdbIdl.ovsdb_connection.register_observer(index)
+        return index
+
     def transaction(self, check_error=False, log_errors=True, **kwargs):
         return Transaction(self, OvsdbIdl.ovsdb_connection,
                            self.context.vsctl_timeout,
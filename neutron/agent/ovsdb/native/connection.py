@@ -17,10 +17,14 @@ from six.moves import queue as Queue
 import threading
 import traceback
 
+from oslo_log import log as logging
 from ovs.db import idl
 from ovs import poller
 
 from neutron.agent.ovsdb.native import idlutils
+from neutron.i18n import _LE
+
+LOG = logging.getLogger(__name__)
 
 
 class TransactionQueue(Queue.Queue, object):
@@ -48,6 +52,41 @@ class TransactionQueue(Queue.Queue, object):
         return self.alertin.fileno()
 
 
+class NotifyingIdl(idl.Idl):
+    """An Idl forwarding row change notifications to observers.
+
+    Only OVS python libraries providing the Idl.notify hook report row
+    changes, notifies_row_changes tells whether it is the case.
+    """
+
+    notifies_row_changes = hasattr(idl.Idl, 'notify')
+
+    def __init__(self, remote, schema, observers):
+        super(NotifyingIdl, self).__init__(remote, schema)
+        self.observers = observers
+
+    def notify(self, event, row, updates=None):
+        for observer in self.observers:
+            observer.notify(event, row, updates)
+
+
+class ObserverRegistration(object):
+    """Registers an observer from the connection thread.
+
+    It is queued like a transaction so that the observer is added and
+    initially processed without racing with IDL updates.
+    """
+
+    def __init__(self, connection, observer):
+        self.connection = connection
+        self.observer = observer
+        self.results = Queue.Queue(1)
+
+    def do_commit(self):
+        self.connection.observers.append(self.observer)
+        self.observer.process(self.connection.idl)
+
+
 class Connection(object):
     def __init__(self, connection, timeout, schema_name):
         self.idl = None
@@ -56,6 +95,7 @@ class Connection(object):
         self.txns = TransactionQueue(1)
         self.lock = threading.Lock()
         self.schema_name = schema_name
+        self.observers = []
 
     def start(self):
         with self.lock:
@@ -65,7 +105,7 @@ class Connection(object):
             helper = idlutils.get_schema_helper(self.connection,
                                                 self.schema_name)
             helper.register_all()
-            self.idl = idl.Idl(self.connection, helper)
+            self.idl = NotifyingIdl(self.connection, helper, self.observers)
             idlutils.wait_for_change(self.idl, self.timeout)
             self.poller = poller.Poller()
             self.thread = threading.Thread(target=self.run)
@@ -78,6 +118,7 @@ class Connection(object):
             self.poller.fd_wait(self.txns.alert_fileno, poller.POLLIN)
             self.poller.block()
             self.idl.run()
+            self.process_observers()
             txn = self.txns.get_nowait()
             if txn is not None:
                 try:
@@ -87,6 +128,29 @@ class Connection(object):
                                                   tb=traceback.format_exc())
                     txn.results.put(er)
                 self.txns.task_done()
+                self.process_observers()
+
+    def process_observers(self):
+        for observer in self.observers:
+            try:
+                observer.process(self.idl)
+            except Exception:
+                LOG.exception(_LE("Failed to process OVSDB changes in %s"),
+                              observer)
 
     def queue_txn(self, txn):
         self.txns.put(txn)
+
+    def register_observer(self, observer):
+        """Register an observer of the IDL replica changes.
+
+        The observer notify(event, row, updates) method is called for every
+        changed row, and its process(idl) method once changes have been
+        applied to the replica, both from the connection thread.
+        """
+        registration = ObserverRegistration(self, observer)
+        self.queue_txn(registration)
+        result = registration.results.get()
+        if isinstance(result, idlutils.ExceptionResult):
+            LOG.error(result.tb)
+            raise result.ex
@@ -0,0 +1,184 @@
+# Copyright (c) 2015 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import threading
+
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# Special ofport values, as reported by ovs_lib
+INVALID_OFPORT = -1
+UNASSIGNED_OFPORT = []
+
+VifPortState = collections.namedtuple(
+    'VifPortState', ['port_name', 'ofport', 'vif_id', 'vif_mac', 'tag'])
+
+
+def _single(value):
+    # The IDL returns optional columns as lists, like ovs-vsctl treat lists
+    # of 1 as single results
+    if isinstance(value, list) and len(value) == 1:
+        return value[0]
+    return value
+
+
+class VifPortIndex(object):
+    """Index of the VIF ports of a bridge fed by OVSDB IDL changes.
+
+    The index is registered as an observer of the native OVSDB connection:
+    notify() is called for every changed Interface, Port or Bridge row and
+    only records the row. process() is called once an update has been
+    completely applied to the IDL replica and re-resolves the recorded rows,
+    so its cost depends on the number of changed rows and not on the number
+    of ports on the bridge.
+
+    If the OVS python library does not report row changes, the whole index is
+    rebuilt from the replica whenever it changes.
+
+    notify() and process() run in the connection thread, consumers retrieve
+    the indexed ports from any thread with pop_changes() and get_ports().
+
+    portid_from_external_ids resolves the vif id of an Interface from its
+    external_ids, as OVSBridge.portid_from_external_ids does.
+    """
+
+    def __init__(self, bridge_name, portid_from_external_ids=None):
+        self.bridge_name = bridge_name
+        self._portid_from_external_ids = (
+            portid_from_external_ids or
+            (lambda external_ids: external_ids.get('iface-id')))
+        self._lock = threading.Lock()
+        # vif_id -> VifPortState, protected by self._lock
+        self._ports = {}
+        self._changed_vifs = set()
+        # Connection thread state
+        self._iface_vif = {}
+        self._iface_port = {}
+        self._port_ifaces = {}
+        self._bridge_ports = set()
+        self._dirty_ifaces = set()
+        self._dirty_ports = set()
+        self._bridge_dirty = True
+        self._full_rebuild = True
+        self._seqno = None
+
+    def notify(self, event, row, updates=None):
+        table = row._table.name
+        if table == 'Interface':
+            self._dirty_ifaces.add(row.uuid)
+        elif table == 'Port':
+            self._dirty_ports.add(row.uuid)
+        elif table == 'Bridge':
+            self._bridge_dirty = True
+
+    def process(self, idl_):
+        if (not getattr(idl_, 'notifies_row_changes', False) and
+                idl_.change_seqno != self._seqno):
+            self._full_rebuild = True
+        self._seqno = idl_.change_seqno
+        if self._full_rebuild:
+            self._full_rebuild = False
+            self._bridge_dirty = True
+            self._dirty_ports.update(self._port_ifaces)
+            self._dirty_ifaces.update(self._iface_vif)
+        if not (self._bridge_dirty or self._dirty_ports or
+                self._dirty_ifaces):
+            return
+
+        port_rows = idl_.tables['Port'].rows
+        iface_rows = idl_.tables['Interface'].rows
+        if self._bridge_dirty:
+            self._bridge_dirty = False
+            bridge_ports = set()
+            for bridge in idl_.tables['Bridge'].rows.values():
+                if bridge.name == self.bridge_name:
+                    bridge_ports = set(port.uuid for port in bridge.ports)
+                    break
+            self._dirty_ports.update(bridge_ports ^ self._bridge_ports)
+            self._bridge_ports = bridge_ports
+
+        for port_uuid in self._dirty_ports:
+            old_ifaces = self._port_ifaces.pop(port_uuid, set())
+            port = port_rows.get(port_uuid)
+            new_ifaces = (set(iface.uuid for iface in port.interfaces)
+                          if port else set())
+            for iface_uuid in old_ifaces - new_ifaces:
+                if self._iface_port.get(iface_uuid) == port_uuid:
+                    del self._iface_port[iface_uuid]
+            for iface_uuid in new_ifaces:
+                self._iface_port[iface_uuid] = port_uuid
+            if new_ifaces:
+                self._port_ifaces[port_uuid] = new_ifaces
+            self._dirty_ifaces |= old_ifaces | new_ifaces
+        self._dirty_ports = set()
+
+        with self._lock:
+            for iface_uuid in self._dirty_ifaces:
+                self._resolve_iface(iface_uuid, iface_rows, port_rows)
+        self._dirty_ifaces = set()
+
+    def _resolve_iface(self, iface_uuid, iface_rows, port_rows):
+        state = None
+        iface = iface_rows.get(iface_uuid)
+        port_uuid = self._iface_port.get(iface_uuid)
+        if iface is not None and port_uuid in self._bridge_ports:
+            state = self._get_vif_state(iface, port_rows.get(port_uuid))
+
+        old_vif = self._iface_vif.pop(iface_uuid, None)
+        if old_vif is not None:
+            old_state = self._ports.pop(old_vif, None)
+            if old_state != state:
+                self._changed_vifs.add(old_vif)
+        if state is not None:
+            self._iface_vif[iface_uuid] = state.vif_id
+            if self._ports.get(state.vif_id) != state:
+                self._changed_vifs.add(state.vif_id)
+            self._ports[state.vif_id] = state
+
+    def _get_vif_state(self, iface, port):
+        external_ids = iface.external_ids
+        vif_mac = external_ids.get('attached-mac')
+        ofport = _single(iface.ofport)
+        if not vif_mac or ofport in (UNASSIGNED_OFPORT, INVALID_OFPORT):
+            return
+        try:
+            vif_id = self._portid_from_external_ids(external_ids)
+        except Exception:
+            # The error was logged, the port is not indexed until its next
+            # change
+            LOG.debug("Unable to resolve the vif id of interface %s",
+                      iface.name)
+            return
+        if not vif_id:
+            return
+        tag = _single(port.tag) if port is not None else []
+        return VifPortState(iface.name, ofport, vif_id, vif_mac, tag)
+
+    def get_ports(self):
+        """Return a dict of the VifPortState of the ports by vif id."""
+        with self._lock:
+            return dict(self._ports)
+
+    def pop_changes(self):
+        """Return the current vif ids and the vif ids changed since last call.
+
+        A vif id is reported as changed when the port was added, removed or
+        when its ofport, mac or tag changed.
+        """
+        with self._lock:
+            changed = self._changed_vifs
+            self._changed_vifs = set()
+            return set(self._ports), changed
@@ -42,7 +42,13 @@ security_group_opts = [
     cfg.BoolOpt(
         'enable_ipset',
         default=True,
-        help=_('Use ipset to speed-up the iptables based security groups.'))
+        help=_('Use ipset to speed-up the iptables based security groups.')),
+    cfg.BoolOpt(
+        'shared_sg_chains',
+        default=False,
+        help=_('Render the rules of security groups once, in iptables '
+               'chains shared by the ports using the same security groups, '
+               'instead of in the chains of each port.'))
 ]
 cfg.CONF.register_opts(security_group_opts, 'SECURITYGROUP')
 
@@ -108,6 +114,9 @@ class SecurityGroupAgentRpc(object):
         self.devices_to_refilter = set()
         # Flag raised when a global refresh is needed
         self.global_refresh_firewall = False
+        # Member IPs changes of security groups, applied with the deferred
+        # refresh: {sg_id: {'added': set(ips), 'removed': set(ips)}}
+        self.pending_member_deltas = {}
         self._use_enhanced_rpc = None
 
     def set_local_zone(self, device):
@@ -207,6 +216,31 @@ class SecurityGroupAgentRpc(object):
             security_groups,
             'security_group_source_groups')
 
+    def security_groups_member_delta(self, sg_member_deltas):
+        LOG.info(_LI("Security group "
+                 "member delta %r"), sg_member_deltas)
+        if not self.use_enhanced_rpc:
+            # Without the enhanced rpc, the member IPs are expanded in the
+            # rules of the devices retrieved from the server
+            self.security_groups_member_updated(list(sg_member_deltas))
+        elif self.defer_refresh_firewall:
+            for sg_id, delta in sg_member_deltas.items():
+                pending = self.pending_member_deltas.setdefault(
+                    sg_id, {'added': set(), 'removed': set()})
+                pending['added'].difference_update(delta['removed'])
+                pending['removed'].update(delta['removed'])
+                pending['removed'].difference_update(delta['added'])
+                pending['added'].update(delta['added'])
+        else:
+            self._apply_member_deltas(sg_member_deltas)
+
+    @skip_if_noopfirewall_or_firewall_disabled
+    def _apply_member_deltas(self, sg_member_deltas):
+        with self.firewall.defer_apply():
+            for sg_id, delta in sg_member_deltas.items():
+                self.firewall.update_security_group_member_ips(
+                    sg_id, delta['added'], delta['removed'])
+
     def _security_group_updated(self, security_groups, attribute):
         devices = []
         sec_grp_set = set(security_groups)
@@ -273,7 +307,8 @@ class SecurityGroupAgentRpc(object):
                     security_groups, security_group_member_ips)
 
     def firewall_refresh_needed(self):
-        return self.global_refresh_firewall or self.devices_to_refilter
+        return (self.global_refresh_firewall or self.devices_to_refilter or
+                self.pending_member_deltas)
 
     def setup_port_filters(self, new_devices, updated_devices):
         """Configure port filters for devices.
@@ -290,8 +325,16 @@ class SecurityGroupAgentRpc(object):
         # losing updates occurring during firewall refresh
         devices_to_refilter = self.devices_to_refilter
         global_refresh_firewall = self.global_refresh_firewall
+        pending_member_deltas = self.pending_member_deltas
         self.devices_to_refilter = set()
         self.global_refresh_firewall = False
+        self.pending_member_deltas = {}
+        # Member deltas are applied first, the member IPs retrieved from the
+        # server for new and refreshed devices are more recent
+        if pending_member_deltas:
+            LOG.debug("Applying member deltas of %d security groups",
+                      len(pending_member_deltas))
+            self._apply_member_deltas(pending_member_deltas)
         # We must call prepare_devices_filter() after we've grabbed
         # self.devices_to_refilter since an update for a new port
         # could arrive while we're processing, and we need to make
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import itertools
 import operator
 
@@ -20,6 +21,7 @@ from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_log import log as logging
 import oslo_messaging
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
 
 from neutron.api.v2 import attributes
@@ -47,22 +49,29 @@ class DhcpRpcCallback(object):
     #     1.0 - Initial version.
     #     1.1 - Added get_active_networks_info, create_dhcp_port,
     #           and update_dhcp_port methods.
+    #     1.2 - Added get_active_networks_markers, and the network_ids
+    #           argument of get_active_networks_info.
     target = oslo_messaging.Target(
         namespace=constants.RPC_NAMESPACE_DHCP_PLUGIN,
-        version='1.1')
+        version='1.2')
 
     def _get_active_networks(self, context, **kwargs):
         """Retrieve and return a list of the active networks."""
         host = kwargs.get('host')
+        network_ids = kwargs.get('network_ids')
         plugin = manager.NeutronManager.get_plugin()
         if utils.is_extension_supported(
             plugin, constants.DHCP_AGENT_SCHEDULER_EXT_ALIAS):
-            if cfg.CONF.network_auto_schedule:
+            # Networks are scheduled when the agent gets its networks, not
+            # for each page of networks it then fetches
+            if cfg.CONF.network_auto_schedule and not network_ids:
                 plugin.auto_schedule_networks(context, host)
             nets = plugin.list_active_networks_on_active_dhcp_agent(
-                context, host)
+                context, host, network_ids=network_ids)
         else:
             filters = dict(admin_state_up=[True])
+            if network_ids:
+                filters['id'] = network_ids
             nets = plugin.get_networks(context, filters=filters)
         return nets
 
@@ -113,11 +122,10 @@ class DhcpRpcCallback(object):
             grouped[net_id] = list(values)
         return grouped
 
-    def get_active_networks_info(self, context, **kwargs):
-        """Returns all the networks/subnets/ports in system."""
-        host = kwargs.get('host')
-        LOG.debug('get_active_networks_info from %s', host)
+    def _get_active_networks_info(self, context, **kwargs):
         networks = self._get_active_networks(context, **kwargs)
+        if not networks:
+            return []
         plugin = manager.NeutronManager.get_plugin()
         filters = {'network_id': [network['id'] for network in networks]}
         ports = plugin.get_ports(context, filters=filters)
@@ -132,6 +140,48 @@ class DhcpRpcCallback(object):
 
         return networks
 
+    @staticmethod
+    def _get_network_marker(network):
+        """Return a digest of the information of a network.
+
+        Networks have no revision number, the digest of the information sent
+        to the agent is used instead to tell which networks changed since
+        the agent fetched them.
+        """
+        keyfunc = operator.itemgetter('id')
+        info = dict(network,
+                    subnets=sorted(network['subnets'], key=keyfunc),
+                    ports=sorted(network['ports'], key=keyfunc))
+        return hashlib.sha1(jsonutils.dumps(info, sort_keys=True)).hexdigest()
+
+    def get_active_networks_info(self, context, **kwargs):
+        """Returns all the networks/subnets/ports in system.
+
+        When network_ids are given, only these networks are returned, along
+        with their revision marker.
+        """
+        host = kwargs.get('host')
+        LOG.debug('get_active_networks_info from %s', host)
+        networks = self._get_active_networks_info(context, **kwargs)
+        if kwargs.get('network_ids'):
+            for network in networks:
+                network['revision_marker'] = self._get_network_marker(network)
+        return networks
+
+    def get_active_networks_markers(self, context, **kwargs):
+        """Returns the revision markers of the active networks by id.
+
+        The markers are digests of the network information, so computing
+        them loads every subnet and port of the networks of the agent, as
+        get_active_networks_info does. Only the RPC payload and the work of
+        the agent are saved for the networks which did not change.
+        """
+        host = kwargs.get('host')
+        LOG.debug('get_active_networks_markers from %s', host)
+        networks = self._get_active_networks_info(context, **kwargs)
+        return dict((network['id'], self._get_network_marker(network))
+                    for network in networks)
+
     def get_network_info(self, context, **kwargs):
         """Retrieve and return a extended information about a network."""
         network_id = kwargs.get('network_id')
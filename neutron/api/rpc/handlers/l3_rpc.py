@@ -42,7 +42,8 @@ class L3RpcCallback(object):
     # 1.4 Added L3 HA update_router_state. This method was later removed,
     #     since it was unused. The RPC version was not changed
     # 1.5 Added update_ha_routers_states
-    target = oslo_messaging.Target(version='1.5')
+    # 1.6 Added get_router_ids
+    target = oslo_messaging.Target(version='1.6')
 
     @property
     def plugin(self):
@@ -57,6 +58,27 @@ class L3RpcCallback(object):
                 plugin_constants.L3_ROUTER_NAT]
         return self._l3plugin
 
+    def get_router_ids(self, context, host):
+        """Returns IDs of routers scheduled to l3 agent on <host>
+
+        This will autoschedule unhosted routers to l3 agent on <host> and then
+        return all ids of routers scheduled to it. The agent then fetches
+        the routers with sync_routers, in chunks.
+        """
+        context = neutron_context.get_admin_context()
+        if not self.l3plugin:
+            LOG.error(_LE('No plugin for L3 routing registered! Will reply '
+                          'to l3 agent with empty router list.'))
+            return []
+        if utils.is_extension_supported(
+                self.l3plugin, constants.L3_AGENT_SCHEDULER_EXT_ALIAS):
+            if cfg.CONF.router_auto_schedule:
+                self.l3plugin.auto_schedule_routers(context, host,
+                                                    router_ids=None)
+            return self.l3plugin.list_router_ids_on_host(context, host)
+        return [router['id'] for router in
+                self.l3plugin.get_routers(context, fields=['id'])]
+
     def sync_routers(self, context, **kwargs):
         """Sync routers according to filters to a specific agent.
 
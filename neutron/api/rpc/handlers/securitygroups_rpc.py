@@ -126,7 +126,11 @@ class SecurityGroupAgentRpcApiMixin(object):
 
     # history
     #   1.1 Support Security Group RPC
+    #   1.3 Added security_groups_member_delta
+    # The methods are implemented by the RPC callbacks of the L2 agents, so
+    # the versions follow theirs (1.2 is DVR on the OVS agent).
     SG_RPC_VERSION = "1.1"
+    SG_MEMBER_DELTA_RPC_VERSION = "1.3"
 
     def _get_security_group_topic(self):
         return topics.get_topic_name(self.topic,
@@ -153,6 +157,19 @@ class SecurityGroupAgentRpcApiMixin(object):
         cctxt.cast(context, 'security_groups_member_updated',
                    security_groups=security_groups)
 
+    def security_groups_member_delta(self, context, sg_member_deltas):
+        """Notify the member IPs added to and removed from security groups.
+
+        :param sg_member_deltas: {sg_id: {'added': [ip], 'removed': [ip]}}
+        """
+        if not sg_member_deltas:
+            return
+        cctxt = self.client.prepare(version=self.SG_MEMBER_DELTA_RPC_VERSION,
+                                    topic=self._get_security_group_topic(),
+                                    fanout=True)
+        cctxt.cast(context, 'security_groups_member_delta',
+                   sg_member_deltas=sg_member_deltas)
+
     def security_groups_provider_updated(self, context):
         """Notify provider updated security groups."""
         cctxt = self.client.prepare(version=self.SG_RPC_VERSION,
@@ -202,6 +219,19 @@ class SecurityGroupAgentRpcCallbackMixin(object):
             return self._security_groups_agent_not_set()
         self.sg_agent.security_groups_member_updated(security_groups)
 
+    def security_groups_member_delta(self, context, **kwargs):
+        """Callback for the member IPs changes of security groups.
+
+        :param sg_member_deltas: dict of the added and removed member IPs
+                                 by security group
+        """
+        sg_member_deltas = kwargs.get('sg_member_deltas', {})
+        LOG.debug("Security group member delta on remote: %s",
+                  sg_member_deltas)
+        if not self.sg_agent:
+            return self._security_groups_agent_not_set()
+        self.sg_agent.security_groups_member_delta(sg_member_deltas)
+
     def security_groups_provider_updated(self, context, **kwargs):
         """Callback for security group provider update."""
         LOG.debug("Provider rule updated")
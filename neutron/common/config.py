@@ -71,6 +71,12 @@ core_opts = [
                help=_("Maximum number of host routes per subnet")),
     cfg.IntOpt('max_fixed_ips_per_port', default=5,
                help=_("Maximum number of fixed ips per port")),
+    cfg.BoolOpt('random_ip_allocation', default=False,
+                help=_("Allocate a random free address of the subnet to a "
+                       "port, and update the availability ranges of the "
+                       "subnet with a compare-and-swap instead of locking "
+                       "them. Allocations that conflict with a concurrent "
+                       "request are retried.")),
     cfg.StrOpt('default_ipv4_subnet_pool', default=None,
                help=_("Default IPv4 subnet-pool to be used for automatic "
                       "subnet CIDR allocation")),
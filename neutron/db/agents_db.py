@@ -21,6 +21,8 @@ import oslo_messaging
 from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy import orm
 from sqlalchemy.orm import exc
 from sqlalchemy import sql
 
@@ -39,6 +41,12 @@ AGENT_OPTS = [
                help=_("Seconds to regard the agent is down; should be at "
                       "least twice report_interval, to be sure the "
                       "agent is down for good.")),
+    cfg.IntOpt('heartbeat_flush_interval', default=0,
+               help=_("Seconds during which the heartbeats of the agents "
+                      "whose state did not change are kept in memory, "
+                      "before being written to the database with one "
+                      "statement. Should be less than half of "
+                      "agent_down_time. 0 writes every heartbeat.")),
     cfg.StrOpt('dhcp_load_type', default='networks',
                choices=['networks', 'subnets', 'ports'],
                help=_('Representing the resource type whose load is being '
@@ -96,6 +104,79 @@ class Agent(model_base.BASEV2, models_v2.HasId):
         return not AgentDbMixin.is_agent_down(self.heartbeat_timestamp)
 
 
+class AgentHeartbeats(object):
+    """In-memory liveness table of the agents reporting to this server.
+
+    The heartbeat of an agent whose reported state is the one last written
+    to the database by this server is only recorded here, the pending
+    heartbeats are then written together, along with the reports whose
+    state no longer matches the database because another server wrote it.
+    """
+
+    def __init__(self):
+        # (agent_type, host) -> (agent id, state last written)
+        self._states = {}
+        # agent id -> last heartbeat received
+        self._heartbeats = {}
+        # agent id -> (heartbeat, report) not written yet
+        self._pending = {}
+        self._last_flush = timeutils.utcnow()
+
+    def get_agent_id(self, agent_type, host, state):
+        """Return the agent id if its state is the one last written."""
+        entry = self._states.get((agent_type, host))
+        if entry and entry[1] == state:
+            return entry[0]
+
+    def get_heartbeat(self, agent_id):
+        return self._heartbeats.get(agent_id)
+
+    def set_state(self, agent_type, host, agent_id, state, heartbeat):
+        """Store the state and heartbeat written to the database."""
+        self._states[(agent_type, host)] = (agent_id, state)
+        self._heartbeats[agent_id] = heartbeat
+        self._pending.pop(agent_id, None)
+
+    def record(self, agent_id, heartbeat, agent):
+        self._heartbeats[agent_id] = heartbeat
+        self._pending[agent_id] = (heartbeat, agent)
+
+    def forget(self, agent_id):
+        for key, (known_id, _state) in self._states.items():
+            if known_id == agent_id:
+                del self._states[key]
+        self._heartbeats.pop(agent_id, None)
+        self._pending.pop(agent_id, None)
+
+    def is_flush_due(self):
+        return timeutils.is_older_than(self._last_flush,
+                                       cfg.CONF.heartbeat_flush_interval)
+
+    def pop_pending(self):
+        pending, self._pending = self._pending, {}
+        self._last_flush = timeutils.utcnow()
+        return pending
+
+    def restore_pending(self, pending):
+        for agent_id, report in pending.items():
+            self._pending.setdefault(agent_id, report)
+
+
+_HEARTBEATS = AgentHeartbeats()
+
+
+def _load_heartbeat(agent, *args):
+    # Agents loaded from the database see the heartbeats not written yet
+    heartbeat = _HEARTBEATS.get_heartbeat(agent.id)
+    if heartbeat and heartbeat > agent.heartbeat_timestamp:
+        orm.attributes.set_committed_value(agent, 'heartbeat_timestamp',
+                                           heartbeat)
+
+
+event.listen(Agent, 'load', _load_heartbeat)
+event.listen(Agent, 'refresh', _load_heartbeat)
+
+
 class AgentDbMixin(ext_agent.AgentPluginBase):
     """Mixin class to add agent extension to db_base_plugin_v2."""
 
@@ -163,6 +244,7 @@ class AgentDbMixin(ext_agent.AgentPluginBase):
         with context.session.begin(subtransactions=True):
             agent = self._get_agent(context, id)
             context.session.delete(agent)
+        _HEARTBEATS.forget(id)
 
     def update_agent(self, context, id, agent):
         agent_data = agent['agent']
@@ -203,14 +285,97 @@ class AgentDbMixin(ext_agent.AgentPluginBase):
         agent = self._get_agent(context, id)
         return self._make_agent_dict(agent, fields)
 
+    def _get_reported_state(self, agent):
+        """Return the binary, topic, configurations and load of a report.
+
+        The configurations are serialized as they are stored in the database,
+        with sorted keys so that equal configurations are stored the same.
+        """
+        configurations = jsonutils.dumps(agent.get('configurations', {}),
+                                         sort_keys=True)
+        return (agent['binary'], agent['topic'], configurations,
+                self._get_agent_load(agent))
+
+    def _flush_heartbeats(self, context):
+        """Write the pending heartbeats with one UPDATE statement.
+
+        A heartbeat is only written if the database still holds the state
+        this server wrote, the report is written again otherwise.
+        """
+        pending = _HEARTBEATS.pop_pending()
+        if not pending:
+            return
+        try:
+            with context.session.begin(subtransactions=True):
+                query = context.session.query(
+                    Agent.id, Agent.heartbeat_timestamp,
+                    Agent.configurations, Agent.load).filter(
+                        Agent.id.in_(pending.keys()))
+                stored = dict((agent_id, (heartbeat_timestamp,
+                                          configurations, load))
+                              for (agent_id, heartbeat_timestamp,
+                                   configurations, load) in query)
+                whens = []
+                outdated = []
+                for agent_id, (heartbeat, agent) in pending.items():
+                    if agent_id not in stored:
+                        # The agent was deleted, its next report recreates it
+                        _HEARTBEATS.forget(agent_id)
+                        continue
+                    heartbeat_timestamp, configurations, load = (
+                        stored[agent_id])
+                    if heartbeat_timestamp >= heartbeat:
+                        # Another server wrote a more recent report
+                        continue
+                    state = self._get_reported_state(agent)
+                    if (configurations, load) != state[2:]:
+                        # Another server wrote a different report
+                        outdated.append(agent)
+                        continue
+                    # The conditions are checked again in the UPDATE in
+                    # case another server writes a report meanwhile
+                    whens.append((sa.and_(
+                        Agent.id == agent_id,
+                        Agent.heartbeat_timestamp < heartbeat,
+                        Agent.configurations == configurations,
+                        Agent.load == load), heartbeat))
+                if whens:
+                    context.session.query(Agent).filter(
+                        Agent.id.in_(stored.keys())).update(
+                            {'heartbeat_timestamp': sa.case(
+                                whens, else_=Agent.heartbeat_timestamp)},
+                            synchronize_session=False)
+                for agent in outdated:
+                    self._create_or_update_agent(context, agent)
+        except db_exc.DBError:
+            LOG.exception(_LE("Failed to write the heartbeats of %d agents"),
+                          len(pending))
+            _HEARTBEATS.restore_pending(pending)
+
+    def _record_heartbeat(self, context, agent):
+        """Record the heartbeat of an agent whose state did not change.
+
+        Return False when the report has to be written to the database.
+        """
+        if agent.get('start_flag'):
+            return False
+        agent_id = _HEARTBEATS.get_agent_id(agent['agent_type'],
+                                            agent['host'],
+                                            self._get_reported_state(agent))
+        if not agent_id:
+            return False
+        _HEARTBEATS.record(agent_id, timeutils.utcnow(), agent)
+        if _HEARTBEATS.is_flush_due():
+            self._flush_heartbeats(context)
+        return True
+
     def _create_or_update_agent(self, context, agent):
         with context.session.begin(subtransactions=True):
             res_keys = ['agent_type', 'binary', 'host', 'topic']
             res = dict((k, agent[k]) for k in res_keys)
 
-            configurations_dict = agent.get('configurations', {})
-            res['configurations'] = jsonutils.dumps(configurations_dict)
-            res['load'] = self._get_agent_load(agent)
+            state = self._get_reported_state(agent)
+            res['configurations'], res['load'] = state[2:]
             current_time = timeutils.utcnow()
             try:
                 agent_db = self._get_agent_by_type_and_host(
@@ -220,6 +385,8 @@ class AgentDbMixin(ext_agent.AgentPluginBase):
                     res['started_at'] = current_time
                 greenthread.sleep(0)
                 agent_db.update(res)
+                # The loaded heartbeat may be one not written yet
+                orm.attributes.flag_modified(agent_db, 'heartbeat_timestamp')
             except ext_agent.AgentNotFoundByTypeHost:
                 greenthread.sleep(0)
                 res['created_at'] = current_time
@@ -230,10 +397,16 @@ class AgentDbMixin(ext_agent.AgentPluginBase):
                 greenthread.sleep(0)
                 context.session.add(agent_db)
             greenthread.sleep(0)
+        if cfg.CONF.heartbeat_flush_interval > 0 and agent_db.id:
+            _HEARTBEATS.set_state(agent['agent_type'], agent['host'],
+                                  agent_db.id, state, current_time)
 
     def create_or_update_agent(self, context, agent):
         """Create or update agent according to report."""
 
+        if (cfg.CONF.heartbeat_flush_interval > 0 and
+                self._record_heartbeat(context, agent)):
+            return
         try:
             return self._create_or_update_agent(context, agent)
         except db_exc.DBDuplicateEntry:
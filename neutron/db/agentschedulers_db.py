@@ -62,6 +62,10 @@ AGENTS_SCHEDULER_OPTS = [
                        'selected for automatic scheduling regardless of this '
                        'option. But manual scheduling to such agents is '
                        'available if this option is True.')),
+    cfg.IntOpt('scheduler_load_resync_interval', default=60,
+               help=_('Seconds after which the agent loads kept in memory '
+                      'by the LoadAwareScheduler drivers are reloaded from '
+                      'the database.')),
 ]
 
 cfg.CONF.register_opts(AGENTS_SCHEDULER_OPTS)
@@ -397,7 +401,8 @@ class DhcpAgentSchedulerDbMixin(dhcpagentscheduler
             self._get_agent(context, id)
             return {'networks': []}
 
-    def list_active_networks_on_active_dhcp_agent(self, context, host):
+    def list_active_networks_on_active_dhcp_agent(self, context, host,
+                                                  network_ids=None):
         try:
             agent = self._get_agent_by_type_and_host(
                 context, constants.AGENT_TYPE_DHCP, host)
@@ -409,6 +414,9 @@ class DhcpAgentSchedulerDbMixin(dhcpagentscheduler
             return []
         query = context.session.query(NetworkDhcpAgentBinding.network_id)
         query = query.filter(NetworkDhcpAgentBinding.dhcp_agent_id == agent.id)
+        if network_ids:
+            query = query.filter(
+                NetworkDhcpAgentBinding.network_id.in_(network_ids))
 
         net_ids = [item[0] for item in query]
         if net_ids:
@@ -434,6 +442,11 @@ class DhcpAgentSchedulerDbMixin(dhcpagentscheduler
             return self.network_scheduler.schedule(
                 self, context, created_network)
 
+    def schedule_networks(self, context, networks):
+        if self.network_scheduler:
+            return self.network_scheduler.schedule_networks(
+                self, context, networks)
+
     def auto_schedule_networks(self, context, host):
         if self.network_scheduler:
             self.network_scheduler.auto_schedule_networks(self, context, host)
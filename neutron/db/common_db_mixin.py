@@ -173,15 +173,46 @@ class CommonDbMixin(object):
                                                     marker_obj=marker_obj)
         return collection
 
+    def _get_projection(self, model, fields, projectable_fields):
+        """Return the columns of model answering the requested fields.
+
+        projectable_fields are the fields which the dict function copies
+        unchanged from the model columns of the same name. None is returned
+        when no fields are requested or when one of them is not projectable,
+        the whole objects have to be loaded then.
+        """
+        if not fields or not projectable_fields:
+            return None
+        names = []
+        for field in fields:
+            if field not in projectable_fields:
+                return None
+            if field not in names:
+                names.append(field)
+        return [getattr(model, name) for name in names]
+
+    def _make_projected_dicts(self, query, columns):
+        """Build the resource dicts from the given columns only.
+
+        Relationships are not loaded and no dict extend function is run.
+        """
+        names = [column.key for column in columns]
+        return [dict(zip(names, row))
+                for row in query.with_entities(*columns)]
+
     def _get_collection(self, context, model, dict_func, filters=None,
                         fields=None, sorts=None, limit=None, marker_obj=None,
-                        page_reverse=False):
+                        page_reverse=False, projectable_fields=None):
+        columns = self._get_projection(model, fields, projectable_fields)
         query = self._get_collection_query(context, model, filters=filters,
                                            sorts=sorts,
                                            limit=limit,
                                            marker_obj=marker_obj,
                                            page_reverse=page_reverse)
-        items = [dict_func(c, fields) for c in query]
+        if columns:
+            items = self._make_projected_dicts(query, columns)
+        else:
+            items = [dict_func(c, fields) for c in query]
         if limit and page_reverse:
             items.reverse()
         return items
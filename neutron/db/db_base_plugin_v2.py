@@ -13,6 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
+import collections
+import random
+
 import netaddr
 from oslo_config import cfg
 from oslo_db import api as oslo_db_api
@@ -55,6 +59,21 @@ LOG = logging.getLogger(__name__)
 # IP allocations being cleaned up by cascade.
 AUTO_DELETE_PORT_OWNERS = [constants.DEVICE_OWNER_DHCP]
 
+# Number of availability ranges of a subnet among which a random address is
+# picked by the random IP allocation
+IP_RANGE_SELECT_SIZE = 100
+
+# Attributes copied unchanged from the model columns by the dict functions,
+# list requests asking only for these are answered from the columns
+NETWORK_COLUMN_ATTRS = ('id', 'name', 'tenant_id', 'admin_state_up',
+                        'status', 'shared')
+SUBNET_COLUMN_ATTRS = ('id', 'name', 'tenant_id', 'network_id',
+                       'subnetpool_id', 'ip_version', 'cidr', 'gateway_ip',
+                       'enable_dhcp', 'ipv6_ra_mode', 'ipv6_address_mode',
+                       'shared')
+PORT_COLUMN_ATTRS = ('id', 'name', 'network_id', 'tenant_id', 'mac_address',
+                     'admin_state_up', 'status', 'device_id', 'device_owner')
+
 
 class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                         common_db_mixin.CommonDbMixin):
@@ -194,6 +213,8 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         The IP address will be generated from one of the subnets defined on
         the network.
         """
+        if cfg.CONF.random_ip_allocation:
+            return NeutronDbPluginV2._try_generate_random_ip(context, subnets)
         range_qry = context.session.query(
             models_v2.IPAvailabilityRange).join(
                 models_v2.IPAllocationPool).with_lockmode('update')
@@ -224,6 +245,144 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                     'subnet_id': subnet['id']}
         raise n_exc.IpAddressGenerationFailure(net_id=subnets[0]['network_id'])
 
+    @staticmethod
+    def _generate_ips(context, subnets, count):
+        """Generate up to count IP addresses in one pass.
+
+        The availability ranges of the subnets are locked and updated once
+        for all the addresses. Fewer addresses are returned when the ranges
+        run out: the ranges are not rebuilt here because the addresses
+        generated so far are not stored yet, _generate_ip takes over once
+        they are.
+        """
+        if cfg.CONF.random_ip_allocation:
+            # Random allocation does not serialize on the ranges, there is
+            # nothing to gain from batching it
+            return []
+        range_qry = context.session.query(
+            models_v2.IPAvailabilityRange).join(
+                models_v2.IPAllocationPool).with_lockmode('update')
+        ips = []
+        for subnet in subnets:
+            for ip_range in range_qry.filter_by(subnet_id=subnet['id']).all():
+                first_ip = netaddr.IPAddress(ip_range['first_ip'])
+                last_ip = netaddr.IPAddress(ip_range['last_ip'])
+                size = min(count - len(ips), int(last_ip) - int(first_ip) + 1)
+                ips.extend({'ip_address': str(first_ip + i),
+                            'subnet_id': subnet['id']} for i in range(size))
+                if first_ip + size > last_ip:
+                    context.session.delete(ip_range)
+                else:
+                    ip_range['first_ip'] = str(first_ip + size)
+                LOG.debug("Allocated %(size)s IPs from %(first_ip)s "
+                          "to %(last_ip)s",
+                          {'size': size, 'first_ip': first_ip,
+                           'last_ip': last_ip})
+                if len(ips) == count:
+                    return ips
+        return ips
+
+    @staticmethod
+    def _get_range_query(context, lock):
+        range_qry = context.session.query(
+            models_v2.IPAvailabilityRange.allocation_pool_id,
+            models_v2.IPAvailabilityRange.first_ip,
+            models_v2.IPAvailabilityRange.last_ip).join(
+                models_v2.IPAllocationPool)
+        if lock:
+            range_qry = range_qry.with_lockmode('update')
+        return range_qry
+
+    @staticmethod
+    def _try_generate_random_ip(context, subnets):
+        """Generate a random IP address without locking the subnet ranges.
+
+        A random address of a random availability range is picked, and the
+        range is updated with a compare-and-swap. If a concurrent request
+        changed the range since it was read, the allocation is retried in
+        place, in the transaction of the caller: the ranges are read again
+        with a lock, which returns their current state.
+        """
+        for subnet in subnets:
+            for lock in (False, True):
+                range_qry = NeutronDbPluginV2._get_range_query(context, lock)
+                ip_ranges = range_qry.filter_by(
+                    subnet_id=subnet['id']).limit(IP_RANGE_SELECT_SIZE).all()
+                if not ip_ranges:
+                    LOG.debug("All IPs from subnet %(subnet_id)s (%(cidr)s) "
+                              "allocated",
+                              {'subnet_id': subnet['id'],
+                               'cidr': subnet['cidr']})
+                    break
+                pool_id, first_ip, last_ip = random.choice(ip_ranges)
+                first = netaddr.IPAddress(first_ip)
+                ip_address = str(netaddr.IPAddress(
+                    random.randint(int(first),
+                                   int(netaddr.IPAddress(last_ip))),
+                    first.version))
+                if NeutronDbPluginV2._remove_ip_from_range(
+                        context, pool_id, first_ip, last_ip, ip_address):
+                    LOG.debug("Allocated IP - %(ip_address)s from "
+                              "%(first_ip)s to %(last_ip)s",
+                              {'ip_address': ip_address,
+                               'first_ip': first_ip,
+                               'last_ip': last_ip})
+                    return {'ip_address': ip_address,
+                            'subnet_id': subnet['id']}
+        raise n_exc.IpAddressGenerationFailure(net_id=subnets[0]['network_id'])
+
+    @staticmethod
+    def _remove_ip_from_range(context, allocation_pool_id, first_ip,
+                              last_ip, ip_address):
+        """Remove ip_address from an availability range read earlier.
+
+        The range is only updated if it still goes from first_ip to last_ip,
+        otherwise a concurrent request allocated an address of the range
+        since it was read and False is returned.
+        """
+        ip = netaddr.IPAddress(ip_address)
+        range_qry = context.session.query(
+            models_v2.IPAvailabilityRange).filter_by(
+                allocation_pool_id=allocation_pool_id,
+                first_ip=first_ip,
+                last_ip=last_ip)
+        if first_ip == last_ip:
+            count = range_qry.delete(synchronize_session=False)
+        elif ip == netaddr.IPAddress(first_ip):
+            count = range_qry.update({'first_ip': str(ip + 1)},
+                                     synchronize_session=False)
+        else:
+            count = range_qry.update({'last_ip': str(ip - 1)},
+                                     synchronize_session=False)
+            if count and ip != netaddr.IPAddress(last_ip):
+                context.session.add(models_v2.IPAvailabilityRange(
+                    allocation_pool_id=allocation_pool_id,
+                    first_ip=str(ip + 1),
+                    last_ip=last_ip))
+        if not count:
+            LOG.debug("Availability range %(first_ip)s - %(last_ip)s "
+                      "changed while allocating %(ip_address)s",
+                      {'first_ip': first_ip, 'last_ip': last_ip,
+                       'ip_address': ip_address})
+        return bool(count)
+
+    @staticmethod
+    def _get_free_ranges(first, last, allocations):
+        """Compact the free addresses from first to last into ranges.
+
+        Addresses are integers and allocations is the sorted list of the
+        allocated addresses. Yields the (first, last) tuples of the ranges.
+        """
+        start = first
+        for ip in allocations[bisect.bisect_left(allocations, first):]:
+            if ip > last:
+                break
+            if ip > start:
+                yield start, ip - 1
+            start = ip + 1
+        if start <= last:
+            yield start, last
+
     @staticmethod
     def _rebuild_availability_ranges(context, subnets):
         """Rebuild availability ranges.
@@ -245,41 +404,32 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
             LOG.debug("Rebuilding availability ranges for subnet %s",
                       subnet)
 
-            # Create a set of all currently allocated addresses
+            # Create a sorted list of all currently allocated addresses
             ip_qry_results = ip_qry.filter_by(subnet_id=subnet['id'])
-            allocations = netaddr.IPSet([netaddr.IPAddress(i['ip_address'])
-                                        for i in ip_qry_results])
+            allocations = sorted(int(netaddr.IPAddress(i['ip_address']))
+                                 for i in ip_qry_results)
 
             for pool in pool_qry.filter_by(subnet_id=subnet['id']):
-                # Create a set of all addresses in the pool
-                poolset = netaddr.IPSet(netaddr.IPRange(pool['first_ip'],
-                                                        pool['last_ip']))
-
-                # Use set difference to find free addresses in the pool
-                available = poolset - allocations
-
-                # Generator compacts an ip set into contiguous ranges
-                def ipset_to_ranges(ipset):
-                    first, last = None, None
-                    for cidr in ipset.iter_cidrs():
-                        if last and last + 1 != cidr.first:
-                            yield netaddr.IPRange(first, last)
-                            first = None
-                        first, last = first if first else cidr.first, cidr.last
-                    if first:
-                        yield netaddr.IPRange(first, last)
-
-                # Write the ranges to the db
-                for ip_range in ipset_to_ranges(available):
+                first_ip = netaddr.IPAddress(pool['first_ip'])
+                last_ip = netaddr.IPAddress(pool['last_ip'])
+
+                # Write the free ranges of the pool to the db
+                for first, last in NeutronDbPluginV2._get_free_ranges(
+                        int(first_ip), int(last_ip), allocations):
                     available_range = models_v2.IPAvailabilityRange(
                         allocation_pool_id=pool['id'],
-                        first_ip=str(netaddr.IPAddress(ip_range.first)),
-                        last_ip=str(netaddr.IPAddress(ip_range.last)))
+                        first_ip=str(netaddr.IPAddress(first,
+                                                       first_ip.version)),
+                        last_ip=str(netaddr.IPAddress(last,
+                                                      first_ip.version)))
                     context.session.add(available_range)
 
     @staticmethod
     def _allocate_specific_ip(context, subnet_id, ip_address):
         """Allocate a specific IP address on the subnet."""
+        if cfg.CONF.random_ip_allocation:
+            return NeutronDbPluginV2._allocate_specific_ip_without_lock(
+                context, subnet_id, ip_address)
         ip = int(netaddr.IPAddress(ip_address))
         range_qry = context.session.query(
             models_v2.IPAvailabilityRange).join(
@@ -315,6 +465,34 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                     context.session.add(new_ip_range)
                     return
 
+    @staticmethod
+    def _allocate_specific_ip_without_lock(context, subnet_id, ip_address):
+        """Allocate a specific IP address with a compare-and-swap.
+
+        If a concurrent request changed the range of the address, the ranges
+        are read again with a lock. The address is in use if it is not in a
+        range anymore.
+        """
+        ip = netaddr.IPAddress(ip_address)
+        for lock in (False, True):
+            range_qry = NeutronDbPluginV2._get_range_query(context, lock)
+            for pool_id, first_ip, last_ip in range_qry.filter_by(
+                    subnet_id=subnet_id):
+                if (netaddr.IPAddress(first_ip) <= ip <=
+                        netaddr.IPAddress(last_ip)):
+                    if NeutronDbPluginV2._remove_ip_from_range(
+                            context, pool_id, first_ip, last_ip, ip_address):
+                        return
+                    break
+            else:
+                if not lock:
+                    # The address is not in an allocation pool
+                    return
+                break
+        network_id = context.session.query(
+            models_v2.Subnet.network_id).filter_by(id=subnet_id).scalar()
+        raise n_exc.IpAddressInUse(net_id=network_id, ip_address=ip_address)
+
     @staticmethod
     def _check_unique_ip(context, network_id, subnet_id, ip_address):
         """Validate that the IP address on the subnet is not in use."""
@@ -542,18 +720,65 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                                        ip_address=ip_address)
         return ip_address
 
-    def _allocate_ips_for_port(self, context, port):
+    @staticmethod
+    def _get_generated_ip_subnets(subnets):
+        """Return the v4 and v6 stateful subnets of a network.
+
+        A port without fixed IPs gets an address generated from each of the
+        non empty lists.
+        """
+        v4 = []
+        v6_stateful = []
+        for subnet in subnets:
+            if subnet['ip_version'] == 4:
+                v4.append(subnet)
+            elif not ipv6_utils.is_auto_address_subnet(subnet):
+                v6_stateful.append(subnet)
+        return [version_subnets for version_subnets in (v4, v6_stateful)
+                if version_subnets]
+
+    def _generate_ips_for_ports(self, context, ports):
+        """Generate the IP addresses of ports created together.
+
+        The addresses of the ports without fixed IPs are generated in one
+        pass per network. Returns, by network id, the subnets of the network
+        and the (version subnets, deque of generated addresses) pairs, to be
+        consumed by _allocate_ips_for_port.
+        """
+        counts = collections.Counter(
+            p['network_id'] for p in ports
+            if p.get('fixed_ips') is attributes.ATTR_NOT_SPECIFIED)
+        generated_ips = {}
+        for network_id, count in counts.items():
+            subnets = self.get_subnets(
+                context, filters={'network_id': [network_id]})
+            generated_ips[network_id] = (subnets, [
+                (version_subnets, collections.deque(
+                    NeutronDbPluginV2._generate_ips(
+                        context, version_subnets, count)))
+                for version_subnets in self._get_generated_ip_subnets(
+                    subnets)])
+        return generated_ips
+
+    def _allocate_ips_for_port(self, context, port, generated_ips=None):
         """Allocate IP addresses for the port.
 
         If port['fixed_ips'] is set to 'ATTR_NOT_SPECIFIED', allocate IP
         addresses for the port. If port['fixed_ips'] contains an IP address or
-        a subnet_id then allocate an IP address accordingly.
+        a subnet_id then allocate an IP address accordingly. generated_ips
+        are the addresses returned by _generate_ips_for_ports, if any.
         """
         p = port['port']
         ips = []
         v6_stateless = []
-        net_id_filter = {'network_id': [p['network_id']]}
-        subnets = self.get_subnets(context, filters=net_id_filter)
+        if generated_ips and p['network_id'] in generated_ips:
+            subnets, version_ips = generated_ips[p['network_id']]
+        else:
+            net_id_filter = {'network_id': [p['network_id']]}
+            subnets = self.get_subnets(context, filters=net_id_filter)
+            version_ips = [
+                (version_subnets, None) for version_subnets in
+                self._get_generated_ip_subnets(subnets)]
         is_router_port = (
             p['device_owner'] in constants.ROUTER_INTERFACE_OWNERS or
             p['device_owner'] == constants.DEVICE_OWNER_ROUTER_SNAT)
@@ -574,24 +799,17 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                 v6_stateless += [subnet for subnet in subnets
                                  if ipv6_utils.is_auto_address_subnet(subnet)]
         else:
-            # Split into v4, v6 stateless and v6 stateful subnets
-            v4 = []
-            v6_stateful = []
-            for subnet in subnets:
-                if subnet['ip_version'] == 4:
-                    v4.append(subnet)
-                elif ipv6_utils.is_auto_address_subnet(subnet):
-                    if not is_router_port:
-                        v6_stateless.append(subnet)
+            if not is_router_port:
+                v6_stateless += [subnet for subnet in subnets
+                                 if ipv6_utils.is_auto_address_subnet(subnet)]
+            for version_subnets, version_generated_ips in version_ips:
+                if version_generated_ips:
+                    result = version_generated_ips.popleft()
                 else:
-                    v6_stateful.append(subnet)
-
-            version_subnets = [v4, v6_stateful]
-            for subnets in version_subnets:
-                if subnets:
-                    result = NeutronDbPluginV2._generate_ip(context, subnets)
-                    ips.append({'ip_address': result['ip_address'],
-                                'subnet_id': result['subnet_id']})
+                    result = NeutronDbPluginV2._generate_ip(context,
+                                                            version_subnets)
+                ips.append({'ip_address': result['ip_address'],
+                            'subnet_id': result['subnet_id']})
 
         for subnet in v6_stateless:
             # IP addresses for IPv6 SLAAC and DHCPv6-stateless subnets
@@ -1017,7 +1235,8 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                                     sorts=sorts,
                                     limit=limit,
                                     marker_obj=marker_obj,
-                                    page_reverse=page_reverse)
+                                    page_reverse=page_reverse,
+                                    projectable_fields=NETWORK_COLUMN_ATTRS)
 
     def get_networks_count(self, context, filters=None):
         return self._get_collection_count(context, models_v2.Network,
@@ -1637,7 +1856,8 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                                     sorts=sorts,
                                     limit=limit,
                                     marker_obj=marker_obj,
-                                    page_reverse=page_reverse)
+                                    page_reverse=page_reverse,
+                                    projectable_fields=SUBNET_COLUMN_ATTRS)
 
     def get_subnets_count(self, context, filters=None):
         return self._get_collection_count(context, models_v2.Subnet,
@@ -1802,6 +2022,9 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         raise n_exc.MacAddressGenerationFailure(net_id=network_id)
 
     def create_port(self, context, port):
+        return self._create_port_and_ips(context, port)
+
+    def _create_port_and_ips(self, context, port, generated_ips=None):
         p = port['port']
         port_id = p.get('id') or uuidutils.generate_uuid()
         network_id = p['network_id']
@@ -1834,7 +2057,8 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                     context, network_id, port_data, p['mac_address'])
 
             # Update the IP's for the port
-            ips = self._allocate_ips_for_port(context, port)
+            ips = self._allocate_ips_for_port(context, port,
+                                              generated_ips)
             if ips:
                 for ip in ips:
                     ip_address = ip['ip_address']
@@ -1956,11 +2180,20 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                   sorts=None, limit=None, marker=None,
                   page_reverse=False):
         marker_obj = self._get_marker_obj(context, 'port', limit, marker)
+        columns = None
+        # NOTE: filtering on fixed_ips joins the allocations, a port would
+        # be returned once per matching address by a column-only query
+        if not (filters and 'fixed_ips' in filters):
+            columns = self._get_projection(models_v2.Port, fields,
+                                           PORT_COLUMN_ATTRS)
         query = self._get_ports_query(context, filters=filters,
                                       sorts=sorts, limit=limit,
                                       marker_obj=marker_obj,
                                       page_reverse=page_reverse)
-        items = [self._make_port_dict(c, fields) for c in query]
+        if columns:
+            items = self._make_projected_dicts(query, columns)
+        else:
+            items = [self._make_port_dict(c, fields) for c in query]
         if limit and page_reverse:
             items.reverse()
         return items
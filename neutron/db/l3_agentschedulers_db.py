@@ -284,12 +284,7 @@ class L3AgentSchedulerDbMixin(l3agentscheduler.L3AgentSchedulerPluginBase,
 
         return self.get_sync_data(context, router_ids=router_ids, active=True)
 
-    def list_active_sync_routers_on_active_l3_agent(
-            self, context, host, router_ids):
-        agent = self._get_agent_by_type_and_host(
-            context, constants.AGENT_TYPE_L3, host)
-        if not agentschedulers_db.services_available(agent.admin_state_up):
-            return []
+    def _get_router_ids_on_agent(self, context, agent, router_ids=None):
         query = context.session.query(RouterL3AgentBinding.router_id)
         query = query.filter(
             RouterL3AgentBinding.l3_agent_id == agent.id)
@@ -297,7 +292,22 @@ class L3AgentSchedulerDbMixin(l3agentscheduler.L3AgentSchedulerPluginBase,
         if router_ids:
             query = query.filter(
                 RouterL3AgentBinding.router_id.in_(router_ids))
-        router_ids = [item[0] for item in query]
+        return [item[0] for item in query]
+
+    def list_router_ids_on_host(self, context, host, router_ids=None):
+        agent = self._get_agent_by_type_and_host(
+            context, constants.AGENT_TYPE_L3, host)
+        if not agentschedulers_db.services_available(agent.admin_state_up):
+            return []
+        return self._get_router_ids_on_agent(context, agent, router_ids)
+
+    def list_active_sync_routers_on_active_l3_agent(
+            self, context, host, router_ids):
+        agent = self._get_agent_by_type_and_host(
+            context, constants.AGENT_TYPE_L3, host)
+        if not agentschedulers_db.services_available(agent.admin_state_up):
+            return []
+        router_ids = self._get_router_ids_on_agent(context, agent, router_ids)
         if router_ids:
             return self._get_active_l3_agent_routers_sync_data(context, host,
                                                                agent,
@@ -493,8 +503,9 @@ class L3AgentSchedulerDbMixin(l3agentscheduler.L3AgentSchedulerPluginBase,
 
     def schedule_routers(self, context, routers):
         """Schedule the routers to l3 agents."""
-        for router in routers:
-            self.schedule_router(context, router, candidates=None)
+        if self.router_scheduler:
+            return self.router_scheduler.schedule_routers(
+                self, context, routers)
 
     def get_l3_agent_with_min_routers(self, context, agent_ids):
         """Return l3 agent with the least number of routers."""
@@ -52,6 +52,10 @@ EXTERNAL_GW_INFO = l3.EXTERNAL_GW_INFO
 # Useful to keep the filtering between API and Database.
 API_TO_DB_COLUMN_MAP = {'port_id': 'fixed_port_id'}
 CORE_ROUTER_ATTRS = ('id', 'name', 'tenant_id', 'admin_state_up', 'status')
+# Floating IP attributes copied unchanged from the model columns
+FLOATINGIP_COLUMN_ATTRS = ('id', 'tenant_id', 'floating_ip_address',
+                           'floating_network_id', 'router_id',
+                           'fixed_ip_address', 'status')
 
 
 class RouterPort(model_base.BASEV2):
@@ -451,7 +455,8 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase):
                                     sorts=sorts,
                                     limit=limit,
                                     marker_obj=marker_obj,
-                                    page_reverse=page_reverse)
+                                    page_reverse=page_reverse,
+                                    projectable_fields=CORE_ROUTER_ATTRS)
 
     def get_routers_count(self, context, filters=None):
         return self._get_collection_count(context, Router,
@@ -1023,7 +1028,8 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase):
                                     sorts=sorts,
                                     limit=limit,
                                     marker_obj=marker_obj,
-                                    page_reverse=page_reverse)
+                                    page_reverse=page_reverse,
+                                    projectable_fields=FLOATINGIP_COLUMN_ATTRS)
 
     def delete_disassociated_floatingips(self, context, network_id):
         query = self._model_query(context, FloatingIP)
@@ -1135,7 +1141,7 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase):
             return []
         qry = context.session.query(RouterPort)
         qry = qry.filter(
-            Router.id.in_(router_ids),
+            RouterPort.router_id.in_(router_ids),
             RouterPort.port_type.in_(device_owners)
         )
 
@@ -1146,7 +1152,9 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase):
     def _populate_subnets_for_ports(self, context, ports):
         """Populate ports with subnets.
 
-        These ports already have fixed_ips populated.
+        These ports already have fixed_ips populated. The subnets of all the
+        ports are fetched at once, so the number of queries does not depend
+        on the number of ports.
         """
         if not ports:
             return
@@ -1165,36 +1173,40 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase):
 
         network_ids = set(p['network_id']
                           for p in each_port_having_fixed_ips())
+        if not network_ids:
+            return
         filters = {'network_id': [id for id in network_ids]}
         fields = ['id', 'cidr', 'gateway_ip',
                   'network_id', 'ipv6_ra_mode']
 
         subnets_by_network = dict((id, []) for id in network_ids)
+        prefixlens = {}
         for subnet in self._core_plugin.get_subnets(context, filters, fields):
-            subnets_by_network[subnet['network_id']].append(subnet)
+            subnet_info = {'id': subnet['id'],
+                           'cidr': subnet['cidr'],
+                           'gateway_ip': subnet['gateway_ip'],
+                           'ipv6_ra_mode': subnet['ipv6_ra_mode']}
+            subnets_by_network[subnet['network_id']].append(subnet_info)
+            prefixlens[subnet['id']] = netaddr.IPNetwork(
+                subnet['cidr']).prefixlen
 
         for port in each_port_having_fixed_ips():
-
+            # Subnets used by the port (having a matching entry in the
+            # port's fixed_ips) go to the port's subnets list, and their
+            # prefix length to the fixed_ips entry. The other subnets of the
+            # network are the port's extra subnets.
+            used_subnet_ids = set()
+            for fixed_ip in port['fixed_ips']:
+                prefixlen = prefixlens.get(fixed_ip['subnet_id'])
+                if prefixlen is not None:
+                    fixed_ip['prefixlen'] = prefixlen
+                    used_subnet_ids.add(fixed_ip['subnet_id'])
             port['subnets'] = []
             port['extra_subnets'] = []
-            for subnet in subnets_by_network[port['network_id']]:
-                # If this subnet is used by the port (has a matching entry
-                # in the port's fixed_ips), then add this subnet to the
-                # port's subnets list, and populate the fixed_ips entry
-                # entry with the subnet's prefix length.
-                subnet_info = {'id': subnet['id'],
-                               'cidr': subnet['cidr'],
-                               'gateway_ip': subnet['gateway_ip'],
-                               'ipv6_ra_mode': subnet['ipv6_ra_mode']}
-                for fixed_ip in port['fixed_ips']:
-                    if fixed_ip['subnet_id'] == subnet['id']:
-                        port['subnets'].append(subnet_info)
-                        prefixlen = netaddr.IPNetwork(
-                            subnet['cidr']).prefixlen
-                        fixed_ip['prefixlen'] = prefixlen
-                        break
+            for subnet_info in subnets_by_network[port['network_id']]:
+                if subnet_info['id'] in used_subnet_ids:
+                    port['subnets'].append(subnet_info)
                 else:
-                    # This subnet is not used by the port.
                     port['extra_subnets'].append(subnet_info)
 
     def _process_floating_ips(self, context, routers_dict, floating_ips):
@@ -423,19 +423,22 @@ class L3_HA_NAT_db_mixin(l3_dvr_db.L3_NAT_with_dvr_db_mixin):
                     context, ha_network, router_db.extra_attributes.ha_vr_id)
                 self._delete_ha_interfaces(context, router_db.id)
 
-    def get_ha_router_port_bindings(self, context, router_ids, host=None):
-        if not router_ids:
-            return []
+    def _get_ha_router_port_bindings_query(self, context, router_ids,
+                                           host=None):
         query = context.session.query(L3HARouterAgentPortBinding)
 
         if host:
             query = query.join(agents_db.Agent).filter(
                 agents_db.Agent.host == host)
 
-        query = query.filter(
+        return query.filter(
             L3HARouterAgentPortBinding.router_id.in_(router_ids))
 
-        return query.all()
+    def get_ha_router_port_bindings(self, context, router_ids, host=None):
+        if not router_ids:
+            return []
+        return self._get_ha_router_port_bindings_query(
+            context, router_ids, host).all()
 
     def get_l3_bindings_hosting_router_with_ha_states(
             self, context, router_id):
@@ -445,21 +448,22 @@ class L3_HA_NAT_db_mixin(l3_dvr_db.L3_NAT_with_dvr_db_mixin):
 
     def _process_sync_ha_data(self, context, routers, host):
         routers_dict = dict((router['id'], router) for router in routers)
+        if not routers_dict:
+            return []
 
-        bindings = self.get_ha_router_port_bindings(context,
-                                                    routers_dict.keys(),
-                                                    host)
-        for binding in bindings:
+        # The HA ports of all the routers are loaded with their bindings
+        query = self._get_ha_router_port_bindings_query(
+            context, routers_dict.keys(), host)
+        interfaces = []
+        for binding in query.options(orm.joinedload('port')):
             port_dict = self._core_plugin._make_port_dict(binding.port)
 
             router = routers_dict.get(binding.router_id)
             router[constants.HA_INTERFACE_KEY] = port_dict
             router[constants.HA_ROUTER_STATE_KEY] = binding.state
+            interfaces.append(port_dict)
 
-        for router in routers_dict.values():
-            interface = router.get(constants.HA_INTERFACE_KEY)
-            if interface:
-                self._populate_subnets_for_ports(context, [interface])
+        self._populate_subnets_for_ports(context, interfaces)
 
         return routers_dict.values()
 
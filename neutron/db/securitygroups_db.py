@@ -39,6 +39,8 @@ IP_PROTOCOL_MAP = {constants.PROTO_NAME_TCP: constants.PROTO_NUM_TCP,
                    constants.PROTO_NAME_UDP: constants.PROTO_NUM_UDP,
                    constants.PROTO_NAME_ICMP: constants.PROTO_NUM_ICMP,
                    constants.PROTO_NAME_ICMP_V6: constants.PROTO_NUM_ICMP_V6}
+# Security group attributes copied unchanged from the model columns
+SECURITY_GROUP_COLUMN_ATTRS = ('id', 'name', 'tenant_id', 'description')
 
 
 class SecurityGroup(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
@@ -202,13 +204,11 @@ class SecurityGroupDbMixin(ext_sg.SecurityGroupPluginBase):
             self._ensure_default_security_group(context, tenant_id)
         marker_obj = self._get_marker_obj(context, 'security_group', limit,
                                           marker)
-        return self._get_collection(context,
-                                    SecurityGroup,
-                                    self._make_security_group_dict,
-                                    filters=filters, fields=fields,
-                                    sorts=sorts,
-                                    limit=limit, marker_obj=marker_obj,
-                                    page_reverse=page_reverse)
+        return self._get_collection(
+            context, SecurityGroup, self._make_security_group_dict,
+            filters=filters, fields=fields, sorts=sorts,
+            limit=limit, marker_obj=marker_obj, page_reverse=page_reverse,
+            projectable_fields=SECURITY_GROUP_COLUMN_ATTRS)
 
     def get_security_groups_count(self, context, filters=None):
         return self._get_collection_count(context, SecurityGroup,
@@ -13,8 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import itertools
+import time
+
 import netaddr
+from oslo_config import cfg
 from oslo_log import log as logging
+import sqlalchemy as sa
 from sqlalchemy.orm import exc
 
 from neutron.common import constants as q_const
@@ -23,6 +29,7 @@ from neutron.common import utils
 from neutron.db import allowedaddresspairs_db as addr_pair
 from neutron.db import models_v2
 from neutron.db import securitygroups_db as sg_db
+from neutron.extensions import allowedaddresspairs as ext_addr_pair
 from neutron.extensions import securitygroup as ext_sg
 from neutron.i18n import _LW
 
@@ -34,6 +41,108 @@ DIRECTION_IP_PREFIX = {'ingress': 'source_ip_prefix',
 
 DHCP_RULE_PORT = {4: (67, 68, q_const.IPv4), 6: (547, 546, q_const.IPv6)}
 
+# Columns of the security group rules kept by SecurityGroupInfoCache
+RULE_CACHE_KEYS = ('id', 'security_group_id', 'direction', 'ethertype',
+                   'protocol', 'port_range_min', 'port_range_max',
+                   'remote_ip_prefix', 'remote_group_id')
+
+sg_rpc_opts = [
+    cfg.BoolOpt('sg_member_delta_notifications', default=False,
+                help=_('Notify agents of the IP addresses added to and '
+                       'removed from security groups when ports are created '
+                       'or deleted, instead of notifying the updated '
+                       'security groups and letting each agent query their '
+                       'members. Enable it only once all the L2 agents '
+                       'support the security_groups_member_delta '
+                       'notification, added in version 1.3 of their RPC '
+                       'API.')),
+    cfg.IntOpt('sg_info_cache_ttl', default=0,
+               help=_('Number of seconds the rules and member IPs of '
+                      'security groups are cached to answer security group '
+                      'requests of agents. The cache of a neutron-server '
+                      'worker is invalidated by the rule and port changes '
+                      'it processes, changes processed by other workers are '
+                      'seen once the cached data expires. 0 disables the '
+                      'cache.')),
+]
+cfg.CONF.register_opts(sg_rpc_opts)
+
+
+class SecurityGroupInfoCache(object):
+    """Cache of the rules and member IPs of security groups.
+
+    Entries expire after ttl seconds and are invalidated by the changes of
+    rules and ports. Data read from the database while an invalidation
+    happens is not cached: readers fetch the version before querying and
+    the cache is only updated if the version did not change.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.version = 0
+        self._rules = {}
+        self._member_ips = {}
+        self.hits = 0
+        self.misses = 0
+        self._sequence = itertools.count()
+
+    def next_sequence(self):
+        """Return a number ordering the cached rules by fetch order."""
+        return next(self._sequence)
+
+    def _get(self, entries, sg_ids):
+        now = time.time()
+        found = {}
+        missing = []
+        for sg_id in sg_ids:
+            entry = entries.get(sg_id)
+            if entry is not None and entry[0] > now:
+                found[sg_id] = entry[1]
+            else:
+                missing.append(sg_id)
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    def _set(self, entries, values, version):
+        if version != self.version:
+            return
+        expiry = time.time() + self.ttl
+        for sg_id, value in values.items():
+            entries[sg_id] = (expiry, value)
+
+    def get_rules(self, sg_ids):
+        """Return the cached rules by group and the missing group ids."""
+        return self._get(self._rules, sg_ids)
+
+    def set_rules(self, rules_by_sg, version):
+        self._set(self._rules, rules_by_sg, version)
+
+    def get_member_ips(self, sg_ids):
+        """Return the cached IPs by group and the missing group ids."""
+        return self._get(self._member_ips, sg_ids)
+
+    def set_member_ips(self, ips_by_sg, version):
+        self._set(self._member_ips, ips_by_sg, version)
+
+    def invalidate_rules(self, sg_ids):
+        self.version += 1
+        for sg_id in sg_ids:
+            self._rules.pop(sg_id, None)
+
+    def invalidate_member_ips(self, sg_ids):
+        self.version += 1
+        for sg_id in sg_ids:
+            self._member_ips.pop(sg_id, None)
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': float(self.hits) / lookups if lookups else 0.0,
+                'rules_entries': len(self._rules),
+                'member_ips_entries': len(self._member_ips)}
+
 
 class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
     """Mixin class to add agent-based security group implementation."""
@@ -67,11 +176,35 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
         """
         return [self.get_port_from_device(device) for device in devices]
 
+    def _get_sg_info_cache(self):
+        """Return the security group info cache, None if it is disabled."""
+        ttl = cfg.CONF.sg_info_cache_ttl
+        if ttl <= 0:
+            return None
+        cache = getattr(self, '_sg_info_cache', None)
+        if cache is None:
+            cache = self._sg_info_cache = SecurityGroupInfoCache(ttl)
+        return cache
+
+    def _invalidate_sg_rules(self, sg_ids):
+        cache = self._get_sg_info_cache()
+        if cache is not None:
+            cache.invalidate_rules(sg_ids)
+
+    def _invalidate_sg_member_ips(self, *ports):
+        cache = self._get_sg_info_cache()
+        if cache is not None:
+            sg_ids = set()
+            for port in ports:
+                sg_ids.update(port.get(ext_sg.SECURITYGROUPS) or [])
+            cache.invalidate_member_ips(sg_ids)
+
     def create_security_group_rule(self, context, security_group_rule):
         bulk_rule = {'security_group_rules': [security_group_rule]}
         rule = self.create_security_group_rule_bulk_native(context,
                                                            bulk_rule)[0]
         sgids = [rule['security_group_id']]
+        self._invalidate_sg_rules(sgids)
         self.notifier.security_groups_rule_updated(context, sgids)
         return rule
 
@@ -81,6 +214,7 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
                       self).create_security_group_rule_bulk_native(
                           context, security_group_rule)
         sgids = set([r['security_group_id'] for r in rules])
+        self._invalidate_sg_rules(sgids)
         self.notifier.security_groups_rule_updated(context, list(sgids))
         return rules
 
@@ -88,6 +222,7 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
         rule = self.get_security_group_rule(context, sgrid)
         super(SecurityGroupServerRpcMixin,
               self).delete_security_group_rule(context, sgrid)
+        self._invalidate_sg_rules([rule['security_group_id']])
         self.notifier.security_groups_rule_updated(context,
                                                    [rule['security_group_id']])
 
@@ -113,6 +248,7 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
                 context,
                 updated_port,
                 port_updates[ext_sg.SECURITYGROUPS])
+            self._invalidate_sg_member_ips(original_port, updated_port)
             need_notify = True
         else:
             updated_port[ext_sg.SECURITYGROUPS] = (
@@ -134,6 +270,10 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
                 original_port.get(ext_sg.SECURITYGROUPS),
                 updated_port.get(ext_sg.SECURITYGROUPS))):
             need_notify = True
+        if (need_notify or
+                original_port.get(ext_addr_pair.ADDRESS_PAIRS) !=
+                updated_port.get(ext_addr_pair.ADDRESS_PAIRS)):
+            self._invalidate_sg_member_ips(original_port, updated_port)
         return need_notify
 
     def notify_security_groups_member_updated_bulk(self, context, ports):
@@ -149,6 +289,8 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
         """
         security_groups_provider_updated = False
         sec_groups = set()
+        member_ports = []
+        self._invalidate_sg_member_ips(*ports)
         for port in ports:
             if port['device_owner'] == q_const.DEVICE_OWNER_DHCP:
                 security_groups_provider_updated = True
@@ -160,13 +302,53 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
                     security_groups_provider_updated = True
             else:
                 sec_groups |= set(port.get(ext_sg.SECURITYGROUPS))
+                member_ports.append(port)
 
         if security_groups_provider_updated:
             self.notifier.security_groups_provider_updated(context)
-        if sec_groups:
+        if sec_groups and cfg.CONF.sg_member_delta_notifications:
+            sg_member_deltas = self._get_security_group_member_deltas(
+                context, member_ports)
+            if sg_member_deltas:
+                self.notifier.security_groups_member_delta(
+                    context, sg_member_deltas)
+        elif sec_groups:
             self.notifier.security_groups_member_updated(
                 context, list(sec_groups))
 
+    def _get_security_group_member_deltas(self, context, ports):
+        """Return the member IPs added and removed by the ports change.
+
+        The IPs of the ports are compared with the current members of their
+        security groups: the IPs still used by a member are reported as
+        added, the others as removed. This works for created and deleted
+        ports and keeps an IP shared by several ports of a group, like an
+        allowed address pair, until the last one is gone.
+
+        :returns: {sg_id: {'added': [ip1, ...], 'removed': [ip2, ...]}}
+        """
+        port_ips_by_sg = collections.defaultdict(set)
+        for port in ports:
+            port_ips = set(ip['ip_address'] for ip in port['fixed_ips'])
+            port_ips.update(pair['ip_address'] for pair in
+                            port.get(ext_addr_pair.ADDRESS_PAIRS) or [])
+            for sg_id in port.get(ext_sg.SECURITYGROUPS) or []:
+                port_ips_by_sg[sg_id] |= port_ips
+        all_ips = set()
+        for ips in port_ips_by_sg.values():
+            all_ips |= ips
+        member_ips = self._select_db_ips_for_remote_group(
+            context, port_ips_by_sg.keys(), ip_addresses=all_ips)
+
+        sg_member_deltas = {}
+        for sg_id, port_ips in port_ips_by_sg.items():
+            if not port_ips:
+                continue
+            sg_member_deltas[sg_id] = {
+                'added': sorted(port_ips & member_ips[sg_id]),
+                'removed': sorted(port_ips - member_ips[sg_id])}
+        return sg_member_deltas
+
     def notify_security_groups_member_updated(self, context, port):
         self.notify_security_groups_member_updated_bulk(context, [port])
 
@@ -236,6 +418,10 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
     def _select_rules_for_ports(self, context, ports):
         if not ports:
             return []
+        cache = self._get_sg_info_cache()
+        if cache is not None and all(ext_sg.SECURITYGROUPS in port
+                                     for port in ports.values()):
+            return self._select_cached_rules_for_ports(cache, context, ports)
         sg_binding_port = sg_db.SecurityGroupPortBinding.port_id
         sg_binding_sgid = sg_db.SecurityGroupPortBinding.security_group_id
 
@@ -248,7 +434,49 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
         query = query.filter(sg_binding_port.in_(ports.keys()))
         return query.all()
 
+    def _select_cached_rules_for_ports(self, cache, context, ports):
+        sg_ids = set()
+        for port in ports.values():
+            sg_ids.update(port[ext_sg.SECURITYGROUPS])
+        version = cache.version
+        rules_by_sg, missing = cache.get_rules(sg_ids)
+        if missing:
+            fetched = dict((sg_id, []) for sg_id in missing)
+            query = context.session.query(sg_db.SecurityGroupRule)
+            query = query.filter(
+                sg_db.SecurityGroupRule.security_group_id.in_(missing))
+            for rule in query:
+                fetched[rule.security_group_id].append(
+                    (cache.next_sequence(),
+                     dict((key, rule[key]) for key in RULE_CACHE_KEYS)))
+            cache.set_rules(fetched, version)
+            rules_by_sg.update(fetched)
+        LOG.debug("Security group info cache stats: %s", cache.get_stats())
+        # Keep the rules of a port in the order the database returned them
+        rules = []
+        for port_id, port in ports.items():
+            port_rules = sorted(rule for sg_id in port[ext_sg.SECURITYGROUPS]
+                                for rule in rules_by_sg[sg_id])
+            rules.extend((port_id, rule) for seq, rule in port_rules)
+        return rules
+
     def _select_ips_for_remote_group(self, context, remote_group_ids):
+        cache = self._get_sg_info_cache()
+        if cache is None or not remote_group_ids:
+            return self._select_db_ips_for_remote_group(context,
+                                                        remote_group_ids)
+        version = cache.version
+        ips_by_group, missing = cache.get_member_ips(set(remote_group_ids))
+        if missing:
+            fetched = self._select_db_ips_for_remote_group(context, missing)
+            fetched = dict((sg_id, frozenset(ips))
+                           for sg_id, ips in fetched.items())
+            cache.set_member_ips(fetched, version)
+            ips_by_group.update(fetched)
+        return ips_by_group
+
+    def _select_db_ips_for_remote_group(self, context, remote_group_ids,
+                                        ip_addresses=None):
         ips_by_group = {}
         if not remote_group_ids:
             return ips_by_group
@@ -272,6 +500,11 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
             addr_pair.AllowedAddressPair,
             sg_binding_port == addr_pair.AllowedAddressPair.port_id)
         query = query.filter(sg_binding_sgid.in_(remote_group_ids))
+        if ip_addresses:
+            # Only the rows of the ports using one of these addresses
+            query = query.filter(sa.or_(
+                models_v2.IPAllocation.ip_address.in_(ip_addresses),
+                addr_pair.AllowedAddressPair.ip_address.in_(ip_addresses)))
         # Each allowed address pair IP record for a port beyond the 1st
         # will have a duplicate regular IP in the query response since
         # the relationship is 1-to-many. Dedup with a set
@@ -99,6 +99,15 @@ def paginate_query(query, model, limit, sorts, marker_obj=None):
             criteria_list.append(criteria)
 
         f = sqlalchemy.sql.or_(*criteria_list)
+        # NOTE: each criterion above implies the range condition on the
+        # first sort key, adding it lets the database seek an index on
+        # that key instead of scanning the rows before the marker
+        first_attr = getattr(model, sorts[0][0])
+        if marker_values[0] is not None:
+            if sorts[0][1]:
+                f = sqlalchemy.sql.and_(first_attr >= marker_values[0], f)
+            else:
+                f = sqlalchemy.sql.and_(first_attr <= marker_values[0], f)
         query = query.filter(f)
 
     if limit:
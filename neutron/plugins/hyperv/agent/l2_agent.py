@@ -59,7 +59,10 @@ class HyperVSecurityAgent(sg_rpc.SecurityGroupAgentRpc):
 
 class HyperVSecurityCallbackMixin(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
 
-    target = oslo_messaging.Target(version='1.1')
+    # history
+    #   1.1 Support Security Group RPC
+    #   1.3 Added security_groups_member_delta
+    target = oslo_messaging.Target(version='1.3')
 
     def __init__(self, sg_agent):
         super(HyperVSecurityCallbackMixin, self).__init__()
@@ -16,6 +16,7 @@
 from oslo_db import exception as db_exc
 from oslo_log import log
 from sqlalchemy import or_
+from sqlalchemy.orm import attributes
 from sqlalchemy.orm import exc
 
 from neutron.common import constants as n_const
@@ -178,6 +179,28 @@ def get_binding_levels(session, port_id, host):
         return result
 
 
+def get_binding_levels_by_port(session, port_hosts):
+    """Get the binding levels of several ports.
+
+    port_hosts maps the ids of the ports to the host of their binding.
+    Returns a dict of the binding levels by port id, ports bound to no
+    host are left out.
+    """
+    port_hosts = dict((port_id, host) for port_id, host in port_hosts.items()
+                      if host)
+    levels = dict((port_id, []) for port_id in port_hosts)
+    port_ids = list(port_hosts)
+    for i in range(0, len(port_ids), MAX_PORTS_PER_QUERY):
+        query = (session.query(models.PortBindingLevel).
+                 filter(models.PortBindingLevel.port_id.in_(
+                     port_ids[i:i + MAX_PORTS_PER_QUERY])).
+                 order_by(models.PortBindingLevel.level))
+        for level in query:
+            if level.host == port_hosts[level.port_id]:
+                levels[level.port_id].append(level)
+    return levels
+
+
 def clear_binding_levels(session, port_id, host):
     if host:
         (session.query(models.PortBindingLevel).
@@ -244,6 +267,51 @@ def get_port(session, port_id):
             return
 
 
+def get_ports(session, port_ids):
+    """Get the port records of several port ids, which may be truncated.
+
+    Returns a dict of the records by requested port id. Ports that are not
+    found or whose truncated id matches several ports are left out.
+    """
+    records = {}
+    for i in range(0, len(port_ids), MAX_PORTS_PER_QUERY):
+        chunk = port_ids[i:i + MAX_PORTS_PER_QUERY]
+        # partial UUIDs must be individually matched with startswith.
+        # full UUIDs may be matched directly in an IN statement
+        partial_uuids = set(port_id for port_id in chunk
+                            if not uuidutils.is_uuid_like(port_id))
+        full_uuids = set(chunk) - partial_uuids
+        or_criteria = [models_v2.Port.id.startswith(port_id)
+                       for port_id in partial_uuids]
+        if full_uuids:
+            or_criteria.append(models_v2.Port.id.in_(full_uuids))
+        with session.begin(subtransactions=True):
+            ports = session.query(models_v2.Port).filter(
+                or_(*or_criteria)).all()
+        for port_id in chunk:
+            matches = [port for port in ports if port.id.startswith(port_id)]
+            if len(matches) == 1:
+                records[port_id] = matches[0]
+            elif matches:
+                LOG.error(_LE("Multiple ports have port_id starting with %s"),
+                          port_id)
+    return records
+
+
+def set_ports_status(session, ports, status):
+    """Set the status of several port records with bulk UPDATEs."""
+    port_ids = [port.id for port in ports]
+    with session.begin(subtransactions=True):
+        for i in range(0, len(port_ids), MAX_PORTS_PER_QUERY):
+            (session.query(models_v2.Port).
+             filter(models_v2.Port.id.in_(
+                 port_ids[i:i + MAX_PORTS_PER_QUERY])).
+             update({'status': status}, synchronize_session=False))
+    for port in ports:
+        # The records are up to date, they must not be flushed again
+        attributes.set_committed_value(port, 'status', status)
+
+
 def get_port_from_device_mac(device_mac):
     LOG.debug("get_port_from_device_mac() called for mac %s", device_mac)
     session = db_api.get_session()
@@ -354,6 +422,17 @@ def get_dvr_port_binding_by_host(session, port_id, host):
     return binding
 
 
+def get_dvr_port_bindings_by_host(session, port_ids, host):
+    """Get the DVR bindings of several ports on a host, by port id."""
+    if not port_ids:
+        return {}
+    with session.begin(subtransactions=True):
+        bindings = (session.query(models.DVRPortBinding).
+                    filter(models.DVRPortBinding.port_id.in_(port_ids),
+                           models.DVRPortBinding.host == host).all())
+    return dict((binding.port_id, binding) for binding in bindings)
+
+
 def get_dvr_port_bindings(session, port_id):
     with session.begin(subtransactions=True):
         bindings = (session.query(models.DVRPortBinding).
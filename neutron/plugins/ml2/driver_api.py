@@ -712,6 +712,37 @@ class MechanismDriver(object):
         """
         pass
 
+    def create_port_bulk_precommit(self, contexts):
+        """Allocate resources for the ports of a bulk request.
+
+        :param contexts: list of PortContext instances describing the
+        ports.
+
+        Called once for all the ports of a bulk request, inside the
+        transaction context that created them. The default implementation
+        calls create_port_precommit for each port, drivers can override it
+        to process the ports at once. Raising an exception will result in
+        a rollback of the current transaction.
+        """
+        for context in contexts:
+            self.create_port_precommit(context)
+
+    def create_port_bulk_postcommit(self, contexts):
+        """Create the ports of a bulk request.
+
+        :param contexts: list of PortContext instances describing the
+        ports.
+
+        Called once for all the ports of a bulk request after the
+        transaction completes. The default implementation calls
+        create_port_postcommit for each port, drivers can override it to
+        process the ports at once, with a single request to a backend for
+        instance. Raising an exception will result in the deletion of all
+        the ports of the request.
+        """
+        for context in contexts:
+            self.create_port_postcommit(context)
+
     def update_port_precommit(self, context):
         """Update resources of a port.
 
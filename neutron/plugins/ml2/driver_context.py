@@ -77,12 +77,14 @@ class SubnetContext(MechanismDriverContext, api.SubnetContext):
 class PortContext(MechanismDriverContext, api.PortContext):
 
     def __init__(self, plugin, plugin_context, port, network, binding,
-                 binding_levels, original_port=None):
+                 binding_levels, original_port=None, network_context=None):
         super(PortContext, self).__init__(plugin, plugin_context)
         self._port = port
         self._original_port = original_port
-        self._network_context = NetworkContext(plugin, plugin_context,
-                                               network)
+        # The NetworkContext may be shared by the ports of a network
+        # processed together
+        self._network_context = network_context or NetworkContext(
+            plugin, plugin_context, network)
         self._binding = binding
         self._binding_levels = binding_levels
         self._segments_to_bind = None
@@ -178,6 +180,10 @@ class PortContext(MechanismDriverContext, api.PortContext):
                 self._original_binding_levels[-1].segment_id)
 
     def _expand_segment(self, segment_id):
+        # Only dynamic segments are not among the network segments
+        for segment in self._network_context.network_segments:
+            if segment[api.ID] == segment_id:
+                return segment
         segment = db.get_segment_by_id(self._plugin_context.session,
                                        segment_id)
         if not segment:
@@ -13,11 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import itertools
 import random
 
 from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_log import log
+from six import moves
+import sqlalchemy as sa
 
 from neutron.common import exceptions as exc
 from neutron.common import utils
@@ -27,6 +30,10 @@ from neutron.plugins.ml2 import driver_api as api
 LOG = log.getLogger(__name__)
 
 IDPOOL_SELECT_SIZE = 100
+# Ranges of segments smaller than this are compared row by row against the
+# table during a sync, larger ones are split until they are complete
+IDPOOL_SYNC_CHUNK_SIZE = 1000
+IDPOOL_SYNC_BULK_SIZE = 100
 
 
 class BaseTypeDriver(api.TypeDriver):
@@ -49,6 +56,11 @@ class SegmentTypeDriver(BaseTypeDriver):
 
     Provide methods helping to perform segment allocation fully or partially
     specified.
+
+    Every server worker reserves a chunk of free segments, starting at a
+    random point of the pool, and allocates from it until it is exhausted.
+    The chunk is only a hint: the database stays the reference and a segment
+    is allocated only once its row has been updated.
     """
 
     def __init__(self, model):
@@ -56,6 +68,10 @@ class SegmentTypeDriver(BaseTypeDriver):
         self.model = model
         self.primary_keys = set(dict(model.__table__.columns))
         self.primary_keys.remove("allocated")
+        self.segmentation_key = next(key for key in sorted(self.primary_keys)
+                                     if key != api.PHYSICAL_NETWORK)
+        # free segments reserved by this worker, by allocation filters
+        self._free_segments = {}
 
     def allocate_fully_specified_segment(self, session, **raw_segment):
         """Allocate segment fully specified by raw_segment.
@@ -113,6 +129,42 @@ class SegmentTypeDriver(BaseTypeDriver):
 
         return alloc
 
+    def _get_free_segments(self, session, filters):
+        key = tuple(sorted(filters.items()))
+        segments = self._free_segments.get(key)
+        if not segments:
+            segments = self._reserve_free_segments(session, filters)
+            self._free_segments[key] = segments
+        return segments
+
+    def _reserve_free_segments(self, session, filters):
+        """Select a chunk of free segments starting at a random point.
+
+        Workers starting at different points of the pool rarely race for
+        the same segments, whatever the size of the pool.
+        """
+
+        column = getattr(self.model, self.segmentation_key)
+        select = (session.query(self.model).
+                  filter_by(allocated=False, **filters))
+        first, last = select.with_entities(sa.func.min(column),
+                                           sa.func.max(column)).one()
+        if first is None:
+            # No resource available
+            return []
+
+        start = random.randint(first, last)
+        allocs = (select.filter(column >= start).order_by(column).
+                  limit(IDPOOL_SELECT_SIZE).all())
+        if len(allocs) < IDPOOL_SELECT_SIZE:
+            # Wrap around the pool
+            allocs += (select.filter(column < start).order_by(column).
+                       limit(IDPOOL_SELECT_SIZE - len(allocs)).all())
+        segments = [dict((k, alloc[k]) for k in self.primary_keys)
+                    for alloc in allocs]
+        random.shuffle(segments)
+        return segments
+
     def allocate_partially_specified_segment(self, session, **filters):
         """Allocate model segment from pool partially specified by filters.
 
@@ -121,18 +173,12 @@ class SegmentTypeDriver(BaseTypeDriver):
 
         network_type = self.get_type()
         with session.begin(subtransactions=True):
-            select = (session.query(self.model).
-                      filter_by(allocated=False, **filters))
-
-            # Selected segment can be allocated before update by someone else,
-            allocs = select.limit(IDPOOL_SELECT_SIZE).all()
-
-            if not allocs:
+            segments = self._get_free_segments(session, filters)
+            if not segments:
                 # No resource available
                 return
 
-            alloc = random.choice(allocs)
-            raw_segment = dict((k, alloc[k]) for k in self.primary_keys)
+            raw_segment = segments.pop()
             LOG.debug("%(type)s segment allocate from pool "
                       "started with %(segment)s ",
                       {"type": network_type,
@@ -145,13 +191,77 @@ class SegmentTypeDriver(BaseTypeDriver):
                           "success with %(segment)s ",
                           {"type": network_type,
                            "segment": raw_segment})
-                return alloc
+                return self.model(allocated=True, **raw_segment)
 
-            # Segment allocated since select
+            # Segment allocated since reserved, the chunk is probably shared
+            # with another worker: reserve a new one on next attempt
             LOG.debug("Allocate %(type)s segment from pool "
                       "failed with segment %(segment)s",
                       {"type": network_type,
                        "segment": raw_segment})
+            self._free_segments.pop(tuple(sorted(filters.items())), None)
             # saving real exception in case we exceeded amount of attempts
             raise db_exc.RetryRequest(
                 exc.NoNetworkFoundInMaximumAllowedAttempts())
+
+    def _sync_allocations(self, session, ranges, **filters):
+        """Synchronize the segments matching filters with configured ranges.
+
+        Unallocated segments outside of the ranges are removed and missing
+        segments of the ranges are added, without loading the ranges: only
+        the parts of them missing rows are compared with the table.
+        """
+
+        column = getattr(self.model, self.segmentation_key)
+        intervals = []
+        for first, last in sorted(ranges):
+            if intervals and first <= intervals[-1][1] + 1:
+                intervals[-1][1] = max(last, intervals[-1][1])
+            else:
+                intervals.append([first, last])
+
+        with session.begin(subtransactions=True):
+            # remove from table unallocated segments not currently allocatable
+            query = (session.query(self.model).
+                     filter_by(allocated=False, **filters))
+            if intervals:
+                query = query.filter(~sa.or_(*[column.between(first, last)
+                                               for first, last in intervals]))
+            count = query.delete(synchronize_session=False)
+            if count:
+                LOG.debug("Removed %(count)s %(type)s segments %(filters)s "
+                          "from pool",
+                          {'count': count, 'type': self.get_type(),
+                           'filters': filters})
+
+            # add missing allocatable segments to table
+            for first, last in intervals:
+                self._add_missing_segments(session, column, first, last,
+                                           filters)
+
+    def _add_missing_segments(self, session, column, first, last, filters):
+        query = (session.query(self.model).filter_by(**filters).
+                 filter(column.between(first, last)))
+        count = query.count()
+        if count == last - first + 1:
+            return
+        if count and last - first >= IDPOOL_SYNC_CHUNK_SIZE:
+            middle = (first + last) // 2
+            self._add_missing_segments(session, column, first, middle,
+                                       filters)
+            self._add_missing_segments(session, column, middle + 1, last,
+                                       filters)
+            return
+
+        existing = set()
+        if count:
+            existing = set(row[0] for row in query.with_entities(column))
+        missing = (dict(filters, allocated=False,
+                        **{self.segmentation_key: segmentation_id})
+                   for segmentation_id in moves.xrange(first, last + 1)
+                   if segmentation_id not in existing)
+        while True:
+            bulk = list(itertools.islice(missing, IDPOOL_SYNC_BULK_SIZE))
+            if not bulk:
+                break
+            session.execute(self.model.__table__.insert(), bulk)
@@ -20,6 +20,20 @@ l2_population_options = [
     cfg.IntOpt('agent_boot_time', default=180,
                help=_('Delay within which agent is expected to update '
                       'existing ports whent it restarts')),
+    cfg.IntOpt('fdb_cache_ttl', default=0,
+               help=_('Delay after which the forwarding entries of a network '
+                      'cached by the server are reloaded from the database. '
+                      'The ports activated or removed by other workers or '
+                      'servers are missing from the entries sent to an '
+                      'agent joining the network until the cache is '
+                      'reloaded, enable it only with a single API worker. '
+                      'Set to 0 to disable the cache.')),
+    cfg.FloatOpt('notification_interval', default=0.1,
+                 help=_('Delay in seconds during which forwarding entry '
+                        'changes are collected before being sent, in one '
+                        'message per host, to the agents having ports on '
+                        'the affected networks. Set to 0 to send them '
+                        'immediately.')),
 ]
 
 cfg.CONF.register_opts(l2_population_options, "l2pop")
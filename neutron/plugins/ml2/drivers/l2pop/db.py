@@ -15,6 +15,7 @@
 
 from oslo_serialization import jsonutils
 from oslo_utils import timeutils
+from sqlalchemy import orm
 
 from neutron.common import constants as const
 from neutron.db import agents_db
@@ -63,6 +64,8 @@ class L2populationDbMixin(base_db.CommonDbMixin):
                                agents_db.Agent.host ==
                                ml2_models.PortBinding.host)
             query = query.join(models_v2.Port)
+            query = query.options(orm.contains_eager(
+                ml2_models.PortBinding.port))
             query = query.filter(models_v2.Port.network_id == network_id,
                                  models_v2.Port.status ==
                                  const.PORT_STATUS_ACTIVE,
@@ -112,3 +115,28 @@ class L2populationDbMixin(base_db.CommonDbMixin):
                                    ml2_models.DVRPortBinding.host ==
                                    agent_host)
             return (query1.count() + query2.count())
+
+    def get_network_hosts(self, session, network_id):
+        """Return the hosts of the agents having active ports on a network."""
+        with session.begin(subtransactions=True):
+            query = session.query(ml2_models.PortBinding.host).distinct()
+            query = query.join(agents_db.Agent,
+                               agents_db.Agent.host ==
+                               ml2_models.PortBinding.host)
+            query = query.join(models_v2.Port)
+            query1 = query.filter(models_v2.Port.network_id == network_id,
+                                  models_v2.Port.status ==
+                                  const.PORT_STATUS_ACTIVE,
+                                  agents_db.Agent.agent_type.in_(
+                                      l2_const.SUPPORTED_AGENT_TYPES))
+            query = session.query(ml2_models.DVRPortBinding.host).distinct()
+            query = query.join(agents_db.Agent,
+                               agents_db.Agent.host ==
+                               ml2_models.DVRPortBinding.host)
+            query = query.join(models_v2.Port)
+            query2 = query.filter(models_v2.Port.network_id == network_id,
+                                  ml2_models.DVRPortBinding.status ==
+                                  const.PORT_STATUS_ACTIVE,
+                                  agents_db.Agent.agent_type.in_(
+                                      l2_const.SUPPORTED_AGENT_TYPES))
+            return set(host for host, in query1.union(query2))
@@ -15,6 +15,7 @@
 
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import timeutils
 
 from neutron.common import constants as const
 from neutron import context as n_context
@@ -34,18 +35,28 @@ class L2populationMechanismDriver(api.MechanismDriver,
 
     def __init__(self):
         super(L2populationMechanismDriver, self).__init__()
-        self.L2populationAgentNotify = l2pop_rpc.L2populationAgentNotifyAPI()
+        self.L2populationAgentNotify = l2pop_rpc.L2populationAgentNotifyAPI(
+            get_network_hosts=self._get_network_hosts)
+        # Active ports of networks, loaded from the database on first use and
+        # kept up to date with the port events handled by this server
+        self.network_fdbs = {}
 
     def initialize(self):
         LOG.debug("Experimental L2 population driver")
         self.rpc_ctx = n_context.get_admin_context_without_session()
         self.migrated_ports = {}
 
+    def _get_network_hosts(self, network_id):
+        return self.get_network_hosts(db_api.get_session(), network_id)
+
     def _get_port_fdb_entries(self, port):
         return [l2pop_rpc.PortInfo(mac_address=port['mac_address'],
                                    ip_address=ip['ip_address'])
                 for ip in port['fixed_ips']]
 
+    def delete_network_postcommit(self, context):
+        self.network_fdbs.pop(context.current['id'], None)
+
     def delete_port_postcommit(self, context):
         port = context.current
         agent_host = context.host
@@ -85,6 +96,11 @@ class L2populationMechanismDriver(api.MechanismDriver,
                                           ip_address=ip)
                        for ip in port_ips]
 
+        if port['device_owner'] != const.DEVICE_OWNER_DVR_INTERFACE:
+            self._set_port_fdb(port['network_id'], port['id'], agent_host,
+                               agent_ip, self._get_port_fdb_entries(port),
+                               update_only=True)
+
         upd_fdb_entries = {port['network_id']: {agent_ip: {}}}
 
         ports = upd_fdb_entries[port['network_id']][agent_ip]
@@ -179,42 +195,66 @@ class L2populationMechanismDriver(api.MechanismDriver,
 
         return agent, agent_host, agent_ip, segment, fdb_entries
 
+    def _get_network_fdb(self, session, network_id):
+        """Return the active ports of a network with their agent ip.
+
+        The ports are indexed by port id and host and come with their fdb
+        entries, empty for the DVR ports of which only the tunnel is
+        populated. They are reloaded from the database once older than
+        fdb_cache_ttl, as ports may be bound by other servers.
+        """
+        loaded_at, network_fdb = self.network_fdbs.get(network_id,
+                                                       (None, None))
+        if (network_fdb is None or
+                timeutils.is_older_than(loaded_at,
+                                        cfg.CONF.l2pop.fdb_cache_ttl)):
+            loaded_at = timeutils.utcnow()
+            network_fdb = {}
+            for binding, agent in self.get_nondvr_active_network_ports(
+                    session, network_id).all():
+                network_fdb[binding.port_id, agent.host] = (
+                    self.get_agent_ip(agent),
+                    self._get_port_fdb_entries(binding.port))
+            for binding, agent in self.get_dvr_active_network_ports(
+                    session, network_id).all():
+                network_fdb[binding.port_id, agent.host] = (
+                    self.get_agent_ip(agent), [])
+            if cfg.CONF.l2pop.fdb_cache_ttl > 0:
+                self.network_fdbs[network_id] = (loaded_at, network_fdb)
+        return network_fdb
+
+    def _set_port_fdb(self, network_id, port_id, agent_host, agent_ip,
+                      fdb_entries, update_only=False):
+        network_fdb = self.network_fdbs.get(network_id, (None, None))[1]
+        if network_fdb is None:
+            return
+        key = (port_id, agent_host)
+        if not update_only or key in network_fdb:
+            network_fdb[key] = (agent_ip, fdb_entries)
+
+    def _remove_port_fdb(self, network_id, port_id, agent_host):
+        network_fdb = self.network_fdbs.get(network_id, (None, None))[1]
+        if network_fdb is not None:
+            network_fdb.pop((port_id, agent_host), None)
+
     def _create_agent_fdb(self, session, agent, segment, network_id):
         agent_fdb_entries = {network_id:
                              {'segment_id': segment['segmentation_id'],
                               'network_type': segment['network_type'],
                               'ports': {}}}
-        tunnel_network_ports = (
-            self.get_dvr_active_network_ports(session, network_id).all())
-        fdb_network_ports = (
-            self.get_nondvr_active_network_ports(session, network_id).all())
         ports = agent_fdb_entries[network_id]['ports']
-        ports.update(self._get_tunnels(
-            fdb_network_ports + tunnel_network_ports,
-            agent.host))
-        for agent_ip, fdbs in ports.items():
-            for binding, agent in fdb_network_ports:
-                if self.get_agent_ip(agent) == agent_ip:
-                    fdbs.extend(self._get_port_fdb_entries(binding.port))
-
-        return agent_fdb_entries
-
-    def _get_tunnels(self, tunnel_network_ports, exclude_host):
-        agents = {}
-        for _, agent in tunnel_network_ports:
-            if agent.host == exclude_host:
+        network_fdb = self._get_network_fdb(session, network_id)
+        for (port_id, host), (agent_ip, fdb_entries) in network_fdb.items():
+            if host == agent.host:
                 continue
-
-            ip = self.get_agent_ip(agent)
-            if not ip:
+            if not agent_ip:
                 LOG.debug("Unable to retrieve the agent ip, check "
-                          "the agent %s configuration.", agent.host)
+                          "the agent %s configuration.", host)
                 continue
+            fdbs = ports.setdefault(agent_ip, [const.FLOODING_ENTRY])
+            fdbs.extend(fdb_entries)
 
-            if ip not in agents:
-                agents[ip] = [const.FLOODING_ENTRY]
-
-        return agents
+        return agent_fdb_entries
 
     def _update_port_up(self, context):
         port = context.current
@@ -225,6 +265,9 @@ class L2populationMechanismDriver(api.MechanismDriver,
         agent, agent_host, agent_ip, segment, port_fdb_entries = port_infos
 
         network_id = port['network_id']
+        dvr_port = port['device_owner'] == const.DEVICE_OWNER_DVR_INTERFACE
+        self._set_port_fdb(network_id, port['id'], agent_host, agent_ip,
+                           [] if dvr_port else port_fdb_entries)
 
         session = db_api.get_session()
         agent_active_ports = self.get_agent_network_active_port_count(
@@ -266,6 +309,7 @@ class L2populationMechanismDriver(api.MechanismDriver,
         agent, agent_host, agent_ip, segment, port_fdb_entries = port_infos
 
         network_id = port['network_id']
+        self._remove_port_fdb(network_id, port['id'], agent_host)
 
         session = db_api.get_session()
         agent_active_ports = self.get_agent_network_active_port_count(
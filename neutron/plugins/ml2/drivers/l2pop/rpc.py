@@ -16,11 +16,16 @@
 import collections
 import copy
 
+import eventlet
+from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
+from oslo_serialization import jsonutils
 
 from neutron.common import rpc as n_rpc
 from neutron.common import topics
+from neutron.i18n import _LE
+from neutron.plugins.ml2.drivers.l2pop import config  # noqa
 
 
 LOG = logging.getLogger(__name__)
@@ -30,25 +35,108 @@ PortInfo = collections.namedtuple("PortInfo", "mac_address ip_address")
 
 
 class L2populationAgentNotifyAPI(object):
+    """Notify forwarding entries to the l2population agents.
 
-    def __init__(self, topic=topics.AGENT):
+    When get_network_hosts is given, the entries added and removed on all
+    agents are not fanned out: they are collected during
+    notification_interval and sent in one message per host, only to the
+    hosts returned by get_network_hosts(network_id).
+    """
+
+    def __init__(self, topic=topics.AGENT, get_network_hosts=None):
         self.topic = topic
         self.topic_l2pop_update = topics.get_topic_name(topic,
                                                         topics.L2POPULATION,
                                                         topics.UPDATE)
         target = oslo_messaging.Target(topic=topic, version='1.0')
         self.client = n_rpc.get_client(target)
+        self.get_network_hosts = get_network_hosts
+        self._pending_notifications = []
+        self._send_scheduled = False
+        # messages and bytes sent by host, None for fanouts
+        self.notification_stats = collections.defaultdict(
+            lambda: {'messages': 0, 'bytes': 0})
+
+    def _cast(self, context, method, fdb_entries, host=None):
+        marshalled_fdb_entries = self._marshall_fdb_entries(fdb_entries)
+        if host:
+            cctxt = self.client.prepare(topic=self.topic_l2pop_update,
+                                        server=host)
+        else:
+            cctxt = self.client.prepare(topic=self.topic_l2pop_update,
+                                        fanout=True)
+        cctxt.cast(context, method, fdb_entries=marshalled_fdb_entries)
+
+        stats = self.notification_stats[host]
+        stats['messages'] += 1
+        stats['bytes'] += len(jsonutils.dumps(marshalled_fdb_entries))
 
     def _notification_fanout(self, context, method, fdb_entries):
+        if (self.get_network_hosts is not None and
+                method in ('add_fdb_entries', 'remove_fdb_entries')):
+            self._pending_notifications.append((method, fdb_entries))
+            if cfg.CONF.l2pop.notification_interval <= 0:
+                self._send_pending_notifications(context)
+            elif not self._send_scheduled:
+                self._send_scheduled = True
+                eventlet.spawn_after(cfg.CONF.l2pop.notification_interval,
+                                     self._send_pending_notifications,
+                                     context)
+            return
+
         LOG.debug('Fanout notify l2population agents at %(topic)s '
                   'the message %(method)s with %(fdb_entries)s',
                   {'topic': self.topic,
                    'method': method,
                    'fdb_entries': fdb_entries})
+        self._cast(context, method, fdb_entries)
+
+    def _send_pending_notifications(self, context):
+        pending = self._pending_notifications
+        self._pending_notifications = []
+        self._send_scheduled = False
+
+        # Successive entries of the same method are merged, the order of
+        # the additions and removals is kept for every host
+        network_hosts = {}
+        host_notifications = collections.defaultdict(list)
+        for method, fdb_entries in pending:
+            for network_id, network_entries in fdb_entries.items():
+                if network_id not in network_hosts:
+                    try:
+                        network_hosts[network_id] = self.get_network_hosts(
+                            network_id)
+                    except Exception:
+                        LOG.exception(_LE('Unable to get the hosts of '
+                                          'network %s, notifying all '
+                                          'agents'), network_id)
+                        network_hosts[network_id] = [None]
+                for host in network_hosts[network_id]:
+                    notifications = host_notifications[host]
+                    if not notifications or notifications[-1][0] != method:
+                        notifications.append((method, {}))
+                    self._merge_fdb_entries(notifications[-1][1],
+                                            network_id, network_entries)
+
+        for host, notifications in host_notifications.items():
+            for method, fdb_entries in notifications:
+                if host:
+                    self._notification_host(context, method, fdb_entries,
+                                            host)
+                else:
+                    self._cast(context, method, fdb_entries)
+        LOG.debug('Sent %(count)s forwarding entry changes to %(hosts)s '
+                  'hosts', {'count': len(pending),
+                            'hosts': len(host_notifications)})
 
-        marshalled_fdb_entries = self._marshall_fdb_entries(fdb_entries)
-        cctxt = self.client.prepare(topic=self.topic_l2pop_update, fanout=True)
-        cctxt.cast(context, method, fdb_entries=marshalled_fdb_entries)
+    @staticmethod
+    def _merge_fdb_entries(fdb_entries, network_id, network_entries):
+        merged = fdb_entries.setdefault(network_id,
+                                        dict(network_entries, ports={}))
+        for agent_ip, port_infos in network_entries['ports'].items():
+            ports = merged['ports'].setdefault(agent_ip, [])
+            ports.extend(port_info for port_info in port_infos
+                         if port_info not in ports)
 
     def _notification_host(self, context, method, fdb_entries, host):
         LOG.debug('Notify l2population agent %(host)s at %(topic)s the '
@@ -58,9 +146,7 @@ class L2populationAgentNotifyAPI(object):
                    'method': method,
                    'fdb_entries': fdb_entries})
 
-        marshalled_fdb_entries = self._marshall_fdb_entries(fdb_entries)
-        cctxt = self.client.prepare(topic=self.topic_l2pop_update, server=host)
-        cctxt.cast(context, method, fdb_entries=marshalled_fdb_entries)
+        self._cast(context, method, fdb_entries, host)
 
     def add_fdb_entries(self, context, fdb_entries, host=None):
         if fdb_entries:
@@ -16,7 +16,6 @@
 from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_log import log
-from six import moves
 import sqlalchemy as sa
 from sqlalchemy import sql
 
@@ -85,7 +84,7 @@ class GreTypeDriver(type_tunnel.TunnelTypeDriver):
     def sync_allocations(self):
 
         # determine current configured allocatable gres
-        gre_ids = set()
+        gre_ranges = []
         for gre_id_range in self.tunnel_ranges:
             tun_min, tun_max = gre_id_range
             if tun_max + 1 - tun_min > 1000000:
@@ -93,11 +92,11 @@ class GreTypeDriver(type_tunnel.TunnelTypeDriver):
                               "%(tun_min)s:%(tun_max)s"),
                           {'tun_min': tun_min, 'tun_max': tun_max})
             else:
-                gre_ids |= set(moves.xrange(tun_min, tun_max + 1))
+                gre_ranges.append(gre_id_range)
 
         session = db_api.get_session()
         try:
-            self._add_allocation(session, gre_ids)
+            self._add_allocation(session, gre_ranges)
         except db_exc.DBDuplicateEntry:
             # in case multiple neutron-servers start allocations could be
             # already added by different neutron-server. because this function
@@ -105,25 +104,8 @@ class GreTypeDriver(type_tunnel.TunnelTypeDriver):
             # assume allocations were added.
             LOG.warning(_LW("Gre allocations were already created."))
 
-    def _add_allocation(self, session, gre_ids):
-        with session.begin(subtransactions=True):
-            # remove from table unallocated tunnels not currently allocatable
-            allocs = (session.query(GreAllocation).all())
-            for alloc in allocs:
-                try:
-                    # see if tunnel is allocatable
-                    gre_ids.remove(alloc.gre_id)
-                except KeyError:
-                    # it's not allocatable, so check if its allocated
-                    if not alloc.allocated:
-                        # it's not, so remove it from table
-                        LOG.debug("Removing tunnel %s from pool", alloc.gre_id)
-                        session.delete(alloc)
-
-            # add missing allocatable tunnels to table
-            for gre_id in sorted(gre_ids):
-                alloc = GreAllocation(gre_id=gre_id)
-                session.add(alloc)
+    def _add_allocation(self, session, gre_ranges):
+        self._sync_allocations(session, gre_ranges)
 
     def get_endpoints(self):
         """Get every gre endpoints from database."""
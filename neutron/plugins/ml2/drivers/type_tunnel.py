@@ -36,10 +36,6 @@ class TunnelTypeDriver(helpers.SegmentTypeDriver):
     methods to manage these endpoints.
     """
 
-    def __init__(self, model):
-        super(TunnelTypeDriver, self).__init__(model)
-        self.segmentation_key = iter(self.primary_keys).next()
-
     @abc.abstractmethod
     def sync_allocations(self):
         """Synchronize type_driver allocation table with configured ranges."""
@@ -17,7 +17,6 @@ import sys
 
 from oslo_config import cfg
 from oslo_log import log
-from six import moves
 import sqlalchemy as sa
 
 from neutron.common import exceptions as exc
@@ -99,62 +98,22 @@ class VlanTypeDriver(helpers.SegmentTypeDriver):
     def _sync_vlan_allocations(self):
         session = db_api.get_session()
         with session.begin(subtransactions=True):
-            # get existing allocations for all physical networks
-            allocations = dict()
-            allocs = (session.query(VlanAllocation).
-                      with_lockmode('update'))
-            for alloc in allocs:
-                if alloc.physical_network not in allocations:
-                    allocations[alloc.physical_network] = set()
-                allocations[alloc.physical_network].add(alloc)
-
             # process vlan ranges for each configured physical network
             for (physical_network,
                  vlan_ranges) in self.network_vlan_ranges.items():
-                # determine current configured allocatable vlans for
-                # this physical network
-                vlan_ids = set()
-                for vlan_min, vlan_max in vlan_ranges:
-                    vlan_ids |= set(moves.xrange(vlan_min, vlan_max + 1))
-
-                # remove from table unallocated vlans not currently
-                # allocatable
-                if physical_network in allocations:
-                    for alloc in allocations[physical_network]:
-                        try:
-                            # see if vlan is allocatable
-                            vlan_ids.remove(alloc.vlan_id)
-                        except KeyError:
-                            # it's not allocatable, so check if its allocated
-                            if not alloc.allocated:
-                                # it's not, so remove it from table
-                                LOG.debug("Removing vlan %(vlan_id)s on "
-                                          "physical network "
-                                          "%(physical_network)s from pool",
-                                          {'vlan_id': alloc.vlan_id,
-                                           'physical_network':
-                                           physical_network})
-                                session.delete(alloc)
-                    del allocations[physical_network]
-
-                # add missing allocatable vlans to table
-                for vlan_id in sorted(vlan_ids):
-                    alloc = VlanAllocation(physical_network=physical_network,
-                                           vlan_id=vlan_id,
-                                           allocated=False)
-                    session.add(alloc)
+                self._sync_allocations(session, vlan_ranges,
+                                       physical_network=physical_network)
 
             # remove from table unallocated vlans for any unconfigured
             # physical networks
-            for allocs in allocations.itervalues():
-                for alloc in allocs:
-                    if not alloc.allocated:
-                        LOG.debug("Removing vlan %(vlan_id)s on physical "
-                                  "network %(physical_network)s from pool",
-                                  {'vlan_id': alloc.vlan_id,
-                                   'physical_network':
-                                   alloc.physical_network})
-                        session.delete(alloc)
+            query = session.query(VlanAllocation).filter_by(allocated=False)
+            if self.network_vlan_ranges:
+                query = query.filter(~VlanAllocation.physical_network.in_(
+                    list(self.network_vlan_ranges)))
+            count = query.delete(synchronize_session=False)
+            if count:
+                LOG.debug("Removed %s vlans of unconfigured physical "
+                          "networks from pool", count)
 
     def get_type(self):
         return p_const.TYPE_VLAN
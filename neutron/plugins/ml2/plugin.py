@@ -961,25 +961,36 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         elif attributes.is_attr_set(attrs.get(ext_sg.SECURITYGROUPS)):
             raise psec.PortSecurityAndIPRequiredForSecurityGroups()
 
-    def _create_port_db(self, context, port):
+    def _create_port_db(self, context, port, networks=None,
+                        generated_ips=None):
+        """Create a port and its binding, without calling the drivers.
+
+        networks caches the network dicts by id across the ports of a bulk
+        request and generated_ips are the IP addresses generated for them.
+        """
         attrs = port[attributes.PORT]
         if not attrs.get('status'):
             attrs['status'] = const.PORT_STATUS_DOWN
+        if networks is None:
+            networks = {}
 
         session = context.session
         with session.begin(subtransactions=True):
             dhcp_opts = attrs.get(edo_ext.EXTRADHCPOPTS, [])
-            result = super(Ml2Plugin, self).create_port(context, port)
+            result = super(Ml2Plugin, self)._create_port_and_ips(
+                context, port, generated_ips)
             self.extension_manager.process_create_port(context, attrs, result)
             self._portsec_ext_port_create_processing(context, result, port)
 
             # sgids must be got after portsec checked with security group
             sgids = self._get_security_groups_on_port(context, port)
             self._process_port_create_security_group(context, result, sgids)
-            network = self.get_network(context, result['network_id'])
+            network_id = result['network_id']
+            if network_id not in networks:
+                networks[network_id] = self.get_network(context, network_id)
             binding = db.add_port_binding(session, result['id'])
-            mech_context = driver_context.PortContext(self, context, result,
-                                                      network, binding, None)
+            mech_context = driver_context.PortContext(
+                self, context, result, networks[network_id], binding, None)
             self._process_port_binding(mech_context, attrs)
 
             result[addr_pair.ADDRESS_PAIRS] = (
@@ -988,13 +999,58 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                     attrs.get(addr_pair.ADDRESS_PAIRS)))
             self._process_port_create_extra_dhcp_opts(context, result,
                                                       dhcp_opts)
-            self.mechanism_manager.create_port_precommit(mech_context)
 
         return result, mech_context
 
+    def _create_port_bulk_ml2(self, context, ports):
+        """Create the ports of a bulk request in a single transaction.
+
+        The IP addresses of the ports are generated in one pass per network,
+        each network is read once and the mechanism drivers are called once
+        with the contexts of all the ports.
+        """
+        objects = []
+        networks = {}
+        items = ports[attributes.PORTS]
+        try:
+            with context.session.begin(subtransactions=True):
+                generated_ips = self._generate_ips_for_ports(
+                    context, [item[attributes.PORT] for item in items])
+                for item in items:
+                    result, mech_context = self._create_port_db(
+                        context, item, networks, generated_ips)
+                    objects.append({'mech_context': mech_context,
+                                    'result': result,
+                                    'attributes': item[attributes.PORT]})
+                self.mechanism_manager.create_port_bulk_precommit(
+                    [obj['mech_context'] for obj in objects])
+
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                LOG.exception(_LE("An exception occurred while creating "
+                                  "the ports %s"), items)
+
+        try:
+            self.mechanism_manager.create_port_bulk_postcommit(
+                [obj['mech_context'] for obj in objects])
+            return objects
+        except ml2_exc.MechanismDriverError:
+            with excutils.save_and_reraise_exception():
+                resource_ids = [res['result']['id'] for res in objects]
+                LOG.exception(_LE("mechanism_manager.create_port_bulk"
+                                  "_postcommit failed. Deleting ports %s"),
+                              ', '.join(resource_ids))
+                self._delete_objects(context, attributes.PORT, objects)
+
+    def _create_port_with_precommit(self, context, port):
+        with context.session.begin(subtransactions=True):
+            result, mech_context = self._create_port_db(context, port)
+            self.mechanism_manager.create_port_precommit(mech_context)
+        return result, mech_context
+
     def create_port(self, context, port):
         attrs = port[attributes.PORT]
-        result, mech_context = self._create_port_db(context, port)
+        result, mech_context = self._create_port_with_precommit(context, port)
         new_host_port = self._get_host_port_if_changed(mech_context, attrs)
         # notify any plugin that is interested in port create events
         kwargs = {'context': context, 'port': new_host_port}
@@ -1022,7 +1078,7 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         return bound_context._port
 
     def create_port_bulk(self, context, ports):
-        objects = self._create_bulk_ml2(attributes.PORT, context, ports)
+        objects = self._create_port_bulk_ml2(context, ports)
 
         # REVISIT(rkukura): Is there any point in calling this before
         # a binding has been successfully established?
@@ -1369,6 +1425,138 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
 
         return self._bind_port_if_needed(port_context)
 
+    def get_bound_port_contexts(self, plugin_context, port_ids, host=None,
+                                cached_networks=None):
+        """Return the bound PortContexts of several ports.
+
+        Same as get_bound_port_context, but the ports, bindings, binding
+        levels and networks of all the ports are loaded with a few queries.
+        Returns a dict of the PortContexts by requested port id, ports that
+        are not found are left out.
+        """
+        if cached_networks is None:
+            cached_networks = {}
+        port_contexts = {}
+        session = plugin_context.session
+        with session.begin(subtransactions=True):
+            port_dbs = db.get_ports(session, port_ids)
+            network_ids = set(port_db.network_id
+                              for port_db in port_dbs.values())
+            network_ids -= set(cached_networks)
+            if network_ids:
+                for network in self.get_networks(
+                        plugin_context, filters={'id': list(network_ids)}):
+                    cached_networks[network['id']] = network
+            dvr_bindings = db.get_dvr_port_bindings_by_host(
+                session,
+                [port_db.id for port_db in port_dbs.values()
+                 if port_db.device_owner == const.DEVICE_OWNER_DVR_INTERFACE],
+                host)
+
+            bindings = {}
+            for port_id, port_db in port_dbs.items():
+                if port_db.device_owner == const.DEVICE_OWNER_DVR_INTERFACE:
+                    binding = dvr_bindings.get(port_db.id)
+                    if not binding:
+                        LOG.error(_LE("Binding info for DVR port %s not "
+                                      "found"), port_id)
+                        continue
+                else:
+                    binding = port_db.port_binding
+                    if not binding:
+                        LOG.info(_LI("Binding info for port %s was not "
+                                     "found, it might have been deleted "
+                                     "already."), port_id)
+                        continue
+                bindings[port_id] = binding
+            levels = db.get_binding_levels_by_port(
+                session, dict((port_dbs[port_id].id, binding.host)
+                              for port_id, binding in bindings.items()))
+
+            network_contexts = {}
+            for port_id, binding in bindings.items():
+                port_db = port_dbs[port_id]
+                network = cached_networks.get(port_db.network_id)
+                if not network:
+                    LOG.debug("Network %(network_id)s of port %(port_id)s "
+                              "not found", {'network_id': port_db.network_id,
+                                            'port_id': port_id})
+                    continue
+                if network['id'] not in network_contexts:
+                    network_contexts[network['id']] = (
+                        driver_context.NetworkContext(self, plugin_context,
+                                                      network))
+                port_contexts[port_id] = driver_context.PortContext(
+                    self, plugin_context, self._make_port_dict(port_db),
+                    network, binding, levels.get(port_db.id),
+                    network_context=network_contexts[network['id']])
+
+        return dict((port_id, self._bind_port_if_needed(port_context))
+                    for port_id, port_context in port_contexts.items())
+
+    def update_port_statuses(self, context, port_ids, status, host=None,
+                             cached_networks=None):
+        """Update the status of several ports.
+
+        The ports are read and updated in a single transaction, the DVR
+        interface ports, whose status is tracked per host, are updated with
+        update_port_status. Returns the ids of the ports that exist.
+        """
+        if cached_networks is None:
+            cached_networks = {}
+        found_port_ids = []
+        dvr_port_ids = []
+        mech_contexts = []
+        session = context.session
+        # REVISIT: Serialize this operation with a semaphore, see
+        # update_port_status
+        with contextlib.nested(lockutils.lock('db-access'),
+                               session.begin(subtransactions=True)):
+            port_dbs = db.get_ports(session, port_ids)
+            for port_id in set(port_ids) - set(port_dbs):
+                LOG.warning(_LW("Port %(port)s updated up by agent not found"),
+                            {'port': port_id})
+            updated_ports = []
+            for port_id, port in port_dbs.items():
+                if port.device_owner == const.DEVICE_OWNER_DVR_INTERFACE:
+                    dvr_port_ids.append(port_id)
+                    continue
+                found_port_ids.append(port.id)
+                if port.status != status and port.port_binding:
+                    updated_ports.append(port)
+            levels = db.get_binding_levels_by_port(
+                session, dict((port.id, port.port_binding.host)
+                              for port in updated_ports))
+            original_ports = [self._make_port_dict(port)
+                              for port in updated_ports]
+            db.set_ports_status(session, updated_ports, status)
+            network_contexts = {}
+            for port, original_port in zip(updated_ports, original_ports):
+                updated_port = self._make_port_dict(port)
+                network_id = original_port['network_id']
+                if network_id not in network_contexts:
+                    network = (cached_networks.get(network_id) or
+                               self.get_network(context, network_id))
+                    network_contexts[network_id] = (
+                        driver_context.NetworkContext(self, context, network))
+                network_context = network_contexts[network_id]
+                mech_context = driver_context.PortContext(
+                    self, context, updated_port, network_context.current,
+                    port.port_binding, levels.get(port.id),
+                    original_port=original_port,
+                    network_context=network_context)
+                self.mechanism_manager.update_port_precommit(mech_context)
+                mech_contexts.append(mech_context)
+
+        for mech_context in mech_contexts:
+            self.mechanism_manager.update_port_postcommit(mech_context)
+
+        for port_id in dvr_port_ids:
+            port_id = self.update_port_status(context, port_id, status, host)
+            if port_id:
+                found_port_ids.append(port_id)
+        return found_port_ids
+
     def update_port_status(self, context, port_id, status, host=None):
         """
         Returns port_id (non-truncated uuid) if the port exists.
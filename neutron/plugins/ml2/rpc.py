@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 from oslo_log import log
 import oslo_messaging
 from sqlalchemy.orm import exc
@@ -72,11 +74,27 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
                                                      port_id,
                                                      host,
                                                      cached_networks)
+        entry, new_status = self._get_device_entry(
+            device, agent_id, host, port_context, cached_networks)
+        if new_status:
+            plugin.update_port_status(rpc_context,
+                                      port_id,
+                                      new_status,
+                                      host)
+        LOG.debug("Returning: %s", entry)
+        return entry
+
+    def _get_device_entry(self, device, agent_id, host, port_context,
+                          cached_networks=None):
+        """Return the details of a device and the status to set its port to.
+
+        The status is None if the port status does not need to change.
+        """
         if not port_context:
             LOG.warning(_LW("Device %(device)s requested by agent "
                             "%(agent_id)s not found in database"),
                         {'device': device, 'agent_id': agent_id})
-            return {'device': device}
+            return {'device': device}, None
 
         segment = port_context.bottom_bound_segment
         port = port_context.current
@@ -94,16 +112,14 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
                          'agent_id': agent_id,
                          'network_id': port['network_id'],
                          'vif_type': port[portbindings.VIF_TYPE]})
-            return {'device': device}
+            return {'device': device}, None
 
+        new_status = None
         if (not host or host == port_context.host):
             new_status = (q_const.PORT_STATUS_BUILD if port['admin_state_up']
                           else q_const.PORT_STATUS_DOWN)
-            if port['status'] != new_status:
-                plugin.update_port_status(rpc_context,
-                                          port_id,
-                                          new_status,
-                                          host)
+            if port['status'] == new_status:
+                new_status = None
 
         entry = {'device': device,
                  'network_id': port['network_id'],
@@ -118,21 +134,44 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
                  'allowed_address_pairs': port['allowed_address_pairs'],
                  'port_security_enabled': port.get(psec.PORTSECURITY, True),
                  'profile': port[portbindings.PROFILE]}
-        LOG.debug("Returning: %s", entry)
-        return entry
+        return entry, new_status
 
     def get_devices_details_list(self, rpc_context, **kwargs):
+        """Agent requests the details of several devices.
+
+        The ports of the devices are loaded and their status updated in
+        bulk, rather than with a get_device_details call per device.
+        """
+        agent_id = kwargs.get('agent_id')
+        devices = kwargs.get('devices') or []
+        host = kwargs.get('host')
+        if not devices:
+            return []
+        LOG.debug("Devices %(devices)s details requested by agent "
+                  "%(agent_id)s with host %(host)s",
+                  {'devices': devices, 'agent_id': agent_id, 'host': host})
+
+        plugin = manager.NeutronManager.get_plugin()
+        port_ids = dict((device, plugin._device_to_port_id(device))
+                        for device in devices)
         # cached networks used for reducing number of network db calls
         cached_networks = {}
-        return [
-            self.get_device_details(
-                rpc_context,
-                device=device,
-                cached_networks=cached_networks,
-                **kwargs
-            )
-            for device in kwargs.pop('devices', [])
-        ]
+        port_contexts = plugin.get_bound_port_contexts(
+            rpc_context, list(set(port_ids.values())), host, cached_networks)
+
+        entries = []
+        new_statuses = collections.defaultdict(set)
+        for device in devices:
+            entry, new_status = self._get_device_entry(
+                device, agent_id, host, port_contexts.get(port_ids[device]))
+            if new_status:
+                new_statuses[new_status].add(port_ids[device])
+            entries.append(entry)
+        for new_status, status_port_ids in new_statuses.items():
+            plugin.update_port_statuses(rpc_context, list(status_port_ids),
+                                        new_status, host, cached_networks)
+        LOG.debug("Returning: %s", entries)
+        return entries
 
     def update_device_down(self, rpc_context, **kwargs):
         """Device no longer exists on agent."""
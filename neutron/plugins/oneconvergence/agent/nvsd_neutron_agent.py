@@ -61,7 +61,10 @@ class NVSDAgentRpcCallback(object):
 
 class SecurityGroupAgentRpcCallback(sg_rpc.SecurityGroupAgentRpcCallbackMixin):
 
-    target = oslo_messaging.Target(version=sg_rpc.SG_RPC_VERSION)
+    # history
+    #   1.1 Support Security Group RPC
+    #   1.3 Added security_groups_member_delta
+    target = oslo_messaging.Target(version='1.3')
 
     def __init__(self, context, sg_agent):
         super(SecurityGroupAgentRpcCallback, self).__init__()
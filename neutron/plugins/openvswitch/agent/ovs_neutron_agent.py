@@ -117,7 +117,8 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
     #   1.0 Initial version
     #   1.1 Support Security Group RPC
     #   1.2 Support DVR (Distributed Virtual Router) RPC
-    target = oslo_messaging.Target(version='1.2')
+    #   1.3 Added security_groups_member_delta
+    target = oslo_messaging.Target(version='1.3')
 
     def __init__(self, integ_br, tun_br, local_ip,
                  bridge_mappings, polling_interval, tunnel_types=None,
@@ -199,6 +200,11 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
 
         self.int_br = ovs_lib.OVSBridge(integ_br)
         self.setup_integration_br()
+        # Incrementally updated index of int_br VIF ports, only available
+        # with the native OVSDB interface
+        self.vif_port_index = None
+        if cfg.CONF.OVS.ovsdb_interface == 'native':
+            self.vif_port_index = self.int_br.get_vif_port_index()
         # Stores port update notifications for processing in main rpc loop
         self.updated_ports = set()
         # keeps association between ports and ofports to detect ofport change
@@ -265,6 +271,7 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
 
         # Initialize iteration counter
         self.iter_num = 0
+        self.deferring_flows = False
         self.run_daemon_loop = True
 
         # The initialization is complete; we can start receiving messages
@@ -732,6 +739,11 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                                      port_other_config)
 
     def _bind_devices(self, need_binding_ports):
+        """Tag the ports and report their status.
+
+        Return True if the agent must resync with the plugin.
+        """
+        bound_ports = []
         for port_detail in need_binding_ports:
             lvm = self.local_vlan_map.get(port_detail['network_id'])
             if not lvm:
@@ -739,7 +751,6 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                 # will need to be handled as a DEAD port in the next scan
                 continue
             port = port_detail['vif_port']
-            device = port_detail['device']
             # Do not bind a port if it's already bound
             cur_tag = self.int_br.db_get_val("Port", port.port_name, "tag")
             if cur_tag != lvm.vlan:
@@ -747,7 +758,13 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                     "Port", port.port_name, "tag", lvm.vlan)
                 if port.ofport != -1:
                     self.int_br.delete_flows(in_port=port.ofport)
+            bound_ports.append(port_detail)
 
+        # The ports must be able to pass traffic before being reported up
+        if bound_ports and not self.apply_deferred_flows():
+            return True
+        for port_detail in bound_ports:
+            device = port_detail['device']
             # update plugin about port status
             # FIXME(salv-orlando): Failures while updating device status
             # must be handled appropriately. Otherwise this might prevent
@@ -762,6 +779,7 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                 self.plugin_rpc.update_device_down(
                     self.context, device, self.agent_id, cfg.CONF.host)
             LOG.info(_LI("Configuration for device %s completed."), device)
+        return False
 
     @staticmethod
     def setup_arp_spoofing_protection(bridge, vif, port_details):
@@ -1105,7 +1123,12 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
         if not self.prevent_arp_spoofing:
             return
         previous = self.vifname_to_ofport_map
-        current = self.int_br.get_vif_port_to_ofport_map()
+        if self.vif_port_index:
+            current = dict(
+                (port_id, state.ofport) for port_id, state in
+                self.vif_port_index.get_ports().items())
+        else:
+            current = self.int_br.get_vif_port_to_ofport_map()
 
         # if any ofport numbers have changed, re-process the devices as
         # added ports so any rules based on ofport numbers are updated.
@@ -1139,6 +1162,9 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
         return port_moves
 
     def scan_ports(self, registered_ports, updated_ports=None):
+        if self.vif_port_index:
+            return self._scan_ports_from_index(registered_ports,
+                                               updated_ports)
         cur_ports = self.int_br.get_vif_port_set()
         self.int_br_device_count = len(cur_ports)
         port_info = {'current': cur_ports}
@@ -1165,13 +1191,52 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
         port_info['removed'] = registered_ports - cur_ports
         return port_info
 
-    def check_changed_vlans(self, registered_ports):
+    def _scan_ports_from_index(self, registered_ports, updated_ports=None):
+        """Scan ports using the VIF port index of the integration bridge.
+
+        Only the ports changed since the previous scan are examined, unless
+        no port is registered (e.g. on resync) in which case all the current
+        ports are reported as added.
+        """
+        cur_ports, changed_ports = self.vif_port_index.pop_changes()
+        self.int_br_device_count = len(cur_ports)
+        port_info = {'current': cur_ports}
+        if updated_ports is None:
+            updated_ports = set()
+        changed_registered = changed_ports & registered_ports
+        if changed_registered:
+            port_states = self.vif_port_index.get_ports()
+            port_tags = dict((state.port_name, state.tag)
+                             for port_id, state in port_states.items()
+                             if port_id in changed_registered)
+            updated_ports.update(
+                self.check_changed_vlans(changed_registered, port_tags))
+        if updated_ports:
+            updated_ports &= cur_ports
+            if updated_ports:
+                port_info['updated'] = updated_ports
+
+        if registered_ports:
+            added = set(port for port in changed_ports
+                        if port in cur_ports) - registered_ports
+            removed = changed_registered - cur_ports
+        else:
+            added = cur_ports
+            removed = set()
+        if added or removed:
+            port_info['added'] = added
+            port_info['removed'] = removed
+        return port_info
+
+    def check_changed_vlans(self, registered_ports, port_tags=None):
         """Return ports which have lost their vlan tag.
 
         The returned value is a set of port ids of the ports concerned by a
-        vlan tag loss.
+        vlan tag loss. port_tags maps port names to their tag, it is
+        retrieved from the integration bridge if not provided.
         """
-        port_tags = self.int_br.get_port_tag_dict()
+        if port_tags is None:
+            port_tags = self.int_br.get_port_tag_dict()
         changed_ports = set()
         for lvm in self.local_vlan_map.values():
             for port in registered_ports:
@@ -1435,7 +1500,8 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
         # unnecessarily, (eg: when there are no IP address changes)
         self.sg_agent.setup_port_filters(port_info.get('added', set()),
                                          port_info.get('updated', set()))
-        self._bind_devices(need_binding_devices)
+        if self._bind_devices(need_binding_devices):
+            resync_a = True
 
         if 'removed' in port_info:
             start = time.time()
@@ -1555,6 +1621,49 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                        'elapsed': elapsed})
         self.iter_num = self.iter_num + 1
 
+    def _get_bridges(self):
+        bridges = [self.int_br] + list(self.phys_brs.values())
+        if self.tun_br:
+            bridges.append(self.tun_br)
+        return bridges
+
+    def defer_apply_flows_on(self):
+        """Start collecting the flow changes of all bridges.
+
+        Until defer_apply_flows_off is called, flows added, modified or
+        deleted on the bridges, including from RPC handlers such as fdb_add,
+        are collected so that each bridge applies them with one ovs-ofctl
+        call per batch of operations.
+        """
+        for bridge in self._get_bridges():
+            bridge.defer_apply_on()
+        self.deferring_flows = True
+
+    def defer_apply_flows_off(self):
+        """Apply the flow changes collected on all bridges.
+
+        Return False if the changes of a bridge could not be applied, they
+        are then lost and the agent must resync.
+        """
+        self.deferring_flows = False
+        applied = True
+        for bridge in self._get_bridges():
+            try:
+                bridge.defer_apply_off()
+            except Exception:
+                LOG.exception(_LE("Failed to apply flows on bridge %s"),
+                              bridge.br_name)
+                applied = False
+        return applied
+
+    def apply_deferred_flows(self):
+        """Apply the flow changes collected so far and keep collecting."""
+        if not self.deferring_flows:
+            return True
+        applied = self.defer_apply_flows_off()
+        self.defer_apply_flows_on()
+        return applied
+
     def rpc_loop(self, polling_manager=None):
         if not polling_manager:
             polling_manager = polling.get_polling_manager(
@@ -1602,6 +1711,8 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                 # loop in which ovs status will be checked periodically.
                 self.loop_count_and_wait(start, port_stats)
                 continue
+            # Collect the flows of this iteration to apply them in bulk
+            self.defer_apply_flows_on()
             # Notify the plugin of tunnel IP
             if self.enable_tunneling and tunnel_sync:
                 LOG.info(_LI("Agent tunnel out of sync with plugin!"))
@@ -1688,6 +1799,9 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                     self.updated_ports |= updated_ports_copy
                     sync = True
 
+            if not self.defer_apply_flows_off():
+                # The flows of this iteration are lost
+                sync = True
             self.loop_count_and_wait(start, port_stats)
 
     def daemon_loop(self):
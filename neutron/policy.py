@@ -399,6 +399,132 @@ def check(context, action, target, plugin=None, might_not_exist=False,
     return result
 
 
+def _get_rule(name):
+    try:
+        return _ENFORCER.rules[name]
+    except KeyError:
+        return None
+
+
+def _get_owner_check_fields(owner_check):
+    """Return the target fields an owner check depends on."""
+    fields = [owner_check.target_field]
+    for separator in (':', '_'):
+        if separator in owner_check.target_field:
+            parent_res = owner_check.target_field.split(separator, 1)[0]
+            parent_foreign_key = attributes.RESOURCE_FOREIGN_KEYS.get(
+                "%ss" % parent_res)
+            if parent_foreign_key:
+                # The owner of the parent resource is loaded if the field is
+                # not in the target
+                fields.append(parent_foreign_key)
+            break
+    return fields
+
+
+def _collect_target_fields(rule, fields, used_rules):
+    """Collect the target fields the result of a rule depends on.
+
+    The fields are added to fields, and the rules referenced by the rule to
+    used_rules. Returns False if the result of the rule may depend on other
+    things than the target fields and the credentials.
+    """
+    if isinstance(rule, (policy.TrueCheck, policy.FalseCheck,
+                         policy.RoleCheck)):
+        return True
+    elif isinstance(rule, policy.RuleCheck):
+        if rule.match not in used_rules:
+            used_rules[rule.match] = _get_rule(rule.match)
+            if used_rules[rule.match] is not None:
+                return _collect_target_fields(used_rules[rule.match],
+                                              fields, used_rules)
+        return True
+    elif isinstance(rule, policy.NotCheck):
+        return _collect_target_fields(rule.rule, fields, used_rules)
+    elif isinstance(rule, (policy.AndCheck, policy.OrCheck)):
+        return all(_collect_target_fields(sub_rule, fields, used_rules)
+                   for sub_rule in rule.rules)
+    elif isinstance(rule, OwnerCheck):
+        fields.update(_get_owner_check_fields(rule))
+        return True
+    elif isinstance(rule, FieldCheck):
+        fields.add(rule.field)
+        return True
+    elif type(rule) is policy.GenericCheck:
+        fields.update(re.findall(r'%\(([^)]+)\)s', rule.match))
+        return True
+    return False
+
+
+# Compiled read rules by action: the rules used by the rule of the action,
+# and the target fields its result depends on
+_COMPILED_RULES = {}
+
+
+def _compile_read_rule(action):
+    """Return the target fields the read rule of an action depends on.
+
+    The result is cached until one of the rules it uses is reloaded. None is
+    returned if the result of the rule cannot be cached.
+    """
+    used_rules, fields = _COMPILED_RULES.get(action, (None, None))
+    if used_rules is None or any(_get_rule(name) is not rule
+                                 for name, rule in used_rules.items()):
+        used_rules, fields = {}, set()
+        if _collect_target_fields(policy.RuleCheck('rule', action),
+                                  fields, used_rules):
+            fields = tuple(sorted(fields))
+        else:
+            fields = None
+        _COMPILED_RULES[action] = used_rules, fields
+    return fields
+
+
+_MISSING = object()
+
+
+def get_checker(context, action, pluralized=None):
+    """Return a function verifying the action on targets in this context.
+
+    The returned function behaves like check on each target it is given, but
+    the policy of a read action is only evaluated once for the targets having
+    the same values for the target fields the policy depends on. It is meant
+    for checking the many objects of a list response, which must not change
+    while it is used.
+    """
+    init()
+    _ENFORCER.load_rules()
+    resource, is_write = get_resource_and_action(action, pluralized)
+    fields = None if is_write else _compile_read_rule(action)
+    if fields is None:
+        # The rule depends on the whole target
+        return lambda target: check(context, action, target,
+                                    pluralized=pluralized)
+
+    match_rule = policy.RuleCheck('rule', action)
+    credentials = context.to_dict()
+    results = {}
+
+    def _check(target):
+        key = tuple(target.get(field, _MISSING) for field in fields)
+        try:
+            return results[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable target values are not cached
+            key = None
+        result = _ENFORCER.enforce(match_rule, target, credentials,
+                                   pluralized=pluralized)
+        if not result:
+            log_rule_list(match_rule)
+        if key is not None:
+            results[key] = result
+        return result
+
+    return _check
+
+
 def enforce(context, action, target, plugin=None, pluralized=None):
     """Verifies that the action is valid on the target in this context.
 
@@ -17,6 +17,7 @@
 from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_log import log as logging
+from sqlalchemy import orm
 from sqlalchemy import sql
 
 from neutron.common import constants
@@ -25,12 +26,41 @@ from neutron.db import agentschedulers_db
 from neutron.i18n import _LI, _LW
 from neutron.scheduler import base_resource_filter
 from neutron.scheduler import base_scheduler
+from neutron.scheduler import load_tracker
 
 LOG = logging.getLogger(__name__)
 
+_NETWORK_LOADS = load_tracker.BindingLoadTracker(
+    agentschedulers_db.NetworkDhcpAgentBinding, 'dhcp_agent_id')
+
 
 class AutoScheduler(object):
 
+    def schedule_networks(self, plugin, context, networks):
+        """Schedule the networks to DHCP agents."""
+        return dict((network['id'], self.schedule(plugin, context, network))
+                    for network in networks)
+
+    def _get_dhcp_enabled_network_ids(self, plugin, context):
+        fields = ['network_id', 'enable_dhcp']
+        subnets = plugin.get_subnets(context, fields=fields)
+        return set(s['network_id'] for s in subnets if s['enable_dhcp'])
+
+    def _get_active_agents_on_host(self, context, host):
+        query = context.session.query(agents_db.Agent)
+        query = query.filter(agents_db.Agent.agent_type ==
+                             constants.AGENT_TYPE_DHCP,
+                             agents_db.Agent.host == host,
+                             agents_db.Agent.admin_state_up == sql.true())
+        dhcp_agents = []
+        for dhcp_agent in query:
+            if agents_db.AgentDbMixin.is_agent_down(
+                dhcp_agent.heartbeat_timestamp):
+                LOG.warn(_LW('DHCP agent %s is not active'), dhcp_agent.id)
+                continue
+            dhcp_agents.append(dhcp_agent)
+        return dhcp_agents
+
     def auto_schedule_networks(self, plugin, context, host):
         """Schedule non-hosted networks to the DHCP agent on the specified
            host.
@@ -39,24 +69,12 @@ class AutoScheduler(object):
         # a list of (agent, net_ids) tuples
         bindings_to_add = []
         with context.session.begin(subtransactions=True):
-            fields = ['network_id', 'enable_dhcp']
-            subnets = plugin.get_subnets(context, fields=fields)
-            net_ids = set(s['network_id'] for s in subnets
-                          if s['enable_dhcp'])
+            net_ids = self._get_dhcp_enabled_network_ids(plugin, context)
             if not net_ids:
                 LOG.debug('No non-hosted networks')
                 return False
-            query = context.session.query(agents_db.Agent)
-            query = query.filter(agents_db.Agent.agent_type ==
-                                 constants.AGENT_TYPE_DHCP,
-                                 agents_db.Agent.host == host,
-                                 agents_db.Agent.admin_state_up == sql.true())
-            dhcp_agents = query.all()
+            dhcp_agents = self._get_active_agents_on_host(context, host)
             for dhcp_agent in dhcp_agents:
-                if agents_db.AgentDbMixin.is_agent_down(
-                    dhcp_agent.heartbeat_timestamp):
-                    LOG.warn(_LW('DHCP agent %s is not active'), dhcp_agent.id)
-                    continue
                 for net_id in net_ids:
                     agents = plugin.get_dhcp_agents_hosting_networks(
                         context, [net_id], active=True)
@@ -84,6 +102,94 @@ class WeightScheduler(base_scheduler.BaseWeightScheduler, AutoScheduler):
         super(WeightScheduler, self).__init__(DhcpFilter())
 
 
+class LoadAwareScheduler(base_scheduler.BaseScheduler, AutoScheduler):
+    """Choose the agents hosting the least number of networks.
+
+    The number of networks of each agent is tracked in memory, instead of
+    relying on the load last reported by the agents.
+    """
+
+    def __init__(self):
+        self.resource_filter = DhcpFilter()
+
+    def select(self, plugin, context, resource_hostable_agents,
+               num_agents_needed):
+        return _NETWORK_LOADS.choose(context, resource_hostable_agents,
+                                     num_agents_needed)
+
+    def _get_hosting_agent_ids(self, plugin, context, network_ids):
+        """Return the eligible agents hosting each of the networks."""
+        binding_model = agentschedulers_db.NetworkDhcpAgentBinding
+        query = context.session.query(binding_model).options(
+            orm.contains_eager(binding_model.dhcp_agent)).join(
+                binding_model.dhcp_agent).filter(
+                    binding_model.network_id.in_(network_ids))
+        eligible = {}
+        hosting_agent_ids = {}
+        for binding in query:
+            agent = binding.dhcp_agent
+            if agent.id not in eligible:
+                eligible[agent.id] = plugin.is_eligible_agent(
+                    context, True, agent)
+            if eligible[agent.id]:
+                hosting_agent_ids.setdefault(
+                    binding.network_id, set()).add(agent.id)
+        return hosting_agent_ids
+
+    def schedule_networks(self, plugin, context, networks):
+        """Schedule the networks to DHCP agents.
+
+        The networks not hosted yet are spread over the agents at once, the
+        agents being listed only once. Return a dict mapping the id of each
+        network scheduled to its new agents.
+        """
+        if not networks:
+            return {}
+        agents_per_network = cfg.CONF.dhcp_agents_per_network
+        hosting_agent_ids = self._get_hosting_agent_ids(
+            plugin, context, [network['id'] for network in networks])
+        placement = {}
+        unhosted_ids = []
+        for network in networks:
+            n_hosting = len(hosting_agent_ids.get(network['id'], ()))
+            if not n_hosting:
+                unhosted_ids.append(network['id'])
+            elif n_hosting < agents_per_network:
+                placement[network['id']] = self.schedule(
+                    plugin, context, network)
+        if not unhosted_ids:
+            return placement
+        agents = [agent for agent in
+                  self.resource_filter._get_active_agents(plugin, context)
+                  if plugin.is_eligible_agent(context, True, agent)]
+        if not agents:
+            return placement
+        new_placement = _NETWORK_LOADS.place(
+            context, agents, unhosted_ids, agents_per_network)
+        for network_id, chosen_agents in new_placement.items():
+            self.resource_filter.bind(context, chosen_agents, network_id)
+        placement.update(new_placement)
+        return placement
+
+    def auto_schedule_networks(self, plugin, context, host):
+        """Schedule the networks not hosted by enough DHCP agents.
+
+        When the host runs an active DHCP agent, the networks are spread at
+        once over all the DHCP agents by schedule_networks, an agent which
+        just started taking its share as the least loaded one.
+        """
+        with context.session.begin(subtransactions=True):
+            net_ids = self._get_dhcp_enabled_network_ids(plugin, context)
+            if not net_ids:
+                LOG.debug('No non-hosted networks')
+                return False
+            dhcp_agents = self._get_active_agents_on_host(context, host)
+        if dhcp_agents:
+            self.schedule_networks(plugin, context,
+                                   [{'id': net_id} for net_id in net_ids])
+        return True
+
+
 class DhcpFilter(base_resource_filter.BaseResourceFilter):
 
     def bind(self, context, agents, network_id):
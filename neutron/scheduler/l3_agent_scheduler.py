@@ -25,15 +25,20 @@ from sqlalchemy import sql
 
 from neutron.common import constants
 from neutron.common import utils
+from neutron.db import agents_db
 from neutron.db import l3_agentschedulers_db
 from neutron.db import l3_db
 from neutron.db import l3_hamode_db
 from neutron.i18n import _LE, _LW
+from neutron.scheduler import load_tracker
 
 
 LOG = logging.getLogger(__name__)
 cfg.CONF.register_opts(l3_hamode_db.L3_HA_OPTS)
 
+_ROUTER_LOADS = load_tracker.BindingLoadTracker(
+    l3_agentschedulers_db.RouterL3AgentBinding, 'l3_agent_id')
+
 
 @six.add_metaclass(abc.ABCMeta)
 class L3Scheduler(object):
@@ -51,6 +56,11 @@ class L3Scheduler(object):
         """
         pass
 
+    def schedule_routers(self, plugin, context, router_ids):
+        """Schedule the routers to active L3 agents."""
+        for router_id in router_ids:
+            self.schedule(plugin, context, router_id)
+
     def _router_has_binding(self, context, router_id, l3_agent_id):
         router_binding_model = l3_agentschedulers_db.RouterL3AgentBinding
 
@@ -387,3 +397,76 @@ class LeastRoutersScheduler(L3Scheduler):
         ordered_agents = plugin.get_l3_agents_ordered_by_num_routers(
             context, [candidate['id'] for candidate in candidates])
         return ordered_agents[:num_agents]
+
+
+class LoadAwareScheduler(L3Scheduler):
+    """Allocate to an L3 agent with the least number of routers bound.
+
+    The number of routers of each agent is tracked in memory, instead of
+    being counted in the database for every router scheduled.
+    """
+
+    def schedule(self, plugin, context, router_id,
+                 candidates=None):
+        return self._schedule_router(
+            plugin, context, router_id, candidates=candidates)
+
+    def _choose_router_agent(self, plugin, context, candidates):
+        return _ROUTER_LOADS.choose(context, candidates, 1)[0]
+
+    def _choose_router_agents_for_ha(self, plugin, context, candidates):
+        num_agents = self._get_num_of_agents_for_ha(len(candidates))
+        return _ROUTER_LOADS.choose(context, candidates, num_agents)
+
+    def _get_hosted_router_ids(self, context, router_ids):
+        binding_model = l3_agentschedulers_db.RouterL3AgentBinding
+        query = context.session.query(binding_model.router_id).join(
+            binding_model.l3_agent).filter(
+                binding_model.router_id.in_(router_ids),
+                agents_db.Agent.admin_state_up == sql.true())
+        return set(router_id for router_id, in query)
+
+    def schedule_routers(self, plugin, context, router_ids):
+        """Schedule the routers to active L3 agents.
+
+        The routers which are neither distributed nor HA are spread over
+        the agents at once, the agents being listed only once.
+        """
+        if not router_ids:
+            return
+        routers = plugin.get_routers(context, filters={'id': router_ids})
+        legacy_routers = []
+        for router in routers:
+            if router.get('distributed') or router.get('ha'):
+                self.schedule(plugin, context, router['id'])
+            else:
+                legacy_routers.append(router)
+        hosted_ids = self._get_hosted_router_ids(
+            context, [router['id'] for router in legacy_routers])
+        legacy_routers = [router for router in legacy_routers
+                          if router['id'] not in hosted_ids]
+        if not legacy_routers:
+            return
+        active_l3_agents = plugin.get_l3_agents(context, active=True)
+        if not active_l3_agents:
+            LOG.warn(_LW('No active L3 agents'))
+            return
+        # Routers with the same candidates are placed together
+        router_ids_by_candidates = {}
+        candidates_by_ids = {}
+        for router in legacy_routers:
+            candidates = plugin.get_l3_agent_candidates(
+                context, router, active_l3_agents)
+            if not candidates:
+                LOG.warn(_LW('No L3 agents can host the router %s'),
+                         router['id'])
+                continue
+            candidate_ids = frozenset(agent['id'] for agent in candidates)
+            candidates_by_ids[candidate_ids] = candidates
+            router_ids_by_candidates.setdefault(candidate_ids, []).append(
+                router['id'])
+        for candidate_ids, ids in router_ids_by_candidates.items():
+            placement = _ROUTER_LOADS.place(
+                context, candidates_by_ids[candidate_ids], ids, 1)
+            for router_id in ids:
+                self.bind_router(context, router_id, placement[router_id][0])
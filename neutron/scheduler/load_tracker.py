@@ -0,0 +1,96 @@
+# Copyright (c) 2015 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import heapq
+
+from oslo_config import cfg
+from oslo_utils import timeutils
+from sqlalchemy import event
+from sqlalchemy import func
+
+
+class BindingLoadTracker(object):
+    """Number of resources bound to each agent, kept in memory.
+
+    The counters are loaded from a binding table with one aggregate query
+    and then follow the bindings inserted and deleted through the ORM. They
+    are reloaded every scheduler_load_resync_interval seconds, to account
+    for the bindings changed by other servers or by bulk queries.
+    """
+
+    def __init__(self, binding_model, agent_id_attr):
+        self._model = binding_model
+        self._agent_id_attr = agent_id_attr
+        self._loads = None
+        self._loaded_at = None
+        self._listening = False
+
+    def _binding_added(self, mapper, connection, binding):
+        agent_id = getattr(binding, self._agent_id_attr)
+        if self._loads is not None and agent_id:
+            self._loads[agent_id] = self._loads.get(agent_id, 0) + 1
+
+    def _binding_removed(self, mapper, connection, binding):
+        agent_id = getattr(binding, self._agent_id_attr)
+        if self._loads is not None and self._loads.get(agent_id):
+            self._loads[agent_id] -= 1
+
+    def _sync(self, context):
+        if not self._listening:
+            event.listen(self._model, 'after_insert', self._binding_added)
+            event.listen(self._model, 'after_delete', self._binding_removed)
+            self._listening = True
+        agent_id_column = getattr(self._model, self._agent_id_attr)
+        query = context.session.query(agent_id_column, func.count()).group_by(
+            agent_id_column)
+        self._loads = dict(query)
+        self._loaded_at = timeutils.utcnow()
+
+    def get_loads(self, context, agent_ids):
+        """Return a dict of the number of bindings of the given agents."""
+        if (self._loads is None or timeutils.is_older_than(
+                self._loaded_at, cfg.CONF.scheduler_load_resync_interval)):
+            self._sync(context)
+        return dict((agent_id, self._loads.get(agent_id, 0))
+                    for agent_id in agent_ids)
+
+    def invalidate(self):
+        self._loads = None
+
+    def choose(self, context, agents, count):
+        """Return the count least loaded agents."""
+        loads = self.get_loads(context, [agent['id'] for agent in agents])
+        return [agent for _load, _id, agent in heapq.nsmallest(
+            count, ((loads[agent['id']], agent['id'], agent)
+                    for agent in agents))]
+
+    def place(self, context, agents, resource_ids, count):
+        """Spread resources over agents, count agents per resource.
+
+        Return a dict mapping each resource id to its agents. The loads
+        are kept in a heap, so that each placement costs O(log n) for n
+        agents.
+        """
+        loads = self.get_loads(context, [agent['id'] for agent in agents])
+        heap = [(loads[agent['id']], agent['id'], agent) for agent in agents]
+        heapq.heapify(heap)
+        count = min(count, len(heap))
+        placement = {}
+        for resource_id in resource_ids:
+            chosen = [heapq.heappop(heap) for _i in range(count)]
+            placement[resource_id] = [agent for _load, _id, agent in chosen]
+            for load, agent_id, agent in chosen:
+                heapq.heappush(heap, (load + 1, agent_id, agent))
+        return placement
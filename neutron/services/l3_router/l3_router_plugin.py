@@ -52,6 +52,11 @@ class L3RouterPlugin(common_db_mixin.CommonDbMixin,
                                    "extraroute", "l3_agent_scheduler",
                                    "l3-ha"]
 
+    # Routers and floating IPs are listed through _get_collection, which
+    # sorts and paginates in the database
+    __native_pagination_support = True
+    __native_sorting_support = True
+
     def __init__(self):
         self.setup_rpc()
         self.router_scheduler = importutils.import_object(
@@ -23,6 +23,11 @@ class MeteringPlugin(metering_db.MeteringDbMixin):
     """Implementation of the Neutron Metering Service Plugin."""
     supported_extension_aliases = ["metering"]
 
+    # Labels and rules are listed through _get_collection, which sorts and
+    # paginates in the database
+    __native_pagination_support = True
+    __native_sorting_support = True
+
     def __init__(self):
         super(MeteringPlugin, self).__init__()
 
@@ -14,15 +14,18 @@
 #    under the License.
 
 import collections
+import time
 
 import netaddr
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import importutils
+from testtools import content
 
 from neutron.agent.common import config
 from neutron.agent.linux import interface
 from neutron.agent.linux import ip_lib
+from neutron.agent.linux import netlink_lib
 from neutron.common import utils
 from neutron.tests.functional.agent.linux import base
 from neutron.tests.functional import base as functional_base
@@ -139,3 +142,48 @@ class IpLibTestCase(IpLibTestFramework):
 
         routes = ip_lib.get_routing_table(namespace=attr.namespace)
         self.assertEqual(expected_routes, routes)
+
+
+class IpLibBenchmarkTestCase(IpLibTestFramework):
+    """Compare the latency of ip_lib operations of both backends.
+
+    Common device operations of the agents are run in a namespace and the
+    average time per operation is attached to the test result.
+    """
+
+    ITERATIONS = 100
+
+    def _operations(self, device):
+        def add_delete_address():
+            device.addr.add('240.0.1.1/24')
+            device.addr.delete('240.0.1.1/24')
+
+        def add_delete_route():
+            device.route.add_route('8.8.8.0/24', '240.0.0.2')
+            device.route.delete_route('8.8.8.0/24', '240.0.0.2')
+
+        return [('link attributes', lambda: device.link.attributes),
+                ('address list', device.addr.list),
+                ('address add+delete', add_delete_address),
+                ('gateway lookup', device.route.get_gateway),
+                ('route add+delete', add_delete_route)]
+
+    def _measure(self, backend):
+        self.config(group='AGENT', ip_lib_backend=backend)
+        device = self.manage_device(self.generate_device_details())
+        results = []
+        for name, operation in self._operations(device):
+            start = time.time()
+            for i in range(self.ITERATIONS):
+                operation()
+            elapsed = (time.time() - start) / self.ITERATIONS
+            results.append('%-20s %s %.2fms' % (name, backend,
+                                                elapsed * 1000))
+        return results
+
+    def test_operation_latency(self):
+        results = self._measure('iproute2')
+        if netlink_lib.pyroute2 is not None:
+            results += self._measure('netlink')
+        self.addDetail('ip-lib-latency',
+                       content.text_content('\n'.join(results)))
@@ -21,8 +21,9 @@ from neutron.tests.common import net_helpers
 from neutron.tests.functional.agent.linux import base
 from neutron.tests.functional import base as functional_base
 
-IPSET_SET = 'test-set'
+IPSET_SET_ID = 'test-set'
 IPSET_ETHERTYPE = 'IPv4'
+IPSET_SET = ipset_manager.IpsetManager.get_name(IPSET_SET_ID, IPSET_ETHERTYPE)
 ICMP_ACCEPT_RULE = '-p icmp -m set --match-set %s src -j ACCEPT' % IPSET_SET
 UNRELATED_IP = '1.1.1.1'
 
@@ -37,18 +38,18 @@ class IpsetBase(functional_base.BaseSudoTestCase):
             machine_fixtures.PeerMachines(bridge)).machines
 
         self.ipset = self._create_ipset_manager_and_set(
-            ip_lib.IPWrapper(self.destination.namespace), IPSET_SET)
+            ip_lib.IPWrapper(self.destination.namespace), IPSET_SET_ID)
 
         self.dst_iptables = iptables_manager.IptablesManager(
             namespace=self.destination.namespace)
 
         self._add_iptables_ipset_rules(self.dst_iptables)
 
-    def _create_ipset_manager_and_set(self, dst_ns, set_name):
+    def _create_ipset_manager_and_set(self, dst_ns, set_id):
         ipset = ipset_manager.IpsetManager(
             namespace=dst_ns.namespace)
 
-        ipset._create_set(set_name, IPSET_ETHERTYPE)
+        ipset.set_members(set_id, IPSET_ETHERTYPE, [])
         return ipset
 
     @staticmethod
@@ -65,30 +66,49 @@ class IpsetBase(functional_base.BaseSudoTestCase):
 
 class IpsetManagerTestCase(IpsetBase):
 
+    def _set_members(self, member_ips, ipset=None):
+        (ipset or self.ipset).set_members(IPSET_SET_ID, IPSET_ETHERTYPE,
+                                          member_ips)
+
     def test_add_member_allows_ping(self):
         self.source.assert_no_ping(self.destination.ip)
-        self.ipset._add_member_to_set(IPSET_SET, self.source.ip)
+        self._set_members([self.source.ip])
         self.source.assert_ping(self.destination.ip)
 
     def test_del_member_denies_ping(self):
-        self.ipset._add_member_to_set(IPSET_SET, self.source.ip)
+        self._set_members([self.source.ip])
         self.source.assert_ping(self.destination.ip)
 
-        self.ipset._del_member_from_set(IPSET_SET, self.source.ip)
+        self._set_members([])
         self.source.assert_no_ping(self.destination.ip)
 
-    def test_refresh_ipset_allows_ping(self):
-        self.ipset._refresh_set(IPSET_SET, [UNRELATED_IP], IPSET_ETHERTYPE)
+    def test_update_ipset_allows_ping(self):
+        self._set_members([UNRELATED_IP])
         self.source.assert_no_ping(self.destination.ip)
 
-        self.ipset._refresh_set(IPSET_SET, [UNRELATED_IP, self.source.ip],
-                                IPSET_ETHERTYPE)
+        self._set_members([UNRELATED_IP, self.source.ip])
+        self.source.assert_ping(self.destination.ip)
+
+        self._set_members([self.source.ip, UNRELATED_IP])
+        self.source.assert_ping(self.destination.ip)
+
+    def test_deferred_members_allow_ping(self):
+        self.ipset.defer_apply_on()
+        self._set_members([self.source.ip])
+        self.source.assert_no_ping(self.destination.ip)
+        self.ipset.defer_apply_off()
         self.source.assert_ping(self.destination.ip)
 
-        self.ipset._refresh_set(IPSET_SET, [self.source.ip, UNRELATED_IP],
-                                IPSET_ETHERTYPE)
+    def test_members_are_read_back_from_system(self):
+        self._set_members([self.source.ip, UNRELATED_IP])
         self.source.assert_ping(self.destination.ip)
 
+        # A restarted agent removes the members left by the previous run
+        ipset = ipset_manager.IpsetManager(
+            namespace=self.destination.namespace)
+        self._set_members([UNRELATED_IP], ipset=ipset)
+        self.source.assert_no_ping(self.destination.ip)
+
     def test_destroy_ipset_set(self):
         self.assertRaises(RuntimeError, self.ipset._destroy, IPSET_SET)
         self._remove_iptables_ipset_rules(self.dst_iptables)
@@ -13,8 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import os.path
+import time
 
 import testtools
+from testtools import content
 
 from neutron.agent.linux import ip_lib
 from neutron.agent.linux import iptables_manager
@@ -147,6 +149,58 @@ class IptablesManagerTestCase(functional_base.BaseSudoTestCase):
         self._test_with_nc(self.client_fw, 'egress', port=None, udp=True)
 
 
+class IptablesManagerApplyBenchmarkTestCase(functional_base.BaseSudoTestCase):
+    """Compare apply latency of full and incremental applies.
+
+    A single wrapped chain out of many is modified, as happens when a
+    security group member changes, and the time spent in apply() is attached
+    to the test result for each rule count.
+    """
+
+    RULE_COUNTS = (100, 1000, 5000)
+    RULES_PER_CHAIN = 50
+
+    def _populate(self, iptables, rule_count):
+        table = iptables.ipv4['filter']
+        for index in range(rule_count):
+            chain = 'bench%d' % (index // self.RULES_PER_CHAIN)
+            if chain not in table.chains:
+                table.add_chain(chain)
+                table.add_rule('FORWARD', '-j $%s' % chain)
+            table.add_rule(chain, '-s 10.%d.%d.%d/32 -j RETURN' % (
+                index >> 16 & 255, index >> 8 & 255, index & 255))
+
+    def _measure_apply(self, incremental, rule_count):
+        self.config(group='AGENT', iptables_incremental_apply=incremental)
+        namespace = self.useFixture(net_helpers.NamespaceFixture()).name
+        iptables = iptables_manager.IptablesManager(namespace=namespace)
+        self._populate(iptables, rule_count)
+        iptables.apply()
+
+        iptables.ipv4['filter'].add_rule('bench0', '-s 192.168.0.1/32 -j DROP')
+        start = time.time()
+        iptables.apply()
+        elapsed = time.time() - start
+
+        state = utils.execute(['ip', 'netns', 'exec', namespace,
+                               'iptables-save', '-t', 'filter'],
+                              run_as_root=True)
+        rules = sorted(line for line in state.splitlines()
+                       if line.startswith('-A'))
+        return elapsed, rules
+
+    def test_apply_latency_by_rule_count(self):
+        results = []
+        for rule_count in self.RULE_COUNTS:
+            full_time, full_rules = self._measure_apply(False, rule_count)
+            incr_time, incr_rules = self._measure_apply(True, rule_count)
+            self.assertEqual(full_rules, incr_rules)
+            results.append('%6d rules: full %.3fs, incremental %.3fs' % (
+                rule_count, full_time, incr_time))
+        self.addDetail('apply-latency',
+                       content.text_content('\n'.join(results)))
+
+
 class IptablesManagerNonRootTestCase(base.BaseTestCase):
     @staticmethod
     def _normalize_module_name(name):
@@ -517,6 +517,9 @@ class L3AgentTestCase(L3AgentTestFramework):
         mocked_get_routers = (
             neutron_l3_agent.L3PluginApi.return_value.get_routers)
         mocked_get_routers.return_value = routers_to_keep
+        mocked_get_router_ids = (
+            neutron_l3_agent.L3PluginApi.return_value.get_router_ids)
+        mocked_get_router_ids.return_value = [r['id'] for r in routers_to_keep]
 
         # Synchonize the agent with the plug-in
         with mock.patch.object(namespace_manager.NamespaceManager, 'list_all',
@@ -13,22 +13,29 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
+import eventlet
+import netaddr
 from oslo_config import cfg
+from oslo_db import api as oslo_db_api
 from oslo_db.sqlalchemy import session
 from oslo_db.sqlalchemy import test_base
+from testtools import content
 import testtools
 
 from neutron.api.v2 import attributes
 from neutron.common import constants
 from neutron.common import exceptions as n_exc
 from neutron import context
+from neutron.db import api as db_api
 from neutron.db import db_base_plugin_v2 as base_plugin
 from neutron.db import model_base
 from neutron.db import models_v2
 from neutron.tests import base
 
 
-def get_admin_test_context(db_url):
+def get_admin_test_context(db_url, autocommit=False):
     """
     get_admin_test_context is used to provide a test context. A new session is
     created using the db url specified
@@ -40,7 +47,8 @@ def get_admin_test_context(db_url):
                           load_admin_roles=True,
                           overwrite=False)
     facade = session.EngineFacade(db_url, mysql_sql_mode='STRICT_ALL_TABLES')
-    ctx._session = facade.get_session(autocommit=False, expire_on_commit=True)
+    ctx._session = facade.get_session(autocommit=autocommit,
+                                      expire_on_commit=True)
     return ctx
 
 
@@ -220,3 +228,128 @@ class TestIpamPsql(test_base.PostgreSQLOpportunisticTestCase,
     def setUp(self):
         super(TestIpamPsql, self).setUp()
         self.configure_test()
+
+
+class IpamConcurrencyBenchmark(object):
+    """Create ports concurrently on a /22 subnet.
+
+    The ports are created by concurrent sessions which retry the requests
+    that failed on a deadlock, and the time spent to create all of them is
+    attached to the test result for the locking and for the random IP
+    allocation.
+    """
+
+    PORT_COUNT = 1000
+    WORKERS = 20
+
+    def configure_test(self):
+        model_base.BASEV2.metadata.create_all(self.engine)
+        cfg.CONF.set_override('notify_nova_on_port_status_changes', False)
+        self.plugin = base_plugin.NeutronDbPluginV2()
+        self.cxt = self._get_context()
+
+    def _get_context(self):
+        cxt = get_admin_test_context(self.engine.url, autocommit=True)
+        self.addCleanup(cxt._session.close)
+        return cxt
+
+    def _create_network(self, network_id, cidr):
+        self.plugin.create_network(self.cxt, {'network': {
+            'tenant_id': 'test_tenant',
+            'id': network_id,
+            'name': network_id,
+            'admin_state_up': True,
+            'shared': False,
+            'status': constants.NET_STATUS_ACTIVE}})
+        return self.plugin.create_subnet(self.cxt, {'subnet': {
+            'tenant_id': 'test_tenant',
+            'name': network_id,
+            'network_id': network_id,
+            'ip_version': 4,
+            'cidr': cidr,
+            'enable_dhcp': False,
+            'gateway_ip': attributes.ATTR_NOT_SPECIFIED,
+            'shared': False,
+            'allocation_pools': attributes.ATTR_NOT_SPECIFIED,
+            'dns_nameservers': attributes.ATTR_NOT_SPECIFIED,
+            'host_routes': attributes.ATTR_NOT_SPECIFIED}})
+
+    @oslo_db_api.wrap_db_retry(max_retries=db_api.MAX_RETRIES,
+                               retry_on_deadlock=True)
+    def _create_port(self, cxt, network_id, port_id):
+        self.plugin.create_port(cxt, {'port': {
+            'tenant_id': 'test_tenant',
+            'name': port_id,
+            'id': port_id,
+            'network_id': network_id,
+            'mac_address': attributes.ATTR_NOT_SPECIFIED,
+            'admin_state_up': True,
+            'status': constants.PORT_STATUS_ACTIVE,
+            'device_id': port_id,
+            'device_owner': 'compute',
+            'fixed_ips': attributes.ATTR_NOT_SPECIFIED}})
+
+    def _create_ports(self, network_id):
+        def create_ports(worker):
+            cxt = self._get_context()
+            for index in range(worker, self.PORT_COUNT, self.WORKERS):
+                self._create_port(cxt, network_id,
+                                  '%s-port-%d' % (network_id, index))
+
+        pool = eventlet.GreenPool(self.WORKERS)
+        start = time.time()
+        for worker in range(self.WORKERS):
+            pool.spawn(create_ports, worker)
+        pool.waitall()
+        return time.time() - start
+
+    def _assert_allocations(self, subnet):
+        allocated = netaddr.IPSet()
+        for allocation in self.cxt.session.query(
+                models_v2.IPAllocation).filter_by(subnet_id=subnet['id']):
+            self.assertNotIn(allocation['ip_address'], allocated)
+            allocated.add(allocation['ip_address'])
+        self.assertEqual(self.PORT_COUNT, allocated.size)
+
+        free = netaddr.IPSet()
+        for ip_range in self.cxt.session.query(
+                models_v2.IPAvailabilityRange).join(
+                    models_v2.IPAllocationPool).filter_by(
+                        subnet_id=subnet['id']):
+            free.add(netaddr.IPRange(ip_range['first_ip'],
+                                     ip_range['last_ip']))
+        self.assertFalse(allocated & free)
+        pool = subnet['allocation_pools'][0]
+        self.assertEqual(
+            netaddr.IPSet(netaddr.IPRange(pool['start'], pool['end'])),
+            allocated | free)
+
+    def test_create_ports_concurrently(self):
+        results = []
+        for network_id, cidr, random_allocation in (
+                ('locking', '10.10.0.0/22', False),
+                ('random', '10.10.4.0/22', True)):
+            cfg.CONF.set_override('random_ip_allocation', random_allocation)
+            subnet = self._create_network(network_id, cidr)
+            elapsed = self._create_ports(network_id)
+            self._assert_allocations(subnet)
+            results.append('%s allocation: %d ports in %.3fs' % (
+                network_id, self.PORT_COUNT, elapsed))
+        self.addDetail('port-create-time',
+                       content.text_content('\n'.join(results)))
+
+
+class TestIpamConcurrencyMySql(test_base.MySQLOpportunisticTestCase,
+                               base.BaseTestCase, IpamConcurrencyBenchmark):
+
+    def setUp(self):
+        super(TestIpamConcurrencyMySql, self).setUp()
+        self.configure_test()
+
+
+class TestIpamConcurrencyPsql(test_base.PostgreSQLOpportunisticTestCase,
+                              base.BaseTestCase, IpamConcurrencyBenchmark):
+
+    def setUp(self):
+        super(TestIpamConcurrencyPsql, self).setUp()
+        self.configure_test()
@@ -334,6 +334,46 @@ class OVS_Lib_Test(base.BaseTestCase):
         ]
         self.execute.assert_has_calls(expected_calls)
 
+    def test_defer_apply_flows(self):
+        with self.br.defer_apply():
+            self.br.add_flow(in_port=1, actions='drop')
+            self.br.delete_flows(in_port=2)
+            self.br.add_flow(in_port=3, actions='normal')
+            self.assertFalse(self.execute.called)
+        expected_calls = [
+            self._ofctl_mock("add-flows", self.BR_NAME, '-',
+                             process_input="hard_timeout=0,idle_timeout=0,"
+                                           "priority=1,in_port=1,actions=drop"
+                                           "\nhard_timeout=0,idle_timeout=0,"
+                                           "priority=1,in_port=3,"
+                                           "actions=normal"),
+            self._ofctl_mock("del-flows", self.BR_NAME, '-',
+                             process_input="in_port=2"),
+        ]
+        self.execute.assert_has_calls(expected_calls)
+        self.assertEqual(2, self.execute.call_count)
+
+    def test_defer_apply_off_without_flows(self):
+        self.br.defer_apply_on()
+        self.br.defer_apply_off()
+        self.assertFalse(self.execute.called)
+
+    def test_defer_apply_off_failure(self):
+        self.br.defer_apply_on()
+        self.br.add_flow(in_port=1, actions='drop')
+        self.execute.side_effect = RuntimeError()
+        self.assertRaises(RuntimeError, self.br.defer_apply_off)
+
+    def test_run_ofctl_failure_is_logged(self):
+        self.execute.side_effect = RuntimeError()
+        self.assertIsNone(self.br.run_ofctl('add-flows', ['-'], ''))
+
+    def test_defer_apply_remove_all_flows_drops_pending_flows(self):
+        with self.br.defer_apply():
+            self.br.add_flow(in_port=1, actions='drop')
+            self.br.remove_all_flows()
+        self._verify_ofctl_mock("del-flows", self.BR_NAME, process_input=None)
+
     def test_delete_flow_with_priority_set(self):
         params = {'in_port': '1',
                   'priority': '1'}
@@ -914,3 +954,54 @@ class TestDeferredOVSBridge(base.BaseTestCase):
     def test_getattr_unallowed_attr_failure(self):
         with ovs_lib.DeferredOVSBridge(self.br) as deferred_br:
             self.assertRaises(AttributeError, getattr, deferred_br, 'failure')
+
+
+class TestDeferredFlows(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestDeferredFlows, self).setUp()
+        self.flows = ovs_lib.DeferredFlows()
+
+    def _get_batches(self):
+        return [(action, len(flow_strs))
+                for action, flow_strs in self.flows.get_batches()]
+
+    def test_empty(self):
+        self.assertEqual(0, len(self.flows))
+        self.assertEqual([], self.flows.get_batches())
+
+    def test_same_action_is_batched(self):
+        self.flows.add('add', dict(in_port=1, actions='drop'))
+        self.flows.add('add', dict(actions='normal'))
+        self.assertEqual(2, len(self.flows))
+        self.assertEqual([('add', 2)], self._get_batches())
+
+    def test_commuting_operations_are_batched(self):
+        self.flows.add('add', dict(in_port=1, actions='drop'))
+        self.flows.add('del', dict(in_port=2))
+        self.flows.add('add', dict(in_port=3, actions='drop'))
+        self.flows.add('mod', dict(in_port=4, actions='drop'))
+        self.flows.add('del', dict(in_port=5))
+        self.assertEqual([('add', 2), ('del', 2), ('mod', 1)],
+                         self._get_batches())
+
+    def test_same_in_port_keeps_order(self):
+        self.flows.add('add', dict(in_port=1, actions='drop'))
+        self.flows.add('del', dict(in_port=1))
+        self.flows.add('add', dict(in_port=1, actions='normal'))
+        self.assertEqual([('add', 1), ('del', 1), ('add', 1)],
+                         self._get_batches())
+
+    def test_operation_without_in_port_keeps_order(self):
+        self.flows.add('add', dict(in_port=1, actions='drop'))
+        self.flows.add('del', dict(in_port=2))
+        self.flows.add('add', dict(dl_vlan=3, actions='drop'))
+        self.assertEqual([('add', 1), ('del', 1), ('add', 1)],
+                         self._get_batches())
+
+    def test_wildcard_delete_keeps_order(self):
+        self.flows.add('add', dict(in_port=1, actions='drop'))
+        self.flows.add('del', dict(dl_vlan=2))
+        self.flows.add('add', dict(in_port=3, actions='drop'))
+        self.assertEqual([('add', 1), ('del', 1), ('add', 1)],
+                         self._get_batches())
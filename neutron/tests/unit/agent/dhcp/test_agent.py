@@ -276,6 +276,17 @@ class TestDhcpAgent(base.BaseTestCase):
                 mocks['sync_state'].assert_called_once_with()
                 mocks['periodic_resync'].assert_called_once_with()
 
+    def test_run_with_reload_interval(self):
+        cfg.CONF.set_override('dhcp_reload_interval', 2)
+        with mock.patch(DEVICE_MANAGER):
+            dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
+            attrs_to_mock = dict(
+                [(a, mock.DEFAULT) for a in
+                 ['sync_state', 'periodic_resync', 'periodic_reload']])
+            with mock.patch.multiple(dhcp, **attrs_to_mock) as mocks:
+                dhcp.run()
+                mocks['periodic_reload'].assert_called_once_with()
+
     def test_call_driver(self):
         network = mock.Mock()
         network.id = '1'
@@ -332,6 +343,8 @@ class TestDhcpAgent(base.BaseTestCase):
     def _test_sync_state_helper(self, known_networks, active_networks):
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks_markers.side_effect = (
+                oslo_messaging.RemoteError('UnsupportedVersion'))
             mock_plugin.get_active_networks_info.return_value = active_networks
             plug.return_value = mock_plugin
 
@@ -380,6 +393,58 @@ class TestDhcpAgent(base.BaseTestCase):
             self._test_sync_state_helper(known_networks, active_networks)
             w.assert_called_once_with()
 
+    def _test_sync_state_markers(self, markers, cached_markers, networks=None,
+                                 page_size=2):
+        cfg.CONF.set_override('sync_networks_page_size', page_size)
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks_markers.return_value = markers
+            mock_plugin.get_active_networks_info.side_effect = (
+                lambda network_ids: [
+                    dhcp.NetModel(True, {'id': network_id,
+                                         'revision_marker': markers[
+                                             network_id]})
+                    for network_id in network_ids])
+            plug.return_value = mock_plugin
+
+            dhcp_agt = dhcp_agent.DhcpAgent(HOSTNAME)
+            for network_id, marker in cached_markers.items():
+                dhcp_agt.cache.cache[network_id] = dhcp.NetModel(
+                    True, {'id': network_id, 'revision_marker': marker})
+
+            with mock.patch.object(
+                    dhcp_agt, 'safe_configure_dhcp_for_network') as configure,\
+                    mock.patch.object(dhcp_agt,
+                                      'disable_dhcp_helper') as disable:
+                dhcp_agt.sync_state(networks)
+
+            pages = [c[0][0] for c in
+                     mock_plugin.get_active_networks_info.call_args_list]
+            self.assertTrue(all(len(page) <= page_size for page in pages))
+            configured = [c[0][0].id for c in configure.call_args_list]
+            self.assertEqual(sum(pages, []), configured)
+            disabled = [c[0][0] for c in disable.call_args_list]
+            return set(configured), set(disabled)
+
+    def test_sync_state_markers_initial(self):
+        markers = {'a': '1', 'b': '1', 'c': '1'}
+        configured, disabled = self._test_sync_state_markers(markers, {})
+        self.assertEqual(set(['a', 'b', 'c']), configured)
+        self.assertEqual(set(), disabled)
+
+    def test_sync_state_markers_changed(self):
+        markers = {'a': '1', 'b': '2', 'c': '1'}
+        configured, disabled = self._test_sync_state_markers(
+            markers, {'a': '1', 'b': '1', 'd': '1'})
+        self.assertEqual(set(['b', 'c']), configured)
+        self.assertEqual(set(['d']), disabled)
+
+    def test_sync_state_markers_specific_network(self):
+        markers = {'a': '1', 'b': '1'}
+        configured, disabled = self._test_sync_state_markers(
+            markers, {'a': '1', 'b': '1'}, networks=['a'])
+        self.assertEqual(set(['a']), configured)
+
     def test_sync_state_plugin_error(self):
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
@@ -413,6 +478,19 @@ class TestDhcpAgent(base.BaseTestCase):
                 sleep.assert_called_once_with(dhcp.conf.resync_interval)
                 self.assertEqual(len(dhcp.needs_resync_reasons), 0)
 
+    def test_periodic_reload_helper(self):
+        cfg.CONF.set_override('dhcp_reload_interval', 2)
+        with mock.patch.object(dhcp_agent.eventlet, 'sleep') as sleep:
+            dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
+            dhcp.pending_reloads = set(['a'])
+            with mock.patch.object(dhcp,
+                                   'reload_pending_networks') as reload_nets:
+                reload_nets.side_effect = RuntimeError
+                with testtools.ExpectedException(RuntimeError):
+                    dhcp._periodic_reload_helper()
+                reload_nets.assert_called_once_with()
+                sleep.assert_called_once_with(2)
+
     def test_populate_cache_on_start_without_active_networks_support(self):
         # emul dhcp driver that doesn't support retrieving of active networks
         self.driver.existing_dhcp_networks.side_effect = NotImplementedError
@@ -852,6 +930,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
             self.assertFalse(self.call_driver.called)
             self.cache.assert_has_calls(
                 [mock.call.get_network_by_id('net-id')])
+            self.cache.invalidate_marker.assert_called_once_with(network)
             self.assertTrue(log.called)
             self.assertTrue(self.dhcp.schedule_resync.called)
 
@@ -901,6 +980,7 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
             mock.call.get_network_by_subnet_id(
                 'bbbbbbbb-bbbb-bbbb-bbbbbbbbbbbb'),
             mock.call.get_network_by_id('12345678-1234-5678-1234567890ab'),
+            mock.call.invalidate_marker(prev_state),
             mock.call.put(fake_network)])
         self.call_driver.assert_called_once_with('restart',
                                                  fake_network)
@@ -965,6 +1045,39 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.call_driver.assert_has_calls(
             [mock.call.call_driver('reload_allocations', fake_network)])
 
+    def test_port_events_coalesced_with_reload_interval(self):
+        cfg.CONF.set_override('dhcp_reload_interval', 2)
+        self.cache.get_network_by_id.return_value = fake_network
+        self.cache.get_port_by_id.side_effect = [fake_port1, fake_port2]
+        self.dhcp.port_update_end(None, dict(port=fake_port1))
+        self.dhcp.port_delete_end(None, dict(port_id=fake_port2.id))
+        self.assertFalse(self.call_driver.called)
+        self.assertEqual(set([fake_network.id]), self.dhcp.pending_reloads)
+
+        self.dhcp.reload_pending_networks()
+        self.call_driver.assert_called_once_with('reload_allocations',
+                                                 fake_network)
+        self.assertEqual(set(), self.dhcp.pending_reloads)
+
+    def test_reload_pending_networks_skips_removed_network(self):
+        self.dhcp.pending_reloads = set([fake_network.id])
+        self.cache.get_network_by_id.return_value = None
+        self.dhcp.reload_pending_networks()
+        self.assertFalse(self.call_driver.called)
+
+    def test_port_update_restart_drops_pending_reload(self):
+        cfg.CONF.set_override('dhcp_reload_interval', 2)
+        self.cache.get_network_by_id.return_value = fake_network
+        self.cache.get_port_by_id.return_value = fake_port1
+        self.dhcp.pending_reloads = set([fake_network.id])
+        payload = dict(port=copy.deepcopy(fake_port1))
+        payload['port']['device_id'] = utils.get_dhcp_agent_device_id(
+            payload['port']['network_id'], self.dhcp.conf.host)
+        payload['port']['fixed_ips'][0]['ip_address'] = '172.9.9.99'
+        self.dhcp.port_update_end(None, payload)
+        self.call_driver.assert_called_once_with('restart', fake_network)
+        self.assertEqual(set(), self.dhcp.pending_reloads)
+
     def test_port_delete_end_unknown_port(self):
         payload = dict(port_id='unknown')
         self.cache.get_port_by_id.return_value = None
@@ -1000,6 +1113,14 @@ class TestDhcpPluginApiProxy(base.BaseTestCase):
     def test_get_active_networks_info(self):
         self._test_dhcp_api('get_active_networks_info', version='1.1')
 
+    def test_get_active_networks_info_by_ids(self):
+        self._test_dhcp_api('get_active_networks_info', version='1.2',
+                            network_ids=['fake_id'])
+
+    def test_get_active_networks_markers(self):
+        self._test_dhcp_api('get_active_networks_markers', version='1.2',
+                            return_value={'fake_id': 'fake_marker'})
+
     def test_get_network_info(self):
         self._test_dhcp_api('get_network_info', network_id='fake_id',
                             return_value=None)
@@ -1116,6 +1237,30 @@ class TestNetworkCache(base.BaseTestCase):
         self.assertEqual(len(nc.port_lookup), 2)
         self.assertIn(fake_port2, fake_net.ports)
 
+    def test_put_port_invalidates_marker(self):
+        fake_net = dhcp.NetModel(
+            True, dict(id='12345678-1234-5678-1234567890ab',
+                       tenant_id='aaaaaaaa-aaaa-aaaa-aaaaaaaaaaaa',
+                       subnets=[fake_subnet1],
+                       ports=[fake_port1],
+                       revision_marker='marker'))
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_net)
+        nc.put_port(fake_port2)
+        self.assertNotIn('revision_marker', fake_net)
+
+    def test_remove_port_invalidates_marker(self):
+        fake_net = dhcp.NetModel(
+            True, dict(id='12345678-1234-5678-1234567890ab',
+                       tenant_id='aaaaaaaa-aaaa-aaaa-aaaaaaaaaaaa',
+                       subnets=[fake_subnet1],
+                       ports=[fake_port1, fake_port2],
+                       revision_marker='marker'))
+        nc = dhcp_agent.NetworkCache()
+        nc.put(fake_net)
+        nc.remove_port(fake_port2)
+        self.assertNotIn('revision_marker', fake_net)
+
     def test_remove_port_existing(self):
         fake_net = dhcp.NetModel(
             True, dict(id='12345678-1234-5678-1234567890ab',
@@ -34,6 +34,7 @@ from neutron.agent.l3 import legacy_router
 from neutron.agent.l3 import link_local_allocator as lla
 from neutron.agent.l3 import namespaces
 from neutron.agent.l3 import router_info as l3router
+from neutron.agent.l3 import router_processing_queue as queue
 from neutron.agent.linux import external_process
 from neutron.agent.linux import interface
 from neutron.agent.linux import ra
@@ -404,12 +405,78 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
 
     def test_periodic_sync_routers_task_raise_exception(self):
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_router_ids.return_value = ['fake_id']
         self.plugin_api.get_routers.side_effect = ValueError
         self.assertRaises(ValueError,
                           agent.periodic_sync_routers_task,
                           agent.context)
         self.assertTrue(agent.fullsync)
 
+    def test_periodic_sync_routers_task_fetches_routers_in_chunks(self):
+        self.conf.set_override('sync_routers_chunk_size', 2)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router_ids = [_uuid() for i in range(5)]
+        self.plugin_api.get_router_ids.return_value = router_ids
+        self.plugin_api.get_routers.side_effect = (
+            lambda context, ids: [{'id': router_id} for router_id in ids])
+        with mock.patch.object(agent._queue, 'add') as queue_add:
+            agent.periodic_sync_routers_task(agent.context)
+        self.plugin_api.get_routers.assert_has_calls(
+            [mock.call(agent.context, router_ids[0:2]),
+             mock.call(agent.context, router_ids[2:4]),
+             mock.call(agent.context, router_ids[4:])])
+        self.assertEqual(router_ids,
+                         [c[0][0].id for c in queue_add.call_args_list])
+        self.assertFalse(agent.fullsync)
+
+    def test_periodic_sync_routers_task_timeout_halves_chunk_size(self):
+        self.conf.set_override('sync_routers_chunk_size', 4)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router_ids = [_uuid() for i in range(4)]
+        self.plugin_api.get_router_ids.return_value = router_ids
+        self.plugin_api.get_routers.side_effect = [
+            oslo_messaging.MessagingTimeout,
+            [{'id': router_ids[0]}, {'id': router_ids[1]}],
+            [{'id': router_ids[2]}, {'id': router_ids[3]}]]
+        agent.periodic_sync_routers_task(agent.context)
+        self.plugin_api.get_routers.assert_has_calls(
+            [mock.call(agent.context, router_ids),
+             mock.call(agent.context, router_ids[:2]),
+             mock.call(agent.context, router_ids[2:])])
+        self.assertEqual(2, agent.sync_routers_chunk_size)
+        self.assertFalse(agent.fullsync)
+
+    def test_periodic_sync_routers_task_timeout_single_router(self):
+        self.conf.set_override('sync_routers_chunk_size', 1)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_router_ids.return_value = [_uuid()]
+        self.plugin_api.get_routers.side_effect = (
+            oslo_messaging.MessagingTimeout)
+        agent.periodic_sync_routers_task(agent.context)
+        self.assertTrue(agent.fullsync)
+
+    def test_periodic_sync_routers_task_old_server(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_router_ids.side_effect = (
+            oslo_messaging.RemoteError('UnsupportedVersion'))
+        self.plugin_api.get_routers.return_value = [{'id': _uuid()}]
+        agent.periodic_sync_routers_task(agent.context)
+        self.plugin_api.get_routers.assert_called_once_with(agent.context)
+        self.assertFalse(agent.fullsync)
+
+    def test_periodic_sync_routers_task_deletes_missing_routers(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        kept, removed = _uuid(), _uuid()
+        agent.router_info = {kept: mock.Mock(), removed: mock.Mock()}
+        self.plugin_api.get_router_ids.return_value = [kept]
+        self.plugin_api.get_routers.return_value = [{'id': kept}]
+        with mock.patch.object(agent._queue, 'add') as queue_add:
+            agent.periodic_sync_routers_task(agent.context)
+        updates = dict((c[0][0].id, c[0][0].action)
+                       for c in queue_add.call_args_list)
+        self.assertEqual({kept: None, removed: queue.DELETE_ROUTER},
+                         updates)
+
     def test_l3_initial_full_sync_done(self):
         with mock.patch.object(l3_agent.L3NATAgent,
                                'periodic_sync_routers_task') as router_sync:
@@ -1996,6 +2063,16 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
         self.assertEqual('1234', agent.conf.router_id)
         self.assertFalse(agent.namespaces_manager._clean_stale)
 
+    def test_process_routers_loop_pool_size(self):
+        self.conf.set_override('router_processing_workers', 32)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        with mock.patch.object(l3_agent.eventlet, 'GreenPool') as pool:
+            pool.return_value.spawn_n.side_effect = [None, RuntimeError()]
+            self.assertRaises(RuntimeError, agent._process_routers_loop)
+        pool.assert_called_once_with(size=32)
+        pool.return_value.spawn_n.assert_called_with(
+            agent._process_router_update)
+
     def test_process_routers_update_rpc_timeout_on_get_routers(self):
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
         agent.fullsync = False
@@ -2114,6 +2191,11 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
         agent._process_router_if_compatible(router)
         self.assertIn(router['id'], agent.router_info)
 
+    def test_router_processing_workers_must_be_positive(self):
+        self.conf.set_override('router_processing_workers', 0)
+        self.assertRaises(SystemExit, l3_agent.L3NATAgent,
+                          HOSTNAME, self.conf)
+
     def test_nonexistent_interface_driver(self):
         self.conf.set_override('interface_driver', None)
         with mock.patch.object(l3_agent, 'LOG') as log:
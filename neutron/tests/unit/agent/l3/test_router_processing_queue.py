@@ -15,6 +15,8 @@
 
 import datetime
 
+import mock
+
 from neutron.agent.l3 import router_processing_queue as l3_queue
 from neutron.openstack.common import uuidutils
 from neutron.tests import base
@@ -100,3 +102,32 @@ class TestExclusiveRouterProcessor(base.BaseTestCase):
             raise Exception("Only the master should process a router")
 
         self.assertEqual(2, len([i for i in master.updates()]))
+
+
+class TestRouterProcessingQueue(base.BaseTestCase):
+
+    def test_stats(self):
+        queue = l3_queue.RouterProcessingQueue()
+        router_id, router_id_2 = _uuid(), _uuid()
+        with mock.patch('time.time', side_effect=[0, 1, 3, 4, 6, 7, 8, 12]):
+            queue.add(l3_queue.RouterUpdate(
+                router_id, l3_queue.PRIORITY_SYNC_ROUTERS_TASK))
+            queue.add(l3_queue.RouterUpdate(router_id_2,
+                                            l3_queue.PRIORITY_RPC))
+            updates = [update.id for rp, update in
+                       queue.each_update_to_next_router()]
+            updates += [update.id for rp, update in
+                        queue.each_update_to_next_router()]
+        self.assertEqual([router_id_2, router_id], updates)
+
+        stats = queue.get_stats()
+        self.assertEqual(0, stats['queue_depth'])
+        self.assertEqual({'updates': 1,
+                          'total_wait_time': 2, 'max_wait_time': 2,
+                          'avg_wait_time': 2,
+                          'total_process_time': 2, 'max_process_time': 2,
+                          'avg_process_time': 2,
+                          'slowest_router': router_id_2},
+                         stats['rpc'])
+        self.assertEqual(7, stats['sync_routers_task']['max_wait_time'])
+        self.assertEqual(4, stats['sync_routers_task']['max_process_time'])
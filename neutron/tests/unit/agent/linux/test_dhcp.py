@@ -627,6 +627,8 @@ class TestBase(base.BaseTestCase):
 
         self.external_process = mock.patch(
             'neutron.agent.linux.external_process.ProcessManager').start()
+        mock.patch.dict(dhcp.DhcpLocalProcess._config_contents,
+                        clear=True).start()
 
 
 class TestDhcpBase(TestBase):
@@ -1296,6 +1298,109 @@ class TestDnsmasq(TestBase):
                 mock.call(exp_opt_name, exp_opt_data),
             ])
 
+    def test_reload_allocations_unchanged(self):
+        with mock.patch('__builtin__.open'):
+            self._get_dnsmasq(FakeDualNetwork()).reload_allocations()
+            self.safe.reset_mock()
+            self.external_process.reset_mock()
+
+            self._get_dnsmasq(FakeDualNetwork()).reload_allocations()
+        self.assertFalse(self.safe.called)
+        self.external_process().enable.assert_called_once_with(
+            reload_cfg=False)
+
+    def test_reload_allocations_changed_port(self):
+        network = FakeDualNetwork()
+        with mock.patch('__builtin__.open'):
+            self._get_dnsmasq(network).reload_allocations()
+            self.safe.reset_mock()
+            self.external_process.reset_mock()
+
+            network.ports = network.ports[1:]
+            self._get_dnsmasq(network).reload_allocations()
+        self.assertEqual(2, self.safe.call_count)
+        self.external_process().enable.assert_called_once_with(
+            reload_cfg=True)
+
+    def test_remove_config_files_forgets_contents(self):
+        dm = self._get_dnsmasq(FakeV4Network())
+        dm._output_hosts_file()
+        self.assertTrue(dm._config_contents)
+        dm._remove_config_files()
+        self.assertFalse(dm._config_contents)
+
+    def test_spawn_cmdline_hostsdir(self):
+        self.conf.set_override('dnsmasq_use_hostsdir', True)
+        network = FakeV4Network()
+        with mock.patch.object(dhcp.Dnsmasq, 'interface_name') as iface:
+            iface.__get__ = mock.Mock(return_value='tap0')
+            cmd = self._get_dnsmasq(network)._build_cmdline_callback('pid')
+        conf_dir = os.path.join(os.path.abspath(self.conf.dhcp_confs),
+                                network.id)
+        self.assertIn('--dhcp-hostsdir=%s/host.d' % conf_dir, cmd)
+        self.assertIn('--hostsdir=%s/addn_hosts.d' % conf_dir, cmd)
+        self.assertFalse([opt for opt in cmd
+                          if opt.startswith(('--dhcp-hostsfile',
+                                             '--addn-hosts'))])
+
+    def _output_hosts_dirs(self, network, existing_port_ids):
+        dm = self._get_dnsmasq(network)
+        with mock.patch('os.listdir', return_value=existing_port_ids):
+            dm._output_hosts_dirs()
+        return dm
+
+    def test_output_hosts_dirs(self):
+        network = FakeV4Network()
+        port = network.ports[0]
+        dm = self._output_hosts_dirs(network, [])
+        host_file = os.path.join(dm.get_conf_file_name('host.d'), port.id)
+        addn_file = os.path.join(dm.get_conf_file_name('addn_hosts.d'),
+                                 port.id)
+        self.safe.assert_has_calls([
+            mock.call(host_file, '00:00:80:aa:bb:cc,'
+                      'host-192-168-0-2.openstacklocal,192.168.0.2\n',
+                      tmp_prefix='.tmp'),
+            mock.call(addn_file, '192.168.0.2\t'
+                      'host-192-168-0-2.openstacklocal host-192-168-0-2\n',
+                      tmp_prefix='.tmp')])
+        # dnsmasq reads the files of new ports by itself
+        self.assertFalse(dm._reload_needed)
+
+    def test_output_hosts_dirs_unchanged(self):
+        network = FakeV4Network()
+        self._output_hosts_dirs(network, [])
+        self.safe.reset_mock()
+        dm = self._output_hosts_dirs(network, [network.ports[0].id])
+        self.assertFalse(self.safe.called)
+        self.assertFalse(dm._reload_needed)
+
+    def test_output_hosts_dirs_removed_port(self):
+        network = FakeV4Network()
+        with mock.patch('os.remove') as remove:
+            dm = self._output_hosts_dirs(network, [network.ports[0].id,
+                                                   'gone'])
+        remove.assert_has_calls([
+            mock.call(os.path.join(dm.get_conf_file_name('host.d'), 'gone')),
+            mock.call(os.path.join(dm.get_conf_file_name('addn_hosts.d'),
+                                   'gone'))])
+        self.assertTrue(dm._reload_needed)
+
+    def test_release_unused_leases_hostsdir(self):
+        self.conf.set_override('dnsmasq_use_hostsdir', True)
+        dnsmasq = self._get_dnsmasq(FakeDualNetwork())
+        dnsmasq._read_hosts_file_leases = mock.Mock(
+            return_value=set([('192.168.1.2', '00:00:80:aa:bb:cc')]))
+        dnsmasq._release_lease = mock.Mock()
+        dnsmasq.network.ports = []
+
+        with mock.patch('os.listdir', return_value=['port1', '.tmpfoo']):
+            dnsmasq._release_unused_leases()
+
+        dnsmasq._read_hosts_file_leases.assert_called_once_with(
+            os.path.join(dnsmasq.get_conf_file_name('host.d'), 'port1'))
+        dnsmasq._release_lease.assert_called_once_with('00:00:80:aa:bb:cc',
+                                                       '192.168.1.2')
+
     def test_release_unused_leases(self):
         dnsmasq = self._get_dnsmasq(FakeDualNetwork())
 
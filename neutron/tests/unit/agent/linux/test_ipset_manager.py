@@ -19,7 +19,8 @@ from neutron.tests import base
 TEST_SET_ID = 'fake_sgid'
 ETHERTYPE = 'IPv4'
 TEST_SET_NAME = ipset_manager.IpsetManager.get_name(TEST_SET_ID, ETHERTYPE)
-TEST_SET_NAME_NEW = TEST_SET_NAME + ipset_manager.SWAP_SUFFIX
+OTHER_SET_ID = 'other_sgid'
+OTHER_SET_NAME = ipset_manager.IpsetManager.get_name(OTHER_SET_ID, 'IPv6')
 FAKE_IPS = ['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4',
             '10.0.0.5', '10.0.0.6']
 
@@ -29,47 +30,32 @@ class BaseIpsetManagerTest(base.BaseTestCase):
         super(BaseIpsetManagerTest, self).setUp()
         self.ipset = ipset_manager.IpsetManager()
         self.execute = mock.patch.object(self.ipset, "execute").start()
+        self.execute.return_value = ''
         self.expected_calls = []
-        self.expect_create()
+        self.expect_save()
 
     def verify_mock_calls(self):
         self.execute.assert_has_calls(self.expected_calls, any_order=False)
+        self.assertEqual(len(self.expected_calls),
+                         len(self.execute.mock_calls))
 
-    def expect_set(self, addresses):
-        temp_input = ['create NETIPv4fake_sgid-new hash:net family inet']
-        temp_input.extend('add NETIPv4fake_sgid-new %s' % ip
-                          for ip in addresses)
-        input = '\n'.join(temp_input)
-        self.expected_calls.extend([
-            mock.call(['ipset', 'restore', '-exist'],
-                      process_input=input,
-                      run_as_root=True),
-            mock.call(['ipset', 'swap', TEST_SET_NAME_NEW, TEST_SET_NAME],
-                      process_input=None,
-                      run_as_root=True),
-            mock.call(['ipset', 'destroy', TEST_SET_NAME_NEW],
-                      process_input=None,
-                      run_as_root=True)])
-
-    def expect_add(self, addresses):
-        self.expected_calls.extend(
-            mock.call(['ipset', 'add', '-exist', TEST_SET_NAME, ip],
-                      process_input=None,
-                      run_as_root=True) for ip in addresses)
-
-    def expect_del(self, addresses):
-        self.expected_calls.extend(
-            mock.call(['ipset', 'del', TEST_SET_NAME, ip],
+    def expect_save(self):
+        self.expected_calls.append(
+            mock.call(['ipset', 'save'],
                       process_input=None,
-                      run_as_root=True) for ip in addresses)
+                      run_as_root=True))
 
-    def expect_create(self):
+    def expect_restore(self, lines):
         self.expected_calls.append(
-            mock.call(['ipset', 'create', '-exist', TEST_SET_NAME,
-                       'hash:net', 'family', 'inet'],
-                      process_input=None,
+            mock.call(['ipset', 'restore', '-exist'],
+                      process_input='\n'.join(lines),
                       run_as_root=True))
 
+    def expect_create_and_add(self, addresses):
+        self.expect_restore(
+            ['create %s hash:net family inet' % TEST_SET_NAME] +
+            ['add %s %s' % (TEST_SET_NAME, ip) for ip in addresses])
+
     def expect_destroy(self):
         self.expected_calls.append(
             mock.call(['ipset', 'destroy', TEST_SET_NAME],
@@ -77,11 +63,11 @@ class BaseIpsetManagerTest(base.BaseTestCase):
                       run_as_root=True))
 
     def add_first_ip(self):
-        self.expect_set([FAKE_IPS[0]])
+        self.expect_create_and_add([FAKE_IPS[0]])
         self.ipset.set_members(TEST_SET_ID, ETHERTYPE, [FAKE_IPS[0]])
 
     def add_all_ips(self):
-        self.expect_set(FAKE_IPS)
+        self.expect_create_and_add(FAKE_IPS)
         self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS)
 
 
@@ -95,26 +81,73 @@ class IpsetManagerTestCase(BaseIpsetManagerTest):
         self.add_first_ip()
         self.verify_mock_calls()
 
-    def test_set_members_adding_less_than_5(self):
+    def test_set_members_adding_members(self):
         self.add_first_ip()
-        self.expect_add(reversed(FAKE_IPS[1:5]))
-        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS[0:5])
+        self.expect_restore(['add %s %s' % (TEST_SET_NAME, ip)
+                             for ip in FAKE_IPS[1:]])
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS)
         self.verify_mock_calls()
 
-    def test_set_members_deleting_less_than_5(self):
+    def test_set_members_deleting_members(self):
         self.add_all_ips()
-        self.expect_del(reversed(FAKE_IPS[4:5]))
+        self.expect_restore(['del %s %s' % (TEST_SET_NAME, ip)
+                             for ip in FAKE_IPS[3:]])
         self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS[0:3])
         self.verify_mock_calls()
 
-    def test_set_members_adding_more_than_5(self):
+    def test_set_members_adding_and_deleting_members(self):
         self.add_first_ip()
-        self.expect_set(FAKE_IPS)
+        self.expect_restore(['del %s %s' % (TEST_SET_NAME, FAKE_IPS[0]),
+                             'add %s %s' % (TEST_SET_NAME, FAKE_IPS[1])])
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS[1:2])
+        self.verify_mock_calls()
+
+    def test_set_members_unchanged(self):
+        self.add_all_ips()
         self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS)
         self.verify_mock_calls()
 
+    def test_set_members_of_system_set(self):
+        self.execute.return_value = '\n'.join([
+            'create %s hash:net family inet hashsize 1024 maxelem 65536' %
+            TEST_SET_NAME,
+            'add %s %s' % (TEST_SET_NAME, FAKE_IPS[0]),
+            'add %s %s' % (TEST_SET_NAME, FAKE_IPS[1]),
+            'create unrelated hash:ip family inet hashsize 1024',
+            'add unrelated 10.1.0.1'])
+        self.expect_restore(['del %s %s' % (TEST_SET_NAME, FAKE_IPS[1]),
+                             'add %s %s' % (TEST_SET_NAME, FAKE_IPS[2])])
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE,
+                               [FAKE_IPS[0], FAKE_IPS[2]])
+        self.verify_mock_calls()
+        self.assertEqual({}, self.ipset.system_sets)
+
+    def test_deferred_set_members_are_coalesced(self):
+        self.ipset.defer_apply_on()
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS[0:2])
+        self.ipset.set_members(OTHER_SET_ID, 'IPv6', ['fe80::1'])
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS[0:1])
+        self.assertTrue(self.ipset.set_exists(TEST_SET_ID, ETHERTYPE))
+        self.assertFalse(self.execute.called)
+
+        self.expect_restore(
+            ['create %s hash:net family inet' % TEST_SET_NAME,
+             'add %s %s' % (TEST_SET_NAME, FAKE_IPS[0]),
+             'create %s hash:net family inet6' % OTHER_SET_NAME,
+             'add %s fe80::1' % OTHER_SET_NAME])
+        self.ipset.defer_apply_off()
+        self.verify_mock_calls()
+
     def test_destroy(self):
         self.add_first_ip()
         self.expect_destroy()
         self.ipset.destroy(TEST_SET_ID, ETHERTYPE)
         self.verify_mock_calls()
+
+    def test_destroy_pending_set(self):
+        self.ipset.defer_apply_on()
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS)
+        self.ipset.destroy(TEST_SET_ID, ETHERTYPE)
+        self.ipset.defer_apply_off()
+        self.assertFalse(self.execute.called)
+        self.assertFalse(self.ipset.set_exists(TEST_SET_ID, ETHERTYPE))
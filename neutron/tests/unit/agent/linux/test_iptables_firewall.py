@@ -1526,6 +1526,22 @@ class IptablesFirewallEnhancedIpsetTestCase(BaseIptablesFirewallTestCase):
 
         self.assertEqual(0, len(self.firewall.sg_members[OTHER_SGID][_IPv4]))
 
+    def test_update_security_group_member_ips(self):
+        self.firewall.sg_rules = self._fake_sg_rules()
+        self.firewall.update_security_group_members(
+            FAKE_SGID, {_IPv4: ['10.0.0.1', '10.0.0.2'], _IPv6: []})
+        self.firewall.update_security_group_member_ips(
+            FAKE_SGID, ['10.0.0.3', 'fe80::1', '10.0.0.1'], ['10.0.0.2'])
+        self.assertEqual({_IPv4: ['10.0.0.1', '10.0.0.3'],
+                          _IPv6: ['fe80::1']},
+                         self.firewall.sg_members[FAKE_SGID])
+
+    def test_update_security_group_member_ips_unused_group(self):
+        self.firewall.sg_rules = self._fake_sg_rules()
+        self.firewall.update_security_group_member_ips(
+            OTHER_SGID, ['10.0.0.3'], [])
+        self.assertNotIn(OTHER_SGID, self.firewall.sg_members)
+
     def test_remove_unused_sg_members(self):
         self.firewall.sg_members = self._fake_sg_members([FAKE_SGID,
                                                           OTHER_SGID])
@@ -1611,6 +1627,8 @@ class IptablesFirewallEnhancedIpsetTestCase(BaseIptablesFirewallTestCase):
             mock.call.set_exists('fake_sgid', 'IPv4'),
             mock.call.get_name('fake_sgid', 'IPv6'),
             mock.call.set_exists('fake_sgid', 'IPv6'),
+            mock.call.defer_apply_on(),
+            mock.call.defer_apply_off(),
             mock.call.destroy('fake_sgid', 'IPv4'),
             mock.call.destroy('fake_sgid', 'IPv6')]
 
@@ -1673,3 +1691,84 @@ class IptablesFirewallEnhancedIpsetTestCase(BaseIptablesFirewallTestCase):
                          [dict(rule.items() +
                                [('source_ip_prefix', '%s/32' % ip)])
                           for ip in other_ips])
+
+
+class IptablesFirewallSharedChainsTestCase(BaseIptablesFirewallTestCase):
+    def setUp(self):
+        super(IptablesFirewallSharedChainsTestCase, self).setUp()
+        self.firewall.enable_ipset = False
+        self.firewall.shared_sg_chains = True
+        self.firewall.sg_rules = {FAKE_SGID: [
+            {'direction': 'ingress', 'ethertype': _IPv4,
+             'protocol': 'tcp', 'port_range_min': 22,
+             'port_range_max': 22}]}
+
+    def _fake_port(self, device, sg_ids=None):
+        return {'device': device,
+                'mac_address': 'ff:ff:ff:ff:ff:ff',
+                'network_id': 'fake_net',
+                'fixed_ips': [FAKE_IP['IPv4']],
+                'security_groups': sg_ids or [FAKE_SGID]}
+
+    def _prepare_port_filters(self, *ports):
+        with self.firewall.defer_apply():
+            for port in ports:
+                self.firewall.prepare_port_filter(port)
+
+    def test_ports_share_security_group_chain(self):
+        self._prepare_port_filters(self._fake_port('tapfake_dev1'),
+                                   self._fake_port('tapfake_dev2'))
+        chain = self.firewall._shared_chain_name([FAKE_SGID], 'ingress')
+        self.assertTrue(chain.startswith('gi'))
+        self.assertEqual(1, self.v4filter_inst.add_chain.call_args_list.count(
+            mock.call(chain)))
+        rule_calls = self.v4filter_inst.add_rule.call_args_list
+        self.assertEqual(1, rule_calls.count(
+            mock.call(chain, '-p tcp -m tcp --dport 22 -j RETURN',
+                      comment=None)))
+        self.assertIn(mock.call(chain, '-j $sg-fallback', comment=None),
+                      rule_calls)
+        for port_chain in ('ifake_dev1', 'ifake_dev2'):
+            self.assertIn(mock.call(port_chain, '-g $%s' % chain,
+                                    comment=None), rule_calls)
+        self.assertNotIn(
+            mock.call('ifake_dev1', '-p tcp -m tcp --dport 22 -j RETURN',
+                      comment=None), rule_calls)
+        self.assertEqual(
+            set([chain,
+                 self.firewall._shared_chain_name([FAKE_SGID], 'egress')]),
+            self.firewall._shared_chains)
+
+    def test_shared_chain_per_security_groups_set(self):
+        self.assertEqual(
+            self.firewall._shared_chain_name([FAKE_SGID, OTHER_SGID],
+                                             'ingress'),
+            self.firewall._shared_chain_name([OTHER_SGID, FAKE_SGID],
+                                             'ingress'))
+        self.assertNotEqual(
+            self.firewall._shared_chain_name([FAKE_SGID], 'ingress'),
+            self.firewall._shared_chain_name([FAKE_SGID, OTHER_SGID],
+                                             'ingress'))
+
+    def test_shared_chains_removed(self):
+        port = self._fake_port('tapfake_dev1')
+        self._prepare_port_filters(port)
+        chains = self.firewall._shared_chains
+        self.firewall.remove_port_filter(port)
+        for chain in chains:
+            self.v4filter_inst.remove_chain.assert_any_call(chain)
+        self.assertEqual(set(), self.firewall._shared_chains)
+
+    def test_rules_compiled_once(self):
+        self.firewall.shared_sg_chains = False
+        with mock.patch.object(
+                self.firewall, '_convert_sg_rule_to_iptables_args',
+                wraps=self.firewall._convert_sg_rule_to_iptables_args
+        ) as convert:
+            self._prepare_port_filters(self._fake_port('tapfake_dev1'),
+                                       self._fake_port('tapfake_dev2'))
+            self.assertEqual(1, convert.call_count)
+            self._prepare_port_filters(self._fake_port('tapfake_dev3'))
+            self.assertEqual(1, convert.call_count)
+        self.v4filter_inst.add_rule.assert_any_call(
+            'ifake_dev3', '-p tcp -m tcp --dport 22 -j RETURN', comment=None)
@@ -1034,3 +1034,88 @@ class IptablesManagerStateLessTestCase(base.BaseTestCase):
 
     def test_mangle_not_found(self):
         self.assertNotIn('mangle', self.iptables.ipv4)
+
+
+class IptablesManagerIncrementalApplyTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(IptablesManagerIncrementalApplyTestCase, self).setUp()
+        cfg.CONF.set_override('comment_iptables_rules', False, 'AGENT')
+        cfg.CONF.set_override('iptables_incremental_apply', True, 'AGENT')
+        self.iptables = iptables_manager.IptablesManager()
+        self.execute = mock.patch.object(self.iptables, "execute").start()
+        self.execute.return_value = ''
+        # The first apply always goes through a full save/restore cycle
+        self.iptables.apply()
+        self.execute.reset_mock()
+
+    def _assert_noflush_restore(self, lines):
+        self.execute.assert_called_once_with(
+            ['iptables-restore', '-n'],
+            process_input='\n'.join(lines), run_as_root=True)
+
+    def test_first_apply_is_full(self):
+        iptables = iptables_manager.IptablesManager()
+        execute = mock.patch.object(iptables, "execute").start()
+        execute.return_value = ''
+        iptables.apply()
+        execute.assert_has_calls([
+            mock.call(['iptables-save', '-c'], run_as_root=True),
+            mock.call(['iptables-restore', '-c'],
+                      process_input=mock.ANY, run_as_root=True)])
+
+    def test_apply_without_changes_is_skipped(self):
+        self.iptables.apply()
+        self.assertFalse(self.execute.called)
+
+    def test_add_rule_only_restores_dirty_chain(self):
+        bn = iptables_manager.binary_name
+        self.iptables.ipv4['filter'].add_chain('filter')
+        self.iptables.ipv4['filter'].add_rule('filter', '-j DROP')
+        self.iptables.ipv4['filter'].add_rule('INPUT', '-s 0/0 -d 192.168.0.2 '
+                                              '-j %s-filter' % bn)
+        self.iptables.apply()
+        self._assert_noflush_restore([
+            '# Generated by iptables_manager',
+            '*filter',
+            ':%s-INPUT - [0:0]' % bn,
+            ':%s-filter - [0:0]' % bn,
+            '-A %s-INPUT -s 0/0 -d 192.168.0.2 -j %s-filter' % (bn, bn),
+            '-A %s-filter -j DROP' % bn,
+            'COMMIT',
+            '# Completed by iptables_manager'])
+
+    def test_remove_chain_deletes_it_after_rewriting_jumps(self):
+        bn = iptables_manager.binary_name
+        self.iptables.ipv4['filter'].add_chain('filter')
+        self.iptables.ipv4['filter'].add_rule('INPUT', '-j $filter')
+        self.iptables.apply()
+        self.execute.reset_mock()
+
+        self.iptables.ipv4['filter'].remove_chain('filter')
+        self.iptables.apply()
+        self._assert_noflush_restore([
+            '# Generated by iptables_manager',
+            '*filter',
+            ':%s-INPUT - [0:0]' % bn,
+            '-F %s-filter' % bn,
+            '-X %s-filter' % bn,
+            'COMMIT',
+            '# Completed by iptables_manager'])
+
+    def test_add_and_remove_chain_before_apply_is_not_deleted(self):
+        self.iptables.ipv4['filter'].add_chain('filter')
+        self.iptables.ipv4['filter'].remove_chain('filter')
+        self.iptables.apply()
+        self.assertFalse(self.execute.called)
+
+    def test_unwrapped_change_triggers_full_apply_of_table(self):
+        self.iptables.ipv4['nat'].add_rule('PREROUTING', '-j DROP',
+                                           wrap=False)
+        self.iptables.apply()
+        self.execute.assert_has_calls([
+            mock.call(['iptables-save', '-c'], run_as_root=True),
+            mock.call(['iptables-restore', '-c'],
+                      process_input=mock.ANY, run_as_root=True)])
+        self.assertEqual(2, self.execute.call_count)
+        self.assertFalse(self.iptables.ipv4['nat'].is_dirty())
@@ -0,0 +1,235 @@
+# Copyright (c) 2015 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import socket
+
+import mock
+
+from neutron.agent.linux import ip_lib
+from neutron.agent.linux import netlink_lib
+from neutron.common import exceptions
+from neutron.tests import base
+
+
+class FakeMsg(dict):
+    def __init__(self, attrs=None, **fields):
+        super(FakeMsg, self).__init__(**fields)
+        self.attrs = attrs or {}
+
+    def get_attr(self, name):
+        return self.attrs.get(name)
+
+
+class FakeNetlinkError(Exception):
+    pass
+
+
+class NetlinkTestCase(base.BaseTestCase):
+    def setUp(self):
+        super(NetlinkTestCase, self).setUp()
+        self.config(group='AGENT', ip_lib_backend='netlink')
+        self.pyroute2 = mock.patch.object(netlink_lib, 'pyroute2').start()
+        self.pyroute2.NetlinkError = FakeNetlinkError
+        mock.patch.dict(netlink_lib._sockets, clear=True).start()
+        self.ipr = self.pyroute2.IPRoute.return_value
+        self.ipr.link_lookup.return_value = [3]
+        self.device = ip_lib.IPDevice('tap0')
+
+
+class TestNetlinkBackend(NetlinkTestCase):
+    def test_backend_commands(self):
+        self.assertIsInstance(self.device.link, netlink_lib.IpLinkCommand)
+        self.assertIsInstance(self.device.addr, netlink_lib.IpAddrCommand)
+        self.assertIsInstance(self.device.route, netlink_lib.IpRouteCommand)
+        self.assertIsInstance(self.device.neigh, netlink_lib.IpNeighCommand)
+        self.assertIsInstance(ip_lib.IPWrapper().netns,
+                              netlink_lib.IpNetnsCommand)
+
+    def test_socket_per_namespace(self):
+        ip_lib.IPDevice('tap0', namespace='ns').link.set_up()
+        ip_lib.IPDevice('tap1', namespace='ns').link.set_up()
+        self.pyroute2.NetNS.assert_called_once_with('ns')
+        self.assertFalse(self.pyroute2.IPRoute.called)
+
+    def test_netns_delete_closes_socket(self):
+        netns = self.pyroute2.NetNS.return_value
+        netns.link_lookup.return_value = [3]
+        ip_lib.IPDevice('tap0', namespace='ns').link.set_up()
+        with mock.patch.object(ip_lib.IpNetnsCommand, 'delete') as delete:
+            ip_lib.IPWrapper().netns.delete('ns')
+        delete.assert_called_once_with('ns')
+        netns.close.assert_called_once_with()
+        self.assertNotIn('ns', netlink_lib._sockets)
+
+    def test_netlink_error(self):
+        self.ipr.link.side_effect = FakeNetlinkError(1, 'error')
+        self.assertRaises(RuntimeError, self.device.link.set_up)
+
+    def test_broken_socket_is_reopened(self):
+        self.ipr.link.side_effect = [IOError(), None]
+        self.assertRaises(IOError, self.device.link.set_up)
+        self.device.link.set_up()
+        self.ipr.close.assert_called_once_with()
+        self.assertEqual(2, self.pyroute2.IPRoute.call_count)
+
+
+class TestNetlinkIpLinkCommand(NetlinkTestCase):
+    def test_set_up(self):
+        self.device.link.set_up()
+        self.ipr.link_lookup.assert_called_once_with(ifname='tap0')
+        self.ipr.link.assert_called_once_with('set', index=3, state='up')
+
+    def test_set_name(self):
+        self.device.link.set_name('tap1')
+        self.ipr.link.assert_called_once_with('set', index=3, ifname='tap1')
+        self.assertEqual('tap1', self.device.name)
+
+    def test_attributes(self):
+        self.ipr.get_links.return_value = [FakeMsg(
+            {'IFLA_ADDRESS': 'cc:dd:ee:ff:ab:cd', 'IFLA_OPERSTATE': 'UP',
+             'IFLA_MTU': 1500, 'IFLA_QDISC': 'mq', 'IFLA_TXQLEN': 1000})]
+        self.assertEqual({'link/ether': 'cc:dd:ee:ff:ab:cd', 'state': 'UP',
+                          'mtu': 1500, 'qdisc': 'mq', 'qlen': 1000},
+                         self.device.link.attributes)
+        self.ipr.get_links.assert_called_once_with(3)
+
+    def test_missing_device(self):
+        self.ipr.link_lookup.return_value = []
+        self.assertRaises(RuntimeError, self.device.link.set_up)
+        self.assertFalse(ip_lib.device_exists('tap0'))
+
+
+class TestNetlinkIpAddrCommand(NetlinkTestCase):
+    def _addr(self, address, prefixlen, flags=netlink_lib.IFA_F_PERMANENT,
+              scope=0, family=socket.AF_INET):
+        return FakeMsg({'IFA_ADDRESS': address}, index=3, flags=flags,
+                       prefixlen=prefixlen, scope=scope, family=family)
+
+    def test_add_v4(self):
+        self.device.addr.add('192.168.45.100/24')
+        self.ipr.addr.assert_called_once_with(
+            'add', index=3, address='192.168.45.100', mask=24,
+            family=socket.AF_INET, scope=0, broadcast='192.168.45.255')
+
+    def test_add_v6(self):
+        self.device.addr.add('2001:db8::1/64', scope='link')
+        self.ipr.addr.assert_called_once_with(
+            'add', index=3, address='2001:db8::1', mask=64,
+            family=socket.AF_INET6, scope=253)
+
+    def test_list(self):
+        self.ipr.get_addr.return_value = [
+            self._addr('172.16.77.240', 24),
+            self._addr('2001:db8::1', 64, family=socket.AF_INET6,
+                       flags=netlink_lib.IFA_F_TENTATIVE),
+            self._addr('fe80::1', 64, family=socket.AF_INET6, scope=253,
+                       flags=(netlink_lib.IFA_F_PERMANENT |
+                              netlink_lib.IFA_F_DADFAILED))]
+        expected = [
+            dict(cidr='172.16.77.240/24', scope='global', dynamic=False,
+                 tentative=False, dadfailed=False),
+            dict(cidr='2001:db8::1/64', scope='global', dynamic=True,
+                 tentative=True, dadfailed=False),
+            dict(cidr='fe80::1/64', scope='link', dynamic=False,
+                 tentative=False, dadfailed=True)]
+        self.assertEqual(expected, self.device.addr.list())
+        self.assertEqual(expected[1:2],
+                         self.device.addr.list(to='2001:db8::/64'))
+        self.assertEqual(expected[2:], self.device.addr.list(scope='link'))
+        self.assertEqual([expected[0], expected[2]],
+                         self.device.addr.list(filters=['permanent']))
+
+    def test_list_ip_version(self):
+        self.ipr.get_addr.return_value = []
+        self.device.addr.list(ip_version=6)
+        self.ipr.get_addr.assert_called_once_with(index=3,
+                                                  family=socket.AF_INET6)
+
+    def test_list_unsupported_filter_uses_ip(self):
+        with mock.patch.object(ip_lib.IpAddrCommand, 'list') as ip_list:
+            self.device.addr.list(filters=['secondary'])
+        ip_list.assert_called_once_with(scope=None, to=None,
+                                        filters=['secondary'],
+                                        ip_version=None)
+
+    def test_flush(self):
+        self.ipr.get_addr.return_value = [self._addr('172.16.77.240', 24)]
+        self.device.addr.flush(4)
+        self.ipr.addr.assert_called_once_with(
+            'delete', index=3, address='172.16.77.240', mask=24,
+            family=socket.AF_INET)
+
+
+class TestNetlinkIpRouteCommand(NetlinkTestCase):
+    def _route(self, dst=None, dst_len=0, table=254, scope=0, oif=3,
+               **attrs):
+        attrs.update(RTA_DST=dst, RTA_OIF=oif)
+        return FakeMsg(attrs, dst_len=dst_len, table=table, scope=scope)
+
+    def test_add_gateway(self):
+        self.device.route.add_gateway('10.0.0.1', metric=100, table=10)
+        self.ipr.route.assert_called_once_with(
+            'replace', oif=3, family=socket.AF_INET, table=10,
+            gateway='10.0.0.1', mask=0, priority=100)
+
+    def test_delete_gateway_missing_device(self):
+        self.ipr.link_lookup.return_value = []
+        self.assertRaises(exceptions.DeviceNotFoundError,
+                          self.device.route.delete_gateway, '10.0.0.1')
+
+    def test_get_gateway(self):
+        self.ipr.get_routes.return_value = [
+            self._route('10.0.0.0', 24, scope=253),
+            self._route(RTA_GATEWAY='10.0.0.2', oif=4),
+            self._route(RTA_GATEWAY='10.0.0.3', table=10),
+            self._route(RTA_GATEWAY='10.0.0.1', RTA_PRIORITY=100)]
+        self.assertEqual(dict(gateway='10.0.0.1', metric=100),
+                         self.device.route.get_gateway())
+        self.assertIsNone(self.device.route.get_gateway(scope='link'))
+
+    def test_list_onlink_routes(self):
+        self.ipr.get_routes.return_value = [
+            self._route('10.0.0.0', 24, scope=253),
+            self._route('10.0.1.0', 24, scope=253,
+                        RTA_PREFSRC='10.0.1.1'),
+            self._route(RTA_GATEWAY='10.0.0.1')]
+        self.assertEqual(['10.0.0.0/24'],
+                         self.device.route.list_onlink_routes(4))
+
+    def test_add_onlink_route(self):
+        self.device.route.add_onlink_route('10.0.0.0/24')
+        self.ipr.route.assert_called_once_with(
+            'replace', oif=3, family=socket.AF_INET, dst='10.0.0.0',
+            mask=24, rtscope=253)
+
+    def test_add_route(self):
+        self.device.route.add_route('8.8.8.0/24', '10.0.0.1', table=16)
+        self.ipr.route.assert_called_once_with(
+            'replace', oif=3, family=socket.AF_INET, table=16,
+            dst='8.8.8.0', mask=24, gateway='10.0.0.1')
+
+
+class TestNetlinkIpNeighCommand(NetlinkTestCase):
+    def test_add(self):
+        self.device.neigh.add('192.168.45.100', 'cc:dd:ee:ff:ab:cd')
+        self.ipr.neigh.assert_called_once_with(
+            'replace', ifindex=3, dst='192.168.45.100',
+            lladdr='cc:dd:ee:ff:ab:cd', family=socket.AF_INET,
+            state=netlink_lib.NUD_PERMANENT)
+
+    def test_delete(self):
+        self.device.neigh.delete('2001:db8::1', 'cc:dd:ee:ff:ab:cd')
+        self.ipr.neigh.assert_called_once_with(
+            'delete', ifindex=3, dst='2001:db8::1',
+            lladdr='cc:dd:ee:ff:ab:cd', family=socket.AF_INET6)
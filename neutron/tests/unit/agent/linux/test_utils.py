@@ -12,6 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
+from eventlet import event
 import mock
 import socket
 import testtools
@@ -107,6 +109,74 @@ class AgentUtilsExecuteTest(base.BaseTestCase):
             self.assertFalse(log.error.called)
 
 
+class TestRootwrapDaemonPool(base.BaseTestCase):
+    def setUp(self):
+        super(TestRootwrapDaemonPool, self).setUp()
+        self.client_cls = mock.patch.object(utils.client, 'Client').start()
+        self.daemon_client = self.client_cls.return_value
+        self.pool = utils.RootwrapDaemonPool(['rootwrap-daemon'], 2)
+
+    def test_execute(self):
+        self.daemon_client.execute.return_value = (0, 'out', '')
+        self.assertEqual((0, 'out', ''),
+                         self.pool.execute(['ls'], 'input'))
+        self.daemon_client.execute.assert_called_once_with(['ls'], 'input')
+        self.assertEqual([mock.call(['rootwrap-daemon'])] * 2,
+                         self.client_cls.call_args_list)
+
+    def test_execute_raises(self):
+        self.daemon_client.execute.side_effect = RuntimeError
+        self.assertRaises(RuntimeError, self.pool.execute, ['ls'])
+        self.assertEqual(1, self.pool.get_stats()['commands'])
+
+    def test_commands_are_queued(self):
+        release = event.Event()
+
+        def execute(cmd, process_input):
+            release.wait()
+            return 0, cmd[0], ''
+
+        self.daemon_client.execute.side_effect = execute
+        callers = [eventlet.spawn(self.pool.execute, [str(i)])
+                   for i in range(3)]
+        # Let the callers queue their commands and the workers start
+        for i in range(3):
+            eventlet.sleep(0)
+        stats = self.pool.get_stats()
+        self.assertEqual(3, stats['pending'])
+        self.assertEqual(1, stats['queue_depth'])
+        self.assertEqual(2, self.daemon_client.execute.call_count)
+
+        release.send()
+        self.assertEqual([(0, str(i), '') for i in range(3)],
+                         [caller.wait() for caller in callers])
+        stats = self.pool.get_stats()
+        self.assertEqual(0, stats['pending'])
+        self.assertEqual(3, stats['commands'])
+        self.assertEqual(1, stats['max_queue_depth'])
+
+
+class TestRootwrapDaemonHelper(base.BaseTestCase):
+    def setUp(self):
+        super(TestRootwrapDaemonHelper, self).setUp()
+        mock.patch.object(utils.RootwrapDaemonHelper,
+                          '_RootwrapDaemonHelper__client', None).start()
+        self.client_cls = mock.patch.object(utils.client, 'Client').start()
+        self.config(group='AGENT', root_helper_daemon='rootwrap-daemon')
+
+    def test_get_client(self):
+        daemon_client = utils.RootwrapDaemonHelper.get_client()
+        self.assertEqual(self.client_cls.return_value, daemon_client)
+        self.assertIsNone(utils.RootwrapDaemonHelper.get_stats())
+
+    def test_get_client_pool(self):
+        self.config(group='AGENT', root_helper_daemon_pool_size=4)
+        daemon_client = utils.RootwrapDaemonHelper.get_client()
+        self.assertIsInstance(daemon_client, utils.RootwrapDaemonPool)
+        self.assertEqual(4, daemon_client.size)
+        self.assertEqual(0, utils.RootwrapDaemonHelper.get_stats()['pending'])
+
+
 class AgentUtilsGetInterfaceMAC(base.BaseTestCase):
     def test_get_interface_mac(self):
         expect_val = '01:02:03:04:05:06'
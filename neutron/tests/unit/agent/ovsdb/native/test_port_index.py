@@ -0,0 +1,152 @@
+# Copyright (c) 2015 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import uuid
+
+import mock
+
+from neutron.agent.ovsdb.native import port_index
+from neutron.tests import base
+
+
+class FakeIdl(object):
+    def __init__(self, notifies_row_changes=True):
+        self.notifies_row_changes = notifies_row_changes
+        self.change_seqno = 0
+        self.tables = dict((name, mock.Mock(rows={}))
+                           for name in ('Bridge', 'Port', 'Interface'))
+        for name, table in self.tables.items():
+            table.name = name
+
+    def add_row(self, table, **columns):
+        row = mock.Mock(uuid=uuid.uuid4(), _table=self.tables[table],
+                        **columns)
+        self.tables[table].rows[row.uuid] = row
+        self.change_seqno += 1
+        return row
+
+    def del_row(self, row):
+        del self.tables[row._table.name].rows[row.uuid]
+        self.change_seqno += 1
+
+
+class TestVifPortIndex(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestVifPortIndex, self).setUp()
+        self.idl = FakeIdl()
+        self.bridge = self.idl.add_row('Bridge', ports=[])
+        self.bridge.name = 'br-int'
+        self.index = port_index.VifPortIndex('br-int')
+        self.index.process(self.idl)
+
+    def _add_vif(self, name, vif_id, ofport=1, tag=1, notify=True):
+        iface = self.idl.add_row(
+            'Interface', ofport=[ofport],
+            external_ids={'iface-id': vif_id, 'attached-mac': 'aa:bb'})
+        iface.name = name
+        port = self.idl.add_row('Port', interfaces=[iface], tag=[tag])
+        port.name = name
+        self.bridge.ports = self.bridge.ports + [port]
+        if notify:
+            self.index.notify('create', iface)
+            self.index.notify('create', port)
+            self.index.notify('update', self.bridge)
+        return iface, port
+
+    def test_add_port(self):
+        self._add_vif('tap1', 'vif1', ofport=5, tag=3)
+        self.index.process(self.idl)
+        self.assertEqual((set(['vif1']), set(['vif1'])),
+                         self.index.pop_changes())
+        self.assertEqual(
+            {'vif1': port_index.VifPortState('tap1', 5, 'vif1', 'aa:bb', 3)},
+            self.index.get_ports())
+        self.assertEqual((set(['vif1']), set()), self.index.pop_changes())
+
+    def test_only_changed_interfaces_are_resolved(self):
+        iface1, _port1 = self._add_vif('tap1', 'vif1')
+        self._add_vif('tap2', 'vif2')
+        self.index.process(self.idl)
+        self.index.pop_changes()
+
+        iface1.ofport = [7]
+        self.index.notify('update', iface1)
+        with mock.patch.object(self.index, '_get_vif_state',
+                               wraps=self.index._get_vif_state) as get_state:
+            self.index.process(self.idl)
+        self.assertEqual(1, get_state.call_count)
+        self.assertEqual((set(['vif1', 'vif2']), set(['vif1'])),
+                         self.index.pop_changes())
+        self.assertEqual(7, self.index.get_ports()['vif1'].ofport)
+
+    def test_remove_port(self):
+        iface, port = self._add_vif('tap1', 'vif1')
+        self.index.process(self.idl)
+        self.index.pop_changes()
+
+        self.bridge.ports = []
+        self.idl.del_row(port)
+        self.idl.del_row(iface)
+        self.index.notify('update', self.bridge)
+        self.index.notify('delete', port)
+        self.index.notify('delete', iface)
+        self.index.process(self.idl)
+        self.assertEqual((set(), set(['vif1'])), self.index.pop_changes())
+
+    def test_unassigned_ofport_is_not_indexed(self):
+        self._add_vif('tap1', 'vif1', ofport=-1)
+        self.index.process(self.idl)
+        self.assertEqual((set(), set()), self.index.pop_changes())
+
+    def test_ports_of_other_bridges_are_not_indexed(self):
+        iface, port = self._add_vif('tap1', 'vif1', notify=False)
+        self.bridge.ports = []
+        other = self.idl.add_row('Bridge', ports=[port])
+        other.name = 'br-ex'
+        self.index.notify('create', iface)
+        self.index.notify('create', port)
+        self.index.notify('create', other)
+        self.index.process(self.idl)
+        self.assertEqual({}, self.index.get_ports())
+
+    def test_rebuild_without_row_notifications(self):
+        self.idl.notifies_row_changes = False
+        self._add_vif('tap1', 'vif1', notify=False)
+        self.index.process(self.idl)
+        self.assertEqual((set(['vif1']), set(['vif1'])),
+                         self.index.pop_changes())
+
+    def test_xenserver_vif_id_is_resolved(self):
+        portid_from_external_ids = mock.Mock(return_value='vif1')
+        self.index = port_index.VifPortIndex('br-int',
+                                             portid_from_external_ids)
+        external_ids = {'xs-vif-uuid': 'xs1', 'attached-mac': 'aa:bb'}
+        iface = self.idl.add_row('Interface', ofport=[5],
+                                 external_ids=external_ids)
+        iface.name = 'tap1'
+        port = self.idl.add_row('Port', interfaces=[iface], tag=[3])
+        self.bridge.ports = [port]
+        self.index.process(self.idl)
+        portid_from_external_ids.assert_called_once_with(external_ids)
+        self.assertEqual(
+            {'vif1': port_index.VifPortState('tap1', 5, 'vif1', 'aa:bb', 3)},
+            self.index.get_ports())
+
+    def test_unresolved_vif_id_is_not_indexed(self):
+        self.index = port_index.VifPortIndex(
+            'br-int', mock.Mock(side_effect=RuntimeError))
+        self._add_vif('tap1', 'vif1')
+        self.index.process(self.idl)
+        self.assertEqual({}, self.index.get_ports())
@@ -15,6 +15,7 @@
 
 import collections
 import contextlib
+import copy
 
 import mock
 from oslo_config import cfg
@@ -1084,6 +1085,152 @@ class SGServerRpcCallBackTestCase(test_sg.SecurityGroupDBTestCase):
                 self._delete('ports', port_id1)
                 self._delete('ports', port_id2)
 
+    def test_notify_security_groups_member_delta(self):
+        cfg.CONF.set_override('sg_member_delta_notifications', True)
+        with self.network() as n:
+            with contextlib.nested(self.subnet(n),
+                                   self.security_group()) as (subnet_v4,
+                                                              sg1):
+                sg1_id = sg1['security_group']['id']
+                res = self._create_port(
+                    self.fmt, n['network']['id'],
+                    security_groups=[sg1_id],
+                    fixed_ips=[{'subnet_id': subnet_v4['subnet']['id'],
+                                'ip_address': '10.0.0.5'}])
+                port = self.deserialize(self.fmt, res)['port']
+                self.notifier.security_groups_member_delta.assert_called_with(
+                    mock.ANY, {sg1_id: {'added': ['10.0.0.5'],
+                                        'removed': []}})
+                self._delete('ports', port['id'])
+                self.notifier.security_groups_member_delta.assert_called_with(
+                    mock.ANY, {sg1_id: {'added': [],
+                                        'removed': ['10.0.0.5']}})
+        self.assertFalse(self.notifier.security_groups_member_updated.called)
+
+
+class SGServerRpcCallBackWithCacheTestCase(SGServerRpcCallBackTestCase):
+    def setUp(self, plugin=None):
+        cfg.CONF.set_override('sg_info_cache_ttl', 60)
+        super(SGServerRpcCallBackWithCacheTestCase, self).setUp(plugin)
+        self.plugin = manager.NeutronManager.get_plugin()
+
+    def _get_info(self):
+        # The test plugin converts the fixed_ips of the devices it returns
+        for port in self.ports:
+            self.plugin.devices[port['id']] = copy.deepcopy(port)
+        ctx = context.get_admin_context()
+        return self.rpc.security_group_info_for_devices(
+            ctx, devices=[port['id'] for port in self.ports])
+
+    def _get_remote_group_info(self, n, sg1_id, sg2_id):
+        res1 = self._create_port(self.fmt, n['network']['id'],
+                                 security_groups=[sg1_id])
+        self.ports = [self.deserialize(self.fmt, res1)['port']]
+        self._create_port(self.fmt, n['network']['id'],
+                          security_groups=[sg2_id])
+        return self._get_info()
+
+    def _create_rule(self, sg_id, port_min, remote_group_id=None):
+        rule = self._build_security_group_rule(
+            sg_id, 'ingress', const.PROTO_NAME_TCP, port_min, port_min,
+            remote_group_id=remote_group_id)
+        res = self._create_security_group_rule(
+            self.fmt, {'security_group_rules': [rule['security_group_rule']]})
+        self.assertEqual(webob.exc.HTTPCreated.code, res.status_int)
+
+    def test_security_group_info_cache_hits(self):
+        with self.network() as n:
+            with contextlib.nested(self.subnet(n),
+                                   self.security_group(),
+                                   self.security_group()) as (subnet_v4,
+                                                              sg1,
+                                                              sg2):
+                sg1_id = sg1['security_group']['id']
+                sg2_id = sg2['security_group']['id']
+                self._create_rule(sg1_id, '24', remote_group_id=sg2_id)
+                expected = self._get_remote_group_info(n, sg1_id, sg2_id)
+                stats = self.plugin._sg_info_cache.get_stats()
+                self.assertEqual(expected, self._get_info())
+                new_stats = self.plugin._sg_info_cache.get_stats()
+                self.assertEqual(stats['misses'], new_stats['misses'])
+                self.assertEqual(stats['hits'] + 2, new_stats['hits'])
+
+    def test_security_group_info_cache_rule_invalidation(self):
+        with self.network() as n:
+            with contextlib.nested(self.subnet(n),
+                                   self.security_group(),
+                                   self.security_group()) as (subnet_v4,
+                                                              sg1,
+                                                              sg2):
+                sg1_id = sg1['security_group']['id']
+                sg2_id = sg2['security_group']['id']
+                info = self._get_remote_group_info(n, sg1_id, sg2_id)
+                self.assertNotIn(sg2_id, info['sg_member_ips'])
+                self._create_rule(sg1_id, '24', remote_group_id=sg2_id)
+                info = self._get_info()
+                self.assertIn({'direction': 'ingress',
+                               'protocol': const.PROTO_NAME_TCP,
+                               'ethertype': const.IPv4,
+                               'port_range_max': 24, 'port_range_min': 24,
+                               'remote_group_id': sg2_id},
+                              info['security_groups'][sg1_id])
+                self.assertEqual(set(['10.0.0.3']),
+                                 info['sg_member_ips'][sg2_id]['IPv4'])
+
+    def test_security_group_info_cache_member_invalidation(self):
+        with self.network() as n:
+            with contextlib.nested(self.subnet(n),
+                                   self.security_group(),
+                                   self.security_group()) as (subnet_v4,
+                                                              sg1,
+                                                              sg2):
+                sg1_id = sg1['security_group']['id']
+                sg2_id = sg2['security_group']['id']
+                self._create_rule(sg1_id, '24', remote_group_id=sg2_id)
+                self._get_remote_group_info(n, sg1_id, sg2_id)
+                self._create_port(self.fmt, n['network']['id'],
+                                  security_groups=[sg2_id])
+                info = self._get_info()
+                self.assertEqual(set(['10.0.0.3', '10.0.0.4']),
+                                 info['sg_member_ips'][sg2_id]['IPv4'])
+
+
+class SecurityGroupInfoCacheTestCase(base.BaseTestCase):
+    def setUp(self):
+        super(SecurityGroupInfoCacheTestCase, self).setUp()
+        self.cache = sg_db_rpc.SecurityGroupInfoCache(60)
+        self.time = mock.patch.object(sg_db_rpc.time, 'time',
+                                      return_value=1000).start()
+
+    def test_get_set(self):
+        self.assertEqual(({}, ['sg1']), self.cache.get_rules(['sg1']))
+        self.cache.set_rules({'sg1': ['rule']}, self.cache.version)
+        self.assertEqual(({'sg1': ['rule']}, []),
+                         self.cache.get_rules(['sg1']))
+        self.assertEqual(({}, ['sg1']), self.cache.get_member_ips(['sg1']))
+        stats = self.cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(2, stats['misses'])
+        self.assertEqual(1, stats['rules_entries'])
+
+    def test_entries_expire(self):
+        self.cache.set_member_ips({'sg1': frozenset(['10.0.0.1'])},
+                                  self.cache.version)
+        self.time.return_value = 1061
+        self.assertEqual(({}, ['sg1']), self.cache.get_member_ips(['sg1']))
+
+    def test_invalidate(self):
+        self.cache.set_rules({'sg1': [], 'sg2': []}, self.cache.version)
+        self.cache.invalidate_rules(['sg1'])
+        self.assertEqual(({'sg2': []}, ['sg1']),
+                         self.cache.get_rules(['sg2', 'sg1']))
+
+    def test_set_after_invalidation_is_ignored(self):
+        version = self.cache.version
+        self.cache.invalidate_member_ips(['sg1'])
+        self.cache.set_member_ips({'sg1': frozenset()}, version)
+        self.assertEqual(({}, ['sg1']), self.cache.get_member_ips(['sg1']))
+
 
 class SecurityGroupAgentRpcTestCaseForNoneDriver(base.BaseTestCase):
     def test_init_firewall_with_none_driver(self):
@@ -1186,6 +1333,15 @@ class SecurityGroupAgentRpcTestCase(BaseSecurityGroupAgentRpcTestCase):
         self.agent.security_groups_member_updated(['fake_sgid3', 'fake_sgid4'])
         self.assertFalse(self.agent.refresh_firewall.called)
 
+    def test_security_groups_member_delta(self):
+        self.agent.refresh_firewall = mock.Mock()
+        self.agent.prepare_devices_filter(['fake_port_id'])
+        self.agent.security_groups_member_delta(
+            {'fake_sgid2': {'added': ['10.0.0.2'], 'removed': []}})
+        self.agent.refresh_firewall.assert_has_calls(
+            [mock.call.refresh_firewall([self.fake_device['device']])])
+        self.assertFalse(self.firewall.update_security_group_member_ips.called)
+
     def test_security_groups_provider_updated(self):
         self.agent.refresh_firewall = mock.Mock()
         self.agent.security_groups_provider_updated()
@@ -1304,6 +1460,34 @@ class SecurityGroupAgentEnhancedRpcTestCase(
             ['fake_sgid3', 'fake_sgid4'])
         self.assertFalse(self.agent.refresh_firewall.called)
 
+    def test_security_groups_member_delta_enhanced_rpc(self):
+        self.agent.refresh_firewall = mock.Mock()
+        self.agent.prepare_devices_filter(['fake_port_id'])
+        self.firewall.reset_mock()
+        self.agent.security_groups_member_delta(
+            {'fake_sgid2': {'added': ['10.0.0.2'], 'removed': ['10.0.0.3']}})
+        self.firewall.assert_has_calls([
+            mock.call.defer_apply(),
+            mock.call.update_security_group_member_ips(
+                'fake_sgid2', ['10.0.0.2'], ['10.0.0.3'])])
+        self.assertFalse(self.agent.refresh_firewall.called)
+
+    def test_security_groups_member_delta_deferred_enhanced_rpc(self):
+        self.agent.defer_refresh_firewall = True
+        self.agent.prepare_devices_filter(['fake_port_id'])
+        self.agent.security_groups_member_delta(
+            {'fake_sgid2': {'added': ['10.0.0.2', '10.0.0.3'],
+                            'removed': []}})
+        self.agent.security_groups_member_delta(
+            {'fake_sgid2': {'added': [], 'removed': ['10.0.0.3']}})
+        self.assertFalse(self.firewall.update_security_group_member_ips.called)
+        self.assertTrue(self.agent.firewall_refresh_needed())
+
+        self.agent.setup_port_filters(set(), set())
+        self.firewall.update_security_group_member_ips.assert_called_once_with(
+            'fake_sgid2', set(['10.0.0.2']), set(['10.0.0.3']))
+        self.assertFalse(self.agent.firewall_refresh_needed())
+
     def test_security_groups_provider_updated_enhanced_rpc(self):
         self.agent.refresh_firewall = mock.Mock()
         self.agent.security_groups_provider_updated()
@@ -1439,6 +1623,12 @@ class SecurityGroupAgentRpcWithDeferredRefreshTestCase(
             self.assertIn('fake_device', self.agent.devices_to_refilter)
             self.assertIn('fake_device_2', self.agent.devices_to_refilter)
 
+    def test_security_groups_member_delta(self):
+        self.agent.security_groups_member_delta(
+            {'fake_sgid2': {'added': ['10.0.0.2'], 'removed': []}})
+        self.assertIn('fake_device', self.agent.devices_to_refilter)
+        self.assertFalse(self.agent.pending_member_deltas)
+
     def test_security_groups_provider_updated(self):
         self.agent.security_groups_provider_updated()
         self.assertTrue(self.agent.global_refresh_firewall)
@@ -1621,6 +1811,19 @@ class SecurityGroupAgentRpcApiTestCase(base.BaseTestCase):
             None, security_groups=[])
         self.assertEqual(False, self.mock_cast.called)
 
+    def test_security_groups_member_delta(self):
+        deltas = {'fake_sgid': {'added': ['10.0.0.2'], 'removed': []}}
+        self.notifier.security_groups_member_delta(None, deltas)
+        self.mock_prepare.assert_called_once_with(
+            version='1.3', topic=mock.ANY, fanout=True)
+        self.mock_cast.assert_has_calls(
+            [mock.call(None, 'security_groups_member_delta',
+                       sg_member_deltas=deltas)])
+
+    def test_security_groups_member_delta_empty(self):
+        self.notifier.security_groups_member_delta(None, {})
+        self.assertEqual(False, self.mock_cast.called)
+
 #Note(nati) bn -> binary_name
 # id -> device_id
 
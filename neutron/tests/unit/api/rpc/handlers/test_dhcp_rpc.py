@@ -69,6 +69,39 @@ class TestDhcpRpcCallback(base.BaseTestCase):
                     {'id': 'b', 'subnets': [subnet], 'ports': []}]
         self.assertEqual(expected, networks)
 
+    def _setup_active_networks(self):
+        self.plugin.get_networks.return_value = [{'id': 'a'}, {'id': 'b'}]
+        self.plugin.get_ports.return_value = [{'id': 'p1', 'network_id': 'a'},
+                                              {'id': 'p2', 'network_id': 'a'}]
+        self.plugin.get_subnets.return_value = [{'id': 's1',
+                                                 'network_id': 'b'}]
+
+    def test_get_active_networks_info_by_ids(self):
+        self._setup_active_networks()
+        markers = self.callbacks.get_active_networks_markers(mock.Mock(),
+                                                             host='host')
+        self.assertEqual(set(['a', 'b']), set(markers))
+        self.assertNotEqual(markers['a'], markers['b'])
+
+        self.plugin.get_ports.return_value.reverse()
+        networks = self.callbacks.get_active_networks_info(
+            mock.Mock(), host='host', network_ids=['a', 'b'])
+        self.plugin.get_networks.assert_called_with(
+            mock.ANY, filters=dict(admin_state_up=[True], id=['a', 'b']))
+        self.assertEqual(markers, dict((network['id'],
+                                        network['revision_marker'])
+                                       for network in networks))
+
+    def test_get_active_networks_markers_changed_port(self):
+        self._setup_active_networks()
+        markers = self.callbacks.get_active_networks_markers(mock.Mock(),
+                                                             host='host')
+        self.plugin.get_ports.return_value[0]['mac_address'] = 'fa:16:3e:00'
+        new_markers = self.callbacks.get_active_networks_markers(mock.Mock(),
+                                                                 host='host')
+        self.assertNotEqual(markers['a'], new_markers['a'])
+        self.assertEqual(markers['b'], new_markers['b'])
+
     def _test__port_action_with_failures(self, exc=None, action=None):
         port = {
             'network_id': 'foo_network_id',
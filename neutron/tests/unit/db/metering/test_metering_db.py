@@ -173,6 +173,24 @@ class TestMetering(MeteringPluginDbTestCase):
 
             self._test_list_resources('metering-label', metering_label)
 
+    def test_list_metering_labels_with_pagination(self):
+        with contextlib.nested(
+                self.metering_label('label1'),
+                self.metering_label('label2'),
+                self.metering_label('label3')) as metering_labels:
+            self._test_list_with_pagination('metering-label',
+                                            metering_labels,
+                                            ('name', 'asc'), 2, 2)
+
+    def test_list_metering_labels_with_pagination_reverse(self):
+        with contextlib.nested(
+                self.metering_label('label1'),
+                self.metering_label('label2'),
+                self.metering_label('label3')) as metering_labels:
+            self._test_list_with_pagination_reverse('metering-label',
+                                                    metering_labels,
+                                                    ('name', 'asc'), 2, 2)
+
     def test_create_metering_label_rule(self):
         name = 'my label'
         description = 'my metering label'
@@ -237,6 +255,21 @@ class TestMetering(MeteringPluginDbTestCase):
                 self._test_list_resources('metering-label-rule',
                                           metering_label_rule)
 
+    def test_list_metering_label_rules_with_pagination(self):
+        with self.metering_label() as metering_label:
+            metering_label_id = metering_label['metering_label']['id']
+            with contextlib.nested(
+                self.metering_label_rule(metering_label_id,
+                                         remote_ip_prefix='10.0.0.0/24'),
+                self.metering_label_rule(metering_label_id,
+                                         remote_ip_prefix='10.0.1.0/24'),
+                self.metering_label_rule(metering_label_id,
+                                         remote_ip_prefix='10.0.2.0/24')
+            ) as metering_label_rules:
+                self._test_list_with_pagination(
+                    'metering-label-rule', metering_label_rules,
+                    ('remote_ip_prefix', 'asc'), 2, 2)
+
     def test_create_metering_label_rules(self):
         name = 'my label'
         description = 'my metering label'
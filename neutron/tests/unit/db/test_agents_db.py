@@ -143,6 +143,126 @@ class TestAgentsDbMixin(TestAgentsDbBase):
                              "Agent entry creation hasn't been retried")
 
 
+class TestAgentsDbHeartbeats(TestAgentsDbBase):
+    def setUp(self):
+        super(TestAgentsDbHeartbeats, self).setUp()
+        self.config(heartbeat_flush_interval=30)
+        mock.patch.object(agents_db, '_HEARTBEATS',
+                          agents_db.AgentHeartbeats()).start()
+        self.agent_status = {
+            'agent_type': constants.AGENT_TYPE_DHCP,
+            'binary': 'neutron-dhcp-agent',
+            'host': 'foo_host',
+            'topic': 'dhcp_agent',
+            'configurations': {'networks': 1}
+        }
+        self.now = timeutils.utcnow()
+        self.utcnow = mock.patch.object(timeutils, 'utcnow').start()
+        self.utcnow.return_value = self.now
+
+    def _report(self, seconds, **kwargs):
+        self.utcnow.return_value = self.now + datetime.timedelta(
+            seconds=seconds)
+        agent_status = dict(self.agent_status, **kwargs)
+        self.plugin.create_or_update_agent(self.context, agent_status)
+
+    def _get_db_heartbeat(self):
+        return self.context.session.query(
+            agents_db.Agent.heartbeat_timestamp).one()[0]
+
+    def test_unchanged_report_is_kept_in_memory(self):
+        self._report(0)
+        with mock.patch.object(self.plugin,
+                               '_create_or_update_agent') as update:
+            self._report(10)
+        self.assertFalse(update.called)
+        self.assertEqual(self.now, self._get_db_heartbeat())
+        agent = self.plugin.get_agents(self.context)[0]
+        self.assertEqual(self.now + datetime.timedelta(seconds=10),
+                         agent['heartbeat_timestamp'])
+
+    def test_pending_heartbeats_are_flushed(self):
+        self._report(0)
+        self._report(10)
+        self._report(40)
+        self.assertEqual(self.now + datetime.timedelta(seconds=40),
+                         self._get_db_heartbeat())
+
+    def test_changed_configurations_are_written(self):
+        self._report(0)
+        self._report(10, configurations={'networks': 2})
+        agent = self.plugin.get_agents(self.context)[0]
+        self.assertEqual({'networks': 2}, agent['configurations'])
+        self.assertEqual(2, self.context.session.query(
+            agents_db.Agent.load).one()[0])
+        self.assertEqual(self.now + datetime.timedelta(seconds=10),
+                         self._get_db_heartbeat())
+
+    def test_start_flag_is_written(self):
+        self._report(0)
+        self._report(10, start_flag=True)
+        agent = self.plugin.get_agents(self.context)[0]
+        self.assertEqual(self.now + datetime.timedelta(seconds=10),
+                         agent['started_at'])
+
+    def test_deleted_agent_is_recreated(self):
+        self._report(0)
+        agent_id = self.plugin.get_agents(self.context)[0]['id']
+        with self.context.session.begin():
+            self.context.session.query(agents_db.Agent).delete()
+        self._report(10)
+        self._report(40)
+        self.assertFalse(self.plugin.get_agents(self.context))
+        self._report(50)
+        agents = self.plugin.get_agents(self.context)
+        self.assertEqual(1, len(agents))
+        self.assertNotEqual(agent_id, agents[0]['id'])
+
+    def test_flush_keeps_more_recent_heartbeat(self):
+        self._report(0)
+        self._report(10)
+        with self.context.session.begin():
+            self.context.session.query(agents_db.Agent).update(
+                {'heartbeat_timestamp': self.now +
+                 datetime.timedelta(seconds=60)})
+        self.plugin._flush_heartbeats(self.context)
+        self.assertEqual(self.now + datetime.timedelta(seconds=60),
+                         self._get_db_heartbeat())
+
+    def _write_other_server_report(self, seconds, networks):
+        with self.context.session.begin():
+            self.context.session.query(agents_db.Agent).update(
+                {'heartbeat_timestamp': self.now +
+                 datetime.timedelta(seconds=seconds),
+                 'configurations': '{"networks": %d}' % networks,
+                 'load': networks})
+
+    def test_flush_rewrites_report_changed_by_other_server(self):
+        self._report(0)
+        self._write_other_server_report(5, networks=2)
+        self._report(10)
+        self._report(40)
+        agent = self.plugin.get_agents(self.context)[0]
+        self.assertEqual({'networks': 1}, agent['configurations'])
+        self.assertEqual(1, self.context.session.query(
+            agents_db.Agent.load).one()[0])
+        self.assertEqual(self.now + datetime.timedelta(seconds=40),
+                         self._get_db_heartbeat())
+
+    def test_flush_keeps_more_recent_report_of_other_server(self):
+        self._report(0)
+        self._report(10)
+        self._write_other_server_report(20, networks=2)
+        with mock.patch.object(self.plugin,
+                               '_create_or_update_agent') as update:
+            self.plugin._flush_heartbeats(self.context)
+        self.assertFalse(update.called)
+        agent = self.plugin.get_agents(self.context)[0]
+        self.assertEqual({'networks': 2}, agent['configurations'])
+        self.assertEqual(self.now + datetime.timedelta(seconds=20),
+                         self._get_db_heartbeat())
+
+
 class TestAgentsDbGetAgents(TestAgentsDbBase):
     scenarios = [
         ('Get all agents', dict(agents=5, down_agents=2,
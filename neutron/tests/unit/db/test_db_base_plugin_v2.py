@@ -22,6 +22,7 @@ import netaddr
 from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_utils import importutils
+from sqlalchemy import event
 from sqlalchemy import orm
 from testtools import matchers
 import webob.exc
@@ -37,6 +38,7 @@ from neutron.common import ipv6_utils
 from neutron.common import test_lib
 from neutron.common import utils
 from neutron import context
+from neutron.db import api as db_api
 from neutron.db import db_base_plugin_v2
 from neutron.db import models_v2
 from neutron import manager
@@ -1046,6 +1048,43 @@ fixed_ips=ip_address%%3D%s&fixed_ips=ip_address%%3D%s&fixed_ips=subnet_id%%3D%s
             self._test_list_resources('port', [port1],
                                       query_params=query_params)
 
+    def test_list_ports_with_column_fields(self):
+        # for this test we need to enable overlapping ips
+        cfg.CONF.set_default('allow_overlapping_ips', True)
+        with contextlib.nested(self.port(device_id='dev1'),
+                               self.port(device_id='dev2')) as ports:
+            statements = []
+
+            def record_statement(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            engine = db_api.get_engine()
+            event.listen(engine, 'before_cursor_execute', record_statement)
+            try:
+                res = self._list('ports',
+                                 query_params='fields=id&fields=device_id')
+            finally:
+                event.remove(engine, 'before_cursor_execute',
+                             record_statement)
+            expected = [{'id': port['port']['id'],
+                         'device_id': port['port']['device_id']}
+                        for port in ports]
+            self.assertEqual(sorted(expected), sorted(res['ports']))
+            # Only the port columns are read, the fixed IPs are not loaded
+            self.assertFalse([statement for statement in statements
+                              if 'ipallocations' in statement])
+
+    def test_list_ports_with_relationship_fields(self):
+        # for this test we need to enable overlapping ips
+        cfg.CONF.set_default('allow_overlapping_ips', True)
+        with contextlib.nested(self.port(), self.port()) as ports:
+            res = self._list('ports',
+                             query_params='fields=id&fields=fixed_ips')
+            expected = [{'id': port['port']['id'],
+                         'fixed_ips': port['port']['fixed_ips']}
+                        for port in ports]
+            self.assertEqual(sorted(expected), sorted(res['ports']))
+
     def test_list_ports_public_network(self):
         with self.network(shared=True) as network:
             with self.subnet(network) as subnet:
@@ -1107,6 +1146,39 @@ fixed_ips=ip_address%%3D%s&fixed_ips=ip_address%%3D%s&fixed_ips=subnet_id%%3D%s
                                             (port1, port2, port3),
                                             ('mac_address', 'asc'), 2, 2)
 
+    def test_list_ports_with_pagination_native_fetches_one_page(self):
+        if self._skip_native_pagination:
+            self.skipTest("Skip test for not implemented pagination feature")
+        cfg.CONF.set_default('allow_overlapping_ips', True)
+        with contextlib.nested(self.port(mac_address='00:00:00:00:00:01'),
+                               self.port(mac_address='00:00:00:00:00:02'),
+                               self.port(mac_address='00:00:00:00:00:03')
+                               ) as (port1, port2, port3):
+            statements = []
+
+            def record_statement(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            engine = db_api.get_engine()
+            event.listen(engine, 'before_cursor_execute', record_statement)
+            try:
+                ports = manager.NeutronManager.get_plugin().get_ports(
+                    context.get_admin_context(),
+                    sorts=[('mac_address', True), ('id', True)],
+                    limit=1, marker=port1['port']['id'])
+            finally:
+                event.remove(engine, 'before_cursor_execute',
+                             record_statement)
+            self.assertEqual([port2['port']['id']],
+                             [port['id'] for port in ports])
+            # The page is selected by the database with a keyset condition
+            # on the sort keys rather than sliced from the whole collection
+            page_statements = [statement for statement in statements
+                               if 'ORDER BY ports.mac_address' in statement]
+            self.assertEqual(1, len(page_statements))
+            self.assertIn('LIMIT', page_statements[0])
+            self.assertIn('ports.mac_address >=', page_statements[0])
+
     def test_list_ports_with_pagination_emulated(self):
         helper_patcher = mock.patch(
             'neutron.api.v2.base.Controller._get_pagination_helper',
@@ -5322,6 +5394,96 @@ class DbModelTestCase(base.BaseTestCase):
         self.assertEqual(actual_repr_output, final_exp)
 
 
+class TestRandomIpAllocation(NeutronDbPluginV2TestCase):
+
+    def setUp(self):
+        super(TestRandomIpAllocation, self).setUp()
+        cfg.CONF.set_override('random_ip_allocation', True)
+
+    def _get_free_ips(self, subnet_id):
+        ranges = context.get_admin_context().session.query(
+            models_v2.IPAvailabilityRange).join(
+                models_v2.IPAllocationPool).filter_by(subnet_id=subnet_id)
+        free_ips = netaddr.IPSet()
+        for ip_range in ranges:
+            free_ips.add(netaddr.IPRange(ip_range['first_ip'],
+                                         ip_range['last_ip']))
+        return free_ips
+
+    def test_create_ports(self):
+        with self.subnet(cidr='10.0.0.0/28') as subnet:
+            subnet_id = subnet['subnet']['id']
+            ips = netaddr.IPSet()
+            for i in range(5):
+                port = self._make_port(self.fmt,
+                                       subnet['subnet']['network_id'])
+                fixed_ips = port['port']['fixed_ips']
+                self.assertEqual(1, len(fixed_ips))
+                self.assertEqual(subnet_id, fixed_ips[0]['subnet_id'])
+                ips.add(fixed_ips[0]['ip_address'])
+            self.assertEqual(5, len(ips))
+            free_ips = self._get_free_ips(subnet_id)
+            self.assertFalse(ips & free_ips)
+            self.assertEqual(netaddr.IPSet(netaddr.IPRange('10.0.0.2',
+                                                           '10.0.0.14')),
+                             ips | free_ips)
+
+    def test_create_port_specific_ip(self):
+        with self.subnet(cidr='10.0.0.0/28') as subnet:
+            fixed_ips = [{'subnet_id': subnet['subnet']['id'],
+                          'ip_address': '10.0.0.5'}]
+            with self.port(subnet=subnet, fixed_ips=fixed_ips) as port:
+                self.assertEqual(
+                    '10.0.0.5', port['port']['fixed_ips'][0]['ip_address'])
+                self.assertEqual(
+                    netaddr.IPSet(netaddr.IPRange('10.0.0.2', '10.0.0.14')) -
+                    netaddr.IPSet(['10.0.0.5']),
+                    self._get_free_ips(subnet['subnet']['id']))
+
+    def test_exhausted_ranges_are_rebuilt(self):
+        with self.subnet(cidr='10.0.0.0/29') as subnet:
+            net_id = subnet['subnet']['network_id']
+            ports = [self._make_port(self.fmt, net_id) for i in range(5)]
+            res = self._create_port(self.fmt, net_id)
+            self.assertEqual(webob.exc.HTTPConflict.code, res.status_int)
+
+            self._delete('ports', ports[0]['port']['id'])
+            port = self._make_port(self.fmt, net_id)
+            self.assertEqual(ports[0]['port']['fixed_ips'],
+                             port['port']['fixed_ips'])
+
+    def test_conflict_is_retried_in_caller_transaction(self):
+        remove_ip_from_range = (
+            db_base_plugin_v2.NeutronDbPluginV2._remove_ip_from_range)
+        conflicts = [False]
+
+        def remove_ip(*args):
+            if conflicts:
+                return conflicts.pop()
+            return remove_ip_from_range(*args)
+
+        with self.subnet(cidr='10.0.0.0/28') as subnet:
+            plugin = manager.NeutronManager.get_plugin()
+            ctx = context.get_admin_context()
+            port = {'port': {'tenant_id': 'tenant',
+                             'network_id': subnet['subnet']['network_id'],
+                             'mac_address': attributes.ATTR_NOT_SPECIFIED,
+                             'fixed_ips': attributes.ATTR_NOT_SPECIFIED,
+                             'admin_state_up': True,
+                             'device_id': 'device',
+                             'device_owner': 'owner',
+                             'name': ''}}
+            with mock.patch.object(db_base_plugin_v2.NeutronDbPluginV2,
+                                   '_remove_ip_from_range',
+                                   side_effect=remove_ip) as remove:
+                with ctx.session.begin(subtransactions=True):
+                    port = plugin.create_port(ctx, port)
+            self.assertEqual(2, remove.call_count)
+            ip_address = port['fixed_ips'][0]['ip_address']
+            self.assertNotIn(ip_address,
+                             self._get_free_ips(subnet['subnet']['id']))
+
+
 class TestNeutronDbPluginV2(base.BaseTestCase):
     """Unit Tests for NeutronDbPluginV2 IPAM Logic."""
 
@@ -5433,6 +5595,91 @@ class TestNeutronDbPluginV2(base.BaseTestCase):
         self._validate_rebuild_availability_ranges(pools, allocations,
                                                    expected)
 
+    def test_get_free_ranges(self):
+        get_free_ranges = db_base_plugin_v2.NeutronDbPluginV2._get_free_ranges
+        self.assertEqual([(3, 4), (6, 6), (9, 10)],
+                         list(get_free_ranges(3, 10, [1, 5, 5, 7, 8, 12])))
+        self.assertEqual([], list(get_free_ranges(3, 4, [3, 4])))
+        self.assertEqual([(3, 10)], list(get_free_ranges(3, 10, [])))
+
+    def _test_remove_ip_from_range(self, ip_address, count=1):
+        context = mock.Mock()
+        range_qry = context.session.query.return_value.filter_by.return_value
+        range_qry.update.return_value = count
+        range_qry.delete.return_value = count
+        result = db_base_plugin_v2.NeutronDbPluginV2._remove_ip_from_range(
+            context, 'pool', '10.0.0.2', '10.0.0.9', ip_address)
+        context.session.query.return_value.filter_by.assert_called_once_with(
+            allocation_pool_id='pool', first_ip='10.0.0.2',
+            last_ip='10.0.0.9')
+        return result, range_qry, context.session.add
+
+    def test_remove_first_ip_from_range(self):
+        result, range_qry, add = self._test_remove_ip_from_range('10.0.0.2')
+        self.assertTrue(result)
+        range_qry.update.assert_called_once_with(
+            {'first_ip': '10.0.0.3'}, synchronize_session=False)
+        self.assertFalse(add.called)
+
+    def test_remove_middle_ip_from_range(self):
+        result, range_qry, add = self._test_remove_ip_from_range('10.0.0.5')
+        self.assertTrue(result)
+        range_qry.update.assert_called_once_with(
+            {'last_ip': '10.0.0.4'}, synchronize_session=False)
+        new_range = add.call_args[0][0]
+        self.assertEqual(('pool', '10.0.0.6', '10.0.0.9'),
+                         (new_range.allocation_pool_id, new_range.first_ip,
+                          new_range.last_ip))
+
+    def test_remove_ip_from_changed_range(self):
+        result, range_qry, add = self._test_remove_ip_from_range('10.0.0.5',
+                                                                 count=0)
+        self.assertFalse(result)
+        self.assertFalse(add.called)
+
+    def _test_try_generate_random_ip_conflict(self, remove_results):
+        context = mock.Mock()
+        range_qry = context.session.query.return_value.join.return_value
+        for qry in (range_qry, range_qry.with_lockmode.return_value):
+            ranges = qry.filter_by.return_value.limit.return_value.all
+            ranges.return_value = [('pool', '10.0.0.2', '10.0.0.9')]
+        subnets = [{'id': 'subnet', 'cidr': '10.0.0.0/28',
+                    'network_id': 'net'}]
+        generate = db_base_plugin_v2.NeutronDbPluginV2._try_generate_random_ip
+        with mock.patch.object(db_base_plugin_v2.NeutronDbPluginV2,
+                               '_remove_ip_from_range',
+                               side_effect=remove_results):
+            try:
+                return generate(context, subnets)
+            finally:
+                range_qry.with_lockmode.assert_called_once_with('update')
+
+    def test_try_generate_random_ip_conflict(self):
+        ip = self._test_try_generate_random_ip_conflict([False, True])
+        self.assertEqual('subnet', ip['subnet_id'])
+        self.assertIn(netaddr.IPAddress(ip['ip_address']),
+                      netaddr.IPRange('10.0.0.2', '10.0.0.9'))
+
+    def test_try_generate_random_ip_locked_conflict(self):
+        self.assertRaises(n_exc.IpAddressGenerationFailure,
+                          self._test_try_generate_random_ip_conflict,
+                          [False, False])
+
+    def test_allocate_specific_ip_without_lock_conflict(self):
+        context = mock.Mock()
+        range_qry = context.session.query.return_value.join.return_value
+        range_qry.filter_by.return_value = [('pool', '10.0.0.2', '10.0.0.9')]
+        locked_qry = range_qry.with_lockmode.return_value
+        locked_qry.filter_by.return_value = [('pool', '10.0.0.6', '10.0.0.9')]
+        with mock.patch.object(db_base_plugin_v2.NeutronDbPluginV2,
+                               '_remove_ip_from_range', return_value=False):
+            self.assertRaises(
+                n_exc.IpAddressInUse,
+                db_base_plugin_v2.NeutronDbPluginV2.
+                _allocate_specific_ip_without_lock,
+                context, 'subnet', '10.0.0.5')
+        range_qry.with_lockmode.assert_called_once_with('update')
+
     def _test__allocate_ips_for_port(self, subnets, port, expected):
         plugin = db_base_plugin_v2.NeutronDbPluginV2()
         with mock.patch.object(db_base_plugin_v2.NeutronDbPluginV2,
@@ -16,11 +16,13 @@ import datetime
 import mock
 from oslo_config import cfg
 from oslo_utils import timeutils
+from sqlalchemy import event
 
 from neutron.api.v2 import attributes
 from neutron.common import constants
 from neutron import context
 from neutron.db import agents_db
+from neutron.db import api as db_api
 from neutron.db import common_db_mixin
 from neutron.db import l3_agentschedulers_db
 from neutron.db import l3_hamode_db
@@ -227,6 +229,39 @@ class L3HATestCase(L3HATestFramework):
         self.assertEqual(1, len(subnets))
         self.assertEqual(cfg.CONF.l3_ha_net_cidr, subnets[0]['cidr'])
 
+    def _get_ha_sync_data_and_statements_count(self, host):
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db_api.get_engine()
+        event.listen(engine, 'before_cursor_execute', count_statement)
+        try:
+            routers = self.plugin.get_ha_sync_data_for_host(self.admin_ctx,
+                                                            host)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statement)
+        return routers, len(statements)
+
+    def test_l3_agent_routers_query_statements_count(self):
+        router = self._create_router()
+        self._bind_router(router['id'])
+        routers, count = self._get_ha_sync_data_and_statements_count(
+            self.agent1['host'])
+        self.assertEqual(1, len(routers))
+
+        for i in range(3):
+            router = self._create_router()
+            self._bind_router(router['id'])
+        routers, count_more = self._get_ha_sync_data_and_statements_count(
+            self.agent1['host'])
+        self.assertEqual(4, len(routers))
+        for router in routers:
+            interface = router[constants.HA_INTERFACE_KEY]
+            self.assertEqual(1, len(interface['subnets']))
+        self.assertEqual(count, count_more)
+
     def test_unique_ha_network_per_tenant(self):
         tenant1 = _uuid()
         tenant2 = _uuid()
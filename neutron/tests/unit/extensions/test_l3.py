@@ -22,6 +22,7 @@ import netaddr
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import importutils
+from sqlalchemy import event
 from webob import exc
 
 from neutron.api.rpc.agentnotifiers import l3_rpc_agent_api
@@ -32,6 +33,7 @@ from neutron.callbacks import registry
 from neutron.common import constants as l3_constants
 from neutron.common import exceptions as n_exc
 from neutron import context
+from neutron.db import api as db_api
 from neutron.db import common_db_mixin
 from neutron.db import db_base_plugin_v2
 from neutron.db import external_net_db
@@ -289,6 +291,9 @@ class TestL3NatServicePlugin(common_db_mixin.CommonDbMixin,
                              l3_dvr_db.L3_NAT_with_dvr_db_mixin,
                              l3_db.L3_NAT_db_mixin):
 
+    __native_pagination_support = True
+    __native_sorting_support = True
+
     supported_extension_aliases = ["router"]
 
     def get_plugin_type(self):
@@ -664,6 +669,16 @@ class L3NatTestCaseBase(L3NatTestCaseMixin):
                                ) as routers:
             self._test_list_resources('router', routers)
 
+    def test_router_list_with_column_fields(self):
+        with contextlib.nested(self.router(name='router1'),
+                               self.router(name='router2')
+                               ) as routers:
+            res = self._list('routers', query_params='fields=id&fields=name')
+            expected = [{'id': router['router']['id'],
+                         'name': router['router']['name']}
+                        for router in routers]
+            self.assertEqual(sorted(expected), sorted(res['routers']))
+
     def test_router_list_with_parameters(self):
         with contextlib.nested(self.router(name='router1'),
                                self.router(name='router2'),
@@ -2468,6 +2483,55 @@ class L3AgentDbTestCaseBase(L3NatTestCaseMixin):
             self.assertIsNotNone(floatingips[0]['fixed_ip_address'])
             self.assertIsNotNone(floatingips[0]['router_id'])
 
+    def _make_routers_with_gateway_interface_and_floatingip(self, ext_net_id,
+                                                            cidrs):
+        for cidr in cidrs:
+            router = self._make_router(self.fmt, self._tenant_id)
+            router_id = router['router']['id']
+            self._add_external_gateway_to_router(router_id, ext_net_id)
+            network = self._make_network(self.fmt, 'net', True)
+            subnet = self._make_subnet(
+                self.fmt, network, str(netaddr.IPNetwork(cidr)[1]), cidr)
+            self._router_interface_action('add', router_id,
+                                          subnet['subnet']['id'], None)
+            port = self._make_port(self.fmt, network['network']['id'])
+            self._make_floatingip(self.fmt, ext_net_id,
+                                  port_id=port['port']['id'])
+
+    def _get_sync_data_and_statements_count(self):
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db_api.get_engine()
+        event.listen(engine, 'before_cursor_execute', count_statement)
+        try:
+            routers = self.plugin.get_sync_data(
+                context.get_admin_context(), None)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statement)
+        return routers, len(statements)
+
+    def test_l3_agent_routers_query_statements_count(self):
+        with self.subnet(cidr='11.0.0.0/24') as public_sub:
+            ext_net_id = public_sub['subnet']['network_id']
+            self._set_net_external(ext_net_id)
+            self._make_routers_with_gateway_interface_and_floatingip(
+                ext_net_id, ['10.0.0.0/24'])
+            routers, count = self._get_sync_data_and_statements_count()
+            self.assertEqual(1, len(routers))
+
+            self._make_routers_with_gateway_interface_and_floatingip(
+                ext_net_id, ['10.0.1.0/24', '10.0.2.0/24', '10.0.3.0/24'])
+            routers, count_more = self._get_sync_data_and_statements_count()
+            self.assertEqual(4, len(routers))
+            for router in routers:
+                self.assertEqual(1, len(router[l3_constants.INTERFACE_KEY]))
+                self.assertEqual(1, len(router[l3_constants.FLOATINGIP_KEY]))
+                self.assertEqual(1, len(router['gw_port']['subnets']))
+            self.assertEqual(count, count_more)
+
     def _test_notify_op_agent(self, target_func, *args):
         l3_rpc_agent_api_str = (
             'neutron.api.rpc.agentnotifiers.l3_rpc_agent_api.L3AgentNotifyAPI')
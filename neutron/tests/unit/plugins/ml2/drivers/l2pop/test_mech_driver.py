@@ -17,6 +17,7 @@ import contextlib
 import testtools
 
 import mock
+from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 
 from neutron.agent import l2population_rpc
@@ -408,6 +409,75 @@ class TestL2PopulationRpcTestCase(test_plugin.Ml2PluginV2TestCase):
                     self.mock_fanout.assert_called_with(
                         mock.ANY, 'add_fdb_entries', expected2)
 
+    def test_fdb_add_two_agents_loads_network_ports_once(self):
+        self.config(fdb_cache_ttl=60, group='l2pop')
+        self._register_ml2_agents()
+        db_mixin = l2pop_db.L2populationDbMixin
+        get_ports = db_mixin.get_nondvr_active_network_ports
+
+        with self.subnet(network=self._network) as subnet:
+            host_arg = {portbindings.HOST_ID: HOST}
+            with self.port(subnet=subnet,
+                           device_owner=DEVICE_OWNER_COMPUTE,
+                           arg_list=(portbindings.HOST_ID,),
+                           **host_arg) as port1:
+                host_arg = {portbindings.HOST_ID: HOST + '_2'}
+                with self.port(subnet=subnet,
+                               device_owner=DEVICE_OWNER_COMPUTE,
+                               arg_list=(portbindings.HOST_ID,),
+                               **host_arg) as port2:
+                    p1 = port1['port']
+                    p2 = port2['port']
+
+                    with mock.patch.object(db_mixin,
+                                           'get_nondvr_active_network_ports',
+                                           autospec=True,
+                                           side_effect=get_ports) as (
+                            get_ports_mock):
+                        self.callbacks.update_device_up(
+                            self.adminContext, agent_id=HOST + '_2',
+                            device='tap' + p2['id'])
+                        self.callbacks.update_device_up(
+                            self.adminContext, agent_id=HOST,
+                            device='tap' + p1['id'])
+
+                    self.assertEqual(1, get_ports_mock.call_count)
+                    p2_ips = [p['ip_address'] for p in p2['fixed_ips']]
+                    expected = {p1['network_id']:
+                                {'ports':
+                                 {'20.0.0.2': [constants.FLOODING_ENTRY,
+                                               l2pop_rpc.PortInfo(
+                                                   p2['mac_address'],
+                                                   p2_ips[0])]},
+                                 'network_type': 'vxlan',
+                                 'segment_id': 1}}
+                    self.mock_cast.assert_called_with(mock.ANY,
+                                                      'add_fdb_entries',
+                                                      expected, HOST)
+
+    def test_get_network_hosts(self):
+        self._register_ml2_agents()
+        plugin = manager.NeutronManager.get_plugin()
+        l2pop_mech = plugin.mechanism_manager.mech_drivers['l2population'].obj
+
+        with self.subnet(network=self._network) as subnet:
+            host_arg = {portbindings.HOST_ID: HOST}
+            with self.port(subnet=subnet,
+                           device_owner=DEVICE_OWNER_COMPUTE,
+                           arg_list=(portbindings.HOST_ID,),
+                           **host_arg) as port1:
+                host_arg = {portbindings.HOST_ID: HOST + '_2'}
+                with self.port(subnet=subnet,
+                               device_owner=DEVICE_OWNER_COMPUTE,
+                               arg_list=(portbindings.HOST_ID,),
+                               **host_arg):
+                    network_id = port1['port']['network_id']
+                    self.callbacks.update_device_up(
+                        self.adminContext, agent_id=HOST,
+                        device='tap' + port1['port']['id'])
+                    self.assertEqual(
+                        set([HOST]), l2pop_mech._get_network_hosts(network_id))
+
     def test_fdb_add_called_two_networks(self):
         self._register_ml2_agents()
 
@@ -865,33 +935,12 @@ class TestL2PopulationRpcTestCase(test_plugin.Ml2PluginV2TestCase):
 
 class TestL2PopulationMechDriver(base.BaseTestCase):
 
-    def _test_get_tunnels(self, agent_ip, exclude_host=True):
-        mech_driver = l2pop_mech_driver.L2populationMechanismDriver()
-        agent = mock.Mock()
-        agent.host = HOST
-        network_ports = ((None, agent),)
-        with mock.patch.object(l2pop_db.L2populationDbMixin,
-                               'get_agent_ip',
-                               return_value=agent_ip):
-            excluded_host = HOST + '-EXCLUDE' if exclude_host else HOST
-            return mech_driver._get_tunnels(network_ports, excluded_host)
-
-    def test_get_tunnels(self):
-        tunnels = self._test_get_tunnels('20.0.0.1')
-        self.assertTrue('20.0.0.1' in tunnels)
-
-    def test_get_tunnels_no_ip(self):
-        tunnels = self._test_get_tunnels(None)
-        self.assertEqual(0, len(tunnels))
-
-    def test_get_tunnels_dont_exclude_host(self):
-        tunnels = self._test_get_tunnels(None, exclude_host=False)
-        self.assertEqual(0, len(tunnels))
-
-    def _test_create_agent_fdb(self, fdb_network_ports_query, agent_ips):
-        mech_driver = l2pop_mech_driver.L2populationMechanismDriver()
+    def _test_create_agent_fdb(self, fdb_network_ports_query, agent_ips,
+                               mech_driver=None):
+        mech_driver = (mech_driver or
+                       l2pop_mech_driver.L2populationMechanismDriver())
         tunnel_network_ports_query, tunnel_agent = (
-            self._mock_network_ports_query(HOST + '1', None))
+            self._mock_network_ports_query(HOST + '1', mock.Mock()))
         agent_ips[tunnel_agent] = '10.0.0.1'
 
         def agent_ip_side_effect(agent):
@@ -963,6 +1012,63 @@ class TestL2PopulationMechDriver(base.BaseTestCase):
                             [constants.FLOODING_ENTRY]}}
         self.assertEqual(expected_result, result)
 
+    def _test_create_agent_fdb_exclude(self, host_name, agent_ip):
+        binding = mock.Mock()
+        binding.port = {'mac_address': '00:00:DE:AD:BE:EF',
+                        'fixed_ips': [{'ip_address': '1.1.1.1'}]}
+        fdb_network_ports_query, fdb_agent = (
+            self._mock_network_ports_query(host_name, binding))
+        agent_fdb = self._test_create_agent_fdb(fdb_network_ports_query,
+                                                {fdb_agent: agent_ip})
+        self.assertEqual({'10.0.0.1': [constants.FLOODING_ENTRY]},
+                         agent_fdb['network_id']['ports'])
+
+    def test_create_agent_fdb_no_agent_ip(self):
+        self._test_create_agent_fdb_exclude(HOST + '2', None)
+
+    def test_create_agent_fdb_exclude_host(self):
+        self._test_create_agent_fdb_exclude(HOST, '20.0.0.1')
+
+    def test_create_agent_fdb_cached(self):
+        self.config(fdb_cache_ttl=60, group='l2pop')
+        mech_driver = l2pop_mech_driver.L2populationMechanismDriver()
+        binding = mock.Mock()
+        binding.port_id = 'port_id'
+        binding.port = {'mac_address': '00:00:DE:AD:BE:EF',
+                        'fixed_ips': [{'ip_address': '1.1.1.1'}]}
+        fdb_network_ports_query, fdb_agent = (
+            self._mock_network_ports_query(HOST + '2', binding))
+        self._test_create_agent_fdb(fdb_network_ports_query,
+                                    {fdb_agent: '20.0.0.1'}, mech_driver)
+        mech_driver._set_port_fdb('network_id', 'port_id', HOST + '2',
+                                  '20.0.0.1', [('00:00:DE:AD:BE:EF',
+                                                '2.2.2.2')])
+        mech_driver._set_port_fdb('network_id', 'port_id2', HOST + '3',
+                                  '20.0.0.3', [])
+        mech_driver._remove_port_fdb('network_id', 'port_id2', HOST + '3')
+        agent_fdb = self._test_create_agent_fdb(fdb_network_ports_query, {},
+                                                mech_driver)
+
+        self.assertEqual(1, fdb_network_ports_query.call_count)
+        expected_result = {'10.0.0.1':
+                           [constants.FLOODING_ENTRY],
+                           '20.0.0.1':
+                           [constants.FLOODING_ENTRY,
+                            ('00:00:DE:AD:BE:EF', '2.2.2.2')]}
+        self.assertEqual(expected_result, agent_fdb['network_id']['ports'])
+
+    def test_create_agent_fdb_cache_disabled(self):
+        self.config(fdb_cache_ttl=0, group='l2pop')
+        mech_driver = l2pop_mech_driver.L2populationMechanismDriver()
+        all_mock = mock.Mock()
+        all_mock.all = mock.Mock(return_value=[])
+        fdb_network_ports_query = mock.Mock(return_value=all_mock)
+        for i in range(2):
+            self._test_create_agent_fdb(fdb_network_ports_query, {},
+                                        mech_driver)
+        self.assertEqual(2, fdb_network_ports_query.call_count)
+        self.assertEqual({}, mech_driver.network_fdbs)
+
     def test_update_port_postcommit_mac_address_changed_raises(self):
         port = {'status': u'ACTIVE',
                 'device_owner': u'compute:None',
@@ -984,3 +1090,91 @@ class TestL2PopulationMechDriver(base.BaseTestCase):
         mech_driver = l2pop_mech_driver.L2populationMechanismDriver()
         with testtools.ExpectedException(ml2_exc.MechanismDriverError):
             mech_driver.update_port_postcommit(ctx)
+
+
+class TestL2PopulationAgentNotifyAPI(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestL2PopulationAgentNotifyAPI, self).setUp()
+        self.network_hosts = {'net1': [HOST, HOST + '_2'], 'net2': [HOST]}
+        self.notifier = l2pop_rpc.L2populationAgentNotifyAPI(
+            get_network_hosts=self.network_hosts.get)
+        self.notifier.client = mock.Mock()
+        self.spawn_after = mock.patch('eventlet.spawn_after').start()
+
+    def _fdb_entries(self, network_id, *port_infos):
+        return {network_id: {'segment_id': 1, 'network_type': 'vxlan',
+                             'ports': {'20.0.0.1': list(port_infos)}}}
+
+    def _send_scheduled(self):
+        self.assertEqual(1, self.spawn_after.call_count)
+        args = self.spawn_after.call_args[0]
+        self.assertEqual(0.1, args[0])
+        args[1](*args[2:])
+
+    def test_fdb_entries_merged_by_host(self):
+        port1 = l2pop_rpc.PortInfo('fa:16:3e:00:00:01', '10.0.0.1')
+        port2 = l2pop_rpc.PortInfo('fa:16:3e:00:00:02', '10.0.0.2')
+        port3 = l2pop_rpc.PortInfo('fa:16:3e:00:00:03', '10.0.0.3')
+        ctx = mock.Mock()
+        with mock.patch.object(self.notifier,
+                               '_notification_host') as notify_host:
+            self.notifier.add_fdb_entries(
+                ctx, self._fdb_entries('net1', constants.FLOODING_ENTRY,
+                                       port1))
+            self.notifier.add_fdb_entries(ctx,
+                                          self._fdb_entries('net1', port2))
+            self.notifier.add_fdb_entries(ctx,
+                                          self._fdb_entries('net2', port3))
+            self.notifier.remove_fdb_entries(ctx,
+                                             self._fdb_entries('net1', port1))
+            self.assertFalse(notify_host.called)
+            self._send_scheduled()
+
+        added = self._fdb_entries('net1', constants.FLOODING_ENTRY,
+                                  port1, port2)
+        removed = self._fdb_entries('net1', port1)
+        added_host = dict(added, **self._fdb_entries('net2', port3))
+        notify_host.assert_has_calls(
+            [mock.call(ctx, 'add_fdb_entries', added_host, HOST),
+             mock.call(ctx, 'remove_fdb_entries', removed, HOST)])
+        notify_host.assert_has_calls(
+            [mock.call(ctx, 'add_fdb_entries', added, HOST + '_2'),
+             mock.call(ctx, 'remove_fdb_entries', removed, HOST + '_2')])
+        self.assertEqual(4, notify_host.call_count)
+        self.assertFalse(self.notifier.client.prepare.called)
+
+    def test_fdb_entries_sent_immediately_without_interval(self):
+        self.config(notification_interval=0, group='l2pop')
+        port1 = l2pop_rpc.PortInfo('fa:16:3e:00:00:01', '10.0.0.1')
+        fdb_entries = self._fdb_entries('net2', port1)
+        with mock.patch.object(self.notifier,
+                               '_notification_host') as notify_host:
+            self.notifier.add_fdb_entries(mock.ANY, fdb_entries)
+        notify_host.assert_called_once_with(mock.ANY, 'add_fdb_entries',
+                                            fdb_entries, HOST)
+        self.assertFalse(self.spawn_after.called)
+
+    def test_fdb_entries_fanout_if_hosts_unknown(self):
+        self.notifier.get_network_hosts = mock.Mock(side_effect=ValueError)
+        fdb_entries = self._fdb_entries('net1', constants.FLOODING_ENTRY)
+        self.notifier.add_fdb_entries(mock.ANY, fdb_entries)
+        self._send_scheduled()
+        self.notifier.client.prepare.assert_called_once_with(
+            topic=self.notifier.topic_l2pop_update, fanout=True)
+
+    def test_update_fdb_entries_fanout(self):
+        fdb_entries = {'chg_ip': {'net1': {'20.0.0.1': {}}}}
+        self.notifier.update_fdb_entries(mock.ANY, fdb_entries)
+        self.assertFalse(self.spawn_after.called)
+        self.notifier.client.prepare.assert_called_once_with(
+            topic=self.notifier.topic_l2pop_update, fanout=True)
+
+    def test_notification_stats(self):
+        fdb_entries = self._fdb_entries('net1', constants.FLOODING_ENTRY)
+        self.notifier.add_fdb_entries(mock.ANY, fdb_entries, HOST)
+        self.notifier.add_fdb_entries(mock.ANY, fdb_entries, HOST)
+        size = len(jsonutils.dumps(
+            self.notifier._marshall_fdb_entries(fdb_entries)))
+        self.assertEqual({HOST: {'messages': 2, 'bytes': 2 * size}},
+                         self.notifier.notification_stats)
@@ -141,3 +141,62 @@ class HelpersTest(testlib_api.SqlTestCase):
             observed = self.driver.allocate_partially_specified_segment(
                 self.session, **expected)
             self.check_raw_segment(expected, observed)
+
+    def test_allocate_partial_segment_reuses_reserved_segments(self):
+        with mock.patch.object(self.driver, '_reserve_free_segments',
+                               wraps=self.driver._reserve_free_segments) as (
+                reserve):
+            observed = set(
+                self.driver.allocate_partially_specified_segment(
+                    self.session).vlan_id
+                for i in range(VLAN_MIN, VLAN_MAX + 1))
+        self.assertEqual(set(range(VLAN_MIN, VLAN_MAX + 1)), observed)
+        self.assertEqual(1, reserve.call_count)
+
+    def test_allocate_partial_segment_conflict_drops_reserved_segments(self):
+        expected = dict(physical_network=TENANT_NET)
+        self.driver.allocate_partially_specified_segment(self.session)
+        with mock.patch.object(query.Query, 'update', return_value=0):
+            self.assertRaises(
+                exc.RetryRequest,
+                self.driver.allocate_partially_specified_segment,
+                self.session)
+        self.assertEqual({}, self.driver._free_segments)
+        observed = self.driver.allocate_partially_specified_segment(
+            self.session)
+        self.check_raw_segment(expected, observed)
+
+    def _get_vlan_ids(self, allocated=None):
+        query = self.session.query(type_vlan.VlanAllocation).filter_by(
+            physical_network=TENANT_NET)
+        if allocated is not None:
+            query = query.filter_by(allocated=allocated)
+        return set(alloc.vlan_id for alloc in query)
+
+    def test_sync_allocations(self):
+        self.driver.allocate_fully_specified_segment(
+            self.session, physical_network=TENANT_NET, vlan_id=VLAN_MIN)
+        self.driver._sync_allocations(self.session,
+                                      [(VLAN_MAX - 2, VLAN_MAX + 5),
+                                       (VLAN_MAX + 3, VLAN_MAX + 10)],
+                                      physical_network=TENANT_NET)
+        self.assertEqual(set([VLAN_MIN] + range(VLAN_MAX - 2, VLAN_MAX + 11)),
+                         self._get_vlan_ids())
+        self.assertEqual(set([VLAN_MIN]), self._get_vlan_ids(allocated=True))
+
+    def test_sync_allocations_large_range(self):
+        vlan_max = VLAN_MIN + 3 * helpers.IDPOOL_SYNC_CHUNK_SIZE
+        with mock.patch.object(self.driver, '_add_missing_segments',
+                               wraps=self.driver._add_missing_segments) as (
+                add_missing):
+            self.driver._sync_allocations(self.session,
+                                          [(VLAN_MIN, vlan_max)],
+                                          physical_network=TENANT_NET)
+            self.assertEqual(set(range(VLAN_MIN, vlan_max + 1)),
+                             self._get_vlan_ids())
+            # complete parts of the range are not compared row by row
+            add_missing.reset_mock()
+            self.driver._sync_allocations(self.session,
+                                          [(VLAN_MIN, vlan_max)],
+                                          physical_network=TENANT_NET)
+            self.assertEqual(1, add_missing.call_count)
@@ -195,6 +195,35 @@ class Ml2DBTestCase(testlib_api.SqlTestCase):
         port = ml2_db.get_port(self.ctx.session, port_id)
         self.assertIsNone(port)
 
+    def test_get_ports(self):
+        network_id = 'foo-network-id'
+        port_id = uuidutils.generate_uuid()
+        self._setup_neutron_network(network_id)
+        self._setup_neutron_port(network_id, port_id)
+        self._setup_neutron_port(network_id, 'foo-port-id-one')
+        self._setup_neutron_port(network_id, 'foo-port-id-two')
+
+        ports = ml2_db.get_ports(
+            self.ctx.session,
+            [port_id, port_id[:11], 'foo-port-id-o', 'foo-port-id', 'bar'])
+        self.assertEqual(set([port_id, port_id[:11], 'foo-port-id-o']),
+                         set(ports))
+        self.assertEqual(port_id, ports[port_id[:11]].id)
+        self.assertEqual('foo-port-id-one', ports['foo-port-id-o'].id)
+
+    def test_set_ports_status(self):
+        network_id = 'foo-network-id'
+        self._setup_neutron_network(network_id)
+        ports = [self._setup_neutron_port(network_id, port_id)
+                 for port_id in ('foo-port-id-one', 'foo-port-id-two')]
+
+        ml2_db.set_ports_status(self.ctx.session, ports, 'ACTIVE')
+        self.assertEqual(['ACTIVE', 'ACTIVE'],
+                         [port.status for port in ports])
+        self.ctx.session.expire_all()
+        port = ml2_db.get_port(self.ctx.session, 'foo-port-id-t')
+        self.assertEqual('ACTIVE', port.status)
+
     def test_get_port_from_device_mac(self):
         network_id = 'foo-network-id'
         port_id = 'foo-port-id'
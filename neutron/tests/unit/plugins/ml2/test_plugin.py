@@ -46,6 +46,7 @@ from neutron.plugins.ml2 import db as ml2_db
 from neutron.plugins.ml2 import driver_api
 from neutron.plugins.ml2 import driver_context
 from neutron.plugins.ml2.drivers import type_vlan
+from neutron.plugins.ml2 import managers
 from neutron.plugins.ml2 import models
 from neutron.plugins.ml2 import plugin as ml2_plugin
 from neutron.tests import base
@@ -451,6 +452,89 @@ class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
                 self._validate_behavior_on_bulk_failure(
                     res, 'ports', webob.exc.HTTPServerError.code)
 
+    def test_create_ports_bulk_calls_drivers_once(self):
+        with contextlib.nested(
+            self.network(),
+            mock.patch.object(managers.MechanismManager,
+                              'create_port_bulk_precommit'),
+            mock.patch.object(managers.MechanismManager,
+                              'create_port_bulk_postcommit')
+        ) as (net, precommit, postcommit):
+            res = self._create_port_bulk(self.fmt, 3, net['network']['id'],
+                                         'test', True)
+            ports = self.deserialize(self.fmt, res)['ports']
+
+        contexts = precommit.call_args[0][0]
+        self.assertEqual(set(port['id'] for port in ports),
+                         set(ctx.current['id'] for ctx in contexts))
+        postcommit.assert_called_once_with(contexts)
+
+    def test_create_ports_bulk_postcommit_failure(self):
+        with mock.patch.object(
+                managers.MechanismManager, 'create_port_bulk_postcommit',
+                side_effect=ml2_exc.MechanismDriverError(
+                    method='create_port_bulk_postcommit')):
+            with self.network() as net:
+                res = self._create_port_bulk(self.fmt, 2,
+                                             net['network']['id'],
+                                             'test', True)
+                self._validate_behavior_on_bulk_failure(
+                    res, 'ports', webob.exc.HTTPServerError.code)
+
+    def test_create_ports_bulk_generates_ips_once_per_subnet(self):
+        plugin = manager.NeutronManager.get_plugin()
+        with self.network() as net:
+            with self.subnet(network=net, cidr='10.0.0.0/29'):
+                with mock.patch.object(
+                        base_plugin.NeutronDbPluginV2, '_generate_ips',
+                        wraps=base_plugin.NeutronDbPluginV2._generate_ips
+                ) as generate_ips:
+                    res = self._create_port_bulk(
+                        self.fmt, 3, net['network']['id'], 'test', True)
+                    ports = self.deserialize(self.fmt, res)['ports']
+                self.assertEqual(1, generate_ips.call_count)
+                self.assertEqual(
+                    ['10.0.0.2', '10.0.0.3', '10.0.0.4'],
+                    sorted(port['fixed_ips'][0]['ip_address']
+                           for port in ports))
+                self.assertFalse(plugin._generate_ips_for_ports(
+                    context.get_admin_context(), []))
+
+    def test_create_ports_bulk_uses_generated_ips_of_all_subnets(self):
+        plugin = manager.NeutronManager.get_plugin()
+        with self.network() as net:
+            with self.subnet(network=net, cidr='10.0.0.0/29'),\
+                    self.subnet(network=net, cidr='10.0.1.0/29'):
+                with contextlib.nested(
+                    mock.patch.object(plugin, 'get_subnets',
+                                      wraps=plugin.get_subnets),
+                    mock.patch.object(
+                        base_plugin.NeutronDbPluginV2, '_generate_ip',
+                        wraps=base_plugin.NeutronDbPluginV2._generate_ip)
+                ) as (get_subnets, generate_ip):
+                    res = self._create_port_bulk(
+                        self.fmt, 3, net['network']['id'], 'test', True)
+                    ports = self.deserialize(self.fmt, res)['ports']
+                self.assertEqual(1, get_subnets.call_count)
+                self.assertFalse(generate_ip.called)
+                self.assertEqual(3, len(ports))
+
+    def test_create_ports_bulk_rebuilds_exhausted_ranges(self):
+        with self.network() as net:
+            with self.subnet(network=net, cidr='10.0.0.0/29') as subnet:
+                with self.port(subnet=subnet) as port:
+                    self._delete('ports', port['port']['id'])
+                # The 5 addresses of the subnet are free, only 4 of them
+                # are in the availability ranges
+                res = self._create_port_bulk(self.fmt, 5,
+                                             net['network']['id'],
+                                             'test', True)
+                ports = self.deserialize(self.fmt, res)['ports']
+                self.assertEqual(
+                    ['10.0.0.%s' % i for i in range(2, 7)],
+                    sorted(port['fixed_ips'][0]['ip_address']
+                           for port in ports))
+
     def test_create_ports_bulk_with_sec_grp(self):
         ctx = context.get_admin_context()
         plugin = manager.NeutronManager.get_plugin()
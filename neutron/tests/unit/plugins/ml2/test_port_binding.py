@@ -14,8 +14,11 @@
 #    under the License.
 
 import mock
+from sqlalchemy import event
 
+from neutron.common import constants as const
 from neutron import context
+from neutron.db import api as db_api
 from neutron.extensions import portbindings
 from neutron import manager
 from neutron.plugins.ml2 import config as config
@@ -136,6 +139,52 @@ class PortBindingTestCase(test_plugin.NeutronDbPluginV2TestCase):
                                                cached_networks={})
             self.assertEqual(1, self.plugin.get_network.call_count)
 
+    def _create_bound_ports(self, count):
+        host_arg = {portbindings.HOST_ID: 'host-ovs-no_filter'}
+        with self.network() as net:
+            return [self._make_port(self.fmt, net['network']['id'],
+                                    arg_list=(portbindings.HOST_ID,),
+                                    **host_arg)['port']
+                    for i in range(count)]
+
+    def _get_devices_details_list(self, devices):
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db_api.get_engine()
+        event.listen(engine, 'before_cursor_execute', count_statement)
+        try:
+            details = self.plugin.endpoints[0].get_devices_details_list(
+                context.get_admin_context(), agent_id='theAgentId',
+                host='host-ovs-no_filter', devices=devices)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statement)
+        return details, len(statements)
+
+    def test_get_devices_details_list(self):
+        ports = self._create_bound_ports(2)
+        devices = [ports[0]['id'], 'tap' + ports[1]['id'][:11], 'unknown']
+        details, _count = self._get_devices_details_list(devices)
+        self.assertEqual(devices, [entry['device'] for entry in details])
+        self.assertEqual([port['id'] for port in ports],
+                         [entry['port_id'] for entry in details[:2]])
+        self.assertEqual('local', details[0]['network_type'])
+        self.assertEqual({'device': 'unknown'}, details[2])
+        for port in ports:
+            self.assertEqual(const.PORT_STATUS_BUILD,
+                             self._show('ports', port['id'])['port']['status'])
+
+    def test_get_devices_details_list_query_count(self):
+        ports = self._create_bound_ports(10)
+        _details, count = self._get_devices_details_list(
+            [port['id'] for port in ports[:2]])
+        _details, bulk_count = self._get_devices_details_list(
+            [port['id'] for port in ports[2:]])
+        # The number of queries does not depend on the number of devices
+        self.assertEqual(count, bulk_count)
+
     def _test_update_port_binding(self, host, new_host=None):
         with mock.patch.object(self.plugin,
                                '_notify_port_updated') as notify_mock:
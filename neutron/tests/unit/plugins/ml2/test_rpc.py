@@ -136,19 +136,35 @@ class RpcCallbacksTestCase(base.BaseTestCase):
         self.assertTrue(self.plugin.update_port_status.called)
 
     def test_get_devices_details_list(self):
-        devices = [1, 2, 3, 4, 5]
-        kwargs = {'host': 'fake_host', 'agent_id': 'fake_agent_id'}
-        with mock.patch.object(self.callbacks, 'get_device_details',
-                               side_effect=devices) as f:
-            res = self.callbacks.get_devices_details_list('fake_context',
-                                                          devices=devices,
-                                                          **kwargs)
-            self.assertEqual(devices, res)
-            self.assertEqual(len(devices), f.call_count)
-            calls = [mock.call('fake_context', device=i,
-                               cached_networks={}, **kwargs)
-                     for i in devices]
-            f.assert_has_calls(calls)
+        port = collections.defaultdict(lambda: 'fake')
+        port.update(admin_state_up=True, status=constants.PORT_STATUS_DOWN)
+        port_context = mock.MagicMock(current=port, host='fake_host')
+        self.plugin._device_to_port_id.side_effect = lambda device: device
+        self.plugin.get_bound_port_contexts.return_value = {
+            'dev1': port_context}
+        res = self.callbacks.get_devices_details_list(
+            'fake_context', devices=['dev1', 'dev2'], host='fake_host',
+            agent_id='fake_agent_id')
+        self.assertEqual(['dev1', 'dev2'], [e['device'] for e in res])
+        self.assertIn('network_type', res[0])
+        self.assertEqual({'device': 'dev2'}, res[1])
+        self.plugin.get_bound_port_contexts.assert_called_once_with(
+            'fake_context', mock.ANY, 'fake_host', mock.ANY)
+        self.assertFalse(self.plugin.get_bound_port_context.called)
+        self.plugin.update_port_statuses.assert_called_once_with(
+            'fake_context', ['dev1'], constants.PORT_STATUS_BUILD,
+            'fake_host', mock.ANY)
+        self.assertFalse(self.plugin.update_port_status.called)
+
+    def test_get_devices_details_list_port_status_equal_new_status(self):
+        port = collections.defaultdict(lambda: 'fake')
+        port.update(admin_state_up=False, status=constants.PORT_STATUS_DOWN)
+        self.plugin._device_to_port_id.side_effect = lambda device: device
+        self.plugin.get_bound_port_contexts.return_value = {
+            'dev1': mock.MagicMock(current=port)}
+        self.callbacks.get_devices_details_list('fake_context',
+                                                devices=['dev1'])
+        self.assertFalse(self.plugin.update_port_statuses.called)
 
     def test_get_devices_details_list_with_empty_devices(self):
         with mock.patch.object(self.callbacks, 'get_device_details') as f:
@@ -27,6 +27,7 @@ from neutron.agent.common import ovs_lib
 from neutron.agent.common import utils
 from neutron.agent.linux import async_process
 from neutron.agent.linux import ip_lib
+from neutron.agent.ovsdb.native import port_index
 from neutron.common import constants as n_const
 from neutron.plugins.common import constants as p_const
 from neutron.plugins.ml2.drivers.l2pop import rpc as l2pop_rpc
@@ -307,6 +308,52 @@ class TestOvsNeutronAgent(base.BaseTestCase):
                 vif_port_set, registered_ports, port_tags_dict=port_tags_dict)
         self.assertEqual(expected, actual)
 
+    def _mock_scan_ports_from_index(self, cur_ports, changed_ports,
+                                    registered_ports, updated_ports=None,
+                                    port_states=None):
+        self.agent.vif_port_index = mock.Mock()
+        self.agent.vif_port_index.pop_changes.return_value = (cur_ports,
+                                                              changed_ports)
+        self.agent.vif_port_index.get_ports.return_value = port_states or {}
+        with mock.patch.object(self.agent.int_br,
+                               'get_vif_port_set') as get_vif_port_set:
+            port_info = self.agent.scan_ports(registered_ports, updated_ports)
+        self.assertFalse(get_vif_port_set.called)
+        return port_info
+
+    def test_scan_ports_from_index_returns_port_changes(self):
+        actual = self._mock_scan_ports_from_index(
+            cur_ports=set([1, 3]), changed_ports=set([2, 3]),
+            registered_ports=set([1, 2]))
+        self.assertEqual(dict(current=set([1, 3]), added=set([3]),
+                              removed=set([2])), actual)
+
+    def test_scan_ports_from_index_unchanged(self):
+        actual = self._mock_scan_ports_from_index(
+            cur_ports=set([1, 3]), changed_ports=set(),
+            registered_ports=set([1, 3]), updated_ports=set([3, 4]))
+        self.assertEqual(dict(current=set([1, 3]), updated=set([3])), actual)
+
+    def test_scan_ports_from_index_on_resync(self):
+        actual = self._mock_scan_ports_from_index(
+            cur_ports=set([1, 3]), changed_ports=set(),
+            registered_ports=set())
+        self.assertEqual(dict(current=set([1, 3]), added=set([1, 3]),
+                              removed=set()), actual)
+
+    def test_scan_ports_from_index_returns_changed_vlan(self):
+        br = ovs_lib.OVSBridge('br-int')
+        port = ovs_lib.VifPort('tap1', 1, 1, "ca:fe:de:ad:be:ef", br)
+        lvm = ovs_neutron_agent.LocalVLANMapping(
+            1, '1', None, 1, {port.vif_id: port})
+        port_states = {1: port_index.VifPortState('tap1', 1, 1,
+                                                  port.vif_mac, [])}
+        with mock.patch.dict(self.agent.local_vlan_map, {'1': lvm}):
+            actual = self._mock_scan_ports_from_index(
+                cur_ports=set([1, 3]), changed_ports=set([1]),
+                registered_ports=set([1, 3]), port_states=port_states)
+        self.assertEqual(dict(current=set([1, 3]), updated=set([1])), actual)
+
     def test_treat_devices_added_returns_raises_for_missing_device(self):
         with contextlib.nested(
             mock.patch.object(self.agent.plugin_rpc,
@@ -434,6 +481,38 @@ class TestOvsNeutronAgent(base.BaseTestCase):
     def test_bind_port_with_missing_network(self):
         self.agent._bind_devices([{'network_id': 'non-existent'}])
 
+    def _test_bind_devices(self, flows_applied):
+        self.agent.local_vlan_map['net1'] = mock.Mock(vlan=1)
+        port = mock.Mock(port_name='tap1', ofport=1)
+        manager = mock.Mock()
+        with contextlib.nested(
+            mock.patch.object(self.agent, 'apply_deferred_flows',
+                              return_value=flows_applied),
+            mock.patch.object(self.agent.plugin_rpc, 'update_device_up'),
+            mock.patch.object(self.agent.int_br, 'db_get_val',
+                              return_value=1)
+        ) as (apply_flows, update_device_up, _db_get_val):
+            manager.attach_mock(apply_flows, 'apply_deferred_flows')
+            manager.attach_mock(update_device_up, 'update_device_up')
+            resync = self.agent._bind_devices(
+                [{'network_id': 'net1', 'vif_port': port, 'device': 'dev1',
+                  'admin_state_up': True}])
+        return resync, manager
+
+    def test_bind_devices_applies_flows_before_reporting_up(self):
+        resync, manager = self._test_bind_devices(True)
+        self.assertFalse(resync)
+        manager.assert_has_calls([
+            mock.call.apply_deferred_flows(),
+            mock.call.update_device_up(self.agent.context, 'dev1',
+                                       self.agent.agent_id, mock.ANY)])
+
+    def test_bind_devices_flows_failure(self):
+        resync, manager = self._test_bind_devices(False)
+        self.assertTrue(resync)
+        manager.assert_has_calls([mock.call.apply_deferred_flows()])
+        self.assertFalse(manager.update_device_up.called)
+
     def _test_process_network_ports(self, port_info):
         with contextlib.nested(
             mock.patch.object(self.agent.sg_agent, "setup_port_filters"),
@@ -1094,6 +1173,42 @@ class TestOvsNeutronAgent(base.BaseTestCase):
         self._test_ovs_status(constants.OVS_NORMAL,
                               constants.OVS_RESTARTED)
 
+    def test_defer_apply_flows(self):
+        self.agent.int_br = mock.Mock()
+        self.agent.tun_br = mock.Mock()
+        self.agent.phys_brs = {'physnet1': mock.Mock()}
+        bridges = [self.agent.int_br, self.agent.tun_br,
+                   self.agent.phys_brs['physnet1']]
+        self.agent.defer_apply_flows_on()
+        self.agent.defer_apply_flows_off()
+        for bridge in bridges:
+            bridge.assert_has_calls([mock.call.defer_apply_on(),
+                                     mock.call.defer_apply_off()])
+
+    def test_defer_apply_flows_off_failure(self):
+        self.agent.int_br = mock.Mock()
+        self.agent.tun_br = mock.Mock()
+        self.agent.phys_brs = {}
+        self.agent.int_br.defer_apply_off.side_effect = RuntimeError()
+        with mock.patch.object(ovs_neutron_agent.LOG,
+                               'exception') as log_exception:
+            self.assertFalse(self.agent.defer_apply_flows_off())
+        self.assertTrue(log_exception.called)
+        self.agent.tun_br.defer_apply_off.assert_called_once_with()
+
+    def test_apply_deferred_flows(self):
+        self.agent.int_br = mock.Mock()
+        self.agent.tun_br = None
+        self.agent.phys_brs = {}
+        self.assertTrue(self.agent.apply_deferred_flows())
+        self.assertFalse(self.agent.int_br.defer_apply_off.called)
+        self.agent.defer_apply_flows_on()
+        self.assertTrue(self.agent.apply_deferred_flows())
+        self.agent.int_br.assert_has_calls([mock.call.defer_apply_on(),
+                                            mock.call.defer_apply_off(),
+                                            mock.call.defer_apply_on()])
+        self.assertTrue(self.agent.deferring_flows)
+
     def test_set_rpc_timeout(self):
         self.agent._handle_sigterm(None, None)
         for rpc_client in (self.agent.plugin_rpc.client,
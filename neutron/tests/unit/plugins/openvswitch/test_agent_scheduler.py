@@ -604,6 +604,22 @@ class OvsAgentSchedulerTestCase(OvsAgentSchedulerTestCaseBase):
             self.adminContext, host=DHCP_HOSTA)
         self.assertEqual([], nets)
 
+    def test_list_active_networks_on_active_dhcp_agent_by_ids(self):
+        helpers.register_dhcp_agent(DHCP_HOSTA)
+        hosta_id = self._get_agent_id(constants.AGENT_TYPE_DHCP,
+                                      DHCP_HOSTA)
+        plugin = manager.NeutronManager.get_plugin()
+        with contextlib.nested(self.network(),
+                               self.network()) as (net1, net2):
+            for net in (net1, net2):
+                self._add_network_to_dhcp_agent(hosta_id,
+                                                net['network']['id'])
+            nets = plugin.list_active_networks_on_active_dhcp_agent(
+                self.adminContext, DHCP_HOSTA,
+                network_ids=[net2['network']['id']])
+        self.assertEqual([net2['network']['id']],
+                         [net['id'] for net in nets])
+
     def test_reserved_port_after_network_remove_from_dhcp_agent(self):
         helpers.register_dhcp_agent(DHCP_HOSTA)
         hosta_id = self._get_agent_id(constants.AGENT_TYPE_DHCP,
@@ -899,6 +915,29 @@ class OvsAgentSchedulerTestCase(OvsAgentSchedulerTestCaseBase):
             self.assertIn(router_ids[0], [r['id'] for r in ret_a])
             self.assertIn(router_ids[2], [r['id'] for r in ret_a])
 
+    def test_rpc_get_router_ids(self):
+        l3_rpc_cb = l3_rpc.L3RpcCallback()
+        self._register_agent_states()
+
+        # No routers
+        self.assertEqual(
+            [], l3_rpc_cb.get_router_ids(self.adminContext, host=L3_HOSTA))
+
+        with contextlib.nested(self.router(),
+                               self.router()) as routers:
+            router_ids = [r['router']['id'] for r in routers]
+            # Routers are scheduled to the agent before returning their ids
+            ret_a = l3_rpc_cb.get_router_ids(self.adminContext, host=L3_HOSTA)
+            self.assertEqual(set(router_ids), set(ret_a))
+            hosta_id = self._get_agent_id(constants.AGENT_TYPE_L3, L3_HOSTA)
+            self.assertEqual(
+                2, len(self._list_routers_hosted_by_l3_agent(
+                    hosta_id)['routers']))
+
+            self._set_agent_admin_state_up(L3_HOSTA, False)
+            self.assertEqual(
+                [], l3_rpc_cb.get_router_ids(self.adminContext, host=L3_HOSTA))
+
     def test_router_auto_schedule_for_specified_routers(self):
 
         def _sync_router_with_ids(router_ids, exp_synced, exp_hosted, host_id):
@@ -518,8 +518,18 @@ class TunnelTest(base.BaseTestCase):
 
         self.mock_int_bridge_expected += [
             mock.call.dump_flows_for_table(constants.CANARY_TABLE),
-            mock.call.dump_flows_for_table(constants.CANARY_TABLE)
+            mock.call.defer_apply_on(),
+            mock.call.defer_apply_off(),
+            mock.call.dump_flows_for_table(constants.CANARY_TABLE),
+            mock.call.defer_apply_on()
+        ]
+        deferred_flows_expected = [
+            mock.call.defer_apply_on(),
+            mock.call.defer_apply_off(),
+            mock.call.defer_apply_on()
         ]
+        self.mock_map_tun_bridge_expected += deferred_flows_expected
+        self.mock_tun_bridge_expected += deferred_flows_expected
 
         with contextlib.nested(
             mock.patch.object(log.KeywordArgumentAdapter, 'exception'),
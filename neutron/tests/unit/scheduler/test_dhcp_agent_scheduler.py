@@ -26,6 +26,7 @@ from neutron.db import agentschedulers_db as sched_db
 from neutron.db import models_v2
 from neutron.extensions import dhcpagentscheduler
 from neutron.scheduler import dhcp_agent_scheduler
+from neutron.scheduler import load_tracker
 from neutron.tests.common import helpers
 from neutron.tests.unit import testlib_api
 
@@ -323,6 +324,122 @@ class DHCPAgentWeightSchedulerTestCase(TestDhcpSchedulerBaseTestCase):
         self.assertEqual('host-d', agent3[0]['host'])
 
 
+class DHCPAgentLoadAwareSchedulerTestCase(TestDhcpSchedulerBaseTestCase):
+    """Unit test scenarios for LoadAwareScheduler."""
+
+    def setUp(self):
+        super(DHCPAgentLoadAwareSchedulerTestCase, self).setUp()
+        self.setup_coreplugin('neutron.plugins.ml2.plugin.Ml2Plugin')
+        mock.patch(
+            'neutron.db.agentschedulers_db.DhcpAgentSchedulerDbMixin.'
+            'start_periodic_dhcp_agent_status_check').start()
+        mock.patch.object(dhcp_agent_scheduler, '_NETWORK_LOADS',
+                          load_tracker.BindingLoadTracker(
+                              sched_db.NetworkDhcpAgentBinding,
+                              'dhcp_agent_id')).start()
+        self.plugin = importutils.import_object('neutron.plugins.ml2.plugin.'
+                                                'Ml2Plugin')
+        self.plugin.network_scheduler = importutils.import_object(
+            'neutron.scheduler.dhcp_agent_scheduler.LoadAwareScheduler'
+        )
+        cfg.CONF.set_override('dhcp_agents_per_network', 1)
+
+    def _get_hosts(self, network_id):
+        agents = self.plugin.get_dhcp_agents_hosting_networks(
+            self.ctx, [network_id])
+        return [agent['host'] for agent in agents]
+
+    def test_scheduler_least_networks(self):
+        self._save_networks(['1111', '2222', '3333'])
+        helpers.register_dhcp_agent(HOST_C)
+        helpers.register_dhcp_agent(HOST_D)
+        self.plugin.schedule_network(self.ctx, {'id': '1111'})
+        first_host = self._get_hosts('1111')[0]
+        self.plugin.schedule_network(self.ctx, {'id': '2222'})
+        self.assertNotEqual([first_host], self._get_hosts('2222'))
+        self.plugin.schedule_network(self.ctx, {'id': '3333'})
+        self.assertEqual(1, len(self._get_hosts('3333')))
+
+    def test_scheduler_does_not_count_bindings_per_network(self):
+        self._save_networks(['1111', '2222'])
+        helpers.register_dhcp_agent(HOST_C)
+        helpers.register_dhcp_agent(HOST_D)
+        with mock.patch.object(
+                dhcp_agent_scheduler._NETWORK_LOADS, '_sync',
+                wraps=dhcp_agent_scheduler._NETWORK_LOADS._sync) as sync:
+            self.plugin.schedule_network(self.ctx, {'id': '1111'})
+            self.plugin.schedule_network(self.ctx, {'id': '2222'})
+        self.assertEqual(1, sync.call_count)
+        self.assertNotEqual(self._get_hosts('1111'), self._get_hosts('2222'))
+
+    def test_schedule_networks_spreads_networks(self):
+        network_ids = ['1111', '2222', '3333', '4444']
+        self._save_networks(network_ids)
+        helpers.register_dhcp_agent(HOST_C)
+        helpers.register_dhcp_agent(HOST_D)
+        placement = self.plugin.schedule_networks(
+            self.ctx, [{'id': network_id} for network_id in network_ids])
+        self.assertEqual(set(network_ids), set(placement))
+        hosts = [self._get_hosts(network_id)[0] for network_id in network_ids]
+        self.assertEqual(2, hosts.count(HOST_C))
+        self.assertEqual(2, hosts.count(HOST_D))
+
+    def test_schedule_networks_skips_hosted_networks(self):
+        cfg.CONF.set_override('dhcp_agents_per_network', 2)
+        self._save_networks(['1111', '2222'])
+        agent_c = helpers.register_dhcp_agent(HOST_C)
+        helpers.register_dhcp_agent(HOST_D)
+        self.plugin.add_network_to_dhcp_agent(self.ctx, agent_c.id, '1111')
+        self.plugin.network_scheduler.resource_filter.bind(
+            self.ctx, [agent_c], '2222')
+        helpers.register_dhcp_agent('host-e')
+        placement = self.plugin.schedule_networks(
+            self.ctx, [{'id': '1111'}, {'id': '2222'}])
+        self.assertEqual(['1111', '2222'], sorted(placement))
+        for network_id in ('1111', '2222'):
+            self.assertEqual(2, len(self._get_hosts(network_id)))
+        self.assertEqual({}, self.plugin.schedule_networks(
+            self.ctx, [{'id': '1111'}, {'id': '2222'}]))
+
+    def test_schedule_networks_no_active_agents(self):
+        self._save_networks(['1111'])
+        self.assertEqual({}, self.plugin.schedule_networks(
+            self.ctx, [{'id': '1111'}]))
+        self.assertEqual([], self._get_hosts('1111'))
+
+    def _auto_schedule_networks(self, host, network_ids):
+        subnets = [{'network_id': network_id, 'enable_dhcp': True}
+                   for network_id in network_ids]
+        scheduler = self.plugin.network_scheduler
+        with contextlib.nested(
+            mock.patch.object(self.plugin, 'get_subnets',
+                              return_value=subnets),
+            mock.patch.object(scheduler, 'schedule_networks',
+                              wraps=scheduler.schedule_networks)
+        ) as (get_subnets, bulk):
+            self.assertTrue(scheduler.auto_schedule_networks(
+                self.plugin, self.ctx, host))
+        return bulk
+
+    def test_auto_schedule_networks_spreads_networks(self):
+        network_ids = ['1111', '2222', '3333', '4444']
+        self._save_networks(network_ids)
+        helpers.register_dhcp_agent(HOST_C)
+        helpers.register_dhcp_agent(HOST_D)
+        bulk = self._auto_schedule_networks(HOST_C, network_ids)
+        self.assertEqual(1, bulk.call_count)
+        hosts = [self._get_hosts(network_id)[0] for network_id in network_ids]
+        self.assertEqual(2, hosts.count(HOST_C))
+        self.assertEqual(2, hosts.count(HOST_D))
+
+    def test_auto_schedule_networks_no_agent_on_host(self):
+        self._save_networks(['1111'])
+        helpers.register_dhcp_agent(HOST_D)
+        bulk = self._auto_schedule_networks(HOST_C, ['1111'])
+        self.assertFalse(bulk.called)
+        self.assertEqual([], self._get_hosts('1111'))
+
+
 class TestDhcpSchedulerFilter(TestDhcpSchedulerBaseTestCase,
                               sched_db.DhcpAgentSchedulerDbMixin):
     def _test_get_dhcp_agents_hosting_networks(self, expected, **kwargs):
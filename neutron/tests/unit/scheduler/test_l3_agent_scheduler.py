@@ -39,6 +39,7 @@ from neutron.db import l3_hascheduler_db
 from neutron.extensions import l3agentscheduler as l3agent
 from neutron import manager
 from neutron.scheduler import l3_agent_scheduler
+from neutron.scheduler import load_tracker
 from neutron.tests import base
 from neutron.tests.common import helpers
 from neutron.tests.unit.db import test_db_base_plugin_v2
@@ -890,6 +891,68 @@ class L3AgentLeastRoutersSchedulerTestCase(L3SchedulerTestCaseMixin,
                         self.assertNotEqual(agent_id1, agent_id3)
 
 
+class L3AgentLoadAwareSchedulerTestCase(L3SchedulerTestCaseMixin,
+                                        test_db_base_plugin_v2.
+                                        NeutronDbPluginV2TestCase):
+
+    def setUp(self):
+        super(L3AgentLoadAwareSchedulerTestCase, self).setUp()
+        mock.patch.object(l3_agent_scheduler, '_ROUTER_LOADS',
+                          load_tracker.BindingLoadTracker(
+                              l3_agentschedulers_db.RouterL3AgentBinding,
+                              'l3_agent_id')).start()
+        self.plugin.router_scheduler = importutils.import_object(
+            'neutron.scheduler.l3_agent_scheduler.LoadAwareScheduler'
+        )
+
+    def _get_agent_ids(self, router_ids):
+        agents = self.get_l3_agents_hosting_routers(
+            self.adminContext, router_ids, admin_state_up=True)
+        return [agent['id'] for agent in agents]
+
+    def test_scheduler(self):
+        with self.subnet() as subnet:
+            self._set_net_external(subnet['subnet']['network_id'])
+            with contextlib.nested(
+                    self.router_with_ext_gw(name='r1', subnet=subnet),
+                    self.router_with_ext_gw(name='r2', subnet=subnet)) as (
+                    r1, r2):
+                agent_ids1 = self._get_agent_ids([r1['router']['id']])
+                agent_ids2 = self._get_agent_ids([r2['router']['id']])
+                self.assertEqual(1, len(agent_ids1))
+                self.assertEqual(1, len(agent_ids2))
+                self.assertNotEqual(agent_ids1, agent_ids2)
+
+    def test_schedule_routers_spreads_routers(self):
+        self._set_l3_agent_admin_state(self.adminContext,
+                                       self.agent_id1, False)
+        self._set_l3_agent_admin_state(self.adminContext,
+                                       self.agent_id2, False)
+        with contextlib.nested(self.router(), self.router(),
+                               self.router(), self.router()) as routers:
+            router_ids = [router['router']['id'] for router in routers]
+            self.assertEqual([], self._get_agent_ids(router_ids))
+            self._set_l3_agent_admin_state(self.adminContext,
+                                           self.agent_id1, True)
+            self._set_l3_agent_admin_state(self.adminContext,
+                                           self.agent_id2, True)
+            with mock.patch.object(
+                    self.plugin, 'get_l3_agents',
+                    wraps=self.plugin.get_l3_agents) as get_l3_agents:
+                self.plugin.schedule_routers(self.adminContext, router_ids)
+            self.assertEqual(1, get_l3_agents.call_count)
+            agent_ids = [self._get_agent_ids([router_id])
+                         for router_id in router_ids]
+            self.assertEqual(2, agent_ids.count([self.agent_id1]))
+            self.assertEqual(2, agent_ids.count([self.agent_id2]))
+
+            # The routers already hosted are left as they are
+            with mock.patch.object(self.plugin.router_scheduler,
+                                   'bind_router') as bind_router:
+                self.plugin.schedule_routers(self.adminContext, router_ids)
+            self.assertFalse(bind_router.called)
+
+
 class L3DvrScheduler(l3_db.L3_NAT_db_mixin,
                      l3_dvrscheduler_db.L3_DVRsch_db_mixin):
     pass
@@ -1662,6 +1725,19 @@ class L3HALeastRoutersSchedulerTestCase(L3HATestCaseMixin):
         self.assertIn(self.agent_id4, agent_ids)
 
 
+class L3HALoadAwareSchedulerTestCase(L3HALeastRoutersSchedulerTestCase):
+
+    def setUp(self):
+        super(L3HALoadAwareSchedulerTestCase, self).setUp()
+        mock.patch.object(l3_agent_scheduler, '_ROUTER_LOADS',
+                          load_tracker.BindingLoadTracker(
+                              l3_agentschedulers_db.RouterL3AgentBinding,
+                              'l3_agent_id')).start()
+        self.plugin.router_scheduler = importutils.import_object(
+            'neutron.scheduler.l3_agent_scheduler.LoadAwareScheduler'
+        )
+
+
 class TestGetL3AgentsWithAgentModeFilter(testlib_api.SqlTestCase,
                                          L3SchedulerBaseMixin):
     """Test cases to test get_l3_agents.
@@ -491,6 +491,58 @@ class NeutronPolicyTestCase(base.BaseTestCase):
         result = policy.enforce(self.context, action, target)
         self.assertTrue(result)
 
+    def test_get_checker(self):
+        targets = [{'tenant_id': 'fake', 'shared': False},
+                   {'tenant_id': 'other', 'shared': False},
+                   {'tenant_id': 'other', 'shared': True},
+                   {'tenant_id': 'other', 'shared': False,
+                    'router:external': True}]
+        check = policy.get_checker(self.context, 'get_network')
+        self.assertEqual(
+            [policy.check(self.context, 'get_network', target)
+             for target in targets],
+            [check(target) for target in targets])
+
+    def test_get_checker_evaluates_rule_once_per_target_fields(self):
+        check = policy.get_checker(self.context, 'get_network')
+        with mock.patch.object(policy._ENFORCER, 'enforce',
+                               wraps=policy._ENFORCER.enforce) as enforce:
+            for name in ('net1', 'net2', 'net3'):
+                self.assertTrue(check({'name': name, 'tenant_id': 'fake'}))
+            self.assertFalse(check({'name': 'net4', 'tenant_id': 'other'}))
+        self.assertEqual(2, enforce.call_count)
+
+    def test_get_checker_parent_resource(self):
+        self.rules['get_port'] = common_policy.parse_rule(
+            "rule:admin_or_network_owner")
+        targets = [{'tenant_id': 'other', 'network_id': 'net1'},
+                   {'tenant_id': 'other', 'network_id': 'net2'},
+                   {'tenant_id': 'other', 'network_id': 'net1'}]
+        plugin = manager.NeutronManager.get_instance().plugin
+        with mock.patch.object(plugin, 'get_network',
+                               side_effect=[{'tenant_id': 'fake'},
+                                            {'tenant_id': 'other'}]) as get:
+            check = policy.get_checker(self.context, 'get_port')
+            self.assertEqual([True, False, True],
+                             [check(target) for target in targets])
+        self.assertEqual(2, get.call_count)
+
+    def test_get_checker_rules_reloaded(self):
+        target = {'tenant_id': 'fake'}
+        self.assertTrue(policy.get_checker(self.context,
+                                           'get_network')(target))
+        self.rules['admin_or_owner'] = common_policy.parse_rule('!')
+        self.assertFalse(policy.get_checker(self.context,
+                                            'get_network')(target))
+
+    def test_get_checker_http_rule_not_cached(self):
+        self.rules['get_network'] = common_policy.parse_rule(
+            "http:http://www.example.com")
+        with mock.patch.object(policy, 'check') as check:
+            policy.get_checker(self.context, 'get_network')({})
+        check.assert_called_once_with(self.context, 'get_network', {},
+                                      pluralized=None)
+
     def test_enforce_tenant_id_check_parent_resource(self):
 
         def fakegetnetwork(*args, **kwargs):